@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
+import asyncio
 import base64
 import configparser
+import contextlib
 import hashlib
 import hmac
 import importlib.util
@@ -8,28 +10,32 @@ import json
 import logging
 import mimetypes
 import os
+import queue
 import re
 import secrets
 import shlex
 import shutil
-import signal
 import stat
+import struct
 import subprocess
 import sys
 import time
 import threading
 import tomllib
 import zipfile
+import zlib
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path, PurePosixPath
-from typing import List, Optional
+from typing import Callable, List, Optional, Union
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel
 import httpx
 
@@ -41,14 +47,32 @@ except ImportError:
 
 # Import service modules (handle both package and flat module execution)
 try:
+    from .services import dataset_preflight as dataset_preflight_service  # type: ignore
     from .services import models as models_service  # type: ignore
+    from .services import job_history as job_history_service  # type: ignore
+    from .services import jobs as jobs_service  # type: ignore
+    from .services import logtail as logtail_service  # type: ignore
     from .services import shutdown as shutdown_service  # type: ignore
+    from .services import supervisor as supervisor_service  # type: ignore
     from .services import tagpilot_ai as tagpilot_ai_service  # type: ignore
+    from .services import tensorboard as tensorboard_service  # type: ignore
+    from .services import train_metrics as train_metrics_service  # type: ignore
+    from .services import versions as versions_service  # type: ignore
+    from .services import wheelhouse as wheelhouse_service  # type: ignore
     from .services.comfy import create_router as create_comfy_router  # type: ignore
 except ImportError:
+    from services import dataset_preflight as dataset_preflight_service  # type: ignore
     from services import models as models_service  # type: ignore
+    from services import job_history as job_history_service  # type: ignore
+    from services import jobs as jobs_service  # type: ignore
+    from services import logtail as logtail_service  # type: ignore
     from services import shutdown as shutdown_service  # type: ignore
+    from services import supervisor as supervisor_service  # type: ignore
     from services import tagpilot_ai as tagpilot_ai_service  # type: ignore
+    from services import tensorboard as tensorboard_service  # type: ignore
+    from services import train_metrics as train_metrics_service  # type: ignore
+    from services import versions as versions_service  # type: ignore
+    from services import wheelhouse as wheelhouse_service  # type: ignore
     from services.comfy import create_router as create_comfy_router  # type: ignore
 
 WORKSPACE_ROOT = Path(os.environ.get("WORKSPACE_ROOT", "/workspace"))
@@ -57,6 +81,7 @@ CONFIG_DIR = WORKSPACE_ROOT / "config"
 MANIFEST = Path(os.environ.get("MODELS_MANIFEST", CONFIG_DIR / "models.manifest"))
 DEFAULT_MANIFEST = Path(os.environ.get("DEFAULT_MODELS_MANIFEST", "/opt/pilot/config/models.manifest.default"))
 SUPERVISORCTL = shutil.which("supervisorctl") or "/usr/bin/supervisorctl"
+SUPERVISOR_SOCKET_PATH = os.environ.get("SUPERVISOR_SOCKET_PATH", "/tmp/supervisor.sock")
  
 CORS_ALLOWED_ORIGINS = [
     origin.strip()
@@ -102,6 +127,10 @@ CORS_ALLOW_CREDENTIALS = _parse_bool_env(
 CONTROLPILOT_COOKIE_SECURE = _parse_bool_env("CONTROLPILOT_COOKIE_SECURE", default=False)
 CONTROLPILOT_COOKIE_SAMESITE = _parse_cookie_samesite(os.environ.get("CONTROLPILOT_COOKIE_SAMESITE", "lax"))
 MODEL_PULL_TIMEOUT_SECONDS = max(1, _parse_int_env("MODEL_PULL_TIMEOUT_SECONDS", 1200))
+MODEL_PULL_CONCURRENCY = max(1, _parse_int_env("MODEL_PULL_CONCURRENCY", 2))
+# "native" downloads in-process (ranged, resumable, exact progress); "script" runs get-models.sh.
+MODEL_PULL_ENGINE = "script" if os.environ.get("MODEL_PULL_ENGINE", "").strip().lower() == "script" else "native"
+MODEL_DOWNLOAD_SEGMENTS = max(1, _parse_int_env("MODEL_DOWNLOAD_SEGMENTS", models_service.DOWNLOAD_SEGMENTS_DEFAULT))
 SERVICE_UPDATE_COMMAND_TIMEOUT_SECONDS = max(1, _parse_int_env("SERVICE_UPDATE_COMMAND_TIMEOUT_SECONDS", 1200))
 COPILOT_SIDECAR_TIMEOUT_SECONDS = max(1, _parse_int_env("COPILOT_SIDECAR_TIMEOUT_SECONDS", 60))
 DATASET_UPLOAD_MAX_BYTES = _parse_int_env("DATASET_UPLOAD_MAX_BYTES", 700 * 1024 * 1024)
@@ -109,8 +138,15 @@ DATASET_ZIP_MAX_ENTRIES = max(1, _parse_int_env("DATASET_ZIP_MAX_ENTRIES", 10000
 DATASET_ZIP_MAX_TOTAL_BYTES = max(1, _parse_int_env("DATASET_ZIP_MAX_TOTAL_BYTES", 4 * 1024 * 1024 * 1024))
 DATASET_ZIP_MAX_ENTRY_BYTES = max(1, _parse_int_env("DATASET_ZIP_MAX_ENTRY_BYTES", 2 * 1024 * 1024 * 1024))
 DATASET_ZIP_MAX_COMPRESSION_RATIO = _parse_float_env("DATASET_ZIP_MAX_COMPRESSION_RATIO", 100.0)
+DATASET_EXTRACT_WORKERS = max(1, _parse_int_env("DATASET_EXTRACT_WORKERS", min(8, os.cpu_count() or 1)))
+DATASET_PREFLIGHT_WORKERS = max(1, _parse_int_env("DATASET_PREFLIGHT_WORKERS", dataset_preflight_service.DEFAULT_WORKERS))
 _TAGPILOT_LOAD_DEFAULT_LIMIT = max(0, _parse_int_env("TAGPILOT_LOAD_DEFAULT_LIMIT", 0))
 _TAGPILOT_LOAD_MAX_LIMIT = max(1, _parse_int_env("TAGPILOT_LOAD_MAX_LIMIT", 1000))
+TAGPILOT_CACHE_DIR = Path(os.environ.get("TAGPILOT_CACHE_DIR", str(CONFIG_DIR / "tagpilot" / "cache")))
+TAGPILOT_CACHE_TTL_SECONDS = _parse_float_env(
+    "TAGPILOT_CACHE_TTL_SECONDS", tagpilot_ai_service.CACHE_DEFAULT_TTL_SECONDS
+)
+TAGPILOT_CACHE_MAX_BYTES = _parse_int_env("TAGPILOT_CACHE_MAX_BYTES", tagpilot_ai_service.CACHE_DEFAULT_MAX_BYTES)
 SERVICE_LOGS = {
     "jupyter": ("/workspace/logs/jupyter.out.log", "/workspace/logs/jupyter.err.log"),
     "code-server": ("/workspace/logs/code-server.out.log", "/workspace/logs/code-server.err.log"),
@@ -134,6 +170,9 @@ DISPLAY_NAMES = {
     "copilot": "Copilot Sidecar",
 }
 SERVICES = list(SERVICE_LOGS.keys())
+SERVICE_LOG_MAX_LINES = 5000
+SERVICE_LOG_POLL_SECONDS = 2.0
+SERVICE_LOG_KEEPALIVE_SECONDS = 15.0
 SERVICE_UPDATE_SPECS: dict[str, dict[str, str]] = {
     "invoke": {"kind": "pip", "python_bin": "/opt/venvs/invoke/bin/python", "package": "invokeai"},
     "comfy": {"kind": "git", "repo_dir": "/opt/pilot/repos/ComfyUI"},
@@ -141,12 +180,19 @@ SERVICE_UPDATE_SPECS: dict[str, dict[str, str]] = {
     "diffpipe": {"kind": "git", "repo_dir": "/opt/pilot/repos/diffusion-pipe"},
     "ai-toolkit": {"kind": "git", "repo_dir": "/opt/pilot/repos/ai-toolkit"},
 }
+SERVICE_LATEST_VERSION_TTL_SECONDS = _parse_float_env(
+    "SERVICE_LATEST_VERSION_TTL_SECONDS", versions_service.DEFAULT_LATEST_TTL_SECONDS
+)
 SERVICE_UPDATES_CONFIG_PATH = Path(
     os.environ.get("SERVICE_UPDATES_CONFIG_PATH", str(WORKSPACE_ROOT / "config" / "service-updates.toml"))
 )
+SERVICE_WHEELHOUSE_DIR = Path(os.environ.get("SERVICE_WHEELHOUSE_DIR", str(WORKSPACE_ROOT / "cache" / "wheelhouse")))
 SERVICE_UPDATES_ROLLBACK_LOG_PATH = Path(
     os.environ.get("SERVICE_UPDATES_ROLLBACK_LOG_PATH", str(WORKSPACE_ROOT / "config" / "service-updates-rollback.jsonl"))
 )
+JOB_HISTORY_DB_PATH = Path(os.environ.get("JOB_HISTORY_DB_PATH", str(WORKSPACE_ROOT / "logs" / "job-history.sqlite3")))
+JOB_HISTORY_MAX_ROWS = max(1, _parse_int_env("JOB_HISTORY_MAX_ROWS", job_history_service.DEFAULT_MAX_ROWS))
+JOB_HISTORY_MAX_AGE_DAYS = max(1, _parse_int_env("JOB_HISTORY_MAX_AGE_DAYS", 90))
 SERVICE_AUTOSTART_CONFIG_PATH = Path(
     os.environ.get("SERVICE_AUTOSTART_CONFIG_PATH", str(WORKSPACE_ROOT / "config" / "service-autostart.toml"))
 )
@@ -155,6 +201,7 @@ try:
 except ValueError:
     TENSORBOARD_PORT = 4444
 TENSORBOARD_ROOT = Path(os.environ.get("TENSORBOARD_ROOT_LOGDIR", str(WORKSPACE_ROOT / "logs" / "tensorboard")))
+TENSORBOARD_INDEX_TTL_SECONDS = _parse_float_env("TENSORBOARD_INDEX_TTL_SECONDS", tensorboard_service.DEFAULT_TTL_SECONDS)
 DIFFPIPE_LOGDIR = Path(os.environ.get("DIFFPIPE_LOGDIR", str(WORKSPACE_ROOT / "logs" / "diffusion-pipe")))
 KOHYA_TENSORBOARD_PATH = Path(os.environ.get("KOHYA_TENSORBOARD_LOGDIR", str(WORKSPACE_ROOT / "outputs")))
 AI_TOOLKIT_TENSORBOARD_PATH = Path(os.environ.get("AI_TOOLKIT_TENSORBOARD_LOGDIR", str(WORKSPACE_ROOT / "outputs" / "ai-toolkit")))
@@ -166,17 +213,45 @@ CONTROLPILOT_SESSION_COOKIE = "controlpilot_session"
 TRAINPILOT_BIN = Path("/opt/pilot/apps/TrainPilot/trainpilot.sh")
 TRAINPILOT_BUNDLED_TOML = Path("/opt/pilot/apps/TrainPilot/newlora.toml")
 TRAINPILOT_PERSISTENT_TOML = WORKSPACE_ROOT / "config" / "trainpilot" / "newlora.toml"
-_tp_proc: Optional[subprocess.Popen] = None
-_tp_logs: deque[str] = deque(maxlen=4000)
+_job_runner = jobs_service.runner
+_dataset_preflight = dataset_preflight_service.analyzer
+_dataset_preflight.workers = DATASET_PREFLIGHT_WORKERS
+_job_history = job_history_service.JobHistory(
+    JOB_HISTORY_DB_PATH, max_rows=JOB_HISTORY_MAX_ROWS, max_age_seconds=JOB_HISTORY_MAX_AGE_DAYS * 86400
+)
+_tp_job: Optional[jobs_service.Job] = None
+_tp_logs = logtail_service.SequencedLog(4000)
 _tp_output_dir: Optional[Path] = None
+_tp_train_log_tails = logtail_service.TailCache(limit=100)
+_tensorboard_index = tensorboard_service.EventIndexCache(ttl=TENSORBOARD_INDEX_TTL_SECONDS)
+_tensorboard_scalars = tensorboard_service.ScalarCache()
+_training_metrics = train_metrics_service.MetricsStore(WORKSPACE_ROOT / "logs" / "training-metrics")
+_tp_latest_runs_lock = threading.Lock()
+_tp_latest_runs: Optional[tuple[float, int, int, list[Path]]] = None  # (checked_at, outputs mtime_ns, found, top dirs)
+_TP_LATEST_RUNS_TTL_SECONDS = 30.0
 
 _model_pull_lock = threading.Lock()
 _model_pull_jobs: dict[str, "ModelPullJob"] = {}
+_model_pull_queue: deque["ModelPullJob"] = deque()
+_model_pull_active = 0
 _MODEL_PULL_TTL_SECONDS = 10 * 60
 _MODEL_PULL_PROGRESS_RE = re.compile(r"(?P<pct>\d{1,3})%")
+# tqdm (hf download): "file.safetensors:  45%|####5     | 3.05G/6.78G [00:30<00:37, 101MB/s]"
+_MODEL_PULL_TQDM_RE = re.compile(
+    r"(?P<done>\d+(?:\.\d+)?)(?P<done_unit>[kMGTP]?)i?B?/(?P<total>\d+(?:\.\d+)?)(?P<total_unit>[kMGTP]?)i?B?\s*"
+    r"\[[^\]]*?(?P<rate>\d+(?:\.\d+)?)(?P<rate_unit>[kMGTP]?)i?B/s"
+)
+# curl progress meter: "  45 6780M   45 3051M    0     0   101M      0  0:01:07  0:00:30  0:00:37  101M"
+_MODEL_PULL_CURL_RE = re.compile(
+    r"^\s*\d{1,3}\s+(?P<total>\d+(?:\.\d+)?)(?P<total_unit>[kMGTP]?)\s+\d{1,3}\s+"
+    r"(?P<done>\d+(?:\.\d+)?)(?P<done_unit>[kMGTP]?)\s+\d+\s+\S+\s+\S+\s+\S+\s+\S+\s+\S+\s+\S+\s+"
+    r"(?P<rate>\d+(?:\.\d+)?)(?P<rate_unit>[kMGTP]?)\s*$"
+)
 
 _service_update_lock = threading.Lock()
 _service_update_jobs: dict[str, "ServiceUpdateJob"] = {}
+# Updates wait on their commands (run by the job runner) in a few fixed threads.
+_service_update_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="service-update")
 _SERVICE_UPDATE_TTL_SECONDS = 30 * 60
 logger = logging.getLogger(__name__)
 
@@ -184,7 +259,7 @@ logger = logging.getLogger(__name__)
 @dataclass
 class ModelPullJob:
     name: str
-    state: str = "running"  # running | done | error
+    state: str = "queued"  # queued | running | done | error
     pid: Optional[int] = None
     progress_pct: Optional[int] = None
     last_line: str = ""
@@ -192,6 +267,13 @@ class ModelPullJob:
     started_at: float = field(default_factory=time.time)
     updated_at: float = field(default_factory=time.time)
     output_tail: deque[str] = field(default_factory=lambda: deque(maxlen=200))
+    cmd: list[str] = field(default_factory=list)
+    expected_bytes: Optional[int] = None  # from the manifest, used for queue ETA
+    bytes_done: Optional[int] = None  # current transfer, as reported by the downloader
+    bytes_total: Optional[int] = None
+    rate_bps: Optional[float] = None
+    job_id: Optional[str] = None  # the runner job behind a script pull, see /api/jobs
+    history_id: Optional[str] = None  # row in the job history database
 
 
 def _cleanup_model_pull_jobs(now: Optional[float] = None) -> None:
@@ -205,6 +287,62 @@ def _cleanup_model_pull_jobs(now: Optional[float] = None) -> None:
             _model_pull_jobs.pop(name, None)
 
 
+def _enqueue_model_pull(job: ModelPullJob) -> None:
+    with _model_pull_lock:
+        _model_pull_queue.append(job)
+    _dispatch_model_pulls()
+
+
+def _dispatch_model_pulls() -> None:
+    """Start queued pulls in FIFO order while fewer than MODEL_PULL_CONCURRENCY are running."""
+    global _model_pull_active
+    to_start: list[ModelPullJob] = []
+    with _model_pull_lock:
+        while _model_pull_queue and _model_pull_active < MODEL_PULL_CONCURRENCY:
+            job = _model_pull_queue.popleft()
+            job.state = "running"
+            job.started_at = job.updated_at = time.time()
+            _model_pull_active += 1
+            to_start.append(job)
+    for job in to_start:
+        job.history_id = _job_history.record_start(
+            "model-pull", job.name, started_at=job.started_at, meta={"engine": "script" if job.cmd else "native"}
+        )
+        if job.cmd:
+            _start_model_pull_job(job, job.cmd)
+        else:
+            # In-process download: its thread is bounded by MODEL_PULL_CONCURRENCY.
+            threading.Thread(target=_model_pull_native_worker, args=(job,), daemon=True).start()
+
+
+def _model_pull_finished(job: ModelPullJob, exit_code: Optional[int] = None) -> None:
+    global _model_pull_active
+    _job_history.record_finish(
+        job.history_id,
+        state=job.state,
+        exit_code=exit_code,
+        bytes_transferred=_model_pull_bytes_transferred(job),
+        error=job.error,
+        output_tail=job.output_tail,
+    )
+    with _model_pull_lock:
+        _model_pull_jobs[job.name] = job
+        _model_pull_active -= 1
+    _dispatch_model_pulls()
+
+
+def _model_pull_bytes_transferred(job: ModelPullJob) -> Optional[int]:
+    # A script pull only reports tqdm's reading for the file in flight, not a total.
+    return None if job.cmd else job.bytes_done
+
+
+def _model_pull_native_worker(job: ModelPullJob) -> None:
+    try:
+        _run_model_pull_native(job)
+    finally:
+        _model_pull_finished(job)
+
+
 def _run_model_pull_command(cmd: list[str], timeout: int = MODEL_PULL_TIMEOUT_SECONDS) -> str:
     try:
         result = subprocess.run(
@@ -224,7 +362,7 @@ def _run_model_pull_command(cmd: list[str], timeout: int = MODEL_PULL_TIMEOUT_SE
     return output
 
 
-def _model_pull_job_to_dict(job: ModelPullJob) -> dict:
+def _model_pull_job_to_dict(job: ModelPullJob, queue_position: Optional[int] = None) -> dict:
     return {
         "name": job.name,
         "state": job.state,
@@ -235,6 +373,49 @@ def _model_pull_job_to_dict(job: ModelPullJob) -> dict:
         "started_at": job.started_at,
         "updated_at": job.updated_at,
         "output_tail": list(job.output_tail),
+        "queue_position": queue_position,
+        "expected_bytes": job.expected_bytes,
+        "bytes_done": job.bytes_done,
+        "bytes_total": job.bytes_total,
+        "rate_bps": job.rate_bps,
+        "eta_seconds": _model_pull_eta(job),
+        "job_id": job.job_id,
+    }
+
+
+def _model_pull_size(value: str, unit: str, base: int) -> float:
+    return float(value) * base ** ("kMGTP".index(unit) + 1) if unit else float(value)
+
+
+def _model_pull_eta(job: ModelPullJob) -> Optional[float]:
+    if job.state != "running" or not job.rate_bps or job.bytes_total is None or job.bytes_done is None:
+        return None
+    return max(0.0, (job.bytes_total - job.bytes_done) / job.rate_bps)
+
+
+def _model_pull_aggregate(running: list[ModelPullJob], queued: list[ModelPullJob]) -> dict:
+    """Combined throughput and ETA. Queued pulls count with their manifest size and
+    finish after the running ones, so the ETA is remaining bytes over current throughput."""
+    rate = sum(job.rate_bps or 0.0 for job in running)
+    remaining = 0
+    known = True
+    for job in running:
+        if job.bytes_total is not None and job.bytes_done is not None:
+            remaining += max(0, job.bytes_total - job.bytes_done)
+        elif job.expected_bytes:
+            remaining += job.expected_bytes
+        else:
+            known = False
+    for job in queued:
+        if job.expected_bytes:
+            remaining += job.expected_bytes
+        else:
+            known = False
+    return {
+        "rate_bps": rate,
+        "remaining_bytes": remaining,
+        "remaining_bytes_complete": known,
+        "eta_seconds": remaining / rate if rate > 0 else None,
     }
 
 
@@ -253,41 +434,26 @@ def _update_model_pull_job(job: ModelPullJob, line: str) -> None:
                 job.progress_pct = pct
         except Exception:
             pass
+    # tqdm scales by 1000, curl by 1024.
+    for regex, base in ((_MODEL_PULL_TQDM_RE, 1000), (_MODEL_PULL_CURL_RE, 1024)):
+        t = regex.search(line)
+        if not t:
+            continue
+        job.bytes_done = int(_model_pull_size(t.group("done"), t.group("done_unit"), base))
+        job.bytes_total = int(_model_pull_size(t.group("total"), t.group("total_unit"), base))
+        job.rate_bps = _model_pull_size(t.group("rate"), t.group("rate_unit"), base)
+        if not m and job.bytes_total > 0:
+            job.progress_pct = min(100, int(job.bytes_done * 100 / job.bytes_total))
+        break
+    _job_history.record_progress(job.history_id, output_tail=job.output_tail)
 
 
-def _run_model_pull_job(job: ModelPullJob, cmd: list[str]) -> None:
-    try:
-        env = os.environ.copy()
-        env.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "0")
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            env=env,
-            bufsize=0,
-        )
-        job.pid = proc.pid
-        job.updated_at = time.time()
+def _start_model_pull_job(job: ModelPullJob, cmd: list[str]) -> None:
+    """Run a script pull on the shared job runner; progress is parsed line by line
+    (progress bars redraw with a bare "\r", which the runner also splits on)."""
 
-        assert proc.stdout is not None
-        buf = ""
-        for chunk in iter(lambda: proc.stdout.read(4096), b""):
-            text = chunk.decode("utf-8", errors="replace")
-            buf += text
-            while True:
-                idx_n = buf.find("\\n")
-                idx_r = buf.find("\\r")
-                idxs = [i for i in (idx_n, idx_r) if i != -1]
-                if not idxs:
-                    break
-                idx = min(idxs)
-                seg = buf[:idx]
-                buf = buf[idx + 1 :]
-                _update_model_pull_job(job, seg)
-        if buf.strip():
-            _update_model_pull_job(job, buf)
-        proc.stdout.close()
-        rc = proc.wait()
+    def on_exit(run: jobs_service.Job) -> None:
+        rc = run.returncode
         if rc == 0:
             job.state = "done"
             job.progress_pct = 100
@@ -296,13 +462,67 @@ def _run_model_pull_job(job: ModelPullJob, cmd: list[str]) -> None:
             output = "\n".join(job.output_tail).strip()
             job.error = output[-2000:] if output else f"exit code {rc}"
         job.updated_at = time.time()
+        _model_pull_finished(job, rc)
+
+    env = os.environ.copy()
+    env.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "0")
+    try:
+        run = _job_runner.spawn(
+            cmd,
+            kind="model-pull",
+            name=job.name,
+            env=env,
+            on_line=lambda _run, line: _update_model_pull_job(job, line),
+            on_exit=on_exit,
+            log_lines=job.output_tail.maxlen or 200,
+        )
     except Exception as e:
         job.state = "error"
         job.error = str(e)
         job.updated_at = time.time()
-    finally:
-        with _model_pull_lock:
-            _model_pull_jobs[job.name] = job
+        _model_pull_finished(job)
+        return
+    job.pid = run.pid
+    job.job_id = run.id
+    job.updated_at = time.time()
+
+
+def _run_model_pull_native(job: ModelPullJob) -> None:
+    def report(snap: dict) -> None:
+        done, total = snap["bytes_done"], snap["bytes_total"]
+        job.bytes_done, job.bytes_total, job.rate_bps = done, total, snap["rate_bps"]
+        if total:
+            job.progress_pct = min(100, int(done * 100 / total))
+        line = f"{snap['file']}: {done / 1e6:.1f}/{total / 1e6:.1f} MB" if total else f"{snap['file']}: {done / 1e6:.1f} MB"
+        job.last_line = f"{line} @ {snap['rate_bps'] / 1e6:.1f} MB/s"
+        job.updated_at = time.time()
+        if not job.output_tail or not job.output_tail[-1].startswith(f"{snap['file']}:"):
+            job.output_tail.append(job.last_line)
+        _job_history.record_progress(
+            job.history_id, output_tail=job.output_tail, bytes_transferred=_model_pull_bytes_transferred(job)
+        )
+
+    try:
+        spec = next((s for s in models_service.load_manifest_specs(MANIFEST) if s.name == job.name), None)
+        if spec is None:
+            raise RuntimeError(f"Unknown model: {job.name}")
+        models_service.download_model(
+            spec,
+            MODELS_DIR,
+            token=_read_secret_env_var("HF_TOKEN") or None,
+            segments=MODEL_DOWNLOAD_SEGMENTS,
+            progress=models_service.TransferProgress(report),
+            warn=lambda message: job.output_tail.append(f"Warning: {message}"),
+        )
+        job.state = "done"
+        job.progress_pct = 100
+        job.rate_bps = None
+        job.updated_at = time.time()
+    except Exception as e:
+        job.state = "error"
+        job.error = str(e)
+        job.output_tail.append(str(e))
+        job.updated_at = time.time()
 
 
 @dataclass
@@ -317,6 +537,11 @@ class ServiceUpdateJob:
     installed_after: Optional[str] = None
     rollback_before: Optional[str] = None
     rollback_after: Optional[str] = None
+    reason: str = "update"  # update | rollback
+    phase: Optional[str] = None  # prefetch | install | cleanup
+    downtime_seconds: Optional[float] = None
+    job_id: Optional[str] = None  # runner job of the current/last command, see /api/jobs
+    history_id: Optional[str] = None  # row in the job history database
     started_at: float = field(default_factory=time.time)
     updated_at: float = field(default_factory=time.time)
     output_tail: deque[str] = field(default_factory=lambda: deque(maxlen=300))
@@ -345,6 +570,10 @@ def _service_update_job_to_dict(job: ServiceUpdateJob) -> dict:
         "installed_after": job.installed_after,
         "rollback_before": job.rollback_before,
         "rollback_after": job.rollback_after,
+        "reason": job.reason,
+        "phase": job.phase,
+        "downtime_seconds": job.downtime_seconds,
+        "job_id": job.job_id,
         "started_at": job.started_at,
         "updated_at": job.updated_at,
         "output_tail": list(job.output_tail),
@@ -358,6 +587,7 @@ def _update_service_update_job(job: ServiceUpdateJob, line: str) -> None:
     job.last_line = line
     job.updated_at = time.time()
     job.output_tail.append(line)
+    _job_history.record_progress(job.history_id, output_tail=job.output_tail)
 
 
 class ServiceEntry(BaseModel):
@@ -367,6 +597,9 @@ class ServiceEntry(BaseModel):
     state_raw: str
     running: bool
     autostart: Optional[bool] = None
+    pid: Optional[int] = None
+    uptime: Optional[int] = None  # seconds, while running
+    exit_status: Optional[int] = None
 
 
 class ServiceAutostartRequest(BaseModel):
@@ -380,6 +613,8 @@ class ServiceVersionEntry(BaseModel):
     update_supported: bool
     installed: Optional[str] = None
     latest: Optional[str] = None
+    latest_checked_at: Optional[float] = None
+    latest_pending: bool = False
     update_available: bool = False
     detail: Optional[str] = None
 
@@ -729,6 +964,12 @@ class DatasetEntry(BaseModel):
     path: str
 
 
+class DatasetUploadCreateRequest(BaseModel):
+    filename: str = "dataset.zip"
+    size: int
+    sha256: Optional[str] = None
+
+
 class TrainPilotModelCheckRequest(BaseModel):
     toml_path: str = ""
 
@@ -771,25 +1012,55 @@ def _is_local_path_value(value: str) -> bool:
     return value.startswith("/")
 
 
-_dataset_list_lock = threading.Lock()
-_dataset_list_cache: dict[str, object] = {"expires_at": 0.0, "entries": []}
+_dataset_stats_lock = threading.Lock()
+_dataset_stats: dict[str, "DatasetStats"] = {}
+_dataset_stats_refreshing = False
 _DATASET_LIST_TTL_SECONDS = 8.0
+_DATASET_STATS_WORKERS = 8
 _DATASET_IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"}
 _DATASET_TAG_EXTS = {".txt", ".caption"}
 _DATASET_ROOT = WORKSPACE_ROOT / "datasets"
 _DATASET_ZIP_ROOT = WORKSPACE_ROOT / "datasets" / "ZIPs"
 _OUTPUT_ROOT = WORKSPACE_ROOT / "outputs"
+_DATASET_ZIP_CRC_CHECK_MAX_BYTES = 1024 * 1024
+_DATASET_ZIP_TTL_SECONDS = 10 * 60
+_dataset_zip_lock = threading.Lock()
+_dataset_zip_jobs: dict[str, "DatasetZipJob"] = {}
+_DATASET_EXTRACT_TTL_SECONDS = 10 * 60
+_DATASET_EXTRACT_CHUNK_BYTES = 1024 * 1024
+_DATASET_EXTRACT_QUEUE_CHUNKS = 64
+_dataset_extract_lock = threading.Lock()
+_dataset_extract_jobs: dict[str, "DatasetExtractJob"] = {}
+_DATASET_UPLOAD_SESSION_TTL_SECONDS = 24 * 60 * 60
+_DATASET_UPLOAD_CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+_dataset_upload_lock = threading.Lock()
+_dataset_upload_busy: set[str] = set()
+_dataset_upload_hashers: dict[str, tuple[int, object]] = {}
 
 
-def _scan_dataset_dir(dataset_dir: Path) -> DatasetEntry:
+@dataclass
+class DatasetStats:
+    entry: DatasetEntry
+    dir_mtimes: dict[str, int]  # every directory in the tree -> st_mtime_ns at scan time
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+def _dataset_display_name(raw: str) -> str:
+    trimmed = raw[2:] if raw.startswith("1_") else raw
+    return trimmed.replace("_", " ").strip().title() or raw
+
+
+def _scan_dataset_stats(dataset_dir: Path) -> DatasetStats:
     images = 0
     size_bytes = 0
     has_tags = False
+    dir_mtimes: dict[str, int] = {}
     stack = [dataset_dir]
 
     while stack:
         current = stack.pop()
         try:
+            dir_mtimes[str(current)] = os.stat(current, follow_symlinks=False).st_mtime_ns
             with os.scandir(current) as it:
                 for entry in it:
                     try:
@@ -811,30 +1082,66 @@ def _scan_dataset_dir(dataset_dir: Path) -> DatasetEntry:
             continue
 
     raw = dataset_dir.name
-    trimmed = raw[2:] if raw.startswith("1_") else raw
-    display = trimmed.replace("_", " ").strip().title() or raw
-    return DatasetEntry(
+    entry = DatasetEntry(
         name=raw,
-        display=display,
+        display=_dataset_display_name(raw),
         images=images,
         size_bytes=size_bytes,
         has_tags=has_tags,
         path=str(dataset_dir),
     )
+    return DatasetStats(entry=entry, dir_mtimes=dir_mtimes)
+
+
+def _scan_dataset_dir(dataset_dir: Path) -> DatasetEntry:
+    return _scan_dataset_stats(dataset_dir).entry
+
+
+def _dataset_stats_current(stats: DatasetStats) -> bool:
+    # Adding, removing or renaming a file bumps its directory's mtime, so a
+    # handful of stat calls stands in for walking every file.
+    for path, mtime_ns in stats.dir_mtimes.items():
+        try:
+            if os.stat(path, follow_symlinks=False).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _revalidate_dataset_stats(dataset_dir: Path, previous: DatasetStats) -> None:
+    if _dataset_stats_current(previous):
+        with _dataset_stats_lock:
+            if _dataset_stats.get(dataset_dir.name) is previous:
+                previous.checked_at = time.monotonic()
+        return
+    fresh = _scan_dataset_stats(dataset_dir)
+    with _dataset_stats_lock:
+        # A write endpoint may have stored newer stats while this scan ran.
+        if _dataset_stats.get(dataset_dir.name) is previous:
+            _dataset_stats[dataset_dir.name] = fresh
+
+
+def _refresh_dataset_stats_background(pending: list[tuple[Path, DatasetStats]]) -> None:
+    global _dataset_stats_refreshing
+    try:
+        with ThreadPoolExecutor(max_workers=min(_DATASET_STATS_WORKERS, len(pending))) as pool:
+            for future in [pool.submit(_revalidate_dataset_stats, path, stats) for path, stats in pending]:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Failed to refresh dataset stats")
+    finally:
+        with _dataset_stats_lock:
+            _dataset_stats_refreshing = False
 
 
 def _list_dataset_entries() -> List[DatasetEntry]:
+    global _dataset_stats_refreshing
     base = WORKSPACE_ROOT / "datasets"
     if not base.exists():
         return []
 
-    now = time.monotonic()
-    with _dataset_list_lock:
-        expires_at = float(_dataset_list_cache.get("expires_at", 0.0) or 0.0)
-        cached_entries = _dataset_list_cache.get("entries", [])
-        if expires_at > now and isinstance(cached_entries, list):
-            return list(cached_entries)
-
     dataset_dirs: list[Path] = []
     try:
         with os.scandir(base) as it:
@@ -847,18 +1154,112 @@ def _list_dataset_entries() -> List[DatasetEntry]:
     except Exception:
         return []
 
-    entries = [_scan_dataset_dir(d) for d in sorted(dataset_dirs)]
+    with _dataset_stats_lock:
+        present = {d.name for d in dataset_dirs}
+        for key in [key for key in _dataset_stats if key not in present]:
+            _dataset_stats.pop(key, None)
+        cached = {key: _dataset_stats.get(key) for key in present}
+
+    missing = [d for d in dataset_dirs if cached[d.name] is None]
+    if missing:
+        # Only datasets never seen before are scanned inline, in parallel.
+        with ThreadPoolExecutor(max_workers=min(_DATASET_STATS_WORKERS, len(missing))) as pool:
+            for path, stats in zip(missing, pool.map(_scan_dataset_stats, missing)):
+                cached[path.name] = stats
+        with _dataset_stats_lock:
+            for path in missing:
+                _dataset_stats.setdefault(path.name, cached[path.name])
+
+    now = time.monotonic()
+    stale = [
+        (d, cached[d.name])
+        for d in dataset_dirs
+        if now - cached[d.name].checked_at > _DATASET_LIST_TTL_SECONDS
+    ]
+    if stale:
+        with _dataset_stats_lock:
+            start_refresh = not _dataset_stats_refreshing
+            _dataset_stats_refreshing = True
+        if start_refresh:
+            # Serve what we have; the refreshed numbers show up on the next request.
+            threading.Thread(target=_refresh_dataset_stats_background, args=(stale,), daemon=True).start()
+
+    return [cached[d.name].entry for d in sorted(dataset_dirs)]
+
+
+def _refresh_dataset_stats(dataset_dir: Path) -> None:
+    stats = _scan_dataset_stats(dataset_dir)
+    with _dataset_stats_lock:
+        _dataset_stats[dataset_dir.name] = stats
+
+
+def _drop_dataset_stats(dataset_dir: Path) -> None:
+    with _dataset_stats_lock:
+        _dataset_stats.pop(dataset_dir.name, None)
+
+
+def _move_dataset_stats(source: Path, target: Path) -> None:
+    with _dataset_stats_lock:
+        stats = _dataset_stats.pop(source.name, None)
+        if stats is None:
+            return
+        # A rename leaves the tree's own directory mtimes alone; only the paths move.
+        scanned_root = stats.entry.path
+        dir_mtimes = {
+            str(target) + key[len(scanned_root):]: mtime_ns
+            for key, mtime_ns in stats.dir_mtimes.items()
+        }
+        entry = DatasetEntry(
+            name=target.name,
+            display=_dataset_display_name(target.name),
+            images=stats.entry.images,
+            size_bytes=stats.entry.size_bytes,
+            has_tags=stats.entry.has_tags,
+            path=str(target),
+        )
+        _dataset_stats[target.name] = DatasetStats(entry=entry, dir_mtimes=dir_mtimes)
 
-    with _dataset_list_lock:
-        _dataset_list_cache["expires_at"] = time.monotonic() + _DATASET_LIST_TTL_SECONDS
-        _dataset_list_cache["entries"] = list(entries)
-    return entries
 
+def _record_dataset_file_writes(dataset_dir: Path, writes: list[tuple[Path, Optional[int]]]) -> None:
+    """Fold files just written by an endpoint into the cached stats for their dataset.
 
-def _invalidate_dataset_list_cache() -> None:
-    with _dataset_list_lock:
-        _dataset_list_cache["expires_at"] = 0.0
-        _dataset_list_cache["entries"] = []
+    ``writes`` pairs each written path with its size before the write (None
+    when the file is new).
+    """
+    with _dataset_stats_lock:
+        stats = _dataset_stats.get(dataset_dir.name)
+        if stats is None:
+            return
+        entry = stats.entry
+        images = entry.images
+        size_bytes = entry.size_bytes
+        has_tags = entry.has_tags
+        dir_mtimes = dict(stats.dir_mtimes)
+        for path, old_size in writes:
+            try:
+                size = path.stat().st_size
+                parent = Path(entry.path) / path.parent.relative_to(dataset_dir)
+                dir_mtimes[str(parent)] = os.stat(path.parent, follow_symlinks=False).st_mtime_ns
+            except (OSError, ValueError):
+                continue
+            size_bytes += size - (old_size or 0)
+            suffix = path.suffix.lower()
+            if suffix in _DATASET_IMAGE_EXTS and old_size is None:
+                images += 1
+            elif suffix in _DATASET_TAG_EXTS and size > 0:
+                has_tags = True
+        _dataset_stats[dataset_dir.name] = DatasetStats(
+            entry=DatasetEntry(
+                name=entry.name,
+                display=entry.display,
+                images=images,
+                size_bytes=size_bytes,
+                has_tags=has_tags,
+                path=entry.path,
+            ),
+            dir_mtimes=dir_mtimes,
+            checked_at=stats.checked_at,
+        )
 
 
 class NoCacheStaticFiles(StaticFiles):
@@ -1345,6 +1746,120 @@ def _stream_upload_to_path(upload: UploadFile, destination: Path, *, max_bytes:
     return total
 
 
+_ExtractProgress = Callable[[int, int, int, int], None]
+
+
+def _check_zip_entry_limits(
+    name: str,
+    file_size: int,
+    compress_size: int,
+    *,
+    max_entry_bytes: int,
+    max_ratio: float,
+) -> None:
+    if file_size <= 0:
+        # Keep directory and explicit zero-byte entries out of ratio math.
+        return
+    if file_size > max_entry_bytes:
+        raise ValueError(f"zip entry too large: {name}")
+    if compress_size > 0 and (file_size / max(1, compress_size)) > max_ratio:
+        raise ValueError(f"zip entry compression ratio too high: {name}")
+
+
+def _plan_zip_extraction(
+    zf: zipfile.ZipFile,
+    dest_dir: Path,
+    *,
+    max_entries: int = DATASET_ZIP_MAX_ENTRIES,
+    max_total_bytes: int = DATASET_ZIP_MAX_TOTAL_BYTES,
+    max_entry_bytes: int = DATASET_ZIP_MAX_ENTRY_BYTES,
+    max_ratio: float = DATASET_ZIP_MAX_COMPRESSION_RATIO,
+) -> tuple[list[Path], list[tuple[zipfile.ZipInfo, Path]]]:
+    dirs: list[Path] = []
+    members: list[tuple[zipfile.ZipInfo, Path]] = []
+    total_uncompressed = 0
+    entries_seen = 0
+    for info in zf.infolist():
+        entries_seen += 1
+        if entries_seen > max_entries:
+            raise ValueError(f"zip has too many entries (max {max_entries})")
+
+        if not info.filename:
+            continue
+        if _zipinfo_is_symlink(info):
+            raise ValueError(f"symlink not allowed in zip: {info.filename}")
+        rel_path = _safe_zip_member_path(info.filename)
+        if not rel_path.parts:
+            continue
+        if not info.is_dir():
+            _check_zip_entry_limits(
+                info.filename,
+                info.file_size,
+                info.compress_size,
+                max_entry_bytes=max_entry_bytes,
+                max_ratio=max_ratio,
+            )
+            total_uncompressed += max(0, info.file_size)
+            if total_uncompressed > max_total_bytes:
+                raise ValueError(f"extracted zip would exceed {max_total_bytes} bytes")
+        target = _resolve_under_root(dest_dir, dest_dir / Path(*rel_path.parts))
+        if info.is_dir():
+            dirs.append(target)
+        else:
+            members.append((info, target))
+    return dirs, members
+
+
+def _extract_zip_members(
+    zip_path: Path,
+    members: list[tuple[zipfile.ZipInfo, Path]],
+    *,
+    workers: int = DATASET_EXTRACT_WORKERS,
+    progress: Optional[_ExtractProgress] = None,
+) -> None:
+    entries_total = len(members)
+    bytes_total = sum(max(0, info.file_size) for info, _ in members)
+    counters = {"entries": 0, "bytes": 0}
+    counters_lock = threading.Lock()
+    local = threading.local()
+    handles: list[zipfile.ZipFile] = []
+
+    def _extract(info: zipfile.ZipInfo, target: Path) -> None:
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            # ZipFile handles share one file position; each worker reads through its own.
+            zf = zipfile.ZipFile(zip_path)
+            local.zf = zf
+            with counters_lock:
+                handles.append(zf)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with zf.open(info) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, _DATASET_EXTRACT_CHUNK_BYTES)
+        with counters_lock:
+            counters["entries"] += 1
+            counters["bytes"] += max(0, info.file_size)
+            if progress:
+                progress(counters["entries"], counters["bytes"], entries_total, bytes_total)
+
+    if progress:
+        progress(0, 0, entries_total, bytes_total)
+    try:
+        if workers <= 1 or entries_total <= 1:
+            for info, target in members:
+                _extract(info, target)
+            return
+        pool = ThreadPoolExecutor(max_workers=min(workers, entries_total), thread_name_prefix="dataset-extract")
+        try:
+            futures = [pool.submit(_extract, info, target) for info, target in members]
+            for future in as_completed(futures):
+                future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        for zf in handles:
+            zf.close()
+
+
 def _safe_extract_zip(
     zip_path: Path,
     dest_dir: Path,
@@ -1353,41 +1868,256 @@ def _safe_extract_zip(
     max_total_bytes: int = DATASET_ZIP_MAX_TOTAL_BYTES,
     max_entry_bytes: int = DATASET_ZIP_MAX_ENTRY_BYTES,
     max_ratio: float = DATASET_ZIP_MAX_COMPRESSION_RATIO,
+    workers: int = DATASET_EXTRACT_WORKERS,
+    progress: Optional[_ExtractProgress] = None,
 ) -> None:
     dest_dir = _resolve_under_root(dest_dir, dest_dir)
-    total_uncompressed = 0
-    entries_seen = 0
     with zipfile.ZipFile(zip_path) as zf:
-        for info in zf.infolist():
-            entries_seen += 1
-            if entries_seen > max_entries:
-                raise ValueError(f"zip has too many entries (max {max_entries})")
+        # Validate every member before writing so a rejected archive leaves nothing behind.
+        dirs, members = _plan_zip_extraction(
+            zf,
+            dest_dir,
+            max_entries=max_entries,
+            max_total_bytes=max_total_bytes,
+            max_entry_bytes=max_entry_bytes,
+            max_ratio=max_ratio,
+        )
+    for directory in dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+    _extract_zip_members(zip_path, members, workers=workers, progress=progress)
 
-            if not info.filename:
-                continue
-            if _zipinfo_is_symlink(info):
-                raise ValueError(f"symlink not allowed in zip: {info.filename}")
-            rel_path = _safe_zip_member_path(info.filename)
-            if not rel_path.parts:
-                continue
-            if not info.is_dir():
-                if info.file_size <= 0:
-                    # Keep directory and explicit zero-byte entries out of ratio math.
-                    pass
-                elif info.file_size > max_entry_bytes:
-                    raise ValueError(f"zip entry too large: {info.filename}")
-                elif info.compress_size > 0 and (info.file_size / max(1, info.compress_size)) > max_ratio:
-                    raise ValueError(f"zip entry compression ratio too high: {info.filename}")
-                total_uncompressed += info.file_size
-                if total_uncompressed > max_total_bytes:
-                    raise ValueError(f"extracted zip would exceed {max_total_bytes} bytes")
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_LOCAL_HEADER_SIG = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR_SIG = b"PK\x07\x08"
+_ZIP_FLAG_ENCRYPTED = 0x1
+_ZIP_FLAG_DATA_DESCRIPTOR = 0x8
+_ZIP_FLAG_UTF8 = 0x800
+
+
+class _ZipUploadStream:
+    """Blocking reader over upload chunks that tees every byte into the archive on disk."""
+
+    def __init__(self, chunks: "queue.Queue", sink) -> None:
+        self._chunks = chunks
+        self._sink = sink
+        self._buffer = bytearray()
+        self._eof = False
+        self.received = 0
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._chunks.get()
+        if isinstance(chunk, BaseException):
+            self._eof = True
+            raise chunk
+        if chunk is None:
+            self._eof = True
+            return False
+        self._sink.write(chunk)
+        self.received += len(chunk)
+        self._buffer += chunk
+        return True
+
+    def read(self, size: int) -> bytes:
+        while not self._buffer and self._fill():
+            pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            if not self._fill():
+                raise ValueError("zip upload ended unexpectedly")
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def unread(self, data: bytes) -> None:
+        self._buffer[:0] = data
+
+    def drain(self) -> None:
+        self._buffer.clear()
+        while self._fill():
+            self._buffer.clear()
+
+
+def _zip64_extra_field(extra: bytes) -> Optional[bytes]:
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, pos)
+        if header_id == 0x0001:
+            return extra[pos + 4 : pos + 4 + length]
+        pos += 4 + length
+    return None
+
+
+def _copy_streamed_zip_member(
+    stream: _ZipUploadStream,
+    out,
+    *,
+    name: str,
+    method: int,
+    compress_size: Optional[int],
+    max_size: int,
+    max_ratio: Optional[float] = None,
+) -> tuple[int, int, int]:
+    """Copy one entry's data to ``out``. ``max_ratio`` is enforced as bytes arrive (with
+    one chunk of slack) for entries whose sizes are only known from a data descriptor."""
+    written = 0
+    crc = 0
+    consumed = 0
+
+    def _emit(data: bytes) -> None:
+        nonlocal written, crc
+        if not data:
+            return
+        written += len(data)
+        if written > max_size:
+            raise ValueError(f"zip entry too large: {name}")
+        if max_ratio is not None and written > consumed * max_ratio + _DATASET_EXTRACT_CHUNK_BYTES:
+            raise ValueError(f"zip entry compression ratio too high: {name}")
+        crc = zlib.crc32(data, crc)
+        if out is not None:
+            out.write(data)
+
+    if method == zipfile.ZIP_STORED:
+        remaining = compress_size or 0
+        while remaining:
+            data = stream.read(min(remaining, _DATASET_EXTRACT_CHUNK_BYTES))
+            if not data:
+                raise ValueError("zip upload ended unexpectedly")
+            remaining -= len(data)
+            consumed += len(data)
+            _emit(data)
+        return written, crc, consumed
+
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    remaining = compress_size
+    while not decompressor.eof:
+        if remaining == 0:
+            raise ValueError(f"zip entry is truncated: {name}")
+        want = _DATASET_EXTRACT_CHUNK_BYTES if remaining is None else min(remaining, _DATASET_EXTRACT_CHUNK_BYTES)
+        data = stream.read(want)
+        if not data:
+            raise ValueError("zip upload ended unexpectedly")
+        consumed += len(data)
+        if remaining is not None:
+            remaining -= len(data)
+        while True:
+            # Bound each step so a hostile entry cannot balloon memory before the size checks run.
+            chunk = decompressor.decompress(data, _DATASET_EXTRACT_CHUNK_BYTES)
+            _emit(chunk)
+            data = decompressor.unconsumed_tail
+            if decompressor.eof or (not data and len(chunk) < _DATASET_EXTRACT_CHUNK_BYTES):
+                break
+    if decompressor.unused_data:
+        # Entries without sizes end where the deflate stream ends; hand back what belongs to the next record.
+        stream.unread(decompressor.unused_data)
+        consumed -= len(decompressor.unused_data)
+    return written, crc, consumed
+
+
+def _stream_extract_zip(
+    stream: _ZipUploadStream,
+    dest_dir: Path,
+    *,
+    max_entries: int = DATASET_ZIP_MAX_ENTRIES,
+    max_total_bytes: int = DATASET_ZIP_MAX_TOTAL_BYTES,
+    max_entry_bytes: int = DATASET_ZIP_MAX_ENTRY_BYTES,
+    max_ratio: float = DATASET_ZIP_MAX_COMPRESSION_RATIO,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict[str, tuple[int, int]]:
+    """Extract entries from local headers while the archive is still arriving.
+
+    Stops at the central directory, or at the first entry that cannot be
+    delimited without it (encrypted, stored with a data descriptor, or an
+    unsupported method); those are extracted once the upload completes.
+    Returns ``{member name: (size, crc)}`` for cross-checking against the
+    central directory.
+    """
+    dest_dir = _resolve_under_root(dest_dir, dest_dir)
+    extracted: dict[str, tuple[int, int]] = {}
+    entries_seen = 0
+    total_uncompressed = 0
+    while True:
+        signature = stream.read_exact(4)
+        if signature != _ZIP_LOCAL_HEADER_SIG:
+            stream.unread(signature)
+            return extracted
+        header = signature + stream.read_exact(_ZIP_LOCAL_HEADER.size - 4)
+        (_, _, flags, method, _, _, crc, compress_size, file_size, name_len, extra_len) = _ZIP_LOCAL_HEADER.unpack(header)
+        raw_name = stream.read_exact(name_len)
+        extra = stream.read_exact(extra_len)
+        name = raw_name.decode("utf-8" if flags & _ZIP_FLAG_UTF8 else "cp437")
+        zip64 = _zip64_extra_field(extra)
+        if zip64 is not None:
+            values = [struct.unpack_from("<Q", zip64, offset)[0] for offset in range(0, len(zip64) - 7, 8)]
+            if file_size == 0xFFFFFFFF and values:
+                file_size = values.pop(0)
+            if compress_size == 0xFFFFFFFF and values:
+                compress_size = values.pop(0)
+        has_descriptor = bool(flags & _ZIP_FLAG_DATA_DESCRIPTOR)
+        if (
+            flags & _ZIP_FLAG_ENCRYPTED
+            or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+            or (method == zipfile.ZIP_STORED and has_descriptor)
+        ):
+            return extracted
+
+        entries_seen += 1
+        if entries_seen > max_entries:
+            raise ValueError(f"zip has too many entries (max {max_entries})")
+        rel_path = _safe_zip_member_path(name) if name else PurePosixPath()
+        target: Optional[Path] = None
+        if rel_path.parts:
             target = _resolve_under_root(dest_dir, dest_dir / Path(*rel_path.parts))
-            if info.is_dir():
-                target.mkdir(parents=True, exist_ok=True)
-                continue
+        if not has_descriptor:
+            _check_zip_entry_limits(name, file_size, compress_size, max_entry_bytes=max_entry_bytes, max_ratio=max_ratio)
+        if target is not None and name.endswith("/"):
+            target.mkdir(parents=True, exist_ok=True)
+            target = None
+
+        if not has_descriptor and total_uncompressed + file_size > max_total_bytes:
+            raise ValueError(f"extracted zip would exceed {max_total_bytes} bytes")
+        # Entries with a data descriptor declare no sizes up front: bound them by what is
+        # left of the total budget and check the ratio while inflating.
+        max_size = min(max_entry_bytes if has_descriptor else file_size, max_entry_bytes, max_total_bytes - total_uncompressed)
+        copy_options = {
+            "name": name,
+            "method": method,
+            "compress_size": None if has_descriptor else compress_size,
+            "max_size": max_size,
+            "max_ratio": max_ratio if has_descriptor else None,
+        }
+        if target is not None:
             target.parent.mkdir(parents=True, exist_ok=True)
-            with zf.open(info) as src, open(target, "wb") as dst:
-                shutil.copyfileobj(src, dst)
+            with open(target, "wb") as out:
+                written, actual_crc, consumed = _copy_streamed_zip_member(stream, out, **copy_options)
+        else:
+            written, actual_crc, consumed = _copy_streamed_zip_member(stream, None, **copy_options)
+
+        if has_descriptor:
+            descriptor = stream.read_exact(4)
+            if descriptor == _ZIP_DATA_DESCRIPTOR_SIG:
+                descriptor = stream.read_exact(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            if zip64 is not None:
+                compress_size, file_size = struct.unpack("<QQ", stream.read_exact(16))
+            else:
+                compress_size, file_size = struct.unpack("<II", stream.read_exact(8))
+        if written != file_size or consumed != compress_size or actual_crc != crc:
+            raise ValueError(f"zip entry is corrupt: {name}")
+        _check_zip_entry_limits(name, written, consumed, max_entry_bytes=max_entry_bytes, max_ratio=max_ratio)
+        total_uncompressed += written
+        if total_uncompressed > max_total_bytes:
+            raise ValueError(f"extracted zip would exceed {max_total_bytes} bytes")
+        if rel_path.parts and not name.endswith("/"):
+            extracted[name] = (written, crc)
+        if progress:
+            progress(len(extracted), total_uncompressed)
 
 
 def _safe_upload_filename(name: str) -> str:
@@ -1447,55 +2177,11 @@ def _resolve_existing_dataset_dir(root) -> Path:
 
 
 def _iter_tensorboard_events(base: Path, *, max_depth: int = 8):
-    try:
-        root = base.resolve()
-    except Exception:
-        return []
-
-    if not root.exists():
-        return []
-
-    if root.is_file():
-        if root.name.startswith("events.out.tfevents."):
-            try:
-                return [(root, root.stat().st_mtime)]
-            except Exception:
-                return []
-        return []
-
-    results = []
-    stack = [(root, 0)]
-    while stack:
-        current, depth = stack.pop()
-        try:
-            with os.scandir(current) as entries:
-                for entry in entries:
-                    try:
-                        if entry.is_dir(follow_symlinks=False):
-                            if depth < max_depth:
-                                stack.append((Path(entry.path), depth + 1))
-                            continue
-                        if not entry.is_file(follow_symlinks=False):
-                            continue
-                        if not entry.name.startswith("events.out.tfevents."):
-                            continue
-                        try:
-                            results.append((Path(entry.path), entry.stat(follow_symlinks=False).st_mtime))
-                        except Exception:
-                            continue
-                    except Exception:
-                        continue
-        except Exception:
-            continue
-    return results
+    return _tensorboard_index.index(base, max_depth=max_depth).events()
 
 
 def _latest_tensorboard_event(base: Path, *, max_depth: int = 8) -> Optional[tuple[Path, float]]:
-    candidates = _iter_tensorboard_events(base, max_depth=max_depth)
-    if not candidates:
-        return None
-    path, mtime = max(candidates, key=lambda item: item[1])
-    return path, mtime
+    return _tensorboard_index.index(base, max_depth=max_depth).latest()
 
 
 def _tensorboard_source_status(source: str, paths: list[Path], *, max_depth: int = 8) -> dict:
@@ -1556,12 +2242,381 @@ def _iter_dataset_files(root: Path):
                 continue
 
 
-def _write_dataset_zip(dataset_dir: Path, zip_path: Path) -> None:
+def _write_dataset_zip(dataset_dir: Path, zip_path: Path) -> dict[str, int]:
+    """Bring ZIPs/<name>.zip in line with the dataset directory.
+
+    Images are stored as-is and text members are deflated. When the existing
+    archive only lacks members they are appended in place; otherwise the
+    archive is rewritten, copying unchanged members from the old archive.
+    """
     dataset_root = _safe_dataset_path(dataset_dir)
     safe_zip_path = _safe_dataset_zip_path(zip_path)
-    with zipfile.ZipFile(safe_zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in _iter_dataset_files(dataset_root):
-            zf.write(p, p.relative_to(dataset_root).as_posix())
+    wanted: dict[str, tuple[Path, zipfile.ZipInfo]] = {}
+    for p in _iter_dataset_files(dataset_root):
+        arcname = p.relative_to(dataset_root).as_posix()
+        zinfo = zipfile.ZipInfo.from_file(p, arcname)
+        zinfo.compress_type = _dataset_zip_compression(p)
+        wanted[arcname] = (p, zinfo)
+
+    existing: dict[str, zipfile.ZipInfo] = {}
+    archive_ok = False
+    if safe_zip_path.exists():
+        try:
+            with zipfile.ZipFile(safe_zip_path) as zf:
+                infos = [info for info in zf.infolist() if not info.is_dir()]
+            existing = {info.filename: info for info in infos}
+            archive_ok = len(existing) == len(infos)
+        except (zipfile.BadZipFile, OSError):
+            existing = {}
+
+    added = [name for name in wanted if name not in existing]
+    removed = [name for name in existing if name not in wanted]
+    changed = {
+        name
+        for name, (p, zinfo) in wanted.items()
+        if name in existing and not _zip_member_is_current(existing[name], p, zinfo)
+    }
+    stats = {
+        "added": len(added),
+        "updated": len(changed),
+        "removed": len(removed),
+        "unchanged": len(wanted) - len(added) - len(changed),
+    }
+
+    if archive_ok and not changed and not removed:
+        if added:
+            with zipfile.ZipFile(safe_zip_path, "a") as zf:
+                for name in added:
+                    p, zinfo = wanted[name]
+                    zf.write(p, name, compress_type=zinfo.compress_type)
+        return stats
+
+    tmp_path = safe_zip_path.with_name(f".{safe_zip_path.name}.{os.getpid()}.tmp")
+    try:
+        with zipfile.ZipFile(tmp_path, "w") as out:
+            src = zipfile.ZipFile(safe_zip_path) if existing else None
+            try:
+                for name, (p, zinfo) in wanted.items():
+                    if src is not None and name in existing and name not in changed:
+                        _copy_zip_member(src, existing[name], out)
+                    else:
+                        out.write(p, name, compress_type=zinfo.compress_type)
+            finally:
+                if src is not None:
+                    src.close()
+        os.replace(tmp_path, safe_zip_path)
+    except Exception:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    return stats
+
+
+def _dataset_zip_compression(path: Path) -> int:
+    # Image formats are already compressed; deflating them again only burns CPU.
+    if path.suffix.lower() in _DATASET_IMAGE_EXTS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _zip_member_is_current(info: zipfile.ZipInfo, path: Path, zinfo: zipfile.ZipInfo) -> bool:
+    if info.compress_type != zinfo.compress_type or info.file_size != zinfo.file_size:
+        return False
+    # Stored ZIP timestamps drop odd seconds; compare at that resolution.
+    stored_time = (*zinfo.date_time[:5], zinfo.date_time[5] // 2 * 2)
+    if tuple(info.date_time) != stored_time:
+        return False
+    # ZIP timestamps have 2s resolution, so re-check small text members by CRC.
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED and zinfo.file_size <= _DATASET_ZIP_CRC_CHECK_MAX_BYTES:
+        try:
+            return zipfile.crc32(path.read_bytes()) == info.CRC
+        except OSError:
+            return False
+    return True
+
+
+def _copy_zip_member(src: zipfile.ZipFile, info: zipfile.ZipInfo, out: zipfile.ZipFile) -> None:
+    zinfo = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.external_attr = info.external_attr
+    zinfo.file_size = info.file_size
+    with src.open(info) as reader, out.open(zinfo, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as writer:
+        shutil.copyfileobj(reader, writer, 1024 * 1024)
+
+
+@dataclass
+class DatasetZipJob:
+    name: str
+    zip_path: str
+    state: str = "running"  # running | done | error
+    rerun: bool = False
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+
+def _cleanup_dataset_zip_jobs(now: Optional[float] = None) -> None:
+    ts = now if now is not None else time.time()
+    with _dataset_zip_lock:
+        to_delete = [
+            name
+            for name, job in _dataset_zip_jobs.items()
+            if job.state in ("done", "error") and (ts - job.updated_at) > _DATASET_ZIP_TTL_SECONDS
+        ]
+        for name in to_delete:
+            _dataset_zip_jobs.pop(name, None)
+
+
+def _dataset_zip_job_to_dict(job: DatasetZipJob) -> dict:
+    return {
+        "name": job.name,
+        "zip": job.zip_path,
+        "state": job.state,
+        "added": job.added,
+        "updated": job.updated,
+        "removed": job.removed,
+        "unchanged": job.unchanged,
+        "error": job.error,
+        "started_at": job.started_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def _run_dataset_zip_job(job: DatasetZipJob, dataset_dir: Path, zip_path: Path) -> None:
+    try:
+        while True:
+            stats = _write_dataset_zip(dataset_dir, zip_path)
+            with _dataset_zip_lock:
+                job.added = stats["added"]
+                job.updated = stats["updated"]
+                job.removed = stats["removed"]
+                job.unchanged = stats["unchanged"]
+                job.updated_at = time.time()
+                if not job.rerun:
+                    job.state = "done"
+                    return
+                # More items were saved while this pass ran; sync again.
+                job.rerun = False
+    except Exception as e:
+        logger.exception("Failed to update dataset zip %s", zip_path)
+        with _dataset_zip_lock:
+            job.state = "error"
+            job.error = str(e)
+            job.updated_at = time.time()
+
+
+def _start_dataset_zip_job(dataset_dir: Path, zip_path: Path) -> DatasetZipJob:
+    _cleanup_dataset_zip_jobs()
+    with _dataset_zip_lock:
+        existing = _dataset_zip_jobs.get(dataset_dir.name)
+        if existing and existing.state == "running":
+            existing.rerun = True
+            return existing
+        job = DatasetZipJob(name=dataset_dir.name, zip_path=str(zip_path))
+        _dataset_zip_jobs[job.name] = job
+    threading.Thread(target=_run_dataset_zip_job, args=(job, dataset_dir, zip_path), daemon=True).start()
+    return job
+
+
+@dataclass
+class DatasetExtractJob:
+    name: str
+    zip_path: str
+    path: str
+    mode: str = "archive"  # archive | stream
+    state: str = "running"  # uploading | running | done | error
+    received_bytes: int = 0
+    entries_done: int = 0
+    entries_total: Optional[int] = None
+    bytes_done: int = 0
+    bytes_total: Optional[int] = None
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+
+def _cleanup_dataset_extract_jobs(now: Optional[float] = None) -> None:
+    ts = now if now is not None else time.time()
+    with _dataset_extract_lock:
+        to_delete = [
+            name
+            for name, job in _dataset_extract_jobs.items()
+            if job.state in ("done", "error") and (ts - job.updated_at) > _DATASET_EXTRACT_TTL_SECONDS
+        ]
+        for name in to_delete:
+            _dataset_extract_jobs.pop(name, None)
+
+
+def _dataset_extract_job_to_dict(job: DatasetExtractJob) -> dict:
+    return {
+        "name": job.name,
+        "zip": job.zip_path,
+        "path": job.path,
+        "mode": job.mode,
+        "state": job.state,
+        "received_bytes": job.received_bytes,
+        "entries_done": job.entries_done,
+        "entries_total": job.entries_total,
+        "bytes_done": job.bytes_done,
+        "bytes_total": job.bytes_total,
+        "error": job.error,
+        "started_at": job.started_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def _claim_dataset_extract_job(dataset_dir: Path, zip_path: Path, *, mode: str) -> DatasetExtractJob:
+    _cleanup_dataset_extract_jobs()
+    with _dataset_extract_lock:
+        existing = _dataset_extract_jobs.get(dataset_dir.name)
+        if existing and existing.state in ("uploading", "running"):
+            raise HTTPException(status_code=409, detail="dataset extraction already in progress")
+        job = DatasetExtractJob(
+            name=dataset_dir.name,
+            zip_path=str(zip_path),
+            path=str(dataset_dir),
+            mode=mode,
+            state="uploading" if mode == "stream" else "running",
+        )
+        _dataset_extract_jobs[job.name] = job
+    return job
+
+
+def _set_dataset_extract_progress(
+    job: DatasetExtractJob,
+    entries_done: int,
+    bytes_done: int,
+    entries_total: Optional[int] = None,
+    bytes_total: Optional[int] = None,
+) -> None:
+    with _dataset_extract_lock:
+        job.entries_done = entries_done
+        job.bytes_done = bytes_done
+        if entries_total is not None:
+            job.entries_total = entries_total
+        if bytes_total is not None:
+            job.bytes_total = bytes_total
+        job.updated_at = time.time()
+
+
+def _fail_dataset_extract_job(job: DatasetExtractJob, dataset_dir: Path, error: Exception) -> None:
+    logger.warning("Dataset extraction failed for %s: %s", job.name, error)
+    # Never leave a half-extracted dataset behind for training to pick up.
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    with _dataset_extract_lock:
+        job.state = "error"
+        job.error = str(error)
+        job.updated_at = time.time()
+    _refresh_dataset_stats(dataset_dir)
+
+
+def _finish_dataset_extract_job(job: DatasetExtractJob) -> None:
+    with _dataset_extract_lock:
+        job.state = "done"
+        job.updated_at = time.time()
+    _refresh_dataset_stats(Path(job.path))
+
+
+def _run_dataset_extract_job(job: DatasetExtractJob, zip_path: Path, dataset_dir: Path) -> None:
+    try:
+        _safe_extract_zip(
+            zip_path,
+            dataset_dir,
+            progress=lambda done, nbytes, total, total_bytes: _set_dataset_extract_progress(
+                job, done, nbytes, total, total_bytes
+            ),
+        )
+    except Exception as e:
+        _fail_dataset_extract_job(job, dataset_dir, e)
+        return
+    _finish_dataset_extract_job(job)
+
+
+def _start_dataset_extract_job(job: DatasetExtractJob, zip_path: Path, dataset_dir: Path) -> DatasetExtractJob:
+    threading.Thread(target=_run_dataset_extract_job, args=(job, zip_path, dataset_dir), daemon=True).start()
+    return job
+
+
+def _run_dataset_stream_extract_job(
+    job: DatasetExtractJob,
+    chunks: "queue.Queue",
+    zip_path: Path,
+    dataset_dir: Path,
+    consumed: threading.Event,
+) -> None:
+    uploaded = False
+    try:
+        try:
+            with zip_path.open("wb") as sink:
+                stream = _ZipUploadStream(chunks, sink)
+                streamed = _stream_extract_zip(
+                    stream,
+                    dataset_dir,
+                    progress=lambda done, nbytes: _set_dataset_extract_progress(job, done, nbytes),
+                )
+                # Deferred members and the central directory only need to reach the disk.
+                stream.drain()
+            uploaded = True
+        finally:
+            if not uploaded:
+                zip_path.unlink(missing_ok=True)
+        with _dataset_extract_lock:
+            job.state = "running"
+            job.updated_at = time.time()
+        consumed.set()
+
+        with zipfile.ZipFile(zip_path) as zf:
+            dirs, members = _plan_zip_extraction(zf, dataset_dir)
+        # The central directory is authoritative; local headers must agree with it.
+        central = {info.filename: info for info, _ in members}
+        for name, (size, crc) in streamed.items():
+            info = central.get(name)
+            if info is None or info.file_size != size or info.CRC != crc:
+                raise ValueError(f"zip entry does not match central directory: {name}")
+        for directory in dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+        remaining = [(info, target) for info, target in members if info.filename not in streamed]
+        streamed_bytes = sum(size for size, _ in streamed.values())
+        _extract_zip_members(
+            zip_path,
+            remaining,
+            progress=lambda done, nbytes, total, total_bytes: _set_dataset_extract_progress(
+                job,
+                len(streamed) + done,
+                streamed_bytes + nbytes,
+                len(streamed) + total,
+                streamed_bytes + total_bytes,
+            ),
+        )
+    except Exception as e:
+        _fail_dataset_extract_job(job, dataset_dir, e)
+        return
+    finally:
+        consumed.set()
+    _finish_dataset_extract_job(job)
+
+
+async def _feed_dataset_extract_queue(chunks: "queue.Queue", item, worker: threading.Thread) -> bool:
+    while worker.is_alive():
+        try:
+            chunks.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        try:
+            # Backpressure: the request waits while extraction catches up.
+            await asyncio.to_thread(chunks.put, item, True, 0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
 
 
 @app.post("/api/datasets/create")
@@ -1574,7 +2629,7 @@ def create_dataset(payload: dict):
         raise HTTPException(status_code=400, detail="dataset already exists")
     target = _safe_dataset_path(target)
     target.mkdir(parents=True, exist_ok=True)
-    _invalidate_dataset_list_cache()
+    _refresh_dataset_stats(target)
     return {"status": "created", "path": str(target)}
 
 
@@ -1589,20 +2644,364 @@ def upload_dataset(file: UploadFile = File(...)):
     fname_stem = _clean_name(Path(file.filename or "dataset.zip").stem)
     fname = fname_stem + ".zip"
     dest = _safe_dataset_zip_path(zip_dir / fname)
+    # Extract into /workspace/datasets/<cleaned_name>
+    extract_dir = _safe_dataset_path(target_dir / f"1_{fname_stem}")
+    job = _claim_dataset_extract_job(extract_dir, dest, mode="archive")
     try:
         _stream_upload_to_path(file, dest, max_bytes=DATASET_UPLOAD_MAX_BYTES)
-        # Extract into /workspace/datasets/<cleaned_name>
-        extract_dir = _safe_dataset_path(target_dir / f"1_{fname_stem}")
         if extract_dir.exists():
             shutil.rmtree(extract_dir, ignore_errors=True)
         extract_dir.mkdir(parents=True, exist_ok=True)
-        _safe_extract_zip(dest, extract_dir)
-    except HTTPException:
+    except Exception as e:
+        # Nothing was extracted yet; keep the existing dataset and forget the job.
+        with _dataset_extract_lock:
+            _dataset_extract_jobs.pop(job.name, None)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail="Failed to upload dataset")
+    # Large archives take a while to unpack; extraction continues in the background.
+    _refresh_dataset_stats(extract_dir)
+    _start_dataset_extract_job(job, dest, extract_dir)
+    return {
+        "status": "uploaded",
+        "zip": str(dest),
+        "extracted_to": str(extract_dir),
+        "extract_job": _dataset_extract_job_to_dict(job),
+    }
+
+
+@app.put("/api/datasets/upload/stream")
+async def upload_dataset_stream(request: Request, filename: str = "dataset.zip"):
+    zip_dir = _safe_dataset_zip_path(WORKSPACE_ROOT / "datasets" / "ZIPs")
+    target_dir = _safe_dataset_path(WORKSPACE_ROOT / "datasets")
+    zip_dir.mkdir(parents=True, exist_ok=True)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    fname_stem = _clean_name(Path(filename or "dataset.zip").stem)
+    dest = _safe_dataset_zip_path(zip_dir / f"{fname_stem}.zip")
+    declared = (request.headers.get("content-length") or "").strip()
+    if declared.isdigit() and int(declared) > DATASET_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"upload exceeds limit ({DATASET_UPLOAD_MAX_BYTES} bytes)")
+    extract_dir = _safe_dataset_path(target_dir / f"1_{fname_stem}")
+    job = _claim_dataset_extract_job(extract_dir, dest, mode="stream")
+    if extract_dir.exists():
+        shutil.rmtree(extract_dir, ignore_errors=True)
+    extract_dir.mkdir(parents=True, exist_ok=True)
+    _refresh_dataset_stats(extract_dir)
+
+    # Members are validated and written by a worker thread while the body is still arriving.
+    chunks: queue.Queue = queue.Queue(maxsize=_DATASET_EXTRACT_QUEUE_CHUNKS)
+    consumed = threading.Event()
+    worker = threading.Thread(
+        target=_run_dataset_stream_extract_job,
+        args=(job, chunks, dest, extract_dir, consumed),
+        daemon=True,
+    )
+    worker.start()
+    received = 0
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            received += len(chunk)
+            if received > DATASET_UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"upload exceeds limit ({DATASET_UPLOAD_MAX_BYTES} bytes)")
+            if not await _feed_dataset_extract_queue(chunks, chunk, worker):
+                break
+            with _dataset_extract_lock:
+                job.received_bytes = received
+                job.updated_at = time.time()
+        else:
+            await _feed_dataset_extract_queue(chunks, None, worker)
+    except BaseException as e:
+        failure = e if isinstance(e, Exception) else RuntimeError("upload interrupted")
+        await _feed_dataset_extract_queue(chunks, failure, worker)
         raise
+    # Report problems found in the streamed members; central-directory checks continue in the background.
+    await asyncio.to_thread(consumed.wait)
+
+    with _dataset_extract_lock:
+        failed = job.state == "error"
+        error = job.error
+        payload = _dataset_extract_job_to_dict(job)
+    if failed:
+        raise HTTPException(status_code=400, detail=error or "Failed to extract dataset archive")
+    return {"status": "uploaded", "zip": str(dest), "extracted_to": str(extract_dir), "extract_job": payload}
+
+
+def _dataset_upload_dir() -> Path:
+    upload_dir = _safe_dataset_zip_path(_DATASET_ZIP_ROOT / ".uploads")
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir
+
+
+def _dataset_upload_paths(upload_id: str) -> tuple[Path, Path]:
+    if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    upload_dir = _dataset_upload_dir()
+    return upload_dir / f"{upload_id}.json", upload_dir / f"{upload_id}.part"
+
+
+def _read_dataset_upload(upload_id: str) -> dict:
+    meta_path, part_path = _dataset_upload_paths(upload_id)
+    try:
+        session = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if not isinstance(session, dict) or not part_path.exists():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+def _write_dataset_upload(session: dict) -> None:
+    meta_path, _ = _dataset_upload_paths(session["id"])
+    tmp_path = meta_path.with_name(f".{meta_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(session), encoding="utf-8")
+    os.replace(tmp_path, meta_path)
+
+
+def _discard_dataset_upload(upload_id: str) -> None:
+    for path in _dataset_upload_paths(upload_id):
+        path.unlink(missing_ok=True)
+    with _dataset_upload_lock:
+        _dataset_upload_hashers.pop(upload_id, None)
+
+
+def _cleanup_dataset_uploads(now: Optional[float] = None) -> None:
+    ts = now if now is not None else time.time()
+    for meta_path in _dataset_upload_dir().glob("*.json"):
+        try:
+            updated_at = float(json.loads(meta_path.read_text(encoding="utf-8")).get("updated_at") or 0)
+        except (OSError, ValueError, AttributeError):
+            updated_at = 0.0
+        if (ts - updated_at) <= _DATASET_UPLOAD_SESSION_TTL_SECONDS:
+            continue
+        with _dataset_upload_lock:
+            if meta_path.stem in _dataset_upload_busy:
+                continue
+        _discard_dataset_upload(meta_path.stem)
+
+
+def _dataset_upload_to_dict(session: dict) -> dict:
+    return {
+        "id": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["offset"],
+        "sha256": session.get("sha256"),
+        "created_at": session["created_at"],
+        "updated_at": session["updated_at"],
+        "expires_at": session["updated_at"] + _DATASET_UPLOAD_SESSION_TTL_SECONDS,
+    }
+
+
+def _claim_dataset_upload(upload_id: str) -> None:
+    with _dataset_upload_lock:
+        if upload_id in _dataset_upload_busy:
+            raise HTTPException(status_code=409, detail="upload is busy")
+        _dataset_upload_busy.add(upload_id)
+
+
+def _release_dataset_upload(upload_id: str) -> None:
+    with _dataset_upload_lock:
+        _dataset_upload_busy.discard(upload_id)
+
+
+def _parse_upload_checksum(header: Optional[str]) -> Optional[tuple[str, bytes]]:
+    if not header or not header.strip():
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in _DATASET_UPLOAD_CHECKSUM_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"unsupported checksum algorithm: {algorithm}")
+    try:
+        digest = base64.b64decode(value.strip(), validate=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid Upload-Checksum header")
+    return algorithm, digest
+
+
+def _dataset_upload_file_hasher(upload_id: str, part_path: Path, offset: int):
+    with _dataset_upload_lock:
+        cached = _dataset_upload_hashers.get(upload_id)
+        if cached and cached[0] == offset:
+            return cached[1].copy()
+    # First chunk since a restart: rebuild the running digest from what is on disk.
+    hasher = hashlib.sha256()
+    remaining = offset
+    with part_path.open("rb") as src:
+        while remaining:
+            block = src.read(min(remaining, _DATASET_EXTRACT_CHUNK_BYTES))
+            if not block:
+                raise HTTPException(status_code=409, detail="upload data is missing; start a new upload")
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+@app.post("/api/datasets/uploads")
+def create_dataset_upload(payload: DatasetUploadCreateRequest):
+    _cleanup_dataset_uploads()
+    if payload.size < 0:
+        raise HTTPException(status_code=400, detail="size must be >= 0")
+    if payload.size > DATASET_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"upload exceeds limit ({DATASET_UPLOAD_MAX_BYTES} bytes)")
+    sha256 = (payload.sha256 or "").strip().lower() or None
+    if sha256 and not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be a hex digest")
+    now = time.time()
+    session = {
+        "id": secrets.token_hex(16),
+        "filename": Path((payload.filename or "").replace("\\", "/")).name or "dataset.zip",
+        "size": payload.size,
+        "offset": 0,
+        "sha256": sha256,
+        "created_at": now,
+        "updated_at": now,
+    }
+    _, part_path = _dataset_upload_paths(session["id"])
+    part_path.touch()
+    _write_dataset_upload(session)
+    return _dataset_upload_to_dict(session)
+
+
+@app.get("/api/datasets/uploads/{upload_id}")
+def dataset_upload_status(upload_id: str):
+    return _dataset_upload_to_dict(_read_dataset_upload(upload_id))
+
+
+@app.patch("/api/datasets/uploads/{upload_id}")
+async def append_dataset_upload(upload_id: str, request: Request):
+    _read_dataset_upload(upload_id)
+    raw_offset = (request.headers.get("upload-offset") or "").strip()
+    if not raw_offset.isdigit():
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    checksum = _parse_upload_checksum(request.headers.get("upload-checksum"))
+    _, part_path = _dataset_upload_paths(upload_id)
+    _claim_dataset_upload(upload_id)
+    offset: Optional[int] = None
+    keep_partial = False
+    try:
+        session = _read_dataset_upload(upload_id)
+        if int(raw_offset) != int(session["offset"]):
+            raise HTTPException(status_code=409, detail=f"offset mismatch (upload is at {session['offset']})")
+        offset = int(session["offset"])
+        remaining = int(session["size"]) - offset
+        chunk_hasher = hashlib.new(checksum[0]) if checksum else None
+        file_hasher = None
+        if session.get("sha256"):
+            file_hasher = await asyncio.to_thread(_dataset_upload_file_hasher, upload_id, part_path, offset)
+        hashers = [h for h in (chunk_hasher, file_hasher) if h is not None]
+
+        def _write_block(out, block: bytes) -> None:
+            out.write(block)
+            for hasher in hashers:
+                hasher.update(block)
+
+        written = 0
+        # Chunks go straight into the .part file that finalize renames into ZIPs/.
+        with part_path.open("r+b") as out:
+            out.seek(offset)
+            out.truncate()
+            pending = bytearray()
+            try:
+                async for data in request.stream():
+                    if not data:
+                        continue
+                    if written + len(pending) + len(data) > remaining:
+                        raise HTTPException(status_code=413, detail="chunk exceeds the declared upload size")
+                    pending += data
+                    if len(pending) >= _DATASET_EXTRACT_CHUNK_BYTES:
+                        await asyncio.to_thread(_write_block, out, bytes(pending))
+                        written += len(pending)
+                        pending.clear()
+            except ClientDisconnect:
+                # Without a chunk checksum, whatever arrived is kept and the client resumes from there.
+                keep_partial = chunk_hasher is None
+                if not keep_partial:
+                    raise
+            if pending:
+                await asyncio.to_thread(_write_block, out, bytes(pending))
+                written += len(pending)
+            if chunk_hasher is not None and chunk_hasher.digest() != checksum[1]:
+                raise HTTPException(status_code=400, detail="chunk checksum mismatch")
+        session["offset"] = offset + written
+        session["updated_at"] = time.time()
+        _write_dataset_upload(session)
+        if file_hasher is not None:
+            with _dataset_upload_lock:
+                _dataset_upload_hashers[upload_id] = (session["offset"], file_hasher)
     except Exception:
-        raise HTTPException(status_code=500, detail="Failed to upload dataset")
-    _invalidate_dataset_list_cache()
-    return {"status": "uploaded", "zip": str(dest), "extracted_to": str(extract_dir)}
+        if offset is not None and not keep_partial:
+            # Drop the rejected chunk so the client can resend it from the same offset.
+            with contextlib.suppress(OSError):
+                with part_path.open("r+b") as out:
+                    out.truncate(offset)
+        raise
+    finally:
+        _release_dataset_upload(upload_id)
+    return _dataset_upload_to_dict(session)
+
+
+@app.post("/api/datasets/uploads/{upload_id}/finalize")
+def finalize_dataset_upload(upload_id: str):
+    _claim_dataset_upload(upload_id)
+    try:
+        session = _read_dataset_upload(upload_id)
+        if session["offset"] != session["size"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"upload incomplete ({session['offset']} of {session['size']} bytes)",
+            )
+        _, part_path = _dataset_upload_paths(upload_id)
+        if session.get("sha256"):
+            digest = _dataset_upload_file_hasher(upload_id, part_path, session["offset"]).hexdigest()
+            if digest != session["sha256"]:
+                _discard_dataset_upload(upload_id)
+                raise HTTPException(status_code=400, detail="upload checksum mismatch; start a new upload")
+        zip_dir = _safe_dataset_zip_path(WORKSPACE_ROOT / "datasets" / "ZIPs")
+        target_dir = _safe_dataset_path(WORKSPACE_ROOT / "datasets")
+        target_dir.mkdir(parents=True, exist_ok=True)
+        fname_stem = _clean_name(Path(session["filename"]).stem)
+        dest = _safe_dataset_zip_path(zip_dir / f"{fname_stem}.zip")
+        extract_dir = _safe_dataset_path(target_dir / f"1_{fname_stem}")
+        job = _claim_dataset_extract_job(extract_dir, dest, mode="archive")
+        os.replace(part_path, dest)
+        _discard_dataset_upload(upload_id)
+        if extract_dir.exists():
+            shutil.rmtree(extract_dir, ignore_errors=True)
+        extract_dir.mkdir(parents=True, exist_ok=True)
+    finally:
+        _release_dataset_upload(upload_id)
+    _refresh_dataset_stats(extract_dir)
+    _start_dataset_extract_job(job, dest, extract_dir)
+    return {
+        "status": "uploaded",
+        "zip": str(dest),
+        "extracted_to": str(extract_dir),
+        "extract_job": _dataset_extract_job_to_dict(job),
+    }
+
+
+@app.delete("/api/datasets/uploads/{upload_id}")
+def delete_dataset_upload(upload_id: str):
+    _read_dataset_upload(upload_id)
+    _claim_dataset_upload(upload_id)
+    try:
+        _discard_dataset_upload(upload_id)
+    finally:
+        _release_dataset_upload(upload_id)
+    return {"status": "deleted", "id": upload_id}
+
+
+@app.get("/api/datasets/{name}/extract/status")
+def dataset_extract_status(name: str):
+    _cleanup_dataset_extract_jobs()
+    dataset_name = _dataset_dir(name).name
+    with _dataset_extract_lock:
+        job = _dataset_extract_jobs.get(dataset_name)
+        if not job:
+            return {"name": dataset_name, "state": "idle"}
+        return _dataset_extract_job_to_dict(job)
 
 
 @app.delete("/api/datasets/{name}")
@@ -1624,7 +3023,7 @@ def delete_dataset(name: str):
                 safe_candidate.unlink()
             except Exception:
                 pass
-    _invalidate_dataset_list_cache()
+    _drop_dataset_stats(target)
     return {"status": "deleted", "path": str(target)}
 
 
@@ -1662,7 +3061,7 @@ def rename_dataset(name: str, payload: dict):
                     safe_old.rename(safe_new)
                 except Exception:
                     pass  # Best effort
-        _invalidate_dataset_list_cache()
+        _move_dataset_stats(source, target)
         return {"status": "renamed", "old_path": str(source), "new_path": str(target)}
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to rename dataset")
@@ -1712,9 +3111,16 @@ def tagpilot_load(name: str, offset: int = 0, limit: int = _TAGPILOT_LOAD_DEFAUL
     }
 
 
+_tagpilot_generation_cache = tagpilot_ai_service.GenerationCache(
+    TAGPILOT_CACHE_DIR,
+    ttl_seconds=TAGPILOT_CACHE_TTL_SECONDS,
+    max_bytes=TAGPILOT_CACHE_MAX_BYTES,
+)
+
+
 @app.get("/api/tagpilot/providers")
 def tagpilot_providers():
-    return tagpilot_ai_service.provider_status(os.environ)
+    return tagpilot_ai_service.provider_status(os.environ, cache=_tagpilot_generation_cache)
 
 
 @app.post("/api/tagpilot/providers/{provider}/key")
@@ -1740,6 +3146,7 @@ async def tagpilot_generate(
     provider: str = Form(...),
     mode: str = Form("tags"),
     prompt: str = Form(""),
+    force: bool = Form(False),
 ):
     try:
         image_bytes = await image.read()
@@ -1755,6 +3162,8 @@ async def tagpilot_generate(
             image_bytes=image_bytes,
             mime_type=mime_type,
             environ=os.environ,
+            cache=_tagpilot_generation_cache,
+            force=force,
         )
     except tagpilot_ai_service.MissingProviderKey as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1771,20 +3180,22 @@ def tagpilot_save(name: str, file: UploadFile = File(...)):
     zip_dir = WORKSPACE_ROOT / "datasets" / "ZIPs"
     zip_dir = _safe_dataset_zip_path(zip_dir)
     zip_dir.mkdir(parents=True, exist_ok=True)
+    fname = _dataset_zip_stems(name)[0] + ".zip"
+    dest = _safe_dataset_zip_path(zip_dir / fname)
+    job = _claim_dataset_extract_job(target, dest, mode="archive")
     if target.exists():
         shutil.rmtree(target, ignore_errors=True)
     target.mkdir(parents=True, exist_ok=True)
-    fname = _dataset_zip_stems(name)[0] + ".zip"
-    dest = _safe_dataset_zip_path(zip_dir / fname)
     try:
         _stream_upload_to_path(file, dest, max_bytes=DATASET_UPLOAD_MAX_BYTES)
-        _safe_extract_zip(dest, target)
-    except HTTPException:
-        raise
-    except Exception:
+    except Exception as e:
+        _fail_dataset_extract_job(job, target, e)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail="Failed to save dataset archive")
-    _invalidate_dataset_list_cache()
-    return {"status": "saved", "path": str(target), "zip": str(dest)}
+    _refresh_dataset_stats(target)
+    _start_dataset_extract_job(job, dest, target)
+    return {"status": "saved", "path": str(target), "zip": str(dest), "extract_job": _dataset_extract_job_to_dict(job)}
 
 
 @app.post("/api/tagpilot/save-item")
@@ -1809,8 +3220,10 @@ def tagpilot_save_item(
         if target.exists():
             shutil.rmtree(target, ignore_errors=True)
         target.mkdir(parents=True, exist_ok=True)
+        _refresh_dataset_stats(target)
     elif not target.exists():
         target.mkdir(parents=True, exist_ok=True)
+        _refresh_dataset_stats(target)
 
     safe_name = _safe_upload_filename(file.filename or "")
     dst_img = _unique_child_path(target, safe_name)
@@ -1819,14 +3232,13 @@ def tagpilot_save_item(
     zip_path = _safe_dataset_zip_path(zip_dir / f"{_dataset_zip_stems(name)[0]}.zip")
 
     try:
+        old_txt_size = dst_txt.stat().st_size if dst_txt.exists() else None
         with dst_img.open("wb") as f:
             shutil.copyfileobj(file.file, f)
         dst_txt.write_text(tags or "", encoding="utf-8")
-        if done:
-            _write_dataset_zip(target, zip_path)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to save tagged item")
-    _invalidate_dataset_list_cache()
+    _record_dataset_file_writes(target, [(dst_img, None), (dst_txt, old_txt_size)])
 
     payload = {
         "status": "saved-item",
@@ -1835,10 +3247,64 @@ def tagpilot_save_item(
         "done": bool(done),
     }
     if done:
+        # Archive maintenance can take a while on large datasets; keep it out of the request.
+        job = _start_dataset_zip_job(target, zip_path)
         payload["zip"] = str(zip_path)
+        payload["zip_job"] = _dataset_zip_job_to_dict(job)
     return payload
 
 
+@app.get("/api/datasets/{name}/zip/status")
+def dataset_zip_status(name: str):
+    _cleanup_dataset_zip_jobs()
+    dataset_name = _resolve_existing_dataset_dir(name).name
+    with _dataset_zip_lock:
+        job = _dataset_zip_jobs.get(dataset_name)
+        if not job:
+            return {"name": dataset_name, "state": "idle"}
+        return _dataset_zip_job_to_dict(job)
+
+
+class DatasetPreflightRequest(BaseModel):
+    # diffusion-pipe bucket settings; leave `resolutions` unset to use the TrainPilot TOML instead.
+    resolutions: Optional[List[Union[int, List[int]]]] = None
+    enable_ar_bucket: bool = True
+    min_ar: float = 0.5
+    max_ar: float = 2.0
+    num_ar_buckets: int = 7
+    ar_buckets: Optional[List[Union[float, List[int]]]] = None
+    toml_path: str = ""
+    max_token_length: Optional[int] = None
+
+
+@app.post("/api/datasets/{name}/preflight")
+def dataset_preflight(name: str, req: Optional[DatasetPreflightRequest] = None):
+    req = req or DatasetPreflightRequest()
+    dataset_dir = _resolve_existing_dataset_dir(name)
+    if req.resolutions:
+        try:
+            spec = dataset_preflight_service.BucketSpec.diffusion_pipe(
+                req.resolutions,
+                enable_ar_bucket=req.enable_ar_bucket,
+                min_ar=req.min_ar,
+                max_ar=req.max_ar,
+                num_ar_buckets=req.num_ar_buckets,
+                ar_buckets=req.ar_buckets,
+            )
+        except (ValueError, TypeError, ZeroDivisionError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid bucket settings: {e}")
+        caption_exts, max_tokens = dataset_preflight_service.CAPTION_EXTENSIONS, req.max_token_length
+    else:
+        toml_path = _resolve_trainpilot_toml_path(req.toml_path)
+        if not toml_path.exists():
+            raise HTTPException(status_code=400, detail="TOML not found")
+        spec, caption_ext, max_tokens = _kohya_preflight_settings(toml_path)
+        caption_exts = (caption_ext,)
+        if req.max_token_length:
+            max_tokens = req.max_token_length
+    return _dataset_preflight.analyze(dataset_dir, spec, caption_extensions=caption_exts, max_tokens=max_tokens)
+
+
 @app.post("/api/models/{name}/pull")
 def pull_model(name: str):
     models_service.ensure_manifest(MANIFEST, DEFAULT_MANIFEST, MODELS_DIR, CONFIG_DIR)
@@ -1860,22 +3326,35 @@ def pull_model(name: str):
 
 @app.post("/api/models/{name}/pull/start")
 def pull_model_start(name: str):
-    """Start a model pull in the background (used by UI for progress updates)."""
+    """Queue a model pull; up to MODEL_PULL_CONCURRENCY run at once, the rest wait in FIFO order."""
     _cleanup_model_pull_jobs()
     models_service.ensure_manifest(MANIFEST, DEFAULT_MANIFEST, MODELS_DIR, CONFIG_DIR)
     entries = models_service.parse_manifest(MANIFEST, DEFAULT_MANIFEST, MODELS_DIR, CONFIG_DIR)
     model_name = _resolve_model_name(name, entries)
+    expected_bytes = next((e.expected_size_bytes for e in entries if e.name == model_name), None)
 
     with _model_pull_lock:
         existing = _model_pull_jobs.get(name)
-        if existing and existing.state == "running":
-            return _model_pull_job_to_dict(existing)
-        job = ModelPullJob(name=model_name)
+        if existing and existing.state in ("queued", "running"):
+            return _model_pull_job_to_dict(existing, _model_pull_queue_position(existing))
+        job = ModelPullJob(
+            name=model_name,
+            cmd=["/opt/pilot/get-models.sh", "pull", model_name] if MODEL_PULL_ENGINE == "script" else [],
+            expected_bytes=expected_bytes,
+        )
         _model_pull_jobs[name] = job
 
-    cmd = ["/opt/pilot/get-models.sh", "pull", model_name]
-    threading.Thread(target=_run_model_pull_job, args=(job, cmd), daemon=True).start()
-    return _model_pull_job_to_dict(job)
+    _enqueue_model_pull(job)
+    with _model_pull_lock:
+        return _model_pull_job_to_dict(job, _model_pull_queue_position(job))
+
+
+def _model_pull_queue_position(job: ModelPullJob) -> Optional[int]:
+    """1-based position in the pull queue; caller holds _model_pull_lock."""
+    for i, queued in enumerate(_model_pull_queue):
+        if queued is job:
+            return i + 1
+    return None
 
 
 @app.get("/api/models/{name}/pull/status")
@@ -1885,17 +3364,27 @@ def pull_model_status(name: str):
         job = _model_pull_jobs.get(name)
         if not job:
             return {"name": name, "state": "idle"}
-        return _model_pull_job_to_dict(job)
+        return _model_pull_job_to_dict(job, _model_pull_queue_position(job))
 
 
 @app.get("/api/models/pulls")
 def list_model_pulls():
-    """List recent model pull jobs (running + recently completed/failed)."""
+    """List pull jobs (queued in FIFO order, running, recently finished) with aggregate throughput/ETA."""
     _cleanup_model_pull_jobs()
     with _model_pull_lock:
-        jobs = list(_model_pull_jobs.values())
-    jobs.sort(key=lambda j: j.updated_at, reverse=True)
-    return {"jobs": [_model_pull_job_to_dict(j) for j in jobs]}
+        queued = list(_model_pull_queue)
+        jobs = [j for j in _model_pull_jobs.values() if j.state != "queued"]
+        jobs.sort(key=lambda j: j.updated_at, reverse=True)
+        running = [j for j in jobs if j.state == "running"]
+        return {
+            "concurrency": MODEL_PULL_CONCURRENCY,
+            "running": len(running),
+            "queued": len(queued),
+            "queue": [q.name for q in queued],
+            "aggregate": _model_pull_aggregate(running, queued),
+            "jobs": [_model_pull_job_to_dict(j, i + 1) for i, j in enumerate(queued)]
+            + [_model_pull_job_to_dict(j) for j in jobs],
+        }
 
 
 @app.post("/api/models/{name}/delete")
@@ -1908,6 +3397,93 @@ def delete_model(name: str):
     return {"status": "ok", "deleted": deleted}
 
 
+@app.get("/api/job-history")
+def job_history(
+    kind: Optional[str] = None,
+    name: Optional[str] = None,
+    state: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 100,
+    output: bool = False,
+):
+    """Model pulls and service updates across Portal restarts, newest first."""
+    limit = max(1, min(int(limit), 1000))
+    rows = _job_history.query(kind=kind, name=name, state=state, since=since, until=until, limit=limit, with_output=output)
+    return {"jobs": rows}
+
+
+@app.get("/api/job-history/durations")
+def job_history_durations(
+    kind: Optional[str] = None,
+    name: Optional[str] = None,
+    state: Optional[str] = "done",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """p50/p90/p95/p99 job durations per kind. Pass `state=` (empty) to include failed jobs."""
+    return {"kinds": _job_history.duration_stats(kind=kind, name=name, state=state or None, since=since, until=until)}
+
+
+def _runner_job_or_404(job_id: str) -> jobs_service.Job:
+    job = _job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.get("/api/jobs")
+def list_jobs(kind: Optional[str] = None):
+    """Subprocess jobs (model pulls, service update commands, training runs), newest first,
+    with exit status, CPU time and peak RSS."""
+    jobs = sorted(_job_runner.list_jobs(kind), key=lambda j: j.started_at, reverse=True)
+    return {"running": sum(1 for j in jobs if j.running), "jobs": [j.to_dict() for j in jobs]}
+
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str, limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None):
+    """One job with its output. `seq` is the newest line's cursor; pass it back as `since`
+    (with `epoch`) for only newer lines (`reset: true` when the cursor fell out of the buffer)."""
+    job = _runner_job_or_404(job_id)
+    limit = max(1, int(limit))
+    payload = job.to_dict()
+    payload["epoch"] = logtail_service.EPOCH
+    if since is not None:
+        entries, reset = job.log.since(since, limit, epoch=epoch)
+        if not reset:
+            payload.update(lines=[line for _, line in entries], seq=entries[-1][0] if entries else since, reset=False)
+            return payload
+    lines, seq = job.log.tail(limit)
+    payload.update(lines=lines, seq=seq, reset=since is not None)
+    return payload
+
+
+@app.get("/api/jobs/{job_id}/stream")
+def job_stream(request: Request, job_id: str, limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None):
+    job = _runner_job_or_404(job_id)
+    return StreamingResponse(
+        logtail_service.cursor_events(
+            request,
+            lambda cursor, cursor_epoch: job_status(job_id, limit=limit, since=cursor, epoch=cursor_epoch),
+            job.log.wait,
+            since,
+            epoch,
+            poll_seconds=SERVICE_LOG_POLL_SECONDS,
+            keepalive_seconds=SERVICE_LOG_KEEPALIVE_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """SIGTERM the job's process (group), SIGKILL if it is still running after the grace period."""
+    job = _runner_job_or_404(job_id)
+    _job_runner.cancel(job.id)
+    return job.to_dict()
+
+
 @app.post("/api/hf-token")
 async def set_hf_token(payload: Optional[HfTokenRequest] = None, token: Optional[str] = None):
     # Keep both request-body and legacy query-param support for callers.
@@ -2061,11 +3637,11 @@ def set_controlpilot_jupyter_settings(payload: ControlPilotJupyterSettingsReques
         updates["JUPYTER_TOKEN"] = token or None
     _write_secrets_env_vars(updates)
     try:
-        _run_supervisorctl("restart", "jupyter", timeout=30)
+        _supervisor_control("restart", "jupyter", timeout=30)
     except HTTPException:
         raise
     except Exception:
-        logger.exception("Failed to restart jupyter via supervisorctl")
+        logger.exception("Failed to restart jupyter via supervisor")
         raise HTTPException(status_code=500, detail="Failed to restart Jupyter")
     return {
         "status": "ok",
@@ -2089,11 +3665,11 @@ def set_copilot_token(payload: dict):
 @app.post("/api/settings/copilot/restart")
 def restart_copilot_sidecar():
     try:
-        _run_supervisorctl("restart", "copilot", timeout=30)
+        _supervisor_control("restart", "copilot", timeout=30)
     except HTTPException:
         raise
     except Exception:
-        logger.exception("Failed to restart copilot via supervisorctl")
+        logger.exception("Failed to restart copilot via supervisor")
         raise HTTPException(status_code=500, detail="Failed to restart Copilot sidecar")
     return {"status": "ok"}
 
@@ -2135,6 +3711,34 @@ def _run_supervisorctl(action: str, name: Optional[str] = None, *, timeout: int
     return _run_cmd_capture(cmd, timeout=timeout)
 
 
+_supervisor_client = supervisor_service.SupervisorClient(SUPERVISOR_SOCKET_PATH, snapshot_ttl=1.0)
+
+
+def _supervisor_control(action: str, name: str, *, timeout: int = 30) -> None:
+    try:
+        getattr(_supervisor_client, action)(name, timeout=timeout)
+        return
+    except supervisor_service.SupervisorUnavailable:
+        logger.debug("supervisord socket unavailable; using supervisorctl %s %s", action, name)
+    _run_supervisorctl(action, name, timeout=timeout)
+
+
+def _supervisor_process_snapshot() -> dict[str, supervisor_service.ProcessInfo]:
+    try:
+        return _supervisor_client.all_process_info()
+    except supervisor_service.SupervisorUnavailable:
+        pass
+    if not SUPERVISORCTL:
+        raise HTTPException(status_code=500, detail="supervisorctl not found")
+    # `status` exits non-zero whenever a program is not running, so keep the output regardless.
+    try:
+        result = subprocess.run([SUPERVISORCTL, "status"], stdout=subprocess.PIPE, text=True, timeout=20)
+        output = result.stdout or ""
+    except (OSError, subprocess.TimeoutExpired):
+        output = ""
+    return {info.name: info for info in supervisor_service.parse_supervisorctl_status(output)}
+
+
 def _default_service_updates_config() -> dict:
     return {
         "enabled": False,
@@ -2275,6 +3879,10 @@ def _append_service_rollback_entry(
 def _pip_installed_version(python_bin: str, package: str) -> Optional[str]:
     if not Path(python_bin).exists():
         return None
+    site_dirs = versions_service.site_packages_for(python_bin)
+    if site_dirs:
+        return versions_service.dist_version(site_dirs, package)
+    # Not a standard venv layout: ask the interpreter.
     code = (
         "import importlib.metadata as m\n"
         f"print(m.version({package!r}))\n"
@@ -2290,14 +3898,23 @@ def _pip_latest_version(python_bin: str, package: str) -> Optional[str]:
     if not Path(python_bin).exists():
         return None
     out = _run_cmd_capture([python_bin, "-m", "pip", "index", "versions", package], timeout=35)
-    match = re.search(r"Available versions:\\s*(.+)", out)
+    match = re.search(r"Available versions:\s*(.+)", out)
     if not match:
         return None
     versions = [v.strip() for v in match.group(1).split(",") if v.strip()]
     return versions[0] if versions else None
 
 
+_pip_latest_versions = versions_service.LatestCache(
+    lambda key: _pip_latest_version(*key),
+    ttl=SERVICE_LATEST_VERSION_TTL_SECONDS,
+)
+
+
 def _git_current_branch(repo: Path) -> Optional[str]:
+    branch, sha = versions_service.git_head(repo)
+    if sha:
+        return branch
     try:
         branch = _run_cmd_capture(["git", "-C", str(repo), "rev-parse", "--abbrev-ref", "HEAD"], timeout=10)
     except Exception:
@@ -2317,13 +3934,18 @@ def _git_current_branch(repo: Path) -> Optional[str]:
 
 
 def _git_local_sha(repo: Path) -> Optional[str]:
+    _, sha = versions_service.git_head(repo)
+    if sha:
+        return sha
     try:
         return _run_cmd_capture(["git", "-C", str(repo), "rev-parse", "HEAD"], timeout=10)
     except Exception:
         return None
 
 
-def _service_version_entry(name: str) -> ServiceVersionEntry:
+def _service_version_entry(name: str, *, wait_latest: Optional[float] = None) -> ServiceVersionEntry:
+    """Version info for one service. "latest" comes from the background cache; pass
+    ``wait_latest`` (seconds) to block for a fresh lookup when there is none yet."""
     display = DISPLAY_NAMES.get(name, name)
     spec = SERVICE_UPDATE_SPECS.get(name)
     if not spec:
@@ -2348,13 +3970,14 @@ def _service_version_entry(name: str) -> ServiceVersionEntry:
                 detail="Invalid update spec",
             )
         installed = _pip_installed_version(python_bin, package)
-        latest = None
+        check = _pip_latest_versions.get((python_bin, package), wait=wait_latest)
+        latest = check["latest"]
         detail = None
-        try:
-            latest = _pip_latest_version(python_bin, package)
-        except Exception:
-            logger.exception("Failed to check latest pip version for %s", name)
+        if check["error"]:
+            logger.warning("Failed to check latest pip version for %s: %s", name, check["error"])
             detail = "Latest version check failed"
+        elif check["pending"] and latest is None:
+            detail = "Checking latest version..."
         update_available = bool(installed and latest and installed != latest)
         return ServiceVersionEntry(
             name=name,
@@ -2363,6 +3986,8 @@ def _service_version_entry(name: str) -> ServiceVersionEntry:
             update_supported=Path(python_bin).exists(),
             installed=installed,
             latest=latest,
+            latest_checked_at=check["checked_at"],
+            latest_pending=check["pending"],
             update_available=update_available,
             detail=detail,
         )
@@ -2400,7 +4025,11 @@ def _service_version_entry(name: str) -> ServiceVersionEntry:
     )
 
 
-def _service_update_commands(name: str, target_version: Optional[str]) -> tuple[list[list[str]], Optional[str]]:
+def _service_update_commands(
+    name: str, target_version: Optional[str]
+) -> tuple[list[list[str]], list[list[str]], Optional[str]]:
+    """(prefetch, install, resolved target). Prefetch fills the service's wheelhouse and
+    runs while the service is up; install is offline from the wheelhouse."""
     spec = SERVICE_UPDATE_SPECS.get(name)
     if not spec:
         raise RuntimeError("Updates are not supported for this service")
@@ -2413,57 +4042,159 @@ def _service_update_commands(name: str, target_version: Optional[str]) -> tuple[
             raise RuntimeError("Invalid pip service update spec")
         resolved_target = (target_version or "").strip()
         if not resolved_target:
-            info = _service_version_entry(name)
+            info = _service_version_entry(name, wait_latest=40)
             resolved_target = (info.latest or "").strip()
-        pkg_ref = f"{package}=={resolved_target}" if resolved_target else package
-        return [[python_bin, "-m", "pip", "install", "--no-cache-dir", "--upgrade", pkg_ref]], resolved_target or None
+        if not resolved_target:
+            raise RuntimeError("Could not determine the version to install")
+        wheels = wheelhouse_service.wheel_dir(SERVICE_WHEELHOUSE_DIR, name)
+        prefetch: list[list[str]] = []
+        if not wheelhouse_service.has_wheel(wheels, package, resolved_target):
+            prefetch.append(wheelhouse_service.prefetch_command(python_bin, wheels, package, resolved_target))
+        install = [wheelhouse_service.offline_install_command(python_bin, wheels, package, resolved_target)]
+        return prefetch, install, resolved_target
 
     raise RuntimeError(f"Unsupported update kind: {kind}")
 
 
+def _service_rollback_prefetch_command(name: str, version: Optional[str]) -> Optional[list[str]]:
+    """Cache wheels for the currently installed version so a rollback needs no network."""
+    spec = SERVICE_UPDATE_SPECS.get(name) or {}
+    if spec.get("kind") != "pip" or not version:
+        return None
+    wheels = wheelhouse_service.wheel_dir(SERVICE_WHEELHOUSE_DIR, name)
+    if wheelhouse_service.has_wheel(wheels, spec["package"], version):
+        return None
+    return wheelhouse_service.prefetch_command(spec["python_bin"], wheels, spec["package"], version)
+
+
+def _service_offline_rollback(job: ServiceUpdateJob) -> None:
+    spec = SERVICE_UPDATE_SPECS.get(job.name) or {}
+    version = job.rollback_before
+    if spec.get("kind") != "pip" or not version:
+        return
+    wheels = wheelhouse_service.wheel_dir(SERVICE_WHEELHOUSE_DIR, job.name)
+    if not wheelhouse_service.has_wheel(wheels, spec["package"], version):
+        _update_service_update_job(job, f"No cached wheels for {version}; not rolling back")
+        return
+    try:
+        _update_service_update_job(job, f"Install failed; reinstalling {version} from the wheelhouse...")
+        _run_service_update_cmd(
+            job, wheelhouse_service.offline_install_command(spec["python_bin"], wheels, spec["package"], version)
+        )
+    except Exception as e:
+        _update_service_update_job(job, f"Rollback failed: {e}")
+
+
+def _prune_service_wheelhouse(job: ServiceUpdateJob) -> None:
+    """Keep only the wheels the installed version and ``rollback_before`` resolve to.
+    Skipped (everything kept) if either cannot be resolved from the wheelhouse."""
+    spec = SERVICE_UPDATE_SPECS.get(job.name) or {}
+    if spec.get("kind") != "pip":
+        return
+    wheels = wheelhouse_service.wheel_dir(SERVICE_WHEELHOUSE_DIR, job.name)
+    versions = [v for v in dict.fromkeys((job.installed_after, job.rollback_before)) if v]
+    if not versions:
+        return
+    keep: set[str] = set()
+    for version in versions:
+        if not wheelhouse_service.has_wheel(wheels, spec["package"], version):
+            if version == job.installed_after:
+                return
+            continue  # nothing cached to roll back to; keep what the installed version needs
+        report = wheels / f".resolve-{version}.json"
+        try:
+            _run_service_update_cmd(
+                job, wheelhouse_service.resolve_command(spec["python_bin"], wheels, spec["package"], version, report)
+            )
+            keep |= wheelhouse_service.wheels_in_report(report)
+        except Exception as e:
+            _update_service_update_job(job, f"Not pruning the wheelhouse: could not resolve {version}: {e}")
+            return
+        finally:
+            report.unlink(missing_ok=True)
+    removed, freed = wheelhouse_service.prune(wheels, keep)
+    if removed:
+        _update_service_update_job(job, f"Pruned {removed} unused wheel(s) from the wheelhouse ({freed / 1024**2:.1f} MiB)")
+
+
 def _run_service_update_cmd(job: ServiceUpdateJob, cmd: list[str]) -> None:
     _update_service_update_job(job, f"$ {' '.join(cmd)}")
     try:
-        result = subprocess.run(
+        run = _job_runner.spawn(
             cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
+            kind="service-update",
+            name=job.name,
+            on_line=lambda _run, line: _update_service_update_job(job, line),
             timeout=SERVICE_UPDATE_COMMAND_TIMEOUT_SECONDS,
+            meta={"reason": job.reason, "phase": job.phase},
         )
-    except subprocess.TimeoutExpired as e:
-        raise RuntimeError(f"Update command timed out ({SERVICE_UPDATE_COMMAND_TIMEOUT_SECONDS}s): {' '.join(cmd)}") from e
     except FileNotFoundError as e:
         raise RuntimeError(f"Command not found: {cmd[0]}") from e
     except Exception as e:
         raise RuntimeError(f"Failed to run command {' '.join(cmd)}: {str(e)}") from e
+    job.pid = run.pid
+    job.job_id = run.id
+    run.wait()
     job.updated_at = time.time()
-    for line in (result.stdout or "").splitlines():
-        _update_service_update_job(job, line)
-    if result.returncode != 0:
-        raise RuntimeError(f"Command failed ({result.returncode}): {' '.join(cmd)}")
+    if run.cancel_reason == "timeout":
+        raise RuntimeError(f"Update command timed out ({SERVICE_UPDATE_COMMAND_TIMEOUT_SECONDS}s): {' '.join(cmd)}")
+    if run.state == "cancelled":
+        raise RuntimeError(f"Update command was cancelled: {' '.join(cmd)}")
+    if run.returncode != 0:
+        raise RuntimeError(f"Command failed ({run.returncode}): {' '.join(cmd)}")
 
 
 def _run_service_update_job(job: ServiceUpdateJob) -> None:
     rollback_logged = False
+    job.history_id = _job_history.record_start(
+        "service-update",
+        job.name,
+        started_at=job.started_at,
+        meta={"reason": job.reason, "target_version": job.target_version, "installed_before": job.installed_before},
+    )
     try:
         job.rollback_before = _service_rollback_marker(job.name)
-        commands, resolved_target = _service_update_commands(job.name, job.target_version)
+        prefetch, install, resolved_target = _service_update_commands(job.name, job.target_version)
         if resolved_target:
             job.target_version = resolved_target
 
-        for cmd in commands:
+        # Phase 1: resolve/download/build while the current version keeps serving.
+        job.phase = "prefetch"
+        for cmd in prefetch:
             _run_service_update_cmd(job, cmd)
+        rollback_prefetch = _service_rollback_prefetch_command(job.name, job.rollback_before)
+        if rollback_prefetch and job.rollback_before != job.target_version:
+            try:
+                _run_service_update_cmd(job, rollback_prefetch)
+            except Exception as e:
+                _update_service_update_job(job, f"Could not cache wheels for {job.rollback_before}: {e}")
 
+        # Phase 2: offline install; the service is only down for this part.
+        job.phase = "install"
         cfg = _read_service_updates_config()
         restart_after_update = bool(cfg.get("restart_after_update", True))
         try:
             running = supervisor_status(job.name).running
         except Exception:
             running = False
-        if running and restart_after_update and SUPERVISORCTL:
-            _update_service_update_job(job, "Restarting service to apply update...")
-            _run_service_update_cmd(job, [SUPERVISORCTL, "restart", job.name])
+        restart = bool(running and restart_after_update and SUPERVISORCTL)
+        install_started = time.time()
+        if restart:
+            _update_service_update_job(job, "Stopping service to apply update...")
+            _run_service_update_cmd(job, [SUPERVISORCTL, "stop", job.name])
+        try:
+            for cmd in install:
+                _run_service_update_cmd(job, cmd)
+        except Exception:
+            _service_offline_rollback(job)
+            raise
+        finally:
+            if restart:
+                _update_service_update_job(job, "Starting service...")
+                try:
+                    _run_service_update_cmd(job, [SUPERVISORCTL, "start", job.name])
+                finally:
+                    job.downtime_seconds = round(time.time() - install_started, 1)
 
         current = _service_version_entry(job.name)
         job.installed_after = current.installed
@@ -2478,8 +4209,11 @@ def _run_service_update_job(job: ServiceUpdateJob) -> None:
             target=job.target_version,
             rollback_before=job.rollback_before,
             rollback_after=job.rollback_after,
+            reason=job.reason,
         )
         rollback_logged = True
+        job.phase = "cleanup"
+        _prune_service_wheelhouse(job)
         job.state = "done"
         job.updated_at = time.time()
     except Exception as e:
@@ -2496,26 +4230,44 @@ def _run_service_update_job(job: ServiceUpdateJob) -> None:
                     rollback_before=job.rollback_before,
                     rollback_after=job.rollback_after,
                     error=str(e),
+                    reason=job.reason,
                 )
             except Exception:
                 pass
         job.updated_at = time.time()
     finally:
         job.pid = None
+        _job_history.record_finish(job.history_id, state=job.state, error=job.error, output_tail=job.output_tail)
         with _service_update_lock:
             _service_update_jobs[job.name] = job
 
 
-def supervisor_status(name: str) -> ServiceEntry:
-    if not SUPERVISORCTL:
-        raise HTTPException(status_code=500, detail="supervisorctl not found")
+def _last_service_rollback_target(name: str) -> Optional[str]:
+    """``before`` of the most recent successful update of ``name`` in the rollback log."""
     try:
-        out = subprocess.check_output([SUPERVISORCTL, "status", name], text=True)
-    except subprocess.CalledProcessError as e:
-        out = e.output or ""
-    # Expected format: "name                       RUNNING   pid ...\n"
-    parts = out.strip().split()
-    state_raw = parts[1] if len(parts) > 1 else "UNKNOWN"
+        lines = SERVICE_UPDATES_ROLLBACK_LOG_PATH.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for raw in reversed(lines):
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        if entry.get("service") == name and entry.get("state") == "done":
+            before = entry.get("before")
+            return before if isinstance(before, str) and before else None
+    return None
+
+
+def supervisor_status(
+    name: str,
+    snapshot: Optional[dict[str, supervisor_service.ProcessInfo]] = None,
+    autostart: Optional[dict[str, Optional[bool]]] = None,
+) -> ServiceEntry:
+    if snapshot is None:
+        snapshot = _supervisor_process_snapshot()
+    info = snapshot.get(name)
+    state_raw = info.state if info else "UNKNOWN"
     state_upper = state_raw.upper()
     running = state_upper in ("RUNNING",)
     display = DISPLAY_NAMES.get(name, name)
@@ -2525,7 +4277,10 @@ def supervisor_status(name: str) -> ServiceEntry:
         state=state_upper,
         state_raw=state_raw,
         running=running,
-        autostart=_read_service_autostart(name),
+        autostart=autostart.get(name) if autostart is not None else _read_service_autostart(name),
+        pid=info.pid if info else None,
+        uptime=info.uptime if info else None,
+        exit_status=info.exit_status if info else None,
     )
 
 
@@ -2551,39 +4306,49 @@ def _supervisor_config_path() -> Optional[Path]:
 
 
 def _read_service_autostart(name: str) -> Optional[bool]:
+    return _read_service_autostart_map([name]).get(name)
+
+
+def _read_service_autostart_map(names: List[str]) -> dict[str, Optional[bool]]:
+    result: dict[str, Optional[bool]] = {name: None for name in names}
+    pending = list(names)
     try:
         if SERVICE_AUTOSTART_CONFIG_PATH.exists():
             with SERVICE_AUTOSTART_CONFIG_PATH.open("rb") as f:
                 data = tomllib.load(f)
-            svc = (data.get("services") or {}).get(name, {})
-            if isinstance(svc, dict) and "autostart" in svc:
-                return bool(svc.get("autostart"))
+            services = data.get("services") or {}
+            for name in names:
+                svc = services.get(name, {})
+                if isinstance(svc, dict) and "autostart" in svc:
+                    result[name] = bool(svc.get("autostart"))
+            pending = [name for name in names if result[name] is None]
     except Exception:
         pass
+    if not pending:
+        return result
 
     conf_path = _supervisor_config_path()
     if not conf_path:
-        return None
+        return result
     parser = configparser.ConfigParser(interpolation=None)
     parser.optionxform = str  # preserve option case
     try:
         parser.read(conf_path)
     except Exception:
-        return None
-    section = f"program:{name}"
-    if not parser.has_section(section):
-        return None
-    if not parser.has_option(section, "autostart"):
-        return None
-    try:
-        return parser.getboolean(section, "autostart")
-    except Exception:
-        raw = parser.get(section, "autostart", fallback="").strip().lower()
-        if raw in ("true", "1", "yes", "on"):
-            return True
-        if raw in ("false", "0", "no", "off"):
-            return False
-        return None
+        return result
+    for name in pending:
+        section = f"program:{name}"
+        if not parser.has_section(section) or not parser.has_option(section, "autostart"):
+            continue
+        try:
+            result[name] = parser.getboolean(section, "autostart")
+        except Exception:
+            raw = parser.get(section, "autostart", fallback="").strip().lower()
+            if raw in ("true", "1", "yes", "on"):
+                result[name] = True
+            elif raw in ("false", "0", "no", "off"):
+                result[name] = False
+    return result
 
 
 def _set_service_autostart(name: str, enabled: bool) -> Optional[bool]:
@@ -2653,18 +4418,16 @@ def _set_service_autostart(name: str, enabled: bool) -> Optional[bool]:
 
 @app.get("/api/services", response_model=List[ServiceEntry])
 def list_services():
-    entries = []
-    for svc in SERVICES:
-        entries.append(supervisor_status(svc))
-    return entries
+    snapshot = _supervisor_process_snapshot()
+    autostart = _read_service_autostart_map(SERVICES)
+    return [supervisor_status(svc, snapshot, autostart) for svc in SERVICES]
 
 
 @app.get("/api/services/versions", response_model=List[ServiceVersionEntry])
 def list_service_versions():
-    entries: list[ServiceVersionEntry] = []
-    for svc in SERVICES:
-        entries.append(_service_version_entry(svc))
-    return entries
+    """Installed versions are read from disk; "latest" is served from a cache that refreshes
+    in the background (entries report ``latest_pending`` while a lookup is in flight)."""
+    return [_service_version_entry(svc) for svc in SERVICES]
 
 
 @app.post("/api/services/{name}/{action}")
@@ -2674,12 +4437,12 @@ def control_service(name: str, action: str):
     if action not in ("start", "stop", "restart"):
         raise HTTPException(status_code=400, detail="Bad action")
     try:
-        _run_supervisorctl(action, name, timeout=30)
+        _supervisor_control(action, name, timeout=30)
         return {"status": "ok"}
     except HTTPException:
         raise
     except Exception:
-        logger.exception("Failed to %s service %s via supervisorctl", action, name)
+        logger.exception("Failed to %s service %s via supervisor", action, name)
         raise HTTPException(status_code=500, detail=f"Failed to {action} service")
 
 
@@ -2711,18 +4474,39 @@ def service_update_start(name: str, payload: Optional[ServiceUpdateStartRequest]
                 if isinstance(tr, str) and tr.strip():
                     target_version = tr.strip()
 
+    return _start_service_update_job(name, target_version)
+
+
+def _start_service_update_job(name: str, target_version: Optional[str], reason: str = "update") -> dict:
     with _service_update_lock:
         existing = _service_update_jobs.get(name)
         if existing and existing.state == "running":
             return _service_update_job_to_dict(existing)
         before = _service_version_entry(name).installed
-        job = ServiceUpdateJob(name=name, target_version=target_version, installed_before=before)
+        job = ServiceUpdateJob(name=name, target_version=target_version, installed_before=before, reason=reason)
         _service_update_jobs[name] = job
 
-    threading.Thread(target=_run_service_update_job, args=(job,), daemon=True).start()
+    _service_update_pool.submit(_run_service_update_job, job)
     return _service_update_job_to_dict(job)
 
 
+@app.post("/api/services/{name}/update/rollback")
+def service_update_rollback(name: str, payload: Optional[ServiceUpdateStartRequest] = None):
+    """Reinstall the version that was active before the last successful update (or
+    ``target_version``), from the wheelhouse when its wheels are cached."""
+    if name not in SERVICES:
+        raise HTTPException(status_code=404, detail="Unknown service")
+    spec = SERVICE_UPDATE_SPECS.get(name) or {}
+    if spec.get("kind") != "pip":
+        raise HTTPException(status_code=400, detail="Rollback is only supported for pip-managed services")
+    _cleanup_service_update_jobs()
+    target = (payload.target_version or "").strip() if payload and payload.target_version else ""
+    target = target or _last_service_rollback_target(name) or ""
+    if not target:
+        raise HTTPException(status_code=404, detail="No previous version recorded")
+    return _start_service_update_job(name, target, reason="rollback")
+
+
 @app.get("/api/services/{name}/update/status")
 def service_update_status(name: str):
     if name not in SERVICES:
@@ -2743,8 +4527,7 @@ def service_autostart(name: str, payload: ServiceAutostartRequest):
     return {"status": "ok", "name": name, "autostart": autostart}
 
 
-@app.get("/api/services/{name}/log")
-def service_log(name: str, lines: int = 100):
+def _service_log_path(name: str) -> Path:
     if name not in SERVICE_LOGS:
         raise HTTPException(status_code=404, detail="Unknown service")
     out_log, err_log = SERVICE_LOGS[name]
@@ -2756,51 +4539,160 @@ def service_log(name: str, lines: int = 100):
     if len(candidates) == 2:
         try:
             if err_path.stat().st_size == 0 and out_path.stat().st_size > 0:
-                path = out_path
-            else:
-                path = max(candidates, key=lambda p: p.stat().st_mtime)
+                return out_path
+            return max(candidates, key=lambda p: p.stat().st_mtime)
         except Exception:
-            path = err_path if err_path.exists() else out_path
-    else:
-        path = candidates[0]
+            return err_path if err_path.exists() else out_path
+    return candidates[0]
+
+
+def _log_grep_matcher(grep: Optional[str]) -> Optional[Callable[[str], bool]]:
+    if not grep:
+        return None
     try:
-        content = subprocess.check_output(["tail", "-n", str(lines), str(path)], text=True)
-    except subprocess.CalledProcessError:
-        try:
-            file_lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
-            content = "\n".join(file_lines[-lines:]) + "\n"
-        except Exception:
-            content = path.read_text()[-5000:]
+        pattern = re.compile(grep, re.IGNORECASE)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid grep pattern: {e}")
+    return lambda line: pattern.search(line) is not None
+
+
+@app.get("/api/services/{name}/log")
+def service_log(name: str, lines: int = 100, grep: Optional[str] = None):
+    path = _service_log_path(name)
+    match = _log_grep_matcher(grep)
+    lines = max(1, min(int(lines), SERVICE_LOG_MAX_LINES))
+    try:
+        tail, _ = logtail_service.tail_lines(path, lines, match=match, partial=True)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read log: {e}")
+    content = "\n".join(tail) + "\n" if tail else ""
     return {"log": content, "path": str(path)}
 
 
+async def _follow_service_log(request: Request, path: Path, lines: int, match):
+    # Initial tail, then appended lines pushed as they land. inotify wakes us
+    # promptly; the poll interval is the fallback for filesystems without it.
+    try:
+        tail, offset = await asyncio.to_thread(logtail_service.tail_lines, path, lines, match=match)
+    except OSError as e:
+        yield logtail_service.sse_event("error", {"detail": f"Failed to read log: {e}"})
+        return
+    yield logtail_service.sse_event("lines", {"lines": tail, "path": str(path)})
+
+    follower = logtail_service.LogFollower(path, offset)
+    watcher = logtail_service.InotifyWatcher.create(path)
+    wake = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    if watcher is not None:
+        loop.add_reader(watcher.fileno(), wake.set)
+    idle_since = time.monotonic()
+    try:
+        while not await request.is_disconnected():
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=SERVICE_LOG_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            if watcher is not None:
+                watcher.drain()
+            new_lines, reset = follower.poll()
+            if reset:
+                yield logtail_service.sse_event("reset", {"path": str(path)})
+            if match is not None:
+                new_lines = [line for line in new_lines if match(line)]
+            if new_lines:
+                yield logtail_service.sse_event("lines", {"lines": new_lines})
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= SERVICE_LOG_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                idle_since = time.monotonic()
+    finally:
+        if watcher is not None:
+            loop.remove_reader(watcher.fileno())
+            watcher.close()
+
+
+@app.get("/api/services/{name}/log/stream")
+def service_log_stream(request: Request, name: str, lines: int = 100, grep: Optional[str] = None):
+    path = _service_log_path(name)
+    match = _log_grep_matcher(grep)
+    lines = max(1, min(int(lines), SERVICE_LOG_MAX_LINES))
+    return StreamingResponse(
+        _follow_service_log(request, path, lines, match),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _tensorboard_sources() -> dict[str, tuple[list[Path], int]]:
+    return {
+        "diffpipe": ([TENSORBOARD_ROOT / "diffpipe", DIFFPIPE_LOGDIR], 6),
+        "trainpilot": ([TRAINPILOT_TENSORBOARD_PATH], 6),
+        "kohya": ([KOHYA_TENSORBOARD_PATH], 8),
+        "ai-toolkit": ([AI_TOOLKIT_TENSORBOARD_PATH, Path("/workspace/outputs")], 8),
+    }
+
+
 @app.get("/api/tensorboard/status")
 def tensorboard_status():
     sources = {
-        "diffpipe": _tensorboard_source_status(
-            "diffpipe",
-            [TENSORBOARD_ROOT / "diffpipe", DIFFPIPE_LOGDIR],
-            max_depth=6,
-        ),
-        "trainpilot": _tensorboard_source_status(
-            "trainpilot",
-            [TRAINPILOT_TENSORBOARD_PATH],
-            max_depth=6,
-        ),
-        "kohya": _tensorboard_source_status(
-            "kohya",
-            [KOHYA_TENSORBOARD_PATH],
-            max_depth=8,
-        ),
-        "ai-toolkit": _tensorboard_source_status(
-            "ai-toolkit",
-            [AI_TOOLKIT_TENSORBOARD_PATH, Path("/workspace/outputs")],
-            max_depth=8,
-        ),
+        source: _tensorboard_source_status(source, paths, max_depth=max_depth)
+        for source, (paths, max_depth) in _tensorboard_sources().items()
     }
     return {"port": TENSORBOARD_PORT, "sources": sources}
 
 
+def _tensorboard_source_runs(source: str) -> tuple[Optional[Path], dict[str, list[tuple[Path, float]]]]:
+    """(root, {run: [(event file, mtime)]}) for the first root of ``source`` that has event files."""
+    spec = _tensorboard_sources().get(source)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Unknown TensorBoard source")
+    paths, max_depth = spec
+    for path in paths:
+        events = _iter_tensorboard_events(path, max_depth=max_depth)
+        if not events:
+            continue
+        root = path.resolve()
+        runs: dict[str, list[tuple[Path, float]]] = {}
+        for event_path, mtime in events:
+            try:
+                run = event_path.parent.relative_to(root).as_posix()
+            except ValueError:  # root is the event file itself
+                run = "."
+            runs.setdefault(run, []).append((event_path, mtime))
+        return root, runs
+    return None, {}
+
+
+@app.get("/api/tensorboard/{source}/runs")
+def tensorboard_runs(source: str):
+    root, runs = _tensorboard_source_runs(source)
+    items = [
+        {"run": run, "event_files": len(files), "latest_mtime": max(mtime for _, mtime in files)}
+        for run, files in runs.items()
+    ]
+    items.sort(key=lambda item: item["latest_mtime"], reverse=True)
+    return {"source": source, "root": str(root) if root else None, "runs": items}
+
+
+@app.get("/api/tensorboard/{source}/scalars")
+def tensorboard_scalars(source: str, run: Optional[str] = None, tags: Optional[str] = None):
+    """Downsampled scalar series read straight from event files; `run` defaults to the most recently written."""
+    root, runs = _tensorboard_source_runs(source)
+    if not runs:
+        raise HTTPException(status_code=404, detail="No TensorBoard event files found")
+    if run is None:
+        run = max(runs, key=lambda name: max(mtime for _, mtime in runs[name]))
+    elif run not in runs:
+        raise HTTPException(status_code=404, detail="Run not found")
+    tag_filter = [t.strip() for t in (tags or "").split(",") if t.strip()] or None
+    event_files = [path for path, _ in runs[run]]
+    series, complete = _tensorboard_scalars.scalars(event_files, tag_filter)
+    # A file with a corrupt record is not read past it; say so instead of silently freezing the curve.
+    errors = {Path(path).name: error for path, error in _tensorboard_scalars.errors(event_files).items()}
+    return {"source": source, "run": run, "complete": complete, "errors": errors, "tags": series}
+
+
 @app.post("/api/shutdown/schedule")
 def schedule_shutdown_endpoint(request: shutdown_service.ShutdownRequest):
     """Schedule a shutdown"""
@@ -3250,19 +5142,7 @@ class TrainPilotRequest(BaseModel):
     output_name: str
     profile: str = "regular"
     toml_path: str = ""
-
-
-def _tp_reader(proc: subprocess.Popen):
-    global _tp_proc
-    for raw in iter(proc.stdout.readline, b""):
-        try:
-            line = raw.decode("utf-8", errors="replace")
-        except Exception:
-            line = str(raw)
-        _tp_logs.append(line.rstrip("\n"))
-    proc.stdout.close()
-    proc.wait()
-    _tp_proc = None
+    skip_preflight: bool = False
 
 
 def _ensure_trainpilot_toml() -> Path:
@@ -3290,11 +5170,32 @@ def _resolve_trainpilot_toml_path(raw_path: str = "") -> Path:
     return candidate
 
 
+def _kohya_preflight_settings(toml_path: Path):
+    try:
+        data = tomllib.loads(toml_path.read_bytes().decode("utf-8", errors="replace"))
+        return dataset_preflight_service.kohya_spec_from_config(data)
+    except (OSError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read bucket settings from TOML: {e}")
+
+
+def _trainpilot_preflight(dataset_name: str, toml_path: Path) -> dict:
+    """Check the dataset against the TOML's bucket settings; 400 if training would fail."""
+    try:
+        dataset_dir = _resolve_existing_dataset_dir(dataset_name)
+    except HTTPException:
+        raise HTTPException(status_code=400, detail=f"Dataset not found: {dataset_name}")
+    spec, caption_ext, max_tokens = _kohya_preflight_settings(toml_path)
+    report = _dataset_preflight.analyze(dataset_dir, spec, caption_extensions=(caption_ext,), max_tokens=max_tokens)
+    if not report["ok"]:
+        raise HTTPException(status_code=400, detail="Dataset pre-flight failed: " + "; ".join(report["errors"]))
+    return report
+
+
 @app.post("/api/trainpilot/start")
 def trainpilot_start(req: TrainPilotRequest):
-    global _tp_proc
+    global _tp_job
     global _tp_output_dir
-    if _tp_proc and _tp_proc.poll() is None:
+    if _tp_job and _tp_job.running:
         raise HTTPException(status_code=400, detail="TrainPilot already running")
     if not TRAINPILOT_BIN.exists():
         raise HTTPException(status_code=500, detail=f"TrainPilot script not found at {TRAINPILOT_BIN}")
@@ -3312,6 +5213,7 @@ def trainpilot_start(req: TrainPilotRequest):
     toml_path = _resolve_trainpilot_toml_path(req.toml_path)
     if not toml_path.exists():
         raise HTTPException(status_code=400, detail="TOML not found")
+    preflight = None if req.skip_preflight else _trainpilot_preflight(ds_raw, toml_path)
     
     # Add debugging info to logs
     _tp_logs.append(f"=== Starting TrainPilot at {datetime.now().isoformat()} ===")
@@ -3332,42 +5234,45 @@ def trainpilot_start(req: TrainPilotRequest):
           "WORKSPACE_ROOT": str(WORKSPACE_ROOT),
         }
     )
+    metrics = _training_metrics.start_run("trainpilot", out_name)
+    _tp_logs.clear()  # start fresh for process output
     try:
-        proc = subprocess.Popen(
+        job = _job_runner.spawn(
             [str(TRAINPILOT_BIN)],
+            kind="trainpilot",
+            name=out_name,
             cwd=TRAINPILOT_BIN.parent,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
             env=env,
-            preexec_fn=os.setsid,
+            new_session=True,
+            on_line=lambda _job, line: metrics.feed(line),
+            on_exit=lambda job: metrics.finish(job.returncode),
+            log=_tp_logs,
+            split_cr=False,
+            on_line_split_cr=True,
+            meta={"dataset": ds_name, "profile": profile, "metrics_run": metrics.run_id},
         )
-        _tp_logs.append(f"TrainPilot process started with PID: {proc.pid}")
     except Exception:
+        metrics.finish(None)
         _tp_logs.append("Failed to start TrainPilot")
         raise HTTPException(status_code=500, detail="Failed to start TrainPilot")
-    _tp_proc = proc
-    _tp_logs.clear()  # Clear startup logs, start fresh for process output
-    _tp_logs.append(f"=== TrainPilot process started (PID: {proc.pid}) ===")
-    threading.Thread(target=_tp_reader, args=(proc,), daemon=True).start()
-    return {"status": "started", "pid": proc.pid}
+    _tp_job = job
+    _tp_logs.append(f"=== TrainPilot process started (PID: {job.pid}) ===")
+    return {
+        "status": "started",
+        "pid": job.pid,
+        "job_id": job.id,
+        "metrics_run": metrics.run_id,
+        "preflight": dataset_preflight_service.summary(preflight) if preflight else None,
+    }
 
 
 @app.post("/api/trainpilot/stop")
 def trainpilot_stop():
-    global _tp_proc
-    if not _tp_proc or _tp_proc.poll() is not None:
-        _tp_proc = None
+    job = _tp_job
+    if job is None or not job.running:
         return {"status": "noop"}
-    try:
-        os.killpg(os.getpgid(_tp_proc.pid), signal.SIGTERM)
-        _tp_proc.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        os.killpg(os.getpgid(_tp_proc.pid), signal.SIGKILL)
-        _tp_proc.wait()
-    except ProcessLookupError:
-        pass
-    finally:
-        _tp_proc = None
+    _job_runner.cancel(job.id)
+    job.wait(jobs_service.DEFAULT_KILL_GRACE_SECONDS + 5)
     return {"status": "stopped"}
 
 
@@ -3444,35 +5349,44 @@ def trainpilot_model_check(req: TrainPilotModelCheckRequest):
     return {"toml_path": toml_path.name, "items": items, "missing": missing}
 
 
-@app.get("/api/trainpilot/logs")
-def trainpilot_logs(limit: int = 500):
-    """Get combined logs from TrainPilot process and Kohya training logs."""
-    lines = []
-    running = False
-    
-    # Add initial status
-    lines.append(f"--- TrainPilot logs endpoint called at {datetime.now().isoformat()} ---")
-    
-    # Check TrainPilot process status
-    global _tp_proc
-    if _tp_proc:
-        if _tp_proc.poll() is None:
-            running = True
-            lines.append(f"--- TrainPilot process running (PID: {_tp_proc.pid}) ---")
-        else:
-            lines.append(f"--- TrainPilot process finished (exit code: {_tp_proc.poll()}) ---")
-    else:
-        lines.append("--- No TrainPilot process running ---")
-    
-    # Add TrainPilot process logs
-    tp_logs = list(_tp_logs)
-    if tp_logs:
-        lines.append(f"--- TrainPilot process logs ({len(tp_logs)} lines) ---")
-        lines.extend(tp_logs)
-    else:
-        lines.append("--- No TrainPilot process logs available ---")
-    
-    # Also try to read the latest Kohya training log file
+def _trainpilot_train_log(log_file: Path) -> tuple[str, logtail_service.SequencedLog]:
+    # The tail cache reads only what was appended since the previous poll.
+    stat_info = log_file.stat()
+    note = f"--- Log file exists, size: {stat_info.st_size} bytes, modified: {datetime.fromtimestamp(stat_info.st_mtime)} ---"
+    return note, _tp_train_log_tails.log(log_file)
+
+
+def _trainpilot_latest_run_dirs(outs_base: Path) -> tuple[int, list[Path]]:
+    """Return (runs found, up to 3 most recently logged run dirs), re-scanned when outputs change or the TTL expires."""
+    global _tp_latest_runs
+    try:
+        base_mtime = outs_base.stat().st_mtime_ns
+    except OSError:
+        base_mtime = 0
+    now = time.monotonic()
+    with _tp_latest_runs_lock:
+        cached = _tp_latest_runs
+        if cached and cached[1] == base_mtime and (now - cached[0]) < _TP_LATEST_RUNS_TTL_SECONDS:
+            return cached[2], cached[3]
+    candidates: list[tuple[float, Path]] = []
+    for d in outs_base.iterdir():
+        if not d.is_dir():
+            continue
+        try:
+            log_file = _safe_output_path(d / "_logs" / "train.log")
+            candidates.append((log_file.stat().st_mtime, _safe_output_path(d)))
+        except (OSError, HTTPException):
+            continue
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    top = [d for _, d in candidates[:3]]
+    with _tp_latest_runs_lock:
+        _tp_latest_runs = (now, base_mtime, len(candidates), top)
+    return len(candidates), top
+
+
+def _trainpilot_kohya_log_section() -> tuple[list[str], Optional[Path], Optional[logtail_service.SequencedLog]]:
+    """Diagnostic lines for the latest Kohya train.log, plus its run dir and refreshed tail (if any)."""
+    lines: list[str] = []
     try:
         outs_base = Path("/workspace/outputs")
         if not outs_base.exists():
@@ -3482,50 +5396,144 @@ def trainpilot_logs(limit: int = 500):
             log_file = _safe_output_path(output_dir / "_logs" / "train.log")
             lines.append(f"--- Current output dir: {output_dir} ---")
             if log_file.exists():
-                stat_info = log_file.stat()
-                lines.append(f"--- Log file exists, size: {stat_info.st_size} bytes, modified: {datetime.fromtimestamp(stat_info.st_mtime)} ---")
-                with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                    kohya_lines = f.readlines()
-                    if kohya_lines:
-                        lines.append(f"--- Kohya training logs from {output_dir.name} ({len(kohya_lines)} lines) ---")
-                        lines.extend([line.rstrip() for line in kohya_lines[-100:]])
-            else:
-                lines.append(f"--- Log file not found for current run: {log_file} ---")
+                note, kohya_log = _trainpilot_train_log(log_file)
+                lines.append(note)
+                return lines, output_dir, kohya_log
+            lines.append(f"--- Log file not found for current run: {log_file} ---")
         else:
             # Find the most recent TrainPilot-style output directory.
             lines.append(f"--- Checking outputs directory: {outs_base} ---")
-            output_dirs = []
-            for d in outs_base.iterdir():
-                if not d.is_dir():
-                    continue
-                log_file = _safe_output_path(d / "_logs" / "train.log")
-                if log_file.exists():
-                    output_dirs.append(_safe_output_path(d))
-            lines.append(f"--- Found {len(output_dirs)} TrainPilot output directories ---")
-            output_dirs.sort(
-                key=lambda x: _safe_output_path(x / "_logs" / "train.log").stat().st_mtime,
-                reverse=True,
-            )
-            for i, output_dir in enumerate(output_dirs[:3]):
+            found, output_dirs = _trainpilot_latest_run_dirs(outs_base)
+            lines.append(f"--- Found {found} TrainPilot output directories ---")
+            for i, output_dir in enumerate(output_dirs):
                 lines.append(f"--- Checking output dir {i+1}: {output_dir.name} ---")
                 log_file = _safe_output_path(output_dir / "_logs" / "train.log")
                 try:
-                    stat_info = log_file.stat()
-                    lines.append(f"--- Log file exists, size: {stat_info.st_size} bytes, modified: {datetime.fromtimestamp(stat_info.st_mtime)} ---")
-                    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                        kohya_lines = f.readlines()
-                        if kohya_lines:
-                            lines.append(f"--- Kohya training logs from {output_dir.name} ({len(kohya_lines)} lines) ---")
-                            lines.extend([line.rstrip() for line in kohya_lines[-100:]])
-                            break
-                except Exception as e:
+                    note, kohya_log = _trainpilot_train_log(log_file)
+                except Exception:
                     lines.append(f"--- Error reading Kohya logs from {output_dir.name} ---")
                     continue
+                lines.append(note)
+                if len(kohya_log):
+                    return lines, output_dir, kohya_log
     except Exception:
         lines.append("--- Error accessing training outputs ---")
+    return lines, None, None
+
+
+@app.get("/api/trainpilot/logs")
+def trainpilot_logs(limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None):
+    """Get combined logs from TrainPilot process and Kohya training logs.
+
+    Every captured line carries a sequence number and the response's `seq` is
+    the newest one. Passing it back as `since` (with the response's `epoch`)
+    returns only newer lines; when the cursor has fallen out of the buffers or
+    comes from before a restart, a full snapshot comes back with `reset: true`.
+    """
+    epoch_now = logtail_service.EPOCH
+    limit = max(1, int(limit))
+    running = False
+    exit_code = None
+    job = _tp_job
+    if job:
+        running = job.running
+        exit_code = job.returncode
+    kohya_notes, kohya_dir, kohya_log = _trainpilot_kohya_log_section()
+    # Both buffers are read up to one cursor so no line lands between them.
+    seq = logtail_service.current_seq()
+
+    if since is not None:
+        tp_new, tp_reset = _tp_logs.since(since, limit, through=seq, epoch=epoch)
+        kohya_new, kohya_reset = (
+            kohya_log.since(since, limit, through=seq, epoch=epoch) if kohya_log is not None else ([], False)
+        )
+        if not (tp_reset or kohya_reset):
+            merged = sorted(tp_new + kohya_new)
+            new = merged[:limit]
+            if len(merged) > limit or len(tp_new) >= limit or len(kohya_new) >= limit:
+                # More is waiting: continue from the last line returned.
+                return {
+                    "lines": [line for _, line in new],
+                    "running": running,
+                    "seq": new[-1][0],
+                    "epoch": epoch_now,
+                    "reset": False,
+                }
+            return {
+                "lines": [line for _, line in new],
+                "running": running,
+                "seq": max(seq, since),
+                "epoch": epoch_now,
+                "reset": False,
+            }
+
+    lines = []
+    
+    # Add initial status
+    lines.append(f"--- TrainPilot logs endpoint called at {datetime.now().isoformat()} ---")
+    
+    # Check TrainPilot process status
+    if job:
+        if running:
+            lines.append(f"--- TrainPilot process running (PID: {job.pid}) ---")
+        else:
+            lines.append(f"--- TrainPilot process finished (exit code: {exit_code}) ---")
+    else:
+        lines.append("--- No TrainPilot process running ---")
+    
+    # Add TrainPilot process logs
+    tp_logs, _ = _tp_logs.tail(through=seq)
+    if tp_logs:
+        lines.append(f"--- TrainPilot process logs ({len(tp_logs)} lines) ---")
+        lines.extend(tp_logs)
+    else:
+        lines.append("--- No TrainPilot process logs available ---")
+    
+    # Also include the latest Kohya training log file
+    lines.extend(kohya_notes)
+    if kohya_log is not None:
+        kohya_lines, _ = kohya_log.tail(through=seq)
+        if kohya_lines:
+            lines.append(f"--- Kohya training logs from {kohya_dir.name} (last {len(kohya_lines)} lines) ---")
+            lines.extend(line.rstrip() for line in kohya_lines)
     
     # Always return a valid response, even if empty
-    return {"lines": lines[-limit:], "running": running}
+    return {"lines": lines[-limit:], "running": running, "seq": seq, "epoch": epoch_now, "reset": since is not None}
+
+
+@app.get("/api/trainpilot/logs/stream")
+def trainpilot_logs_stream(request: Request, limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None):
+    return StreamingResponse(
+        logtail_service.cursor_events(
+            request,
+            lambda cursor, cursor_epoch: trainpilot_logs(limit=limit, since=cursor, epoch=cursor_epoch),
+            _tp_logs.wait,
+            since,
+            epoch,
+            poll_seconds=SERVICE_LOG_POLL_SECONDS,
+            keepalive_seconds=SERVICE_LOG_KEEPALIVE_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/training/metrics")
+def training_metrics_runs(source: Optional[str] = None, limit: int = 20):
+    """Recent training runs (TrainPilot and Diffusion Pipe) with their latest step metrics."""
+    limit = max(1, min(int(limit), 200))
+    return {"runs": _training_metrics.list_runs(limit=limit, source=source)}
+
+
+@app.get("/api/training/metrics/{run_id}")
+def training_metrics_run(run_id: str, since_step: Optional[int] = None):
+    """Step/loss/lr/throughput series for one run; `since_step` returns only newer points."""
+    if not train_metrics_service.RUN_ID_RE.match(run_id):
+        raise HTTPException(status_code=400, detail="Invalid run id")
+    data = _training_metrics.get(run_id, since_step=since_step)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return data
 
 
 @app.get("/api/trainpilot/toml")
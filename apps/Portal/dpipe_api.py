@@ -1,16 +1,27 @@
 import json
 import os
-import signal
-import subprocess
 import threading
-from collections import deque
 from pathlib import Path
 from typing import List, Optional, Union
 
 import toml
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
 
+try:
+    from .services import dataset_preflight  # type: ignore
+    from .services import jobs  # type: ignore
+    from .services import logtail  # type: ignore
+    from .services import train_metrics  # type: ignore
+    from .services import training_cache  # type: ignore
+except ImportError:
+    from services import dataset_preflight  # type: ignore
+    from services import jobs  # type: ignore
+    from services import logtail  # type: ignore
+    from services import train_metrics  # type: ignore
+    from services import training_cache  # type: ignore
+
 # Paths aligned with the runtime layout
 WORKSPACE = Path(os.environ.get("WORKSPACE_ROOT", "/workspace"))
 MODEL_DIR = WORKSPACE / "models"
@@ -33,9 +44,15 @@ router = APIRouter(prefix="/dpipe", tags=["diffusion-pipe"])
 
 # Process/bookkeeping
 _proc_lock = threading.Lock()
-_procs: dict[int, subprocess.Popen] = {}
-_logs: dict[int, deque[str]] = {}
+_procs: dict[int, jobs.Job] = {}  # running runs by pid
+_logs: dict[int, logtail.SequencedLog] = {}
 _LOG_MAX = 2000
+_LOG_POLL_SECONDS = 2.0
+_metrics = train_metrics.MetricsStore(WORKSPACE / "logs" / "training-metrics")
+# diffusion-pipe caches latents and text embeddings under <dataset>/cache/<model type>.
+_MODEL_TYPE = "hunyuan-video"
+_CACHE_SUBDIR = Path("cache") / _MODEL_TYPE
+_caches = training_cache.CacheRegistry(WORKSPACE / "config" / "training-caches.json")
 
 
 def _ensure_dirs():
@@ -43,24 +60,23 @@ def _ensure_dirs():
         p.mkdir(parents=True, exist_ok=True)
 
 
-def _deque_for(pid: int) -> deque[str]:
+def _log_for(pid: int) -> logtail.SequencedLog:
     if pid not in _logs:
-        _logs[pid] = deque(maxlen=_LOG_MAX)
+        _logs[pid] = logtail.SequencedLog(_LOG_MAX)
     return _logs[pid]
 
 
-def _read_stream(proc: subprocess.Popen, pid: int):
-    for raw in iter(proc.stdout.readline, b""):
-        try:
-            line = raw.decode("utf-8", errors="replace")
-        except Exception:
-            line = str(raw)
-        with _proc_lock:
-            _deque_for(pid).append(line.rstrip("\n"))
-    proc.stdout.close()
-    proc.wait()
+def _run_finished(
+    job: jobs.Job,
+    metrics: Optional[train_metrics.MetricsRecorder] = None,
+    cache_dir: Optional[Path] = None,
+):
+    if metrics is not None:
+        metrics.finish(job.returncode)
+    if cache_dir is not None:
+        _caches.finish(cache_dir, ok=job.returncode == 0)
     with _proc_lock:
-        _procs.pop(pid, None)
+        _procs.pop(job.pid, None)
 
 
 def _resolve_diffpipe_dir() -> Path:
@@ -245,7 +261,7 @@ def create_training_config(
         "video_clip_mode": video_clip_mode,
         "pipeline_stages": num_gpus,
         "model": {
-            "type": "hunyuan-video",
+            "type": _MODEL_TYPE,
             "transformer_path": transformer_path,
             "vae_path": vae_path,
             "llm_path": llm_path,
@@ -324,6 +340,8 @@ class TrainRequest(BaseModel):
     steps_per_print: int = 1
     video_clip_mode: str = "single_middle"
     resume_from_checkpoint: bool = False
+    skip_preflight: bool = False
+    regenerate_cache: Optional[bool] = None  # None: only when the recorded cache is stale
     only_double_blocks: bool = False
     enable_wandb: bool = False
     wandb_run_name: Optional[str] = None
@@ -410,6 +428,25 @@ def _ensure_single_run():
             raise HTTPException(status_code=400, detail="A training process is already running.")
 
 
+def _preflight_dataset(ds_path: Path, req: TrainRequest, resolutions: list, ar_buckets: Optional[list]) -> dict:
+    """Header-only dataset check against the run's buckets; 400 before any GPU work if it would fail."""
+    try:
+        spec = dataset_preflight.BucketSpec.diffusion_pipe(
+            resolutions,
+            enable_ar_bucket=req.enable_ar_bucket,
+            min_ar=req.min_ar,
+            max_ar=req.max_ar,
+            num_ar_buckets=req.num_ar_buckets,
+            ar_buckets=ar_buckets,
+        )
+    except (ValueError, TypeError, ZeroDivisionError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket settings: {e}")
+    report = dataset_preflight.analyzer.analyze(ds_path, spec)
+    if not report["ok"]:
+        raise HTTPException(status_code=400, detail="Dataset pre-flight failed: " + "; ".join(report["errors"]))
+    return report
+
+
 @router.post("/train/start")
 def start_training(req: TrainRequest):
     _ensure_dirs()
@@ -432,11 +469,34 @@ def start_training(req: TrainRequest):
         arb = json.loads(req.ar_buckets) if req.ar_buckets else None
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid JSON in resolutions/frame/ar buckets: {e}")
+    preflight = None if req.skip_preflight else _preflight_dataset(ds_path, req, resolutions, arb)
 
     transformer_path = _resolve_training_model_path(req.transformer_path, field="transformer_path")
     vae_path = _resolve_training_model_path(req.vae_path, field="vae_path")
     llm_path = _resolve_training_model_path(req.llm_path, field="llm_path")
     clip_path = _resolve_training_model_path(req.clip_path, field="clip_path")
+    cache_dir = ds_path / _CACHE_SUBDIR
+    cache_models = [str(transformer_path), str(vae_path), str(llm_path), str(clip_path)]
+    cache_parts = training_cache.fingerprint_parts(
+        ds_path,
+        cache_dir.parent,
+        settings={
+            "resolutions": resolutions,
+            "enable_ar_bucket": req.enable_ar_bucket,
+            "min_ar": req.min_ar,
+            "max_ar": req.max_ar,
+            "num_ar_buckets": req.num_ar_buckets,
+            "ar_buckets": arb,
+            "frame_buckets": frames,
+            "video_clip_mode": req.video_clip_mode,
+            "dtype": req.dtype,
+            "model_type": _MODEL_TYPE,
+        },
+        model_paths=cache_models,
+    )
+    cache = _caches.check(cache_dir, cache_parts)
+    regenerate = req.regenerate_cache if req.regenerate_cache is not None else cache["status"] == "stale"
+    cache["regenerate"] = regenerate
 
     dataset_cfg = create_dataset_config(
         ds_path,
@@ -500,26 +560,58 @@ def start_training(req: TrainRequest):
     ]
     if req.resume_from_checkpoint:
         cmd.append("--resume_from_checkpoint")
-
+    if regenerate:
+        cmd.append("--regenerate_cache")
+
+    metrics = _metrics.start_run("dpipe", out_dir.name)
+    # Recorded before spawning: a run that exits at once finishes the entry from on_exit.
+    _caches.begin(
+        cache_dir,
+        trainer="diffusion-pipe",
+        dataset_dir=ds_path,
+        parts=cache_parts,
+        model_paths=cache_models,
+        dataset_skip=cache_dir.parent,
+        rebuild=regenerate,
+        run=metrics.run_id,
+    )
     try:
-        proc = subprocess.Popen(
+        job = jobs.runner.spawn(
             cmd,
+            kind="dpipe",
+            name=out_dir.name,
             cwd=run_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            preexec_fn=os.setsid,
+            new_session=True,
+            on_line=lambda _job, line: metrics.feed(line),
+            on_exit=lambda job: _run_finished(job, metrics, cache_dir),
+            log_lines=_LOG_MAX,
+            split_cr=False,
+            on_line_split_cr=True,
+            meta={"config": str(training_cfg), "metrics_run": metrics.run_id, "cache_dir": str(cache_dir)},
         )
     except FileNotFoundError:
+        metrics.finish(None)
+        _caches.finish(cache_dir, ok=False)
         raise HTTPException(status_code=500, detail="deepspeed binary is unavailable")
     except Exception:
+        metrics.finish(None)
+        _caches.finish(cache_dir, ok=False)
         raise HTTPException(status_code=500, detail="Unable to start diffusion-pipe training")
 
-    pid = proc.pid
+    pid = job.pid
     with _proc_lock:
-        _procs[pid] = proc
-        _deque_for(pid).clear()
-    threading.Thread(target=_read_stream, args=(proc, pid), daemon=True).start()
-    return {"status": "started", "pid": pid, "config": str(training_cfg)}
+        if job.running:
+            _procs[pid] = job
+        _logs[pid] = job.log
+    return {
+        "status": "started",
+        "pid": pid,
+        "job_id": job.id,
+        "config": str(training_cfg),
+        "metrics_run": metrics.run_id,
+        "preflight": dataset_preflight.summary(preflight) if preflight else None,
+        "cache": cache,
+    }
 
 
 @router.post("/train/stop")
@@ -529,32 +621,125 @@ def stop_training(pid: Optional[int] = None):
             if not _procs:
                 return {"status": "noop", "detail": "No training process tracked."}
             pid = next(iter(_procs))
-        proc = _procs.get(pid)
-    if proc is None:
+        job = _procs.get(pid)
+    if job is None:
         return {"status": "noop", "detail": "Process not found."}
-    if proc.poll() is not None:
+    if not job.running:
         with _proc_lock:
             _procs.pop(pid, None)
         return {"status": "stopped", "detail": "Process already exited."}
-    try:
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-        try:
-            proc.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-            proc.wait()
-    finally:
-        with _proc_lock:
-            _procs.pop(pid, None)
+    jobs.runner.cancel(job.id)
+    job.wait(jobs.DEFAULT_KILL_GRACE_SECONDS + 5)
+    with _proc_lock:
+        _procs.pop(pid, None)
     return {"status": "stopped", "pid": pid}
 
 
 @router.get("/train/logs")
-def training_logs(pid: Optional[int] = None, limit: int = 500):
+def training_logs(pid: Optional[int] = None, limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None):
+    """Log tail for a run. `seq` is the newest line's cursor; pass it as `since` (with `epoch`) to get only newer lines."""
     with _proc_lock:
         if pid is None:
             if not _procs and not _logs:
-                return {"pid": None, "lines": []}
+                return {"pid": None, "lines": [], "seq": 0, "epoch": logtail.EPOCH, "running": False, "reset": since is not None}
             pid = next(iter(_logs)) if _logs else next(iter(_procs))
-        lines = list(_deque_for(pid))[-limit:]
-    return {"pid": pid, "lines": lines}
+        log = _log_for(pid)
+        running = pid in _procs
+    if since is not None:
+        entries, reset = log.since(since, limit, epoch=epoch)
+        if not reset:
+            seq = entries[-1][0] if entries else since
+            return {
+                "pid": pid,
+                "lines": [line for _, line in entries],
+                "seq": seq,
+                "epoch": logtail.EPOCH,
+                "running": running,
+                "reset": False,
+            }
+    lines, seq = log.tail(limit)
+    return {"pid": pid, "lines": lines, "seq": seq, "epoch": logtail.EPOCH, "running": running, "reset": since is not None}
+
+
+@router.get("/train/logs/stream")
+def training_logs_stream(
+    request: Request, pid: Optional[int] = None, limit: int = 500, since: Optional[int] = None, epoch: Optional[str] = None
+):
+    """Server-Sent Events version of /train/logs: a `lines` event per batch of new lines."""
+    with _proc_lock:
+        if pid is None:
+            if not _procs and not _logs:
+                raise HTTPException(status_code=404, detail="No training logs yet.")
+            pid = next(iter(_logs)) if _logs else next(iter(_procs))
+        log = _log_for(pid)
+    return StreamingResponse(
+        logtail.cursor_events(
+            request,
+            lambda cursor, cursor_epoch: training_logs(pid=pid, limit=limit, since=cursor, epoch=cursor_epoch),
+            log.wait,
+            since,
+            epoch,
+            poll_seconds=_LOG_POLL_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _cache_dirs_in_use() -> set[str]:
+    with _proc_lock:
+        return {job.meta.get("cache_dir") for job in _procs.values() if job.running}
+
+
+@router.get("/caches")
+def list_caches():
+    """Latent/text-embedding caches: recorded ones plus untracked ``<dataset>/cache`` dirs, with sizes."""
+    caches = _caches.inventory([(BASE_DATASET_DIR, _CACHE_SUBDIR)])
+    in_use = _cache_dirs_in_use()
+    for item in caches:
+        item["in_use"] = item["cache_dir"] in in_use
+    return {
+        "caches": caches,
+        "total_bytes": sum(item["size_bytes"] for item in caches),
+        "orphaned_bytes": sum(item["size_bytes"] for item in caches if item["orphaned"]),
+    }
+
+
+class CacheCleanupRequest(BaseModel):
+    cache_dirs: Optional[List[str]] = None  # default: every orphaned cache
+    dry_run: bool = False
+
+
+@router.post("/caches/cleanup")
+def cleanup_caches(req: CacheCleanupRequest):
+    caches = {item["cache_dir"]: item for item in list_caches()["caches"]}
+    if req.cache_dirs is None:
+        targets = [path for path, item in caches.items() if item["orphaned"]]
+    else:
+        unknown = [path for path in req.cache_dirs if path not in caches]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown cache dir: {unknown[0]}")
+        targets = list(dict.fromkeys(req.cache_dirs))
+    removed, skipped = [], []
+    for path in targets:
+        item = caches[path]
+        if item["in_use"]:
+            skipped.append({"cache_dir": path, "reason": "in use by a running training"})
+            continue
+        if not _path_is_within_root(Path(path), BASE_DATASET_DIR) and Path(path).exists():
+            skipped.append({"cache_dir": path, "reason": "outside the datasets directory"})
+            continue
+        freed = item["size_bytes"]
+        if not req.dry_run:
+            try:
+                freed = _caches.remove(Path(path))
+            except OSError as e:
+                skipped.append({"cache_dir": path, "reason": f"delete failed: {e}"})
+                continue
+        removed.append({"cache_dir": path, "size_bytes": freed})
+    return {
+        "dry_run": req.dry_run,
+        "removed": removed,
+        "skipped": skipped,
+        "freed_bytes": sum(item["size_bytes"] for item in removed),
+    }
@@ -1,65 +1,295 @@
 import asyncio
 import logging
 import os
+import random
+import time
+from collections import deque
+from datetime import datetime
 from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
 
 from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import httpx
 import websockets
 
+from . import image_index
+from .logtail import sse_event
+
 logger = logging.getLogger(__name__)
 
+# RFC 9110 section 7.6.1: connection-scoped headers a proxy must not forward.
+_HOP_BY_HOP_HEADERS = frozenset(
+    {
+        b"connection",
+        b"keep-alive",
+        b"proxy-authenticate",
+        b"proxy-authorization",
+        b"proxy-connection",
+        b"te",
+        b"trailer",
+        b"transfer-encoding",
+        b"upgrade",
+    }
+)
+_PROXY_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+_PROXY_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=60.0, pool=10.0)  # per chunk, not per transfer
+_PROXY_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=16, keepalive_expiry=30.0)
+
+
+def _end_to_end_headers(raw: Iterable[tuple[bytes, bytes]], drop: Iterable[bytes] = ()) -> list[tuple[bytes, bytes]]:
+    """Drop hop-by-hop headers, plus any the ``Connection`` header names. Repeated
+    headers (``Set-Cookie``) are kept as separate entries."""
+    raw = list(raw)
+    excluded = set(_HOP_BY_HOP_HEADERS) | {name.lower() for name in drop}
+    for name, value in raw:
+        if name.lower() == b"connection":
+            excluded.update(token.strip().lower() for token in value.split(b",") if token.strip())
+    return [(name, value) for name, value in raw if name.lower() not in excluded]
+
+
+async def _relay(upstream: httpx.Response):
+    """Upstream bytes as they arrive, still encoded, so ``Content-Length`` and
+    ``Content-Encoding`` stay valid. The next chunk is read only after the previous
+    one was sent, so a slow client slows the upstream read instead of filling memory."""
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    finally:
+        await upstream.aclose()
+
+
+_LATEST_IMAGE_WAIT_SECONDS = 2.0
+_LATEST_IMAGE_KEEPALIVE_SECONDS = 15.0
+
+_HUB_QUEUE_SIZE = 256  # frames per subscriber; the oldest go first when a client falls behind
+_HUB_QUEUE_BYTES = 32 * 1024 * 1024  # and bytes per subscriber, so a few large previews cannot pin memory
+_HUB_BACKOFF_INITIAL_SECONDS = 0.5
+_HUB_BACKOFF_MAX_SECONDS = 30.0
+_HUB_IDLE_CLOSE_SECONDS = 10.0  # keep the upstream across page reloads
+_HUB_MAX_FRAME_BYTES = 8 * 1024 * 1024  # previews arrive as single binary frames; a few hundred KB in practice
+_HUB_UNAVAILABLE = '{"type": "error", "message": "Cannot connect to ComfyUI"}'
+
+Frame = Union[str, bytes]
+
+
+class _Subscriber:
+    """Frame queue for one browser, bounded by count and by total bytes. When
+    over either, the oldest frames are dropped so a slow client sees recent
+    previews instead of a growing backlog."""
+
+    def __init__(self, maxlen: int, max_bytes: int = _HUB_QUEUE_BYTES):
+        self.frames: deque = deque()
+        self.maxlen = maxlen
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, frame: Frame) -> None:
+        self.frames.append(frame)
+        self.bytes += len(frame)
+        # The newest frame always stays, even on its own over max_bytes.
+        while len(self.frames) > 1 and (len(self.frames) > self.maxlen or self.bytes > self.max_bytes):
+            self.bytes -= len(self.frames.popleft())
+            self.dropped += 1
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Frame]:
+        """Next frame, or None once the subscriber is closed."""
+        while not self.frames:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self.frames.popleft()
+        self.bytes -= len(frame)
+        return frame
+
+
+class ComfyHub:
+    """One upstream Comfy websocket shared by every ``/ws/comfy`` client.
+
+    The upstream is opened with the first subscriber, reconnected with
+    exponential backoff (with jitter) while anyone is subscribed, and closed
+    ``idle_close`` seconds after the last one leaves. Text and binary frames
+    are fanned out to every subscriber's queue.
+    """
+
+    def __init__(
+        self,
+        url: Callable[[], str],
+        *,
+        queue_size: int = _HUB_QUEUE_SIZE,
+        queue_bytes: int = _HUB_QUEUE_BYTES,
+        backoff_initial: float = _HUB_BACKOFF_INITIAL_SECONDS,
+        backoff_max: float = _HUB_BACKOFF_MAX_SECONDS,
+        idle_close: float = _HUB_IDLE_CLOSE_SECONDS,
+    ):
+        self._url = url
+        self._queue_size = queue_size
+        self._queue_bytes = queue_bytes
+        self._backoff_initial = backoff_initial
+        self._backoff_max = backoff_max
+        self._idle_close = idle_close
+        self._subscribers: set[_Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self._upstream = None
+        self._outage_reported = False  # _HUB_UNAVAILABLE went out for the current outage
+        self.connects = 0
+        self.dropped = 0  # frames dropped for subscribers that already left
+
+    def subscribe(self) -> _Subscriber:
+        sub = _Subscriber(self._queue_size, self._queue_bytes)
+        self._subscribers.add(sub)
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        running = self._task is not None and not self._task.done()
+        if running and self._upstream is None and self._outage_reported:
+            # Joined mid-outage: the one-time notice already went to the others.
+            sub.put(_HUB_UNAVAILABLE)
+        if not running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        if sub not in self._subscribers:
+            return
+        self._subscribers.discard(sub)
+        self.dropped += sub.dropped
+        sub.close()
+        if not self._subscribers and self._task is not None and self._idle_timer is None:
+            self._idle_timer = asyncio.get_running_loop().call_later(self._idle_close, self._stop_if_idle)
+
+    async def send(self, message: Frame) -> bool:
+        """Forward a client frame to Comfy; False while the upstream is down."""
+        upstream = self._upstream
+        if upstream is None:
+            return False
+        try:
+            await upstream.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._upstream is not None,
+            "subscribers": len(self._subscribers),
+            "connects": self.connects,
+            "dropped_frames": self.dropped + sum(sub.dropped for sub in self._subscribers),
+        }
+
+    async def close(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        for sub in list(self._subscribers):
+            self.unsubscribe(sub)
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        await self._cancel_task()
+
+    def _stop_if_idle(self) -> None:
+        self._idle_timer = None
+        if not self._subscribers:
+            asyncio.get_running_loop().create_task(self._cancel_task())
+
+    async def _cancel_task(self) -> None:
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        upstream = self._upstream
+        if upstream is not None:
+            # A clean close ends the read loop; cancelling inside it would send 1011.
+            await upstream.close()
+            await asyncio.wait({task}, timeout=1.0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def _publish(self, frame: Frame) -> None:
+        for sub in self._subscribers:
+            sub.put(frame)
+
+    async def _run(self) -> None:
+        delay = self._backoff_initial
+        self._outage_reported = False
+        while self._subscribers:
+            try:
+                async with websockets.connect(self._url(), max_size=_HUB_MAX_FRAME_BYTES) as upstream:
+                    self._upstream = upstream
+                    self.connects += 1
+                    delay = self._backoff_initial
+                    self._outage_reported = False
+                    async for message in upstream:
+                        self._publish(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._outage_reported:
+                    logger.warning("Comfy websocket unavailable: %s", e)
+                    self._publish(_HUB_UNAVAILABLE)
+                    self._outage_reported = True
+            finally:
+                self._upstream = None
+            if not self._subscribers:
+                break
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self._backoff_max)
+
 
 def create_router(workspace_root: Path, auth_checker=None) -> APIRouter:
     router = APIRouter()
 
+    hub = ComfyHub(lambda: f"ws://localhost:{os.environ.get('COMFY_PORT', '5555')}/ws?clientId=portal_preview")
+    router.add_event_handler("shutdown", hub.close)
+
     @router.websocket("/ws/comfy")
     async def comfy_websocket(websocket: WebSocket):
-        """WebSocket endpoint for ComfyUI live image preview."""
+        """WebSocket endpoint for ComfyUI live image preview, fed by the shared hub."""
         if auth_checker is not None and not auth_checker(websocket.cookies):
             await websocket.close(code=4401, reason="ControlPilot password required")
             return
         await websocket.accept()
+        sub = hub.subscribe()
 
-        comfy_port = os.environ.get("COMFY_PORT", "5555")
-        comfy_ws_url = f"ws://localhost:{comfy_port}/ws?clientId=portal_preview"
+        async def forward_from_comfy():
+            while True:
+                frame = await sub.get()
+                if frame is None:
+                    return
+                if isinstance(frame, bytes):
+                    await websocket.send_bytes(frame)
+                else:
+                    await websocket.send_text(frame)
 
-        try:
-            async with websockets.connect(comfy_ws_url) as comfy_ws:
-                async def forward_from_comfy():
-                    try:
-                        async for message in comfy_ws:
-                            await websocket.send_text(message)
-                    except websockets.exceptions.ConnectionClosed:
-                        pass
-                    except Exception:
-                        pass
-
-                async def forward_to_comfy():
-                    try:
-                        async for message in websocket.iter_text():
-                            await comfy_ws.send(message)
-                    except WebSocketDisconnect:
-                        pass
-                    except Exception:
-                        pass
-
-                await asyncio.gather(
-                    forward_from_comfy(),
-                    forward_to_comfy(),
-                    return_exceptions=True,
-                )
-        except Exception:
-            logger.exception("Comfy preview websocket bridge failed")
+        async def forward_to_comfy():
             try:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": "Cannot connect to ComfyUI",
-                })
-            except Exception:
+                async for message in websocket.iter_text():
+                    await hub.send(message)
+            except WebSocketDisconnect:
                 pass
+
+        tasks = [asyncio.create_task(forward_from_comfy()), asyncio.create_task(forward_to_comfy())]
+        try:
+            # Whichever side ends first (browser gone, hub closed) ends the bridge.
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
         finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            hub.unsubscribe(sub)
             try:
                 await websocket.close()
             except Exception:
@@ -73,7 +303,7 @@ def create_router(workspace_root: Path, auth_checker=None) -> APIRouter:
             import requests
             response = requests.get(f"http://localhost:{comfy_port}/system_stats", timeout=5)
             if response.status_code == 200:
-                return {"status": "running", "port": comfy_port}
+                return {"status": "running", "port": comfy_port, "preview_hub": hub.stats()}
             return {"status": "error", "message": "ComfyUI returned error status"}
         except requests.exceptions.RequestException:
             return {"status": "stopped", "message": "ComfyUI is not reachable"}
@@ -81,64 +311,89 @@ def create_router(workspace_root: Path, auth_checker=None) -> APIRouter:
             logger.exception("Failed to query ComfyUI status")
             return {"status": "error", "message": "Unable to query ComfyUI"}
 
+    output_index = image_index.LatestImageIndex(workspace_root / "outputs" / "comfy")
+    router.add_event_handler("shutdown", lambda: output_index.close())
+
+    def latest_image_payload() -> dict:
+        if not output_index.root.exists():
+            return {"image": None, "message": "No output directory found"}
+        snapshot = output_index.snapshot(limit=1)
+        if not snapshot["images"]:
+            return {"image": None, "message": "No images found", "image_count": 0, "version": snapshot["version"]}
+        latest = snapshot["images"][0]
+        rel_path = Path(latest["path"])
+        subfolder = rel_path.parent.as_posix() if rel_path.parent != Path(".") else ""
+        dimensions = latest["dimensions"]
+        image_url = f"/proxy/comfy/view?filename={rel_path.name}"
+        if subfolder:
+            image_url += f"&subfolder={subfolder}"
+        return {
+            "image": {
+                "url": image_url,
+                "filename": rel_path.name,
+                "subfolder": subfolder,
+                "dimensions": f"{dimensions[0]}x{dimensions[1]}" if dimensions else "Unknown",
+                "size": latest["size"],
+                "generated_at": datetime.fromtimestamp(latest["mtime"]).isoformat(),
+            },
+            "image_count": snapshot["count"],
+            "version": snapshot["version"],
+        }
+
     @router.get("/api/comfy/latest-image")
     def comfy_latest_image():
         """Get the latest generated image from ComfyUI output directory."""
         try:
-            from datetime import datetime
-            from PIL import Image
-
-            output_dir = workspace_root / "outputs" / "comfy"
-            if not output_dir.exists():
-                return {"image": None, "message": "No output directory found"}
-
-            image_patterns = ["*.png", "*.jpg", "*.jpeg", "*.webp"]
-            latest_file = None
-            latest_time = None
-            image_count = 0
-
-            for pattern in image_patterns:
-                for file_path in output_dir.rglob(pattern):
-                    if file_path.is_file():
-                        image_count += 1
-                        file_time = file_path.stat().st_mtime
-                        if latest_time is None or file_time > latest_time:
-                            latest_time = file_time
-                            latest_file = file_path
-
-            if latest_file:
-                stat = latest_file.stat()
-                file_size = stat.st_size
-                rel_path = latest_file.relative_to(output_dir)
-                subfolder = rel_path.parent.as_posix() if rel_path.parent != Path(".") else ""
-                try:
-                    with Image.open(latest_file) as img:
-                        dimensions = f"{img.width}x{img.height}"
-                except Exception:
-                    dimensions = "Unknown"
-
-                image_url = f"/proxy/comfy/view?filename={rel_path.name}"
-                if subfolder:
-                    image_url += f"&subfolder={subfolder}"
-                return {
-                    "image": {
-                        "url": image_url,
-                        "filename": latest_file.name,
-                        "subfolder": subfolder,
-                        "dimensions": dimensions,
-                        "size": file_size,
-                        "generated_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    },
-                    "image_count": image_count,
-                }
-            return {"image": None, "message": "No images found", "image_count": 0}
+            return latest_image_payload()
         except Exception:
             logger.exception("Failed to inspect latest ComfyUI image")
             return {"image": None, "error": "Unable to inspect ComfyUI output"}
 
-    @router.get("/proxy/comfy/{path:path}")
+    @router.get("/api/comfy/latest-image/stream")
+    async def comfy_latest_image_stream(request: Request):
+        """Server-Sent Events: an ``image`` event now and whenever the output index changes."""
+
+        async def events():
+            version = None
+            idle_since = time.monotonic()
+            while not await request.is_disconnected():
+                payload = await asyncio.to_thread(latest_image_payload)
+                if payload.get("version") != version:
+                    version = payload.get("version")
+                    yield sse_event("image", payload)
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= _LATEST_IMAGE_KEEPALIVE_SECONDS:
+                    yield ": keepalive\n\n"
+                    idle_since = time.monotonic()
+                await asyncio.to_thread(output_index.wait, version or 0, _LATEST_IMAGE_WAIT_SECONDS)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    client: Optional[httpx.AsyncClient] = None
+
+    def proxy_client() -> httpx.AsyncClient:
+        nonlocal client
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=_PROXY_TIMEOUT, limits=_PROXY_LIMITS)
+        return client
+
+    async def close_proxy_client() -> None:
+        if client is not None:
+            await client.aclose()
+
+    router.add_event_handler("shutdown", close_proxy_client)
+
+    @router.api_route("/proxy/comfy/{path:path}", methods=_PROXY_METHODS)
     async def proxy_comfy(request: Request, path: str):
-        """Proxy ComfyUI requests to avoid mixed content issues."""
+        """Proxy ComfyUI requests to avoid mixed content issues.
+
+        Bodies are streamed both ways over a shared keep-alive client. ``Range`` and
+        conditional headers pass through untouched.
+        """
         comfy_port = os.environ.get("COMFY_PORT", "5555")
         comfy_url = f"http://localhost:{comfy_port}/{path}"
 
@@ -146,24 +401,31 @@ def create_router(workspace_root: Path, auth_checker=None) -> APIRouter:
         if query_string:
             comfy_url += f"?{query_string}"
 
+        has_body = request.method not in ("GET", "HEAD", "OPTIONS") or "content-length" in request.headers
+        http = proxy_client()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    comfy_url,
-                    headers={k: v for k, v in request.headers.items() if k.lower() != "host"},
-                    timeout=30.0,
-                )
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.headers.get("content-type", "application/octet-stream"),
-                )
+            upstream_request = http.build_request(
+                request.method,
+                comfy_url,
+                headers=_end_to_end_headers(request.headers.raw, drop=(b"host",)),
+                content=request.stream() if has_body else None,
+            )
+            upstream = await http.send(upstream_request, stream=True)
         except Exception:
             logger.exception("Comfy proxy request failed for path %s", path)
             return JSONResponse(
                 {"error": "Proxy request failed"},
-                status_code=500,
+                status_code=502,
             )
 
+        headers = _end_to_end_headers(upstream.headers.raw)
+        if request.method == "HEAD" or upstream.status_code in (204, 304):
+            await upstream.aread()  # empty; reading it marks the connection reusable
+            await upstream.aclose()
+            response = Response(status_code=upstream.status_code)
+        else:
+            response = StreamingResponse(_relay(upstream), status_code=upstream.status_code)
+        response.raw_headers = headers
+        return response
+
     return router
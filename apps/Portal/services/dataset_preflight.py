@@ -0,0 +1,465 @@
+"""Dataset pre-flight checks run before a training job is launched.
+
+Corrupt images, missing captions and a bad bucket layout otherwise surface
+only after the trainer has spent minutes loading models. The analyzer walks a
+dataset, reads each image's header (never the pixels) in a process pool and
+reports resolution and aspect-ratio spread, caption coverage, estimated token
+lengths and how images land in the configured buckets.
+
+Per-file results are cached by (mtime, size) of the image and its caption, so
+re-checking an unchanged dataset only costs the directory walk.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import re
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Sequence, Union
+
+from . import imagemeta
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mov", ".mkv", ".avi")
+CAPTION_EXTENSIONS = (".txt", ".caption")
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+DEFAULT_CACHE_ENTRIES = 200_000
+_INLINE_THRESHOLD = 64  # fewer files than this are probed in-process
+_CHUNK_SIZE = 256
+_MAX_EXAMPLES = 20
+_TRAILER_BYTES = 64
+# CLIP-style pre-tokenization: words, numbers and single punctuation marks.
+# BPE splits rare words further, so this undercounts slightly.
+_TOKEN_RE = re.compile(r"[a-zA-Z]+|[0-9]|[^\sa-zA-Z0-9]")
+
+Resolution = Union[int, Sequence[int]]
+
+
+class FileProbe(NamedTuple):
+    width: int
+    height: int
+    error: Optional[str]
+    caption_tokens: Optional[int]  # None: no caption file
+    warning: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    """Bucket layout: one group of (width, height) buckets per training resolution.
+
+    Images are assigned to the bucket in each group whose aspect ratio is
+    closest (in log space) to their own, as both trainers do.
+    """
+
+    groups: tuple[tuple[str, tuple[tuple[int, int], ...]], ...]
+    min_ar: Optional[float] = None
+    max_ar: Optional[float] = None
+
+    @classmethod
+    def diffusion_pipe(
+        cls,
+        resolutions: Iterable[Resolution],
+        *,
+        enable_ar_bucket: bool = True,
+        min_ar: float = 0.5,
+        max_ar: float = 2.0,
+        num_ar_buckets: int = 7,
+        ar_buckets: Optional[Iterable[Union[float, Sequence[int]]]] = None,
+    ) -> "BucketSpec":
+        """diffusion-pipe's layout: for each resolution, one bucket per aspect
+        ratio with the resolution's area, sides rounded to multiples of 16."""
+        if not enable_ar_bucket:
+            ratios = [1.0]
+        elif ar_buckets:
+            ratios = [float(ar[0]) / float(ar[1]) if isinstance(ar, (list, tuple)) else float(ar) for ar in ar_buckets]
+        elif num_ar_buckets <= 1:
+            ratios = [math.sqrt(min_ar * max_ar)]
+        else:
+            step = (math.log(max_ar) - math.log(min_ar)) / (num_ar_buckets - 1)
+            ratios = [math.exp(math.log(min_ar) + i * step) for i in range(num_ar_buckets)]
+        groups = []
+        for res in resolutions:
+            if isinstance(res, (list, tuple)):
+                area, label = float(res[0]) * float(res[1]), f"{res[0]}x{res[1]}"
+            else:
+                area, label = float(res) ** 2, str(res)
+            sizes = []
+            for ar in ratios:
+                size = (_round16(math.sqrt(area * ar)), _round16(math.sqrt(area / ar)))
+                if size not in sizes:
+                    sizes.append(size)
+            groups.append((label, tuple(sizes)))
+        if not enable_ar_bucket:
+            return cls(tuple(groups))
+        return cls(tuple(groups), min(ratios), max(ratios))
+
+    @classmethod
+    def kohya(
+        cls,
+        resolution: Union[int, str, Sequence[int]],
+        *,
+        enable_bucket: bool = False,
+        min_bucket_reso: int = 256,
+        max_bucket_reso: int = 1024,
+        bucket_reso_steps: int = 64,
+    ) -> "BucketSpec":
+        """Kohya sd-scripts' ``make_bucket_resolutions``: widths stepping from
+        the minimum to the maximum side, each paired with the tallest height
+        that keeps the area within ``resolution``."""
+        width, height = _parse_kohya_resolution(resolution)
+        label = f"{width}x{height}"
+        if not enable_bucket:
+            return cls(((label, ((width, height),)),))
+        steps = max(1, int(bucket_reso_steps))
+        max_area = width * height
+        square = int(math.sqrt(max_area) // steps * steps)
+        sizes = {(square, square)}
+        side = min_bucket_reso
+        while side <= max_bucket_reso:
+            other = min(max_bucket_reso, int((max_area // side) // steps * steps))
+            if other >= min_bucket_reso:
+                sizes.add((side, other))
+                sizes.add((other, side))
+            side += steps
+        ordered = tuple(sorted(sizes, key=lambda s: s[0] / s[1]))
+        ratios = [w / h for w, h in ordered]
+        return cls(((label, ordered),), min(ratios), max(ratios))
+
+
+def _round16(value: float) -> int:
+    return max(16, int(round(value / 16.0)) * 16)
+
+
+def _parse_kohya_resolution(value) -> tuple[int, int]:
+    if isinstance(value, (list, tuple)):
+        return int(value[0]), int(value[-1])
+    parts = [p for p in str(value).replace("x", ",").split(",") if p.strip()]
+    if not parts:
+        raise ValueError(f"invalid resolution: {value!r}")
+    return int(parts[0]), int(parts[-1])
+
+
+def kohya_spec_from_config(config: dict) -> tuple[BucketSpec, str, Optional[int]]:
+    """Bucket spec, caption extension and token limit from a Kohya TOML/dict."""
+
+    def find(key, default=None):
+        if key in config:
+            return config[key]
+        for value in config.values():
+            if isinstance(value, dict) and key in value:
+                return value[key]
+        return default
+
+    spec = BucketSpec.kohya(
+        find("resolution", "512,512"),
+        enable_bucket=bool(find("enable_bucket", False)),
+        min_bucket_reso=int(find("min_bucket_reso", 256)),
+        max_bucket_reso=int(find("max_bucket_reso", 1024)),
+        bucket_reso_steps=int(find("bucket_reso_steps", 64)),
+    )
+    caption_ext = str(find("caption_extension", "") or find("caption_file_extension", "") or ".caption")
+    max_tokens = find("max_token_length")
+    return spec, caption_ext, int(max_tokens) if max_tokens else 75
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text.lower()))
+
+
+def _trailer_ok(path: str, fmt: str) -> bool:
+    marker = b"IEND" if fmt == "png" else b"\xff\xd9"
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            fh.seek(max(0, fh.tell() - _TRAILER_BYTES))
+            return marker in fh.read()
+    except OSError:
+        return False
+
+
+def probe_file(image_path: str, caption_path: Optional[str]) -> FileProbe:
+    """Header-only image check plus caption token count (runs in pool workers).
+
+    A missing end marker is only a warning: motion photos and files with
+    appended metadata carry valid data after it.
+    """
+    header = imagemeta.read_header(Path(image_path))
+    error = warning = None
+    if header is None:
+        error = "unreadable image header"
+    elif header.width <= 0 or header.height <= 0:
+        error = f"invalid dimensions {header.width}x{header.height}"
+    elif header.format in ("png", "jpeg") and not _trailer_ok(image_path, header.format):
+        warning = "no end-of-image marker near the end of the file (possibly truncated)"
+    tokens = None
+    if caption_path is not None:
+        try:
+            with open(caption_path, "r", encoding="utf-8", errors="replace") as fh:
+                tokens = count_tokens(fh.read())
+        except OSError:
+            tokens = None
+    width, height = (header.width, header.height) if header else (0, 0)
+    return FileProbe(width, height, error, tokens, warning)
+
+
+def _probe_chunk(items: list[tuple[str, Optional[str]]]) -> list[FileProbe]:
+    return [probe_file(image, caption) for image, caption in items]
+
+
+class _Entry(NamedTuple):
+    image: str
+    rel: str
+    caption: Optional[str]
+    key: tuple
+
+
+def _walk(dataset_dir: Path, caption_exts: Sequence[str]) -> tuple[list[_Entry], int]:
+    entries: list[_Entry] = []
+    videos = 0
+    root = str(dataset_dir)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            listing = list(os.scandir(directory))
+        except OSError:
+            continue
+        captions: dict[str, os.stat_result] = {}
+        images: list[tuple[os.DirEntry, os.stat_result]] = []
+        for item in listing:
+            try:
+                if item.is_dir(follow_symlinks=False):
+                    stack.append(item.path)
+                    continue
+                lower = item.name.lower()
+                if lower.endswith(IMAGE_EXTENSIONS):
+                    images.append((item, item.stat()))
+                elif lower.endswith(VIDEO_EXTENSIONS):
+                    videos += 1
+                elif lower.endswith(tuple(caption_exts)):
+                    captions[item.name] = item.stat()
+            except OSError:
+                continue
+        for item, stat in images:
+            stem = os.path.splitext(item.name)[0]
+            caption = None
+            caption_stat = None
+            for ext in caption_exts:
+                caption_stat = captions.get(stem + ext)
+                if caption_stat is not None:
+                    caption = os.path.join(directory, stem + ext)
+                    break
+            key = (
+                stat.st_mtime_ns,
+                stat.st_size,
+                caption,
+                caption_stat.st_mtime_ns if caption_stat else None,
+                caption_stat.st_size if caption_stat else None,
+            )
+            entries.append(_Entry(item.path, os.path.relpath(item.path, root), caption, key))
+    entries.sort(key=lambda e: e.rel)
+    return entries, videos
+
+
+def _summary(values: list[float]) -> dict:
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(math.ceil(0.95 * len(ordered))) - 1)]
+    return {"min": ordered[0], "median": statistics.median(ordered), "p95": p95, "max": ordered[-1]}
+
+
+def build_report(
+    dataset_dir: Path,
+    probes: list[tuple[str, FileProbe]],
+    spec: BucketSpec,
+    *,
+    videos: int = 0,
+    max_tokens: Optional[int] = None,
+) -> dict:
+    """Turn per-file probes into the pre-flight report (``ok``, ``errors``, ``warnings`` and stats)."""
+    corrupt = [(rel, p.error) for rel, p in probes if p.error]
+    valid = [(rel, p) for rel, p in probes if not p.error]
+    suspect = [(rel, p.warning) for rel, p in valid if p.warning]
+    missing = [rel for rel, p in probes if p.caption_tokens is None]
+    empty = [rel for rel, p in probes if p.caption_tokens == 0]
+    tokens = [p.caption_tokens for _, p in probes if p.caption_tokens]
+    over = [rel for rel, p in probes if max_tokens and p.caption_tokens and p.caption_tokens > max_tokens]
+
+    report: dict = {
+        "dataset": str(dataset_dir),
+        "images": len(probes),
+        "videos": videos,
+        "valid_images": len(valid),
+        "corrupt_count": len(corrupt),
+        "corrupt": [{"path": rel, "error": err} for rel, err in corrupt[:_MAX_EXAMPLES]],
+        "suspect_count": len(suspect),
+        "suspect": [{"path": rel, "warning": warning} for rel, warning in suspect[:_MAX_EXAMPLES]],
+        "missing_captions": len(missing),
+        "missing_caption_examples": missing[:_MAX_EXAMPLES],
+        "empty_captions": len(empty),
+        "tokens": None,
+        "resolution": None,
+        "aspect_ratio": None,
+        "buckets": [],
+    }
+    if tokens:
+        report["tokens"] = {**_summary(tokens), "limit": max_tokens, "over_limit": len(over), "over_limit_examples": over[:_MAX_EXAMPLES]}
+
+    out_of_range = 0
+    if valid:
+        megapixels = [p.width * p.height / 1e6 for _, p in valid]
+        ratios = [p.width / p.height for _, p in valid]
+        report["resolution"] = {
+            "min_side": min(min(p.width, p.height) for _, p in valid),
+            "max_side": max(max(p.width, p.height) for _, p in valid),
+            "megapixels": {k: round(v, 3) for k, v in _summary(megapixels).items()},
+        }
+        if spec.min_ar is not None and spec.max_ar is not None:
+            # Small tolerance: bucket edges are rounded sizes, not exact ratios.
+            out_of_range = sum(1 for ar in ratios if ar < spec.min_ar * 0.98 or ar > spec.max_ar * 1.02)
+        report["aspect_ratio"] = {**{k: round(v, 3) for k, v in _summary(ratios).items()}, "out_of_range": out_of_range}
+
+    for label, sizes in spec.groups:
+        logs = [math.log(w / h) for w, h in sizes]
+        counts = [0] * len(sizes)
+        upscaled = 0
+        for _, p in valid:
+            image_log = math.log(p.width / p.height)
+            i = min(range(len(sizes)), key=lambda j: abs(logs[j] - image_log))
+            counts[i] += 1
+            w, h = sizes[i]
+            if p.width < w or p.height < h:
+                upscaled += 1
+        report["buckets"].append(
+            {
+                "resolution": label,
+                "upscaled": upscaled,
+                "buckets": [
+                    {"size": [w, h], "aspect": round(w / h, 3), "count": n} for (w, h), n in zip(sizes, counts)
+                ],
+            }
+        )
+
+    errors = []
+    warnings = []
+    if not probes and not videos:
+        errors.append("No images found in dataset")
+    elif probes and not valid:
+        errors.append("No readable images in dataset")
+    if corrupt:
+        errors.append(f"{len(corrupt)} corrupt or unreadable image(s)")
+    if suspect:
+        warnings.append(f"{len(suspect)} image(s) may be truncated (no end-of-image marker)")
+    if missing:
+        warnings.append(f"{len(missing)} image(s) without a caption file")
+    if empty:
+        warnings.append(f"{len(empty)} empty caption file(s)")
+    if over:
+        warnings.append(f"{len(over)} caption(s) longer than {max_tokens} tokens (estimated)")
+    if out_of_range:
+        warnings.append(f"{out_of_range} image(s) outside the aspect-ratio bucket range")
+    upscaled_total = max((group["upscaled"] for group in report["buckets"]), default=0)
+    if upscaled_total:
+        warnings.append(f"{upscaled_total} image(s) smaller than their bucket will be upscaled")
+    report["ok"] = not errors
+    report["errors"] = errors
+    report["warnings"] = warnings
+    return report
+
+
+class PreflightAnalyzer:
+    """Probes datasets in a shared process pool and caches per-file results."""
+
+    def __init__(self, *, workers: int = DEFAULT_WORKERS, cache_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.workers = max(1, workers)
+        self.cache_entries = cache_entries
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, tuple[tuple, FileProbe]] = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # forkserver: workers start from a clean process, not a fork of
+                # the threaded Portal.
+                context = multiprocessing.get_context("forkserver")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def _probe_many(self, items: list[tuple[str, Optional[str]]]) -> list[FileProbe]:
+        if self.workers <= 1 or len(items) < _INLINE_THRESHOLD:
+            return _probe_chunk(items)
+        chunk = max(1, min(_CHUNK_SIZE, math.ceil(len(items) / (self.workers * 4))))
+        chunks = [items[i : i + chunk] for i in range(0, len(items), chunk)]
+        try:
+            results = self._executor().map(_probe_chunk, chunks)
+            return [probe for batch in results for probe in batch]
+        except (BrokenProcessPool, OSError):
+            with self._lock:
+                self._pool = None
+            return _probe_chunk(items)
+
+    def analyze(
+        self,
+        dataset_dir: Path,
+        spec: BucketSpec,
+        *,
+        caption_extensions: Sequence[str] = CAPTION_EXTENSIONS,
+        max_tokens: Optional[int] = None,
+    ) -> dict:
+        started = time.monotonic()
+        dataset_dir = Path(dataset_dir)
+        entries, videos = _walk(dataset_dir, caption_extensions)
+
+        results: dict[str, FileProbe] = {}
+        todo: list[_Entry] = []
+        with self._lock:
+            for entry in entries:
+                cached = self._cache.get(entry.image)
+                if cached is not None and cached[0] == entry.key:
+                    self._cache.move_to_end(entry.image)
+                    results[entry.image] = cached[1]
+                else:
+                    todo.append(entry)
+        probed = self._probe_many([(e.image, e.caption) for e in todo]) if todo else []
+        with self._lock:
+            for entry, probe in zip(todo, probed):
+                results[entry.image] = probe
+                self._cache[entry.image] = (entry.key, probe)
+                self._cache.move_to_end(entry.image)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+        report = build_report(
+            dataset_dir,
+            [(e.rel, results[e.image]) for e in entries],
+            spec,
+            videos=videos,
+            max_tokens=max_tokens,
+        )
+        report["probed"] = len(todo)
+        report["cached"] = len(entries) - len(todo)
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+analyzer = PreflightAnalyzer()
+
+
+def summary(report: dict) -> dict:
+    """The part of a report that start endpoints echo back."""
+    return {key: report.get(key) for key in ("ok", "errors", "warnings", "images", "corrupt_count", "missing_captions", "buckets")}
@@ -0,0 +1,365 @@
+"""Incrementally maintained index of the newest images under an output tree.
+
+``/api/comfy/latest-image`` is polled while Comfy generates. Walking the whole
+output tree on every poll is linear in the number of images ever generated,
+so the tree is scanned once and then kept current from inotify events (one
+watch per directory). Reads are served from memory: the file count, the
+``keep`` newest files and their dimensions (read from the image header when a
+file enters the newest set). Where inotify is unavailable the tree is
+rescanned at most every ``rescan_seconds``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import ctypes
+import ctypes.util
+import heapq
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from . import imagemeta
+from .logtail import InotifyWatcher
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+DEFAULT_KEEP = 50
+DEFAULT_RESCAN_SECONDS = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+class _TreeWatcher:
+    """inotify watches on every directory of a tree, reporting (dir, name, mask)."""
+
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = (
+        InotifyWatcher.IN_CLOSE_WRITE
+        | InotifyWatcher.IN_MOVED_FROM
+        | InotifyWatcher.IN_MOVED_TO
+        | InotifyWatcher.IN_CREATE
+        | InotifyWatcher.IN_DELETE
+    )
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, fd: int, add_watch, rm_watch):
+        self._fd = fd
+        self._add_watch = add_watch
+        self._rm_watch = rm_watch
+        self._dirs: dict[int, str] = {}
+
+    @classmethod
+    def create(cls) -> Optional["_TreeWatcher"]:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            return None
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            init, add_watch, rm_watch = libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+        except (OSError, AttributeError):
+            return None
+        fd = init(InotifyWatcher.IN_NONBLOCK | InotifyWatcher.IN_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(fd, add_watch, rm_watch)
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def watch(self, directory: str) -> bool:
+        wd = self._add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            return False
+        self._dirs[wd] = directory
+        return True
+
+    def unwatch_tree(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for wd, watched in list(self._dirs.items()):
+            if watched == directory or watched.startswith(prefix):
+                self._rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    @property
+    def watching(self) -> bool:
+        return bool(self._dirs)
+
+    def clear(self) -> None:
+        for wd in list(self._dirs):
+            self._rm_watch(self._fd, wd)
+        self._dirs.clear()
+
+    def read(self) -> Optional[list[tuple[str, str, int]]]:
+        """Pending events, or None if the kernel queue overflowed (rescan needed)."""
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            except OSError:
+                return None
+            if not data:
+                return events
+            pos = 0
+            while pos + self._EVENT.size <= len(data):
+                wd, mask, _, name_len = self._EVENT.unpack_from(data, pos)
+                name = data[pos + self._EVENT.size : pos + self._EVENT.size + name_len].rstrip(b"\0")
+                pos += self._EVENT.size + name_len
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if mask & self.IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is not None and name:
+                    events.append((directory, os.fsdecode(name), mask))
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class LatestImageIndex:
+    def __init__(
+        self,
+        root: Path,
+        *,
+        keep: int = DEFAULT_KEEP,
+        extensions: Iterable[str] = IMAGE_EXTENSIONS,
+        rescan_seconds: float = DEFAULT_RESCAN_SECONDS,
+        use_inotify: bool = True,
+    ):
+        self.root = Path(root)
+        self.keep = keep
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.rescan_seconds = rescan_seconds
+        self._use_inotify = use_inotify
+        self._cond = threading.Condition()
+        self._files: dict[str, tuple[float, int]] = {}  # relative path -> (mtime, size)
+        self._recent: list[tuple[float, str]] = []  # ascending (mtime, relative path), at most ``keep``
+        self._dims: dict[str, Optional[tuple[int, int]]] = {}
+        self._scanned_at: Optional[float] = None
+        self._watcher: Optional[_TreeWatcher] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.version = 0
+
+    # -- reads -------------------------------------------------------------
+
+    def snapshot(self, limit: int = 1) -> dict:
+        """``count`` and the ``limit`` newest images (newest first)."""
+        self._ensure_current()
+        with self._cond:
+            newest = self._recent[::-1][: max(0, limit)]
+            missing = [rel for _, rel in newest if rel not in self._dims]
+        dims = {rel: imagemeta.image_size(self.root / rel) for rel in missing}
+        with self._cond:
+            for rel, size in dims.items():
+                if rel in self._files:
+                    self._dims[rel] = size
+            images = []
+            for mtime, rel in newest:
+                stat = self._files.get(rel)
+                if stat is None:
+                    continue
+                images.append({"path": rel, "mtime": mtime, "size": stat[1], "dimensions": self._dims.get(rel)})
+            return {"count": len(self._files), "images": images, "version": self.version}
+
+    def wait(self, version: int, timeout: float) -> bool:
+        """Block until the index moves past ``version``; True if it did."""
+        self._ensure_current()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.version == version and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self._watcher is None:
+                    remaining = min(remaining, self.rescan_seconds)
+                self._cond.wait(remaining)
+                if self._watcher is None and self.version == version:
+                    break  # polling mode: let the caller rescan
+            return self.version != version
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            watcher, self._watcher = self._watcher, None
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if watcher is not None:
+            watcher.close()
+
+    # -- maintenance -------------------------------------------------------
+
+    def _ensure_current(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            if self._watcher is not None:
+                return
+            fresh = self._scanned_at is not None and time.monotonic() - self._scanned_at < self.rescan_seconds
+            if fresh or not self.root.is_dir():
+                if not self.root.is_dir() and self._files:
+                    self._replace({})
+                return
+            watcher = _TreeWatcher.create() if self._use_inotify else None
+            self._replace(self._scan(watcher))
+            self._scanned_at = time.monotonic()
+            if watcher is not None:
+                self._watcher = watcher
+                self._thread = threading.Thread(target=self._watch_loop, name="image-index", daemon=True)
+                self._thread.start()
+
+    def _is_image(self, name: str) -> bool:
+        return name.lower().endswith(self.extensions)
+
+    def _scan(self, watcher: Optional[_TreeWatcher], start: Optional[str] = None) -> dict[str, tuple[float, int]]:
+        """Images under ``start`` (default: the root), keyed by path relative to the root."""
+        files: dict[str, tuple[float, int]] = {}
+        root = str(self.root)
+        stack = [start or root]
+        while stack:
+            directory = stack.pop()
+            if watcher is not None:
+                watcher.watch(directory)  # before listing, so nothing created meanwhile is missed
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif self._is_image(entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        files[os.path.relpath(entry.path, root)] = (stat.st_mtime, stat.st_size)
+                except OSError:
+                    continue
+        return files
+
+    def _replace(self, files: dict[str, tuple[float, int]]) -> None:
+        # Caller holds the lock.
+        changed = files is self._files or files != self._files
+        self._files = files
+        newest = heapq.nlargest(self.keep, files.items(), key=lambda item: item[1][0])
+        self._recent = sorted((mtime, rel) for rel, (mtime, _) in newest)
+        self._dims = {rel: self._dims[rel] for _, rel in self._recent if rel in self._dims}
+        if changed:
+            self._changed()
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._cond.notify_all()
+
+    def _upsert(self, rel: str, mtime: float, size: int) -> None:
+        previous = self._files.get(rel)
+        self._files[rel] = (mtime, size)
+        if previous is not None:
+            self._drop_recent(rel, previous[0])
+            self._dims.pop(rel, None)
+        if len(self._recent) < self.keep or (mtime, rel) > self._recent[0]:
+            bisect.insort(self._recent, (mtime, rel))
+            if len(self._recent) > self.keep:
+                _, evicted = self._recent.pop(0)
+                self._dims.pop(evicted, None)
+        self._changed()
+
+    def _remove(self, rel: str) -> None:
+        previous = self._files.pop(rel, None)
+        if previous is None:
+            return
+        self._dims.pop(rel, None)
+        if self._drop_recent(rel, previous[0]) and len(self._files) > len(self._recent):
+            # Refill the newest set from memory; no disk access.
+            self._replace(self._files)
+            return
+        self._changed()
+
+    def _remove_tree(self, prefix: str) -> None:
+        gone = [rel for rel in self._files if rel.startswith(prefix + os.sep)]
+        for rel in gone:
+            del self._files[rel]
+        if gone:
+            self._replace(self._files)
+
+    def _drop_recent(self, rel: str, mtime: float) -> bool:
+        i = bisect.bisect_left(self._recent, (mtime, rel))
+        if i < len(self._recent) and self._recent[i] == (mtime, rel):
+            del self._recent[i]
+            return True
+        return False
+
+    def _apply(self, events: list[tuple[str, str, int]]) -> None:
+        root = str(self.root)
+        for directory, name, mask in events:
+            path = os.path.join(directory, name)
+            rel = os.path.relpath(path, root)
+            if mask & _TreeWatcher.IN_ISDIR:
+                if mask & (InotifyWatcher.IN_CREATE | InotifyWatcher.IN_MOVED_TO):
+                    with self._cond:
+                        for sub_rel, (mtime, size) in self._scan(self._watcher, path).items():
+                            self._upsert(sub_rel, mtime, size)
+                elif mask & (InotifyWatcher.IN_DELETE | InotifyWatcher.IN_MOVED_FROM):
+                    with self._cond:
+                        if self._watcher is not None:
+                            self._watcher.unwatch_tree(path)
+                        self._remove_tree(rel)
+                continue
+            if not self._is_image(name):
+                continue
+            if mask & (InotifyWatcher.IN_DELETE | InotifyWatcher.IN_MOVED_FROM):
+                with self._cond:
+                    self._remove(rel)
+            elif mask & (InotifyWatcher.IN_CLOSE_WRITE | InotifyWatcher.IN_MOVED_TO):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                with self._cond:
+                    self._upsert(rel, stat.st_mtime, stat.st_size)
+
+    def _watch_loop(self) -> None:
+        while True:
+            with self._cond:
+                watcher = self._watcher
+            if watcher is None:
+                return
+            try:
+                ready, _, _ = select.select([watcher.fileno()], [], [], 1.0)
+            except (OSError, ValueError):
+                return
+            if not ready:
+                continue
+            with self._cond:
+                if self._watcher is None:
+                    return
+                events = watcher.read()
+            if events is None:
+                logger.warning("Image index event queue overflowed; rescanning %s", self.root)
+                with self._cond:
+                    watcher.clear()
+                    self._replace(self._scan(watcher))
+                continue
+            try:
+                self._apply(events)
+            except Exception:
+                logger.exception("Image index update failed for %s", self.root)
+            with self._cond:
+                if self._watcher is watcher and not watcher.watching:
+                    # The root itself went away; the next read rescans (or empties) the index.
+                    self._watcher = None
+                    self._scanned_at = None
+                    watcher.close()
+                    return
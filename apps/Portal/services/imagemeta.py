@@ -0,0 +1,106 @@
+"""Image dimensions from file headers, without decoding pixels.
+
+PIL's ``Image.open`` is lazy too, but it still imports plugins, builds an image
+object and, for some formats, walks metadata. Directory listings and pollers
+only need the size, which every format we care about stores in its first few
+bytes (JPEG: in the first SOF segment).
+"""
+
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG markers that carry frame dimensions (SOF0..SOF15, minus DHT/JPG/DAC).
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_MAX_SEGMENTS = 512
+
+
+class ImageHeader(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+def _png(head: bytes) -> Optional[ImageHeader]:
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", head[16:24])
+    return ImageHeader("png", width, height)
+
+
+def _webp(head: bytes) -> Optional[ImageHeader]:
+    chunk = head[12:16]
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return ImageHeader("webp", width, height)
+    if chunk == b"VP8L" and len(head) >= 25 and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return ImageHeader("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8 " and len(head) >= 30 and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return ImageHeader("webp", width & 0x3FFF, height & 0x3FFF)
+    return None
+
+
+def _jpeg(fh: BinaryIO) -> Optional[ImageHeader]:
+    fh.seek(2)
+    for _ in range(_JPEG_MAX_SEGMENTS):
+        marker = fh.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # fill bytes
+            byte = fh.read(1)
+            if not byte:
+                return None
+            code = byte[0]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # standalone markers carry no length
+        if code in (0xD9, 0xDA):
+            return None  # end of image / start of scan before any frame header
+        raw = fh.read(2)
+        if len(raw) < 2:
+            return None
+        length = struct.unpack(">H", raw)[0]
+        if length < 2:
+            return None
+        if code in _JPEG_SOF:
+            frame = fh.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return ImageHeader("jpeg", width, height)
+        fh.seek(length - 2, 1)
+    return None
+
+
+def read_header(path: Path) -> Optional[ImageHeader]:
+    """Format and size from the file header, or None if the file is not a
+    PNG/JPEG/WebP/GIF/BMP we can read (unknown, truncated or unreadable)."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(32)
+            if head.startswith(_PNG_SIGNATURE):
+                return _png(head)
+            if head[:3] == b"\xff\xd8\xff":
+                return _jpeg(fh)
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp(head)
+            if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+                width, height = struct.unpack("<HH", head[6:10])
+                return ImageHeader("gif", width, height)
+            if head[:2] == b"BM" and len(head) >= 26:
+                width, height = struct.unpack("<ii", head[18:26])
+                return ImageHeader("bmp", width, abs(height))
+    except OSError:
+        return None
+    return None
+
+
+def image_size(path: Path) -> Optional[tuple[int, int]]:
+    header = read_header(path)
+    return (header.width, header.height) if header else None
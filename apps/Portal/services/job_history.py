@@ -0,0 +1,290 @@
+"""SQLite history of Portal background jobs (model pulls, service updates).
+
+The in-memory job dicts only cover the last few minutes of one process. Every
+job also gets one row here: written when it starts, refreshed with its output
+tail every few seconds while it runs, finalized once when it ends, and
+otherwise left alone until retention drops it. Rows still marked ``running``
+when a new process opens the database belonged to a Portal that went away and
+become ``interrupted``, keeping the output they had last reported.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+DEFAULT_MAX_ROWS = 5000
+DEFAULT_MAX_AGE_SECONDS = 90 * 24 * 3600
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+_OUTPUT_TAIL_MAX_CHARS = 16 * 1024
+DEFAULT_PROGRESS_INTERVAL_SECONDS = 5.0
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    duration_seconds REAL,
+    exit_code INTEGER,
+    bytes_transferred INTEGER,
+    error TEXT,
+    output_tail TEXT,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_started ON jobs (started_at);
+CREATE INDEX IF NOT EXISTS jobs_kind_started ON jobs (kind, started_at);
+CREATE INDEX IF NOT EXISTS jobs_state_started ON jobs (state, started_at);
+CREATE INDEX IF NOT EXISTS jobs_kind_name_started ON jobs (kind, name, started_at);
+"""
+_COLUMNS = (
+    "id",
+    "kind",
+    "name",
+    "state",
+    "started_at",
+    "ended_at",
+    "duration_seconds",
+    "exit_code",
+    "bytes_transferred",
+    "error",
+    "output_tail",
+    "meta",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: list[float], pct: float) -> Optional[float]:
+    """Linear interpolation between the closest ranks (numpy's default)."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class JobHistory:
+    """One lazily opened connection shared under a lock. If the database cannot be
+    opened (missing workspace, read-only volume), history is disabled and every
+    call is a no-op."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.max_age_seconds = max_age_seconds
+        self.progress_interval = progress_interval
+        self._progress_at: dict[str, float] = {}  # last progress write per running job
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or self._disabled:
+            return self._conn
+        try:
+            self.path.parent.mkdir(exist_ok=True)  # the workspace itself must already exist
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+            conn.execute("UPDATE jobs SET state = 'interrupted' WHERE state = 'running'")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Job history disabled (%s): %s", self.path, e)
+            self._disabled = True
+            return None
+        self._conn = conn
+        return conn
+
+    def record_start(self, kind: str, name: str, *, started_at: Optional[float] = None, meta: Optional[dict] = None) -> Optional[str]:
+        job_id = secrets.token_hex(8)
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, name, state, started_at, meta) VALUES (?, ?, ?, 'running', ?, ?)",
+                    (job_id, kind, name, started_at or time.time(), json.dumps(meta) if meta else None),
+                )
+            except sqlite3.Error as e:
+                logger.warning("Job history insert failed: %s", e)
+                return None
+        return job_id
+
+    def record_progress(
+        self,
+        job_id: Optional[str],
+        *,
+        output_tail: Iterable[str] = (),
+        bytes_transferred: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> bool:
+        """Save a running job's output so far, at most once per ``progress_interval``.
+        Cheap to call from every output line; returns True when a write happened."""
+        if not job_id:
+            return False
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            last = self._progress_at.get(job_id)
+            if last is not None and now - last < self.progress_interval:
+                return False
+            self._progress_at[job_id] = now
+            conn = self._connect()
+            if conn is None:
+                return False
+            tail = "\n".join(output_tail)[-_OUTPUT_TAIL_MAX_CHARS:] or None
+            try:
+                conn.execute(
+                    "UPDATE jobs SET output_tail = ?, bytes_transferred = coalesce(?, bytes_transferred)"
+                    " WHERE id = ? AND state = 'running'",
+                    (tail, bytes_transferred, job_id),
+                )
+            except sqlite3.Error as e:
+                logger.warning("Job history update failed: %s", e)
+                return False
+        return True
+
+    def record_finish(
+        self,
+        job_id: Optional[str],
+        *,
+        state: str,
+        ended_at: Optional[float] = None,
+        exit_code: Optional[int] = None,
+        bytes_transferred: Optional[int] = None,
+        error: Optional[str] = None,
+        output_tail: Iterable[str] = (),
+    ) -> None:
+        if not job_id:
+            return
+        ended = ended_at or time.time()
+        tail = "\n".join(output_tail)[-_OUTPUT_TAIL_MAX_CHARS:] or None
+        with self._lock:
+            self._progress_at.pop(job_id, None)
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, ended_at = ?, duration_seconds = max(0, ? - started_at), exit_code = ?,"
+                    " bytes_transferred = ?, error = ?, output_tail = ? WHERE id = ? AND state = 'running'",
+                    (state, ended, ended, exit_code, bytes_transferred, error, tail, job_id),
+                )
+                self._prune(conn, ended)
+            except sqlite3.Error as e:
+                logger.warning("Job history update failed: %s", e)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM jobs WHERE started_at < ? AND state != 'running'", (now - self.max_age_seconds,))
+        conn.execute(
+            "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs ORDER BY started_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    @staticmethod
+    def _where(
+        kind: Optional[str], name: Optional[str], state: Optional[str], since: Optional[float], until: Optional[float]
+    ) -> tuple[str, list]:
+        clauses, args = [], []
+        for column, value in (("kind", kind), ("name", name), ("state", state)):
+            if value:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(
+        self,
+        *,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        state: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        with_output: bool = False,
+    ) -> list[dict]:
+        """Newest first."""
+        where, args = self._where(kind, name, state, since, until)
+        columns = ", ".join(c for c in _COLUMNS if with_output or c != "output_tail")
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            rows = conn.execute(
+                f"SELECT {columns} FROM jobs{where} ORDER BY started_at DESC LIMIT ?", (*args, max(1, limit))
+            ).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            item["meta"] = json.loads(item["meta"]) if item.get("meta") else {}
+            if with_output:
+                item["output_tail"] = item["output_tail"].split("\n") if item["output_tail"] else []
+            result.append(item)
+        return result
+
+    def duration_stats(
+        self,
+        *,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        state: Optional[str] = "done",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        percentiles: Iterable[float] = DEFAULT_PERCENTILES,
+    ) -> dict[str, dict]:
+        """Duration percentiles per kind over finished jobs (by default only successful ones)."""
+        where, args = self._where(kind, name, state, since, until)
+        where += (" AND" if where else " WHERE") + " duration_seconds IS NOT NULL"
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return {}
+            rows = conn.execute(
+                f"SELECT kind, duration_seconds, bytes_transferred FROM jobs{where} ORDER BY kind, duration_seconds", args
+            ).fetchall()
+        grouped: dict[str, list[tuple[float, Optional[int]]]] = {}
+        for row in rows:
+            grouped.setdefault(row["kind"], []).append((row["duration_seconds"], row["bytes_transferred"]))
+        stats = {}
+        for group_kind, items in grouped.items():
+            durations = [d for d, _ in items]
+            moved = [b for _, b in items if b]
+            stats[group_kind] = {
+                "count": len(durations),
+                "mean_seconds": round(sum(durations) / len(durations), 3),
+                "max_seconds": round(durations[-1], 3),
+                "percentiles": {f"p{p:g}": round(percentile(durations, p), 3) for p in percentiles},
+                "bytes_transferred": sum(moved) if moved else None,
+            }
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
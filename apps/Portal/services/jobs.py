@@ -0,0 +1,422 @@
+"""One event loop for every subprocess the Portal launches.
+
+Model pulls, service update commands and training runs used to get an OS thread
+each, blocked on ``readline``. :class:`JobRunner` runs them all on a single
+asyncio loop thread instead: stdout pipes and exit notifications (pidfd) are
+registered as loop readers, output lands in a bounded :class:`SequencedLog`,
+and the child is reaped with ``wait4`` so its CPU time and peak RSS are
+recorded. The number of threads stays the same however many jobs are running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import logging
+import os
+import re
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from . import logtail
+
+DEFAULT_LOG_LINES = 2000
+DEFAULT_KILL_GRACE_SECONDS = 5.0
+DEFAULT_FINISHED_TTL_SECONDS = 30 * 60
+DEFAULT_MAX_FINISHED = 200
+_READ_BYTES = 64 * 1024
+_MAX_LINE_CHARS = 64 * 1024
+_EOF_GRACE_SECONDS = 2.0  # a backgrounded grandchild may hold the pipe open after the job exits
+_REAP_POLL_SECONDS = 0.25  # only without pidfd_open (non-Linux, old kernels)
+_MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KiB on Linux
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_SPLIT_LINES = re.compile(r"\r\n|\r|\n")
+_SPLIT_NEWLINES = re.compile(r"\r?\n")
+
+logger = logging.getLogger(__name__)
+
+LineCallback = Callable[["Job", str], None]
+ExitCallback = Callable[["Job"], None]
+
+
+class _LineSplitter:
+    """Incremental UTF-8 decoding and line splitting. With ``split_cr`` a bare ``\\r``
+    (progress bar redraw) ends a line too; a ``\\r`` at a chunk boundary is held back
+    so a ``\\r\\n`` split across reads is not seen as two line ends."""
+
+    def __init__(self, split_cr: bool):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._regex = _SPLIT_LINES if split_cr else _SPLIT_NEWLINES
+        self._pending = ""
+
+    def feed(self, data: bytes, final: bool = False) -> list[str]:
+        text = self._pending + self._decoder.decode(data, final)
+        hold = ""
+        if not final and text.endswith("\r"):
+            text, hold = text[:-1], "\r"
+        lines = self._regex.split(text)
+        self._pending = lines.pop()
+        if final:
+            if self._pending:
+                lines.append(self._pending)
+            self._pending = ""
+        elif len(self._pending) > _MAX_LINE_CHARS:
+            lines.append(self._pending)
+            self._pending = ""
+        self._pending += hold
+        return lines
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    name: str
+    cmd: list[str]
+    log: logtail.SequencedLog
+    state: str = "running"  # running | done | error | cancelled
+    pid: Optional[int] = None
+    returncode: Optional[int] = None
+    error: Optional[str] = None
+    last_line: str = ""
+    started_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+    cpu_user_seconds: Optional[float] = None
+    cpu_system_seconds: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    meta: dict = field(default_factory=dict)
+    new_session: bool = False
+    cancel_reason: Optional[str] = None  # "cancelled" | "timeout" once a stop was requested
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _proc: Optional[subprocess.Popen] = field(default=None, repr=False)
+    _fd: Optional[int] = field(default=None, repr=False)
+    _pidfd: Optional[int] = field(default=None, repr=False)
+    _splitter: Optional[_LineSplitter] = field(default=None, repr=False)
+    _line_splitter: Optional[_LineSplitter] = field(default=None, repr=False)  # only when on_line splits differently
+    _on_line: Optional[LineCallback] = field(default=None, repr=False)
+    _on_exit: Optional[ExitCallback] = field(default=None, repr=False)
+    _timers: list = field(default_factory=list, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has exited and its output is drained."""
+        return self._done.wait(timeout)
+
+    def usage(self) -> dict:
+        """CPU seconds and peak RSS: from ``wait4`` once finished, from ``/proc`` (the
+        leader process only) while running."""
+        if self.running and self.pid is not None:
+            return _proc_usage(self.pid)
+        return {
+            "cpu_user_seconds": self.cpu_user_seconds,
+            "cpu_system_seconds": self.cpu_system_seconds,
+            "max_rss_bytes": self.max_rss_bytes,
+        }
+
+    def to_dict(self) -> dict:
+        end = self.ended_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "cmd": list(self.cmd),
+            "state": self.state,
+            "running": self.running,
+            "pid": self.pid,
+            "returncode": self.returncode,
+            "error": self.error,
+            "last_line": self.last_line,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "duration_seconds": round(end - self.started_at, 3),
+            "seq": self.log.last_seq,
+            "meta": dict(self.meta),
+            **self.usage(),
+        }
+
+
+def _proc_usage(pid: int) -> dict:
+    usage = {"cpu_user_seconds": None, "cpu_system_seconds": None, "max_rss_bytes": None}
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+        fields = stat[stat.rindex(")") + 2 :].split()  # the command name may contain spaces
+        usage["cpu_user_seconds"] = int(fields[11]) / _CLK_TCK
+        usage["cpu_system_seconds"] = int(fields[12]) / _CLK_TCK
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                usage["max_rss_bytes"] = int(line.split()[1]) * 1024
+                break
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage
+
+
+class JobRunner:
+    """Starts subprocesses and follows them on one lazily started event loop thread.
+
+    Callbacks (``on_line`` per output line, ``on_exit`` once the job is finished)
+    run on that loop thread, so they must not block.
+    """
+
+    def __init__(
+        self,
+        *,
+        finished_ttl: float = DEFAULT_FINISHED_TTL_SECONDS,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ) -> None:
+        self._finished_ttl = finished_ttl
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="job-runner", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def spawn(
+        self,
+        cmd: Sequence[str],
+        *,
+        kind: str,
+        name: str = "",
+        cwd: Optional[Path] = None,
+        env: Optional[dict] = None,
+        new_session: bool = False,
+        on_line: Optional[LineCallback] = None,
+        on_exit: Optional[ExitCallback] = None,
+        log: Optional[logtail.SequencedLog] = None,
+        log_lines: int = DEFAULT_LOG_LINES,
+        split_cr: bool = True,
+        on_line_split_cr: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        meta: Optional[dict] = None,
+    ) -> Job:
+        """Start ``cmd`` with stdout+stderr captured. ``Popen`` errors (missing binary,
+        bad cwd) are raised here, in the caller's thread. ``new_session`` puts the child
+        in its own process group so cancelling also stops whatever it spawned.
+
+        ``split_cr`` applies to the stored log; ``on_line_split_cr`` (default: the same)
+        lets ``on_line`` see each progress-bar redraw as it happens while the log keeps
+        whole lines."""
+        loop = self._ensure_loop()
+        proc = subprocess.Popen(
+            list(cmd),
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+            start_new_session=new_session,
+        )
+        job = Job(
+            id=secrets.token_hex(8),
+            kind=kind,
+            name=name,
+            cmd=[str(part) for part in cmd],
+            log=log if log is not None else logtail.SequencedLog(log_lines),
+            pid=proc.pid,
+            meta=dict(meta or {}),
+            new_session=new_session,
+            _proc=proc,
+            _splitter=_LineSplitter(split_cr),
+            _line_splitter=(
+                _LineSplitter(on_line_split_cr)
+                if on_line is not None and on_line_split_cr is not None and on_line_split_cr != split_cr
+                else None
+            ),
+            _on_line=on_line,
+            _on_exit=on_exit,
+        )
+        self.cleanup()
+        with self._lock:
+            self._jobs[job.id] = job
+        loop.call_soon_threadsafe(self._attach, job, timeout)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, kind: Optional[str] = None) -> list[Job]:
+        self.cleanup()
+        with self._lock:
+            return [job for job in self._jobs.values() if kind is None or job.kind == kind]
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """Forget finished jobs after the TTL, and the oldest beyond ``max_finished``."""
+        ts = now if now is not None else time.time()
+        with self._lock:
+            finished = [job for job in self._jobs.values() if not job.running]
+            excess = len(finished) - self._max_finished
+            for job in finished:
+                if excess > 0 or (ts - (job.ended_at or ts)) > self._finished_ttl:
+                    self._jobs.pop(job.id, None)
+                    excess -= 1
+
+    def cancel(self, job_id: str, *, grace: float = DEFAULT_KILL_GRACE_SECONDS, reason: str = "cancelled") -> Optional[Job]:
+        """SIGTERM the job (its process group with ``new_session``), SIGKILL after ``grace``."""
+        job = self.get(job_id)
+        if job is None or not job.running:
+            return job
+        loop = self._ensure_loop()
+        loop.call_soon_threadsafe(self._terminate, job, grace, reason)
+        return job
+
+    # --- loop thread ---
+
+    def _attach(self, job: Job, timeout: Optional[float]) -> None:
+        loop = self._loop
+        assert loop is not None and job._proc is not None and job._proc.stdout is not None
+        job._fd = job._proc.stdout.fileno()
+        os.set_blocking(job._fd, False)
+        loop.add_reader(job._fd, self._on_readable, job)
+        try:
+            job._pidfd = os.pidfd_open(job._proc.pid)
+        except (AttributeError, OSError):
+            job._pidfd = None
+        if job._pidfd is not None:
+            loop.add_reader(job._pidfd, self._reap, job)
+        else:
+            self._reap(job)
+        if timeout:
+            job._timers.append(loop.call_later(timeout, self._terminate, job, DEFAULT_KILL_GRACE_SECONDS, "timeout"))
+
+    def _emit(self, job: Job, data: bytes, final: bool = False) -> None:
+        separate = job._line_splitter is not None
+        for line in job._splitter.feed(data, final):
+            job.log.append(line)
+            if line.strip():
+                job.last_line = line.strip()
+            if not separate:
+                self._notify(job, line)
+        if separate:
+            for line in job._line_splitter.feed(data, final):
+                self._notify(job, line)
+
+    def _notify(self, job: Job, line: str) -> None:
+        if job._on_line is None:
+            return
+        try:
+            job._on_line(job, line)
+        except Exception:
+            logger.exception("on_line callback failed for job %s", job.id)
+
+    def _on_readable(self, job: Job) -> None:
+        if job._fd is None:
+            return
+        try:
+            data = os.read(job._fd, _READ_BYTES)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if data:
+            self._emit(job, data)
+            return
+        self._close_output(job)
+
+    def _close_output(self, job: Job) -> None:
+        if job._fd is None:
+            return
+        self._loop.remove_reader(job._fd)
+        self._emit(job, b"", final=True)
+        job._proc.stdout.close()
+        job._fd = None
+        self._maybe_finish(job)
+
+    def _drain_and_close(self, job: Job) -> None:
+        while job._fd is not None:
+            try:
+                data = os.read(job._fd, _READ_BYTES)
+            except OSError:
+                data = b""
+            if not data:
+                self._close_output(job)
+                break
+            self._emit(job, data)
+
+    def _reap(self, job: Job) -> None:
+        proc = job._proc
+        try:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        except ChildProcessError:
+            pid, status, rusage = proc.pid, None, None  # reaped elsewhere; the status is lost
+        if pid == 0:
+            if job._pidfd is None:
+                self._loop.call_later(_REAP_POLL_SECONDS, self._reap, job)
+            return
+        if job._pidfd is not None:
+            self._loop.remove_reader(job._pidfd)
+            os.close(job._pidfd)
+            job._pidfd = None
+        job.returncode = os.waitstatus_to_exitcode(status) if status is not None else None
+        proc.returncode = job.returncode if job.returncode is not None else -1
+        if rusage is not None:
+            job.cpu_user_seconds = round(rusage.ru_utime, 3)
+            job.cpu_system_seconds = round(rusage.ru_stime, 3)
+            job.max_rss_bytes = rusage.ru_maxrss * _MAXRSS_BYTES
+        job.ended_at = time.time()
+        if job._fd is not None:
+            job._timers.append(self._loop.call_later(_EOF_GRACE_SECONDS, self._drain_and_close, job))
+        self._maybe_finish(job)
+
+    def _maybe_finish(self, job: Job) -> None:
+        if job._fd is not None or job.ended_at is None or job._done.is_set():
+            return
+        for timer in job._timers:
+            timer.cancel()
+        job._timers.clear()
+        if job.cancel_reason is not None:
+            job.state = "cancelled"
+            if job.cancel_reason == "timeout":
+                job.error = f"timed out after {job.ended_at - job.started_at:.0f}s"
+        elif job.returncode == 0:
+            job.state = "done"
+        else:
+            job.state = "error"
+            job.error = f"exit code {job.returncode}"
+        job._done.set()
+        if job._on_exit is not None:
+            try:
+                job._on_exit(job)
+            except Exception:
+                logger.exception("on_exit callback failed for job %s", job.id)
+
+    def _signal(self, job: Job, sig: int) -> None:
+        if job.ended_at is not None:
+            return  # reaped: the pid may already belong to someone else
+        try:
+            if job.new_session:
+                os.killpg(job.pid, sig)
+            else:
+                os.kill(job.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _terminate(self, job: Job, grace: float, reason: str) -> None:
+        if job.ended_at is not None:
+            return
+        if job.cancel_reason is None:
+            job.cancel_reason = reason
+        self._signal(job, signal.SIGTERM)
+        job._timers.append(self._loop.call_later(grace, self._signal, job, signal.SIGKILL))
+
+
+runner = JobRunner()
@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+_BLOCK_BYTES = 64 * 1024
+_TAIL_MAX_SCAN_BYTES = 32 * 1024 * 1024
+_FOLLOW_MAX_READ_BYTES = 4 * 1024 * 1024
+
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+# Names this process's sequence. Sequence numbers restart with the process, so
+# clients send it back with their cursor and a cursor from an earlier Portal
+# resets even once the new counter has passed it.
+EPOCH = secrets.token_hex(4)
+
+
+def _next_seq() -> int:
+    global _last_seq
+    with _seq_lock:
+        _last_seq += 1
+        return _last_seq
+
+
+def current_seq() -> int:
+    """Newest sequence number issued so far, across all logs."""
+    return _last_seq
+
+
+def sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _decode_line(raw: bytes) -> str:
+    return raw.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def tail_lines(
+    path: Path,
+    limit: int,
+    *,
+    match: Optional[Callable[[str], bool]] = None,
+    partial: bool = False,
+    max_scan_bytes: int = _TAIL_MAX_SCAN_BYTES,
+    block_size: int = _BLOCK_BYTES,
+) -> Tuple[List[str], int]:
+    """Return the last ``limit`` complete lines of ``path`` and the offset just past them.
+
+    Reads backwards from EOF one block at a time, so the cost is proportional
+    to the bytes that hold the requested lines, not to the file size. With
+    ``match``, only matching lines count, and the scan stops after
+    ``max_scan_bytes``. An unterminated last line (a progress bar still being
+    redrawn) is held back so a ``LogFollower`` started at the returned offset
+    emits it once, whole; ``partial`` includes it for one-shot reads.
+    """
+    selected: List[str] = []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        offset = end
+        pos = end
+        pending = b""
+        trailing = None  # bytes after the last newline, once it has been found
+        while pos > 0 and len(selected) < limit:
+            if max_scan_bytes and (end - pos) >= max_scan_bytes:
+                pending = b""
+                break
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            parts = (f.read(size) + pending).split(b"\n")
+            pending = parts.pop(0)
+            if trailing is None:
+                if not parts:
+                    continue  # no newline yet: still inside the last line
+                trailing = parts.pop()
+                offset = end - len(trailing)
+                if trailing and partial:
+                    parts.append(trailing)
+            for raw in reversed(parts):
+                line = _decode_line(raw)
+                if match is None or match(line):
+                    selected.append(line)
+                    if len(selected) >= limit:
+                        break
+        if pos == 0 and pending and len(selected) < limit:
+            if trailing is None:
+                offset = 0  # the whole file is one unterminated line
+            if trailing is not None or partial:
+                line = _decode_line(pending)
+                if match is None or match(line):
+                    selected.append(line)
+    selected.reverse()
+    return selected, offset
+
+
+class LogFollower:
+    """Incremental reader that yields complete lines appended after ``offset``."""
+
+    def __init__(self, path: Path, offset: int = 0):
+        self.path = Path(path)
+        self.offset = offset
+        self._identity: Optional[Tuple[int, int]] = None
+        self._partial = b""
+        try:
+            st = os.stat(self.path)
+            self._identity = (st.st_dev, st.st_ino)
+        except OSError:
+            pass
+
+    def poll(self, max_bytes: int = _FOLLOW_MAX_READ_BYTES) -> Tuple[List[str], bool]:
+        """Return ``(new lines, reset)``; ``reset`` is True after rotation or truncation."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return [], False
+        identity = (st.st_dev, st.st_ino)
+        reset = False
+        if self._identity is not None and identity != self._identity:
+            reset = True  # rotated: a new file took the old name
+        elif st.st_size < self.offset:
+            reset = True  # truncated in place
+        if reset:
+            self.offset = 0
+            self._partial = b""
+        self._identity = identity
+        if st.st_size <= self.offset:
+            return [], reset
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(min(st.st_size - self.offset, max_bytes))
+        except OSError:
+            return [], reset
+        self.offset += len(data)
+        parts = (self._partial + data).split(b"\n")
+        self._partial = parts.pop()
+        return [_decode_line(raw) for raw in parts], reset
+
+
+class SequencedLog:
+    """Bounded line buffer that numbers every line from one process-wide, increasing sequence.
+
+    Sequence numbers are shared across all logs, so a client cursor taken from
+    several logs at once (``max`` of their ``last_seq``) stays valid for each.
+    """
+
+    def __init__(self, maxlen: int):
+        self._entries: deque = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._dropped_through = 0  # cursors below this lost lines (evicted, or the log was cleared)
+
+    def append(self, line: str) -> int:
+        with self._cond:
+            if len(self._entries) == self._entries.maxlen:
+                self._dropped_through = self._entries[0][0]
+            seq = _next_seq()
+            self._entries.append((seq, line))
+            self._cond.notify_all()
+            return seq
+
+    def extend(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.append(line)
+
+    def clear(self) -> None:
+        with self._cond:
+            # A fresh number no line holds: every earlier cursor resets, the empty log's cursor does not.
+            self._dropped_through = _next_seq()
+            self._entries.clear()
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._cond:
+            return iter([line for _, line in self._entries])
+
+    def tail(self, limit: Optional[int] = None, *, through: Optional[int] = None) -> Tuple[List[str], int]:
+        """Return the newest ``limit`` lines (up to seq ``through``) and the cursor that follows them."""
+        with self._cond:
+            entries = [e for e in self._entries if through is None or e[0] <= through]
+            last = entries[-1][0] if entries else self._dropped_through
+        if limit is not None:
+            entries = entries[-limit:] if limit > 0 else []
+        return [line for _, line in entries], last
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._entries[-1][0] if self._entries else self._dropped_through
+
+    def since(
+        self,
+        seq: int,
+        limit: Optional[int] = None,
+        *,
+        through: Optional[int] = None,
+        epoch: Optional[str] = None,
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        """Return ``(entries newer than seq, reset)``, oldest ``limit`` at most, none past ``through``.
+
+        With more than ``limit`` newer lines, the next call continues from the
+        last entry returned, so a cursor can page forward without gaps.
+        ``reset`` means the cursor can no longer be continued (lines after it
+        were dropped, or ``epoch`` says it comes from before a server
+        restart) and the caller should resend a full snapshot. Reading several
+        logs with one ``through`` taken up front gives a cursor that is
+        consistent for all.
+        """
+        if epoch is not None and epoch != EPOCH:
+            return [], True
+        with self._cond:
+            if seq < self._dropped_through or seq > _last_seq:
+                return [], True
+            newer: List[Tuple[int, str]] = []
+            for entry in reversed(self._entries):
+                if entry[0] <= seq:
+                    break
+                if through is None or entry[0] <= through:
+                    newer.append(entry)
+        newer.reverse()
+        if limit is not None:
+            newer = newer[: max(0, limit)]
+        return newer, False
+
+    def wait(self, seq: int, timeout: float) -> bool:
+        """Block until there is something newer than ``seq`` (or it was dropped); False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: bool(self._entries and self._entries[-1][0] > seq) or self._dropped_through > seq,
+                timeout,
+            )
+
+
+async def cursor_events(
+    request,
+    fetch: Callable[[Optional[int], Optional[str]], dict],
+    wait: Callable[[int, float], bool],
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+    *,
+    poll_seconds: float = 2.0,
+    keepalive_seconds: float = 15.0,
+):
+    """Server-Sent Events body for a cursor-based log endpoint.
+
+    ``fetch(since, epoch)`` returns the same payload as the polling endpoint
+    (``lines``, ``seq``, ``epoch``, ``reset`` and optionally ``running``); it
+    is sent as a ``lines`` event whenever it carries something new.
+    ``wait(seq, timeout)`` blocks until the log moves past ``seq``.
+    """
+    running = None
+    idle_since = time.monotonic()
+    while not await request.is_disconnected():
+        payload = await asyncio.to_thread(fetch, since, epoch)
+        changed = payload.get("running") != running
+        running = payload.get("running")
+        if since is None or payload.get("lines") or payload.get("reset") or changed:
+            yield sse_event("lines", payload)
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since >= keepalive_seconds:
+            yield ": keepalive\n\n"
+            idle_since = time.monotonic()
+        since = int(payload.get("seq") or 0)
+        epoch = payload.get("epoch")
+        await asyncio.to_thread(wait, since, poll_seconds)
+
+
+class TailCache:
+    """Keeps the last ``limit`` lines of recently read files, reading only appended bytes on later calls."""
+
+    def __init__(self, limit: int = 100, *, max_files: int = 16):
+        self.limit = limit
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[Path, Tuple[LogFollower, SequencedLog]]" = OrderedDict()
+
+    def log(self, path: Path) -> SequencedLog:
+        """Bring the cached tail of ``path`` up to date and return it."""
+        path = Path(path)
+        with self._lock:
+            state = self._files.get(path)
+            if state is not None:
+                follower, tail = state
+                while True:
+                    before = follower.offset
+                    new_lines, reset = follower.poll()
+                    if reset:
+                        # Rotated or truncated: re-tail into the same log so cursors see a reset.
+                        try:
+                            lines, end = tail_lines(path, self.limit)
+                        except OSError:
+                            self._files.pop(path, None)
+                            raise
+                        tail.clear()
+                        tail.extend(lines)
+                        state = (LogFollower(path, end), tail)
+                        self._files[path] = state
+                        break
+                    tail.extend(new_lines)
+                    if follower.offset - before < _FOLLOW_MAX_READ_BYTES:
+                        break
+            else:
+                lines, end = tail_lines(path, self.limit)
+                tail = SequencedLog(self.limit)
+                tail.extend(lines)
+                state = (LogFollower(path, end), tail)
+                self._files[path] = state
+            self._files.move_to_end(path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+            return state[1]
+
+    def lines(self, path: Path) -> List[str]:
+        return list(self.log(path))
+
+    def forget(self, path: Path) -> None:
+        with self._lock:
+            self._files.pop(Path(path), None)
+
+
+class InotifyWatcher:
+    """Wakes on changes to one file via inotify on its directory (so renames and re-creates are seen)."""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, fd: int, name: bytes):
+        self._fd = fd
+        self._name = name
+
+    @classmethod
+    def create(cls, path: Path) -> Optional["InotifyWatcher"]:
+        """Return a watcher, or None where inotify is unavailable (callers then poll)."""
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            return None
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            init = libc.inotify_init1
+            add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError):
+            return None
+        fd = init(cls.IN_NONBLOCK | cls.IN_CLOEXEC)
+        if fd < 0:
+            return None
+        path = Path(path)
+        mask = (
+            cls.IN_MODIFY
+            | cls.IN_ATTRIB
+            | cls.IN_CLOSE_WRITE
+            | cls.IN_MOVED_FROM
+            | cls.IN_MOVED_TO
+            | cls.IN_CREATE
+            | cls.IN_DELETE
+        )
+        if add_watch(fd, os.fsencode(str(path.parent)), mask) < 0:
+            os.close(fd)
+            return None
+        return cls(fd, os.fsencode(path.name))
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def drain(self) -> bool:
+        """Consume queued events; True if any of them concern the watched file."""
+        hit = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return hit
+            except OSError:
+                return True
+            if not data:
+                return hit
+            pos = 0
+            while pos + self._EVENT.size <= len(data):
+                _, _, _, name_len = self._EVENT.unpack_from(data, pos)
+                name = data[pos + self._EVENT.size : pos + self._EVENT.size + name_len].rstrip(b"\0")
+                if name == self._name:
+                    hit = True
+                pos += self._EVENT.size + name_len
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
 import fnmatch
+import json
+import logging
 import os
 import re
 import shutil
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import quote
 
+import httpx
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 
 class ModelEntry(BaseModel):
     name: str
@@ -34,15 +44,104 @@ def _matches_any_pattern(rel_path: str, patterns: List[str]) -> bool:
     return any(fnmatch.fnmatch(rel_path, pat) for pat in patterns)
 
 
+class DirIndex:
+    """One recursive listing of a model directory, shared by every manifest entry that
+    points at it.
+
+    Mirrors ``Path.rglob("*")``: pre-order, symlinked directories are listed but not
+    descended into. File sizes are only stat'ed when asked for.
+    """
+
+    def __init__(self, root: Path, *, create: bool = False) -> None:
+        self.root = root
+        self.files: dict[str, os.DirEntry] = {}
+        self.dirs: set[str] = set()
+        self._unscanned: set[str] = set()
+        self._sizes: dict[str, int] = {}
+        self._shared: Optional[bool] = None
+        if create:
+            root.mkdir(parents=True, exist_ok=True)
+        self.exists = root.is_dir()
+        if self.exists:
+            self._scan(root, "")
+
+    def _scan(self, path: Path, prefix: str) -> None:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            self._unscanned.add(prefix.rstrip("/"))
+            return
+        subdirs = []
+        for entry in entries:
+            rel = prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self.dirs.add(rel)
+                    subdirs.append((entry, rel))
+                elif entry.is_file():
+                    self.files[rel] = entry
+                elif entry.is_dir():
+                    self.dirs.add(rel)
+                    self._unscanned.add(rel)
+            except OSError:
+                continue
+        for entry, rel in subdirs:
+            self._scan(Path(entry.path), rel + "/")
+
+    def paths(self) -> List[Path]:
+        return [self.root / rel for rel in self.files]
+
+    def size(self, path: Path) -> int:
+        rel = self._rel(path)
+        if rel is None or rel not in self.files:
+            return path.stat().st_size
+        size = self._sizes.get(rel)
+        if size is None:
+            size = self._sizes[rel] = self.files[rel].stat().st_size
+        return size
+
+    def has(self, path: Path) -> bool:
+        """Equivalent of ``path.exists()`` for paths under the indexed root."""
+        rel = self._rel(path)
+        if rel is None:
+            return path.exists()
+        if rel in self.files or rel in self.dirs:
+            return True
+        parts = rel.split("/")
+        for i in range(len(parts)):
+            if "/".join(parts[:i]) in self._unscanned:
+                return path.exists()
+        return False
+
+    def is_shared_models_dir(self, models_root: Path) -> bool:
+        if self._shared is None:
+            self._shared = self.root.resolve().parent == models_root.resolve()
+        return self._shared
+
+    def _rel(self, path: Path) -> Optional[str]:
+        try:
+            rel = path.relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        if rel == "." or ".." in rel.split("/"):
+            return None
+        return rel
+
+
 def _select_hf_repo_files(
     target_dir: Path,
     patterns: List[str],
     model_name: str,
     models_root: Path,
+    index: Optional[DirIndex] = None,
 ) -> List[Path]:
-    if not target_dir.exists():
-        return []
-    files = [p for p in target_dir.rglob("*") if p.is_file()]
+    if index is None:
+        if not target_dir.exists():
+            return []
+        files = [p for p in target_dir.rglob("*") if p.is_file()]
+    else:
+        files = index.paths()
     if patterns:
         filtered: List[Path] = []
         for p in files:
@@ -62,7 +161,10 @@ def _select_hf_repo_files(
         if partial:
             return partial
         # For shared model directories, avoid deleting unrelated files.
-        if target_dir.resolve().parent == models_root.resolve():
+        if index is not None:
+            if index.is_shared_models_dir(models_root):
+                return []
+        elif target_dir.resolve().parent == models_root.resolve():
             return []
     return files
 
@@ -90,6 +192,140 @@ def ensure_manifest(
         shutil.copy(default_manifest_path, manifest_path)
 
 
+_SUBDIR_TO_TYPE = {
+    "checkpoints": "checkpoint",
+    "vae": "vae",
+    "vae_approx": "vae",
+    "loras": "lora",
+    "refiners": "refiner",
+    "text_encoders": "text_encoder",
+    "clip": "clip",
+    "clip_vision": "clip_vision",
+    "controlnet": "controlnet",
+    "diffusers": "diffusers",
+    "diffusion_models": "checkpoint",
+    "embeddings": "embedding",
+    "hypernetworks": "hypernetwork",
+    "latent_upscale_models": "latent_upscale",
+    "audio_encoders": "audio_encoder",
+    "photomaker": "photomaker",
+    "style_models": "style",
+    "unet": "unet",
+    "upscale_models": "upscale",
+}
+
+
+def _parse_size(raw: str) -> Optional[int]:
+    if not raw:
+        return None
+    s = raw.strip().lower()
+    try:
+        if s.endswith("tb"):
+            return int(float(s[:-2]) * 1024 * 1024 * 1024 * 1024)
+        if s.endswith("gb"):
+            return int(float(s[:-2]) * 1024 * 1024 * 1024)
+        if s.endswith("mb"):
+            return int(float(s[:-2]) * 1024 * 1024)
+        if s.endswith("kb"):
+            return int(float(s[:-2]) * 1024)
+        # plain bytes
+        if s.replace(".", "", 1).isdigit():
+            return int(float(s))
+    except Exception:
+        return None
+    return None
+
+
+@dataclass(frozen=True)
+class ManifestSpec:
+    """One parsed manifest line; everything about an entry that does not depend on disk state."""
+
+    name: str
+    kind: str
+    source: str
+    subdir: str
+    include: str
+    expected_size_bytes: Optional[int]
+    category: str
+    type: str
+    info_url: Optional[str]
+    expected: Tuple[str, ...]  # candidate file paths relative to the subdir (hf_file / url)
+    patterns: Tuple[str, ...]  # include globs (hf_repo)
+    size_raw: str = ""  # manifest size column as written, e.g. "6.94GB"
+
+
+_manifest_lock = threading.Lock()
+_manifest_cache: dict[str, Tuple[Tuple[int, int, int], List[ManifestSpec]]] = {}
+
+
+def _parse_manifest_line(line: str) -> Optional[ManifestSpec]:
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    parts = line.split("|")
+    if len(parts) < 4:
+        return None
+    name, kind, source, subdir, *rest = parts
+    include = rest[0] if rest else ""
+    expected_size_bytes = _parse_size(rest[1]) if len(rest) > 1 else None
+    expected: List[str] = []
+    patterns: List[str] = []
+    if kind == "hf_file":
+        path_in_repo = source.split(":", 1)[1] if ":" in source else ""
+        if path_in_repo:
+            expected = [path_in_repo]
+            fallback = Path(path_in_repo).name
+            if fallback not in expected:
+                expected.append(fallback)
+    elif kind == "url":
+        expected = [Path(source.split("?", 1)[0]).name]
+    elif kind == "hf_repo":
+        patterns = [p.strip() for p in include.split(",") if p.strip()] if include else []
+    info_url = None
+    if kind.startswith("hf_"):
+        repo = source.split(":")[0]
+        info_url = f"https://huggingface.co/{repo}"
+    elif source.startswith("http"):
+        info_url = source
+    return ManifestSpec(
+        name=name,
+        kind=kind,
+        source=source,
+        subdir=subdir,
+        include=include,
+        expected_size_bytes=expected_size_bytes,
+        category=classify_model(name, source, subdir),
+        type=_SUBDIR_TO_TYPE.get(subdir, "checkpoint"),
+        info_url=info_url,
+        expected=tuple(expected),
+        patterns=tuple(patterns),
+        size_raw=rest[1].strip() if len(rest) > 1 else "",
+    )
+
+
+def load_manifest_specs(manifest_path: Path) -> List[ManifestSpec]:
+    """Parsed manifest lines, re-read only when the file's mtime/size/inode change."""
+    try:
+        st = manifest_path.stat()
+    except OSError:
+        return []
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cache_key = str(manifest_path)
+    with _manifest_lock:
+        cached = _manifest_cache.get(cache_key)
+        if cached and cached[0] == key:
+            return cached[1]
+    specs: List[ManifestSpec] = []
+    with manifest_path.open() as f:
+        for line in f:
+            spec = _parse_manifest_line(line)
+            if spec is not None:
+                specs.append(spec)
+    with _manifest_lock:
+        _manifest_cache[cache_key] = (key, specs)
+    return specs
+
+
 def parse_manifest(
     manifest_path: Path,
     default_manifest_path: Path,
@@ -100,112 +336,46 @@ def parse_manifest(
     entries: List[ModelEntry] = []
     if not manifest_path.exists():
         return entries
-    subdir_to_type = {
-        "checkpoints": "checkpoint",
-        "vae": "vae",
-        "vae_approx": "vae",
-        "loras": "lora",
-        "refiners": "refiner",
-        "text_encoders": "text_encoder",
-        "clip": "clip",
-        "clip_vision": "clip_vision",
-        "controlnet": "controlnet",
-        "diffusers": "diffusers",
-        "diffusion_models": "checkpoint",
-        "embeddings": "embedding",
-        "hypernetworks": "hypernetwork",
-        "latent_upscale_models": "latent_upscale",
-        "audio_encoders": "audio_encoder",
-        "photomaker": "photomaker",
-        "style_models": "style",
-        "unet": "unet",
-        "upscale_models": "upscale",
-    }
-
-    def parse_size(raw: str) -> Optional[int]:
-        if not raw:
-            return None
-        s = raw.strip().lower()
-        try:
-            if s.endswith("tb"):
-                return int(float(s[:-2]) * 1024 * 1024 * 1024 * 1024)
-            if s.endswith("gb"):
-                return int(float(s[:-2]) * 1024 * 1024 * 1024)
-            if s.endswith("mb"):
-                return int(float(s[:-2]) * 1024 * 1024)
-            if s.endswith("kb"):
-                return int(float(s[:-2]) * 1024)
-            # plain bytes
-            if s.replace(".", "", 1).isdigit():
-                return int(float(s))
-        except Exception:
-            return None
-        return None
-
-    with manifest_path.open() as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split("|")
-            if len(parts) < 4:
-                continue
-            name, kind, source, subdir, *rest = parts
-            include = rest[0] if rest else ""
-            expected_size_bytes = parse_size(rest[1]) if len(rest) > 1 else None
-            target_dir = models_dir / subdir
-            target_dir.mkdir(parents=True, exist_ok=True)
-            expected: List[Path] = []
-            matched: List[Path] = []
-            if kind == "hf_file":
-                path_in_repo = source.split(":", 1)[1] if ":" in source else ""
-                if path_in_repo:
-                    expected = [target_dir / path_in_repo]
-                    fallback = target_dir / Path(path_in_repo).name
-                    if fallback not in expected:
-                        expected.append(fallback)
-            elif kind == "url":
-                fname = Path(source.split("?", 1)[0]).name
-                expected = [target_dir / fname]
-            elif kind == "hf_repo":
-                pats = [p.strip() for p in include.split(",") if p.strip()] if include else []
-                matched.extend(_select_hf_repo_files(target_dir, pats, name, models_dir))
-            # If we have explicit expected files, check those
-            if expected:
-                matched.extend([p for p in expected if p.exists()])
-            # Prefer safetensors when summarizing size
-            safes = [p for p in matched if p.suffix == ".safetensors"]
-            use_files = safes or matched
-            installed = len(use_files) > 0
-            size_bytes = sum(p.stat().st_size for p in use_files)
-            primary_path = str(use_files[0]) if use_files else None
-            if not installed and expected_size_bytes:
-                size_bytes = expected_size_bytes
-            category = classify_model(name, source, subdir)
-            mtype = subdir_to_type.get(subdir, "checkpoint")
-            info_url = None
-            if kind.startswith("hf_"):
-                repo = source.split(":")[0]
-                info_url = f"https://huggingface.co/{repo}"
-            elif source.startswith("http"):
-                info_url = source
-            entries.append(
-                ModelEntry(
-                    name=name,
-                    kind=kind,
-                    source=source,
-                    subdir=subdir,
-                    include=include,
-                    expected_size_bytes=expected_size_bytes,
-                    category=category,
-                    type=mtype,
-                    installed=installed,
-                    size_bytes=size_bytes,
-                    info_url=info_url,
-                    target_path=str(target_dir),
-                    primary_path=primary_path,
-                )
+    # Many entries share a subdir (checkpoints/, diffusion_models/, ...): list each once.
+    indexes: dict[str, DirIndex] = {}
+    for spec in load_manifest_specs(manifest_path):
+        target_dir = models_dir / spec.subdir
+        index = indexes.get(spec.subdir)
+        if index is None:
+            index = indexes[spec.subdir] = DirIndex(target_dir, create=True)
+        matched: List[Path] = []
+        if spec.kind == "hf_repo":
+            matched.extend(_select_hf_repo_files(target_dir, list(spec.patterns), spec.name, models_dir, index))
+        # If we have explicit expected files, check those
+        for rel in spec.expected:
+            p = target_dir / rel
+            if index.has(p):
+                matched.append(p)
+        # Prefer safetensors when summarizing size
+        safes = [p for p in matched if p.suffix == ".safetensors"]
+        use_files = safes or matched
+        installed = len(use_files) > 0
+        size_bytes = sum(index.size(p) for p in use_files)
+        primary_path = str(use_files[0]) if use_files else None
+        if not installed and spec.expected_size_bytes:
+            size_bytes = spec.expected_size_bytes
+        entries.append(
+            ModelEntry(
+                name=spec.name,
+                kind=spec.kind,
+                source=spec.source,
+                subdir=spec.subdir,
+                include=spec.include,
+                expected_size_bytes=spec.expected_size_bytes,
+                category=spec.category,
+                type=spec.type,
+                installed=installed,
+                size_bytes=size_bytes,
+                info_url=spec.info_url,
+                target_path=str(target_dir),
+                primary_path=primary_path,
             )
+        )
     return entries
 
 
@@ -277,48 +447,446 @@ def model_name_for_expected_path(
     except Exception:
         required_resolved = required_path
 
-    with manifest_path.open() as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split("|")
-            if len(parts) < 4:
-                continue
-            name, kind, source, subdir, *rest = parts
-            include = rest[0] if rest else ""
-            target_dir = models_dir / subdir
-
-            expected: list[Path] = []
-            if kind == "hf_file":
-                path_in_repo = source.split(":", 1)[1] if ":" in source else ""
-                if path_in_repo:
-                    expected.append(target_dir / path_in_repo)
-                    expected.append(target_dir / Path(path_in_repo).name)
-            elif kind == "url":
-                fname = Path(source.split("?", 1)[0]).name
-                expected.append(target_dir / fname)
-            elif kind == "hf_repo":
-                # Repo downloads can be directories. If the config points into the directory,
-                # assume this repo is the likely match (only when include patterns are present).
-                expected.append(target_dir)
-            else:
-                continue
+    for spec in load_manifest_specs(manifest_path):
+        name, kind, include = spec.name, spec.kind, spec.include
+        target_dir = models_dir / spec.subdir
+
+        expected: list[Path] = []
+        if kind in ("hf_file", "url"):
+            expected = [target_dir / rel for rel in spec.expected]
+        elif kind == "hf_repo":
+            # Repo downloads can be directories. If the config points into the directory,
+            # assume this repo is the likely match (only when include patterns are present).
+            expected.append(target_dir)
+        else:
+            continue
 
-            for p in expected:
+        for p in expected:
+            try:
+                cand = p.resolve()
+            except Exception:
+                cand = p
+            if cand == required_resolved:
+                return name
+            if kind == "hf_repo":
                 try:
-                    cand = p.resolve()
+                    if required_resolved.is_relative_to(cand):  # py3.9+
+                        # Avoid matching parent directories like /workspace/models
+                        if cand == target_dir.resolve():
+                            if include and include.strip():
+                                return name
                 except Exception:
-                    cand = p
-                if cand == required_resolved:
-                    return name
-                if kind == "hf_repo":
-                    try:
-                        if required_resolved.is_relative_to(cand):  # py3.9+
-                            # Avoid matching parent directories like /workspace/models
-                            if cand == target_dir.resolve():
-                                if include and include.strip():
-                                    return name
-                    except Exception:
-                        pass
+                    pass
     return None
+
+
+# --- Download engine -------------------------------------------------------
+
+HF_ENDPOINT_DEFAULT = "https://huggingface.co"
+DOWNLOAD_SEGMENTS_DEFAULT = 4
+_MIN_SEGMENT_BYTES = 16 * 1024 * 1024
+_CHUNK_BYTES = 1024 * 1024
+_RATE_WINDOW_SECONDS = 5.0
+_STATE_SAVE_SECONDS = 1.0
+_MANIFEST_SIZE_TOLERANCE = 0.01
+_SIZE_RE = re.compile(r"^\s*(?P<num>\d+(?:\.\d+)?)\s*(?P<unit>[kmgt]?)b?\s*$", re.IGNORECASE)
+
+
+class DownloadError(RuntimeError):
+    pass
+
+
+@dataclass
+class RemoteFile:
+    url: str
+    dest: Path
+    size: Optional[int] = None  # exact size when the listing provides it
+    ranges: bool = False
+
+
+class TransferProgress:
+    """Byte counter shared by every segment of a pull, with a sliding-window rate."""
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[dict], None]] = None,
+        *,
+        interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._callback = callback
+        self._interval = interval
+        self._clock = clock
+        self._samples: deque[tuple[float, int]] = deque()
+        self._last_report = 0.0
+        self.bytes_done = 0
+        self.bytes_total: Optional[int] = 0
+        self.current_file = ""
+
+    def add_total(self, size: Optional[int]) -> None:
+        with self._lock:
+            if size is None or self.bytes_total is None:
+                self.bytes_total = None
+            else:
+                self.bytes_total += size
+
+    def set_file(self, name: str) -> None:
+        with self._lock:
+            self.current_file = name
+        self._report(force=True)
+
+    def add(self, count: int, *, transferred: bool = True) -> None:
+        """Count ``count`` bytes as done; ``transferred=False`` for bytes already on disk."""
+        now = self._clock()
+        with self._lock:
+            self.bytes_done += count
+            if transferred:
+                self._samples.append((now, count))
+        self._report()
+
+    def rate_bps(self) -> float:
+        now = self._clock()
+        with self._lock:
+            while self._samples and now - self._samples[0][0] > _RATE_WINDOW_SECONDS:
+                self._samples.popleft()
+            if not self._samples:
+                return 0.0
+            span = max(now - self._samples[0][0], 1.0)
+            return sum(n for _, n in self._samples) / span
+
+    def snapshot(self) -> dict:
+        rate = self.rate_bps()
+        with self._lock:
+            done, total, name = self.bytes_done, self.bytes_total, self.current_file
+        eta = (total - done) / rate if total is not None and rate > 0 else None
+        return {"file": name, "bytes_done": done, "bytes_total": total, "rate_bps": rate, "eta_seconds": eta}
+
+    def _report(self, force: bool = False) -> None:
+        if self._callback is None:
+            return
+        now = self._clock()
+        with self._lock:
+            if not force and now - self._last_report < self._interval:
+                return
+            self._last_report = now
+        self._callback(self.snapshot())
+
+
+def size_matches_manifest(actual: int, raw: str) -> bool:
+    """Manifest sizes are rounded and written as either decimal or binary units, so accept
+    ``actual`` if it is within 1% of either reading plus half a unit of the last written
+    digit ("0.34GB" covers +-5MB). Unparseable sizes always match."""
+    m = _SIZE_RE.match(raw or "")
+    if not m:
+        return True
+    num = float(m.group("num"))
+    decimals = len(m.group("num").partition(".")[2])
+    power = "kmgt".find(m.group("unit").lower()) + 1 if m.group("unit") else 0
+    for base in (1000, 1024):
+        expected = num * base ** power
+        rounding = 0.5 * 10 ** -decimals * base ** power
+        if abs(actual - expected) <= max(expected * _MANIFEST_SIZE_TOLERANCE, 1024 * 1024) + rounding:
+            return True
+    return False
+
+
+def _dest_under(target_dir: Path, rel: str) -> Path:
+    dest = (target_dir / rel).resolve()
+    root = target_dir.resolve()
+    if dest == root or root not in dest.parents:
+        raise DownloadError(f"Refusing to write outside {target_dir}: {rel!r}")
+    return dest
+
+
+def _hf_list_repo_files(client: httpx.Client, endpoint: str, repo: str, headers: dict) -> List[dict]:
+    url: Optional[str] = f"{endpoint}/api/models/{repo}/tree/main?recursive=true"
+    files: List[dict] = []
+    while url:
+        resp = client.get(url, headers=headers)
+        if resp.status_code != 200:
+            raise DownloadError(f"Listing {repo} failed: HTTP {resp.status_code}")
+        files.extend(item for item in resp.json() if item.get("type") == "file")
+        url = resp.links.get("next", {}).get("url")
+    return files
+
+
+def resolve_model_files(
+    spec: ManifestSpec,
+    models_dir: Path,
+    client: httpx.Client,
+    *,
+    endpoint: str = HF_ENDPOINT_DEFAULT,
+    headers: Optional[dict] = None,
+) -> List[RemoteFile]:
+    """Turn a manifest entry into concrete (url, destination) pairs, laid out the same way
+    ``hf download --local-dir`` and get-models.sh do."""
+    target_dir = models_dir / spec.subdir
+    endpoint = endpoint.rstrip("/")
+    if spec.kind == "hf_file":
+        repo, _, path_in_repo = spec.source.partition(":")
+        if not path_in_repo:
+            raise DownloadError(f"hf_file source needs repo:path, got {spec.source!r}")
+        url = f"{endpoint}/{repo}/resolve/main/{quote(path_in_repo)}"
+        return [RemoteFile(url=url, dest=_dest_under(target_dir, path_in_repo))]
+    if spec.kind == "url":
+        name = Path(spec.source.split("?", 1)[0]).name
+        return [RemoteFile(url=spec.source, dest=_dest_under(target_dir, name))]
+    if spec.kind == "hf_repo":
+        repo = spec.source
+        out: List[RemoteFile] = []
+        for item in _hf_list_repo_files(client, endpoint, repo, headers or {}):
+            rel = item["path"]
+            if spec.patterns and not _matches_any_pattern(rel, list(spec.patterns)):
+                continue
+            size = (item.get("lfs") or {}).get("size", item.get("size"))
+            out.append(
+                RemoteFile(
+                    url=f"{endpoint}/{repo}/resolve/main/{quote(rel)}",
+                    dest=_dest_under(target_dir, rel),
+                    size=int(size) if size is not None else None,
+                )
+            )
+        if not out:
+            raise DownloadError(f"No files in {repo} match {spec.include!r}")
+        return out
+    raise DownloadError(f"Unsupported manifest kind: {spec.kind}")
+
+
+def _probe(client: httpx.Client, remote: RemoteFile, headers: dict) -> None:
+    """Fill in size and range support from a HEAD request (following redirects)."""
+    try:
+        resp = client.head(remote.url, headers=headers)
+    except httpx.HTTPError as e:
+        raise DownloadError(f"HEAD {remote.url} failed: {e}") from e
+    if resp.status_code in (401, 403):
+        raise DownloadError(f"Access denied for {remote.url} (HTTP {resp.status_code}); set HF_TOKEN for gated models")
+    if resp.status_code >= 400:
+        if resp.status_code in (405, 501):
+            return
+        raise DownloadError(f"HEAD {remote.url} failed: HTTP {resp.status_code}")
+    length = resp.headers.get("content-length")
+    if length is not None and length.isdigit() and resp.headers.get("content-encoding") in (None, "identity"):
+        size = int(length)
+        if remote.size is not None and remote.size != size:
+            raise DownloadError(f"{remote.dest.name}: server reports {size} bytes, listing says {remote.size}")
+        remote.size = size
+    remote.ranges = remote.size is not None and resp.headers.get("accept-ranges", "").lower() == "bytes"
+
+
+class _RangeState:
+    """Outstanding byte ranges of a ``.part`` file, persisted next to it so an
+    interrupted download resumes where each segment stopped."""
+
+    def __init__(self, path: Path, size: int, ranges: List[List[int]]) -> None:
+        self.path = path
+        self.size = size
+        self.ranges = ranges  # [[next, end)] per segment
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, size: int) -> Optional["_RangeState"]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("size") != size:
+            return None
+        ranges = [[int(a), int(b)] for a, b in data.get("ranges", [])]
+        if any(not 0 <= a <= b <= size for a, b in ranges):
+            return None
+        return cls(path, size, ranges)
+
+    def remaining(self) -> int:
+        with self.lock:
+            return sum(b - a for a, b in self.ranges)
+
+    def save(self) -> None:
+        with self.lock:
+            payload = {"size": self.size, "ranges": [list(r) for r in self.ranges]}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def _split_ranges(start: int, end: int, segments: int) -> List[List[int]]:
+    count = max(1, min(segments, (end - start) // _MIN_SEGMENT_BYTES))
+    step = -(-(end - start) // count)
+    return [[a, min(a + step, end)] for a in range(start, end, step)] or [[start, end]]
+
+
+def _download_segment(
+    client: httpx.Client,
+    remote: RemoteFile,
+    headers: dict,
+    fd: int,
+    state: _RangeState,
+    index: int,
+    progress: TransferProgress,
+    stop: threading.Event,
+) -> None:
+    pos, end = state.ranges[index]
+    if pos >= end:
+        return
+    req_headers = dict(headers, Range=f"bytes={pos}-{end - 1}")
+    with client.stream("GET", remote.url, headers=req_headers) as resp:
+        if resp.status_code != 206:
+            raise DownloadError(f"{remote.dest.name}: expected a ranged response, got HTTP {resp.status_code}")
+        for chunk in resp.iter_bytes(_CHUNK_BYTES):
+            if stop.is_set():
+                return
+            chunk = chunk[: end - pos]
+            os.pwrite(fd, chunk, pos)
+            pos += len(chunk)
+            with state.lock:
+                state.ranges[index][0] = pos
+            progress.add(len(chunk))
+            if pos >= end:
+                break
+    if pos < end:
+        raise DownloadError(f"{remote.dest.name}: connection closed at byte {pos} of segment ending {end}")
+
+
+def _download_ranged(
+    client: httpx.Client,
+    remote: RemoteFile,
+    headers: dict,
+    part: Path,
+    progress: TransferProgress,
+    segments: int,
+) -> None:
+    size = remote.size or 0
+    state_path = part.with_name(part.name + ".json")
+    state = _RangeState.load(state_path, size) if part.exists() else None
+    if state is None:
+        # A bare .part (e.g. left by curl or a single-stream attempt) is a contiguous prefix.
+        have = part.stat().st_size if part.exists() else 0
+        if have > size:
+            have = 0
+            part.unlink()
+        state = _RangeState(state_path, size, _split_ranges(have, size, segments) if have < size else [])
+    progress.add(size - state.remaining(), transferred=False)
+
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def run(i: int) -> None:
+        try:
+            _download_segment(client, remote, headers, fd, state, i, progress, stop)
+        except BaseException as e:  # noqa: BLE001 - surfaced to the caller below
+            errors.append(e)
+            stop.set()
+
+    try:
+        os.ftruncate(fd, size)
+        threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(len(state.ranges))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            while t.is_alive():
+                t.join(_STATE_SAVE_SECONDS)
+                state.save()
+        state.save()
+    finally:
+        os.close(fd)
+    if errors:
+        err = errors[0]
+        if isinstance(err, DownloadError):
+            raise err
+        raise DownloadError(f"{remote.dest.name}: {err}") from err
+    state_path.unlink(missing_ok=True)
+
+
+def _download_stream(
+    client: httpx.Client,
+    remote: RemoteFile,
+    headers: dict,
+    part: Path,
+    progress: TransferProgress,
+) -> None:
+    with client.stream("GET", remote.url, headers=headers) as resp:
+        if resp.status_code != 200:
+            raise DownloadError(f"GET {remote.url} failed: HTTP {resp.status_code}")
+        with part.open("wb") as f:
+            for chunk in resp.iter_bytes(_CHUNK_BYTES):
+                f.write(chunk)
+                progress.add(len(chunk))
+
+
+def download_file(
+    client: httpx.Client,
+    remote: RemoteFile,
+    progress: TransferProgress,
+    *,
+    headers: Optional[dict] = None,
+    segments: int = DOWNLOAD_SEGMENTS_DEFAULT,
+) -> Path:
+    """Download one probed file into place via ``<name>.part``. Servers that honour
+    ``Range`` get ``segments`` parallel connections and resumable progress."""
+    headers = headers or {}
+    dest = remote.dest
+    if remote.size is not None and dest.is_file() and dest.stat().st_size == remote.size:
+        progress.add(remote.size, transferred=False)
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    progress.set_file(dest.name)
+    try:
+        if remote.ranges:
+            _download_ranged(client, remote, headers, part, progress, segments)
+        else:
+            _download_stream(client, remote, headers, part, progress)
+    except httpx.HTTPError as e:
+        raise DownloadError(f"{dest.name}: {e}") from e
+    actual = part.stat().st_size
+    if remote.size is not None and actual != remote.size:
+        raise DownloadError(f"{dest.name}: downloaded {actual} bytes, expected {remote.size}")
+    os.replace(part, dest)
+    return dest
+
+
+def download_model(
+    spec: ManifestSpec,
+    models_dir: Path,
+    *,
+    token: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    segments: int = DOWNLOAD_SEGMENTS_DEFAULT,
+    progress: Optional[TransferProgress] = None,
+    client: Optional[httpx.Client] = None,
+    warn: Optional[Callable[[str], None]] = None,
+) -> List[Path]:
+    """Download every file of a manifest entry in-process.
+
+    All files are probed first so the total is known up front. A total that does
+    not match the manifest ``size`` column is only reported through ``warn``:
+    get-models.sh never enforced it, and updated repos drift from it. Each file
+    must still match its probed ``Content-Length`` exactly. The HF token is only
+    sent to the HF endpoint (httpx drops it on cross-origin redirects to the CDN).
+    """
+    warn = warn or logger.warning
+    endpoint = (endpoint or os.environ.get("HF_ENDPOINT") or HF_ENDPOINT_DEFAULT).rstrip("/")
+    progress = progress or TransferProgress()
+    own_client = client is None
+    if client is None:
+        client = httpx.Client(follow_redirects=True, timeout=httpx.Timeout(30.0, read=120.0))
+    try:
+        hf_headers = {"Authorization": f"Bearer {token}"} if token else {}
+        headers = hf_headers if spec.kind.startswith("hf_") else {}
+        files = resolve_model_files(spec, models_dir, client, endpoint=endpoint, headers=headers)
+        for remote in files:
+            _probe(client, remote, headers)
+            progress.add_total(remote.size)
+        total = progress.bytes_total
+        if total is not None and spec.size_raw and not size_matches_manifest(total, spec.size_raw):
+            warn(f"{spec.name}: remote size {total} bytes does not match manifest size {spec.size_raw}")
+        paths = [download_file(client, remote, progress, headers=headers, segments=segments) for remote in files]
+        if total is None and spec.size_raw:
+            actual = sum(p.stat().st_size for p in paths)
+            if not size_matches_manifest(actual, spec.size_raw):
+                warn(f"{spec.name}: downloaded {actual} bytes, manifest says {spec.size_raw}")
+        return paths
+    finally:
+        if own_client:
+            client.close()
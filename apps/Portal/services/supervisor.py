@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import time
+import xmlrpc.client
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# supervisor.xmlrpc.Faults
+FAULT_BAD_NAME = 10
+FAULT_ALREADY_STARTED = 60
+FAULT_NOT_RUNNING = 70
+
+
+class SupervisorUnavailable(RuntimeError):
+    """The supervisord socket could not be reached; callers fall back to supervisorctl."""
+
+
+class SupervisorError(RuntimeError):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class ProcessInfo:
+    name: str
+    group: str
+    state: str
+    pid: Optional[int] = None
+    uptime: Optional[int] = None
+    exit_status: Optional[int] = None
+    description: str = ""
+    spawn_error: str = ""
+
+    @classmethod
+    def from_rpc(cls, raw: dict) -> "ProcessInfo":
+        state = str(raw.get("statename") or "UNKNOWN").upper()
+        pid = int(raw.get("pid") or 0) or None
+        uptime = None
+        start = int(raw.get("start") or 0)
+        now = int(raw.get("now") or 0)
+        if state == "RUNNING" and start and now >= start:
+            uptime = now - start
+        exit_status = None
+        if state in ("EXITED", "FATAL", "BACKOFF", "STOPPED") and raw.get("stop"):
+            exit_status = int(raw.get("exitstatus") or 0)
+        return cls(
+            name=str(raw.get("name") or ""),
+            group=str(raw.get("group") or ""),
+            state=state,
+            pid=pid if state in ("RUNNING", "STOPPING") else None,
+            uptime=uptime,
+            exit_status=exit_status,
+            description=str(raw.get("description") or ""),
+            spawn_error=str(raw.get("spawnerr") or ""),
+        )
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class _UnixTransport(xmlrpc.client.Transport):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__()
+        self._socket_path = socket_path
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        return _UnixHTTPConnection(self._socket_path, self._timeout)
+
+
+class SupervisorClient:
+    """XML-RPC client for supervisord's unix socket with a short-lived status snapshot."""
+
+    def __init__(self, socket_path: str, *, snapshot_ttl: float = 1.0, timeout: float = 5.0):
+        self.socket_path = socket_path
+        self.snapshot_ttl = snapshot_ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, ProcessInfo]] = None
+        self._snapshot_at = 0.0
+
+    def _call(self, method: str, *args, timeout: Optional[float] = None):
+        transport = _UnixTransport(self.socket_path, timeout or self.timeout)
+        proxy = xmlrpc.client.ServerProxy("http://localhost/RPC2", transport=transport, allow_none=True)
+        try:
+            return getattr(proxy, method)(*args)
+        except xmlrpc.client.Fault as e:
+            raise SupervisorError(e.faultCode, e.faultString) from e
+        except (OSError, http.client.HTTPException, xmlrpc.client.ProtocolError) as e:
+            raise SupervisorUnavailable(str(e) or type(e).__name__) from e
+        finally:
+            transport.close()
+
+    def all_process_info(self) -> Dict[str, ProcessInfo]:
+        # One RPC per TTL window, however many callers ask concurrently.
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is not None and (now - self._snapshot_at) < self.snapshot_ttl:
+                return self._snapshot
+            raw = self._call("supervisor.getAllProcessInfo")
+            self._snapshot = {info.name: info for info in (ProcessInfo.from_rpc(item) for item in raw)}
+            self._snapshot_at = time.monotonic()
+            return self._snapshot
+
+    def process_info(self, name: str) -> Optional[ProcessInfo]:
+        return self.all_process_info().get(name)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def start(self, name: str, *, timeout: float = 30.0) -> None:
+        try:
+            self._call("supervisor.startProcess", name, True, timeout=timeout)
+        except SupervisorError as e:
+            if e.code != FAULT_ALREADY_STARTED:
+                raise
+        finally:
+            self.invalidate()
+
+    def stop(self, name: str, *, timeout: float = 30.0) -> None:
+        try:
+            self._call("supervisor.stopProcess", name, True, timeout=timeout)
+        except SupervisorError as e:
+            if e.code != FAULT_NOT_RUNNING:
+                raise
+        finally:
+            self.invalidate()
+
+    def restart(self, name: str, *, timeout: float = 30.0) -> None:
+        self.stop(name, timeout=timeout)
+        self.start(name, timeout=timeout)
+
+
+def parse_supervisorctl_status(output: str) -> List[ProcessInfo]:
+    """Parse `supervisorctl status` output, e.g. `comfy  RUNNING   pid 42, uptime 1:02:03`."""
+    entries: List[ProcessInfo] = []
+    for line in (output or "").splitlines():
+        parts = line.split(None, 2)
+        if len(parts) < 2:
+            continue
+        name, state = parts[0], parts[1].upper()
+        description = parts[2].strip() if len(parts) > 2 else ""
+        pid = None
+        uptime = None
+        if state == "RUNNING" and description.startswith("pid "):
+            pid_text, _, uptime_text = description[4:].partition(", uptime ")
+            try:
+                pid = int(pid_text.strip())
+            except ValueError:
+                pid = None
+            uptime = _parse_uptime(uptime_text)
+        group, _, program = name.partition(":")
+        entries.append(
+            ProcessInfo(
+                name=program or name,
+                group=group if program else name,
+                state=state,
+                pid=pid,
+                uptime=uptime,
+                description=description,
+            )
+        )
+    return entries
+
+
+def _parse_uptime(text: str) -> Optional[int]:
+    text = (text or "").strip()
+    if not text:
+        return None
+    days = 0
+    if "day" in text:
+        day_text, _, text = text.partition(",")
+        try:
+            days = int(day_text.split()[0])
+        except (ValueError, IndexError):
+            return None
+    try:
+        hours, minutes, seconds = (int(part) for part in text.strip().split(":"))
+    except ValueError:
+        return None
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
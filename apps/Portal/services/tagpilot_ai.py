@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import json
 import mimetypes
 import os
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Mapping
+from pathlib import Path
+from typing import Any, Iterable, Mapping
 
 
 MAX_OUTPUT_TOKENS = 300
 PROVIDER_ERROR_STATUS_CODE = 424
 GEMINI_API_VERSIONS = ("v1", "v1beta")
 XAI_SUPPORTED_IMAGE_MIME_TYPES = {"image/jpeg", "image/png"}
+CACHE_DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+CACHE_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
 
 
 class TagPilotAIError(RuntimeError):
@@ -55,6 +62,175 @@ PROVIDERS: dict[str, ProviderSpec] = {
 }
 
 
+class GenerationCache:
+    """Persistent generate() results keyed by image content and request inputs.
+
+    Each entry is a small JSON file named by its key. Hits refresh the file
+    mtime so size-based eviction drops the least recently used entries first.
+    A non-positive ``max_bytes`` disables the cache.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        ttl_seconds: float = CACHE_DEFAULT_TTL_SECONDS,
+        max_bytes: int = CACHE_DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.root = Path(root)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+        self._entries: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(*, image_bytes: bytes, provider: str, model: str, mode: str, prompt: str) -> str:
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+        material = json.dumps([image_digest, provider, model, mode, prompt], ensure_ascii=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, str] | None:
+        return self.get_first([key])
+
+    def get_first(self, keys: Iterable[str]) -> dict[str, str] | None:
+        """The entry for the first of ``keys`` that has one; one hit or miss overall."""
+        if not self.enabled:
+            return None
+        result = None
+        for key in keys:
+            result = self._load(key)
+            if result is not None:
+                break
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def _load(self, key: str) -> dict[str, str] | None:
+        path = self._entry_path(key)
+        try:
+            st = path.stat()
+            if self.ttl_seconds > 0 and (time.time() - st.st_mtime) > self.ttl_seconds:
+                self._remove(path, st.st_size)
+                return None
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and isinstance(data.get("text"), str):
+                os.utime(path)
+                return {k: str(v) for k, v in data.items() if k in {"text", "provider", "model"}}
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def put(self, key: str, result: Mapping[str, str]) -> None:
+        if not self.enabled:
+            return
+        payload = json.dumps(
+            {k: result[k] for k in ("text", "provider", "model") if k in result},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        path = self._entry_path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else None
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._rescan_locked()
+            else:
+                self._total_bytes += len(payload) - (previous or 0)
+                if previous is None:
+                    self._entries = (self._entries or 0) + 1
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            if self.enabled and self._total_bytes is None:
+                self._rescan_locked()
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": self._entries or 0,
+                "size_bytes": self._total_bytes or 0,
+                "max_bytes": max(0, self.max_bytes),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def _remove(self, path: Path, size: int) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._total_bytes is not None:
+                self._total_bytes = max(0, self._total_bytes - size)
+                self._entries = max(0, (self._entries or 0) - 1)
+
+    def _scan_locked(self) -> list[tuple[float, int, Path]]:
+        found: list[tuple[float, int, Path]] = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json") or not entry.is_file(follow_symlinks=False):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, Path(entry.path)))
+        except OSError:
+            pass
+        return found
+
+    def _rescan_locked(self) -> None:
+        found = self._scan_locked()
+        self._total_bytes = sum(size for _, size, _ in found)
+        self._entries = len(found)
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        found = sorted(self._scan_locked())
+        total = sum(size for _, size, _ in found)
+        kept = len(found)
+        for mtime, size, path in found:
+            expired = self.ttl_seconds > 0 and (now - mtime) > self.ttl_seconds
+            if not expired and total <= self.max_bytes:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            kept -= 1
+            self.evictions += 1
+        self._total_bytes = total
+        self._entries = kept
+
+
 def normalize_provider(provider: str) -> str:
     provider_id = (provider or "").strip().lower()
     if provider_id not in PROVIDERS:
@@ -70,7 +246,10 @@ def secret_name_for_provider(provider: str) -> str:
     return provider_spec(provider).secret_name
 
 
-def provider_status(environ: Mapping[str, str] | None = None) -> dict[str, list[dict[str, Any]]]:
+def provider_status(
+    environ: Mapping[str, str] | None = None,
+    cache: GenerationCache | None = None,
+) -> dict[str, Any]:
     env = environ if environ is not None else os.environ
     providers = []
     for spec in PROVIDERS.values():
@@ -82,7 +261,10 @@ def provider_status(environ: Mapping[str, str] | None = None) -> dict[str, list[
                 "models": list(_candidate_models(spec, env)),
             }
         )
-    return {"providers": providers}
+    status: dict[str, Any] = {"providers": providers}
+    if cache is not None:
+        status["cache"] = cache.stats()
+    return status
 
 
 def require_provider_key(provider: str, environ: Mapping[str, str] | None = None) -> str:
@@ -143,7 +325,9 @@ async def generate(
     image_bytes: bytes,
     mime_type: str,
     environ: Mapping[str, str] | None = None,
-) -> dict[str, str]:
+    cache: GenerationCache | None = None,
+    force: bool = False,
+) -> dict[str, Any]:
     provider_id = normalize_provider(provider)
     if mode not in {"tags", "caption"}:
         raise ValueError("mode must be tags or caption")
@@ -152,13 +336,31 @@ async def generate(
     resolved_prompt = prompt.strip() or _default_prompt(mode)
     env = environ if environ is not None else os.environ
 
+    use_cache = cache is not None and cache.enabled
+
+    def cache_key(model: str) -> str:
+        return GenerationCache.key(
+            image_bytes=image_bytes, provider=provider_id, model=model, mode=mode, prompt=resolved_prompt
+        )
+
+    if use_cache and not force:
+        # Results are stored under the model that produced them; prefer the primary's.
+        cached = cache.get_first(cache_key(model) for model in _candidate_models(PROVIDERS[provider_id], env))
+        if cached is not None:
+            return {**cached, "cached": True}
+
     if provider_id == "openai":
-        return await _generate_openai(resolved_prompt, image_bytes, mime_type, env)
-    if provider_id == "gemini":
-        return await _generate_gemini(resolved_prompt, image_bytes, mime_type, env)
-    if provider_id == "grok":
-        return await _generate_grok(resolved_prompt, image_bytes, mime_type, env)
-    raise ValueError(f"Unsupported TagPilot provider: {provider}")
+        result = await _generate_openai(resolved_prompt, image_bytes, mime_type, env)
+    elif provider_id == "gemini":
+        result = await _generate_gemini(resolved_prompt, image_bytes, mime_type, env)
+    elif provider_id == "grok":
+        result = await _generate_grok(resolved_prompt, image_bytes, mime_type, env)
+    else:
+        raise ValueError(f"Unsupported TagPilot provider: {provider}")
+
+    if use_cache:
+        cache.put(cache_key(result["model"]), result)
+    return {**result, "cached": False}
 
 
 def _candidate_models(spec: ProviderSpec, environ: Mapping[str, str]) -> tuple[str, ...]:
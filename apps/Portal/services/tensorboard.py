@@ -0,0 +1,461 @@
+from __future__ import annotations
+
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EVENT_PREFIX = "events.out.tfevents."
+DEFAULT_TTL_SECONDS = 5.0
+# Directory listings whose mtime is this recent are re-read next time: on
+# coarse-timestamp filesystems an entry added in the same tick would not move it.
+_MTIME_SETTLE_SECONDS = 2.0
+_PRUNED_DIR_NAMES = frozenset({"__pycache__", "node_modules"})
+DEFAULT_MAX_POINTS = 1000
+_READ_CHUNK_BYTES = 1024 * 1024
+_MAX_READ_BYTES_PER_CALL = 32 * 1024 * 1024
+_MAX_RECORD_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class _DirNode:
+    mtime_ns: int
+    trusted: bool
+    subdirs: List[str] = field(default_factory=list)
+    events: Dict[str, float] = field(default_factory=dict)  # file name -> mtime
+
+
+class EventIndex:
+    """Event files under one root, kept current with one stat per directory instead of a full rescan.
+
+    A directory is only listed again when its mtime changes (an entry was
+    added, removed or renamed). Known event files are re-stat'ed for their
+    mtime, since appends do not touch the directory.
+    """
+
+    def __init__(self, root: Path, *, max_depth: int = 8):
+        self.root = Path(root)
+        self.max_depth = max_depth
+        self._nodes: Dict[str, _DirNode] = {}
+        self._events: List[Tuple[Path, float]] = []
+        self._latest: Optional[Tuple[Path, float]] = None
+        self._lock = threading.Lock()
+        self.refreshed_at: Optional[float] = None  # time.monotonic() of the last refresh
+        self.dirs_listed = 0  # directories read with scandir during the last refresh
+
+    def events(self) -> List[Tuple[Path, float]]:
+        return list(self._events)
+
+    def latest(self) -> Optional[Tuple[Path, float]]:
+        return self._latest
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        self.dirs_listed = 0
+        try:
+            root = self.root.resolve()
+        except Exception:
+            self._set([], {})
+            return
+        if root.is_file():
+            events = []
+            if root.name.startswith(EVENT_PREFIX):
+                try:
+                    events.append((root, root.stat().st_mtime))
+                except OSError:
+                    pass
+            self._set(events, {})
+            return
+        if not root.is_dir():
+            self._set([], {})
+            return
+
+        now = time.time()
+        nodes: Dict[str, _DirNode] = {}
+        events: List[Tuple[Path, float]] = []
+        stack = [(str(root), 0)]
+        while stack:
+            current, depth = stack.pop()
+            try:
+                st = os.stat(current, follow_symlinks=False)
+            except OSError:
+                continue
+            node = self._nodes.get(current)
+            if node is None or not node.trusted or node.mtime_ns != st.st_mtime_ns:
+                node = self._list_dir(current, st, now)
+                if node is None:
+                    continue
+            else:
+                for name in list(node.events):
+                    try:
+                        node.events[name] = os.stat(os.path.join(current, name), follow_symlinks=False).st_mtime
+                    except OSError:
+                        node.events.pop(name, None)
+            nodes[current] = node
+            events.extend((Path(current, name), mtime) for name, mtime in node.events.items())
+            if depth < self.max_depth:
+                stack.extend((os.path.join(current, name), depth + 1) for name in node.subdirs)
+        self._set(events, nodes)
+
+    def _list_dir(self, path: str, st: os.stat_result, now: float) -> Optional[_DirNode]:
+        node = _DirNode(mtime_ns=st.st_mtime_ns, trusted=(now - st.st_mtime) > _MTIME_SETTLE_SECONDS)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith(".") and entry.name not in _PRUNED_DIR_NAMES:
+                                node.subdirs.append(entry.name)
+                            continue
+                        if entry.name.startswith(EVENT_PREFIX) and entry.is_file(follow_symlinks=False):
+                            node.events[entry.name] = entry.stat(follow_symlinks=False).st_mtime
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        self.dirs_listed += 1
+        return node
+
+    def _set(self, events: List[Tuple[Path, float]], nodes: Dict[str, _DirNode]) -> None:
+        self._events = events
+        self._latest = max(events, key=lambda item: item[1]) if events else None
+        self._nodes = nodes
+        self.refreshed_at = time.monotonic()
+
+
+class EventIndexCache:
+    """One EventIndex per (root, depth), answered from cache and refreshed in the background when stale."""
+
+    def __init__(self, *, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, int], EventIndex] = {}
+        self._refreshing: set = set()
+
+    def index(self, root: Path, *, max_depth: int = 8) -> EventIndex:
+        """Return the index for ``root``; the first call scans synchronously, later stale calls do not block."""
+        key = (str(root), max_depth)
+        with self._lock:
+            idx = self._indexes.get(key)
+            if idx is None:
+                idx = self._indexes[key] = EventIndex(root, max_depth=max_depth)
+        if idx.refreshed_at is None:
+            idx.refresh()
+        elif time.monotonic() - idx.refreshed_at >= self.ttl:
+            self._refresh_background(key, idx)
+        return idx
+
+    def _refresh_background(self, key: Tuple[str, int], idx: EventIndex) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                idx.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+# ---------------- Scalar reader ----------------
+# TFRecord framing: uint64 length, uint32 masked CRC32C(length), data, uint32 masked CRC32C(data).
+# The payload is a tensorflow.Event protobuf, decoded here by hand for the fields scalars need.
+
+def _crc32c_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _crc32c_table()
+
+
+def _masked_crc32c(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc = _CRC32C_TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    crc ^= 0xFFFFFFFF
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _proto_fields(buf: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield (field number, wire type, value); values are ints for varint/fixed and bytes for length-delimited."""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            value = buf[pos : pos + 8]
+            pos += 8
+        elif wire == 2:
+            size, pos = _read_varint(buf, pos)
+            value = buf[pos : pos + size]
+            pos += size
+        elif wire == 5:
+            value = buf[pos : pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"unsupported wire type {wire}")
+        yield number, wire, value
+
+
+# tensorflow.DataType values for scalar tensors
+_DT_FLOAT, _DT_DOUBLE, _DT_INT32, _DT_INT64, _DT_HALF = 1, 2, 3, 9, 19
+_TENSOR_CONTENT_FORMATS = {_DT_FLOAT: "<f", _DT_DOUBLE: "<d", _DT_INT32: "<i", _DT_INT64: "<q", _DT_HALF: "<e"}
+
+
+def _tensor_scalar(buf: bytes) -> Optional[float]:
+    dtype = 0
+    content = None
+    values: List[float] = []
+    for number, wire, value in _proto_fields(buf):
+        if number == 1 and wire == 0:
+            dtype = value
+        elif number == 4 and wire == 2:
+            content = value
+        elif number == 5:  # float_val
+            values.extend(struct.unpack(f"<{len(value) // 4}f", value) if wire == 2 else struct.unpack("<f", value))
+        elif number == 6:  # double_val
+            values.extend(struct.unpack(f"<{len(value) // 8}d", value) if wire == 2 else struct.unpack("<d", value))
+        elif number in (7, 10, 13):  # int_val, int64_val, half_val (packed varints)
+            if wire == 0:
+                values.append(value)
+            else:
+                pos = 0
+                while pos < len(value):
+                    item, pos = _read_varint(value, pos)
+                    values.append(item)
+            if number == 13:
+                values = [struct.unpack("<e", struct.pack("<H", int(v) & 0xFFFF))[0] for v in values]
+    if values:
+        return float(values[0])
+    fmt = _TENSOR_CONTENT_FORMATS.get(dtype)
+    if content and fmt and len(content) >= struct.calcsize(fmt):
+        return float(struct.unpack_from(fmt, content)[0])
+    return None
+
+
+def parse_scalar_event(data: bytes) -> List[Tuple[float, int, str, float]]:
+    """Scalars in one serialized Event as (wall_time, step, tag, value)."""
+    wall_time = 0.0
+    step = 0
+    summary = None
+    for number, wire, value in _proto_fields(data):
+        if number == 1 and wire == 1:
+            wall_time = struct.unpack("<d", value)[0]
+        elif number == 2 and wire == 0:
+            step = value if value < (1 << 63) else value - (1 << 64)
+        elif number == 5 and wire == 2:
+            summary = value
+    if summary is None:
+        return []
+    scalars = []
+    for number, wire, value in _proto_fields(summary):
+        if number != 1 or wire != 2:
+            continue
+        tag = ""
+        scalar = None
+        tensor = None
+        plugin = ""
+        for vnum, vwire, vval in _proto_fields(value):
+            if vnum == 1 and vwire == 2:
+                tag = bytes(vval).decode("utf-8", errors="replace")
+            elif vnum == 2 and vwire == 5:
+                scalar = struct.unpack("<f", vval)[0]
+            elif vnum == 8 and vwire == 2:
+                tensor = vval
+            elif vnum == 9 and vwire == 2:
+                for mnum, mwire, mval in _proto_fields(vval):
+                    if mnum == 1 and mwire == 2:
+                        for pnum, pwire, pval in _proto_fields(mval):
+                            if pnum == 1 and pwire == 2:
+                                plugin = bytes(pval).decode("utf-8", errors="replace")
+        if scalar is None and tensor is not None and plugin in ("", "scalars"):
+            scalar = _tensor_scalar(tensor)
+        if tag and scalar is not None:
+            scalars.append((wall_time, step, tag, float(scalar)))
+    return scalars
+
+
+class EventFileReader:
+    """Reads records appended to one event file since the last call, leaving partial records for later."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offset = 0
+        self.error: Optional[str] = None
+        self.behind = False  # the last call stopped at its byte budget, not at the end of the file
+
+    def read_scalars(self, max_bytes: int = _MAX_READ_BYTES_PER_CALL) -> List[Tuple[float, int, str, float]]:
+        scalars: List[Tuple[float, int, str, float]] = []
+        if self.error:
+            return scalars
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return scalars
+        if size < self.offset:
+            self.offset = 0  # rewritten in place; start over
+        if size == self.offset:
+            self.behind = False
+            return scalars
+        budget = max_bytes
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while budget > 0:
+                header = f.read(12)
+                if len(header) < 12:
+                    break  # writer is mid-record; resume here next time
+                length = struct.unpack("<Q", header[:8])[0]
+                if struct.unpack("<I", header[8:])[0] != _masked_crc32c(header[:8]) or length > _MAX_RECORD_BYTES:
+                    self.error = f"corrupt record header at offset {self.offset}"
+                    break
+                body = f.read(length + 4)
+                if len(body) < length + 4:
+                    break
+                try:
+                    scalars.extend(parse_scalar_event(body[:length]))
+                except (ValueError, IndexError, struct.error):
+                    pass  # not an event we can decode; skip the record
+                self.offset += 12 + length + 4
+                budget -= 12 + length + 4
+        self.behind = budget <= 0
+        return scalars
+
+
+class ScalarSeries:
+    """Downsampled (step, wall_time, value) points: past ``max_points`` every other point is dropped
+    and only every ``stride``-th new point is kept. The latest point is always tracked."""
+
+    def __init__(self, max_points: int = DEFAULT_MAX_POINTS):
+        self.max_points = max(8, max_points)
+        self.stride = 1
+        self.seen = 0
+        self.steps: List[int] = []
+        self.wall_times: List[float] = []
+        self.values: List[float] = []
+        self.last: Optional[Tuple[int, float, float]] = None
+
+    def add(self, step: int, wall_time: float, value: float) -> None:
+        self.last = (step, wall_time, value)
+        keep = self.seen % self.stride == 0
+        self.seen += 1
+        if not keep:
+            return
+        self.steps.append(step)
+        self.wall_times.append(wall_time)
+        self.values.append(value)
+        if len(self.steps) > self.max_points:
+            self.steps = self.steps[::2]
+            self.wall_times = self.wall_times[::2]
+            self.values = self.values[::2]
+            self.stride *= 2
+
+    def to_dict(self) -> dict:
+        steps, walls, values = list(self.steps), list(self.wall_times), list(self.values)
+        if self.last is not None and (not steps or steps[-1] != self.last[0] or walls[-1] != self.last[1]):
+            steps.append(self.last[0])
+            walls.append(self.last[1])
+            values.append(self.last[2])
+        return {"step": steps, "wall_time": walls, "value": values, "stride": self.stride, "count": self.seen}
+
+
+class ScalarCache:
+    """Scalar series per event file, advanced incrementally from stored offsets on each request."""
+
+    def __init__(self, *, max_points: int = DEFAULT_MAX_POINTS, max_files: int = 64):
+        self.max_points = max_points
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[Path, Tuple[EventFileReader, Dict[str, ScalarSeries]]]" = OrderedDict()
+
+    def _read_file(self, path: Path) -> Dict[str, ScalarSeries]:
+        state = self._files.get(path)
+        if state is None:
+            state = (EventFileReader(path), {})
+            self._files[path] = state
+        reader, series = state
+        offset_before = reader.offset
+        scalars = reader.read_scalars()
+        if reader.offset < offset_before:
+            series.clear()
+        for wall_time, step, tag, value in scalars:
+            tag_series = series.get(tag)
+            if tag_series is None:
+                tag_series = series[tag] = ScalarSeries(self.max_points)
+            tag_series.add(step, wall_time, value)
+        self._files.move_to_end(path)
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        return series
+
+    def scalars(self, event_files: List[Path], tags: Optional[List[str]] = None) -> Tuple[Dict[str, dict], bool]:
+        """Merged series per tag for one run's event files (read in name order, as TensorBoard does).
+
+        Each call reads a bounded amount per file; the flag is False while
+        some file still has unread records (call again to continue).
+        """
+        merged: Dict[str, dict] = {}
+        complete = True
+        with self._lock:
+            for path in sorted(event_files, key=lambda p: p.name):
+                series = self._read_file(path)
+                if self._files[path][0].behind:
+                    complete = False
+                for tag, tag_series in series.items():
+                    if tags and tag not in tags:
+                        continue
+                    data = tag_series.to_dict()
+                    current = merged.get(tag)
+                    if current is None:
+                        merged[tag] = data
+                        continue
+                    for key in ("step", "wall_time", "value"):
+                        current[key].extend(data[key])
+                    current["count"] += data["count"]
+                    current["stride"] = max(current["stride"], data["stride"])
+        return merged, complete
+
+    def errors(self, event_files: Optional[List[Path]] = None) -> Dict[str, str]:
+        """Reader errors by path (only for ``event_files`` when given); a file with an error is no longer read."""
+        wanted = None if event_files is None else {Path(p) for p in event_files}
+        with self._lock:
+            return {
+                str(path): reader.error
+                for path, (reader, _) in self._files.items()
+                if reader.error and (wanted is None or path in wanted)
+            }
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+COLUMNS = ("t", "step", "loss", "lr", "it_s", "eta_s")
+DEFAULT_MAX_POINTS = 2000
+DEFAULT_PERSIST_INTERVAL_SECONDS = 15.0
+RUN_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[A-Za-z0-9._-]{1,120}$")
+
+# Kohya/accelerate tqdm bar: "steps:  12%|█▏  | 120/1000 [01:23<10:12,  1.44it/s, avr_loss=0.0923]"
+_TQDM_RE = re.compile(
+    r"(?P<desc>[A-Za-z][\w .-]*?):?\s*\d{1,3}%\|[^|]*\|\s*(?P<n>\d+)\s*/\s*(?P<total>\d+)"
+    r"\s*\[(?P<elapsed>[\d:]+)<(?P<remaining>[\d:?]+),\s*(?P<rate>[\d.]+|\?)\s*(?P<unit>it/s|s/it)?"
+    r"(?:,\s*(?P<postfix>[^\]]*))?\]"
+)
+_POSTFIX_RE = re.compile(r"(?P<key>[\w/.-]+)=(?P<value>[-+0-9.eE]+|nan|inf)")
+# DeepSpeed pipeline engine (diffusion-pipe): "steps: 10 loss: 0.1234 iter time (s): 1.234 samples/sec: 3.2"
+_DS_STEP_RE = re.compile(
+    r"\bsteps:\s*(?P<step>\d+)\s+loss:\s*(?P<loss>[-+0-9.eE]+|nan)(?:\s+iter time \(s\):\s*(?P<iter>[0-9.]+))?"
+)
+# DeepSpeed engine summary: "step=10, skipped=0, lr=[5e-05], mom=[...]"
+_DS_LR_RE = re.compile(r"\bstep=(?P<step>\d+),\s*skipped=\d+,\s*lr=\[(?P<lr>[-+0-9.eE]+)")
+_EPOCH_RE = re.compile(r"^\s*epoch\s+(?P<epoch>\d+)\s*/\s*(?P<total>\d+)\b", re.IGNORECASE)
+_LOSS_KEYS = ("avr_loss", "loss", "current_loss", "avg_loss")
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number == number and abs(number) != float("inf") else None
+
+
+def _clock_seconds(text: str) -> Optional[int]:
+    if not text or "?" in text:
+        return None
+    seconds = 0
+    try:
+        for part in text.split(":"):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return None
+    return seconds
+
+
+class MetricsParser:
+    """Turns raw trainer output into step samples; carries lr/epoch seen on separate lines forward."""
+
+    def __init__(self):
+        self.last_step: Optional[int] = None
+        self.total_steps: Optional[int] = None
+        self.epoch: Optional[int] = None
+        self.total_epochs: Optional[int] = None
+        self._lr: Optional[float] = None
+
+    def feed(self, line: str) -> List[dict]:
+        samples = []
+        # tqdm redraws with carriage returns, so one "line" can hold many updates.
+        for segment in line.split("\r"):
+            sample = self._parse_segment(segment)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def _parse_segment(self, segment: str) -> Optional[dict]:
+        if not segment.strip():
+            return None
+        m = _TQDM_RE.search(segment)
+        if m and "step" in m.group("desc").lower():
+            return self._tqdm_sample(m)
+        m = _DS_LR_RE.search(segment)
+        if m:
+            self._lr = _float(m.group("lr"))
+            return None
+        m = _DS_STEP_RE.search(segment)
+        if m:
+            iter_time = _float(m.group("iter"))
+            return self._sample(
+                int(m.group("step")),
+                loss=_float(m.group("loss")),
+                it_s=(1.0 / iter_time) if iter_time else None,
+            )
+        m = _EPOCH_RE.match(segment)
+        if m:
+            self.epoch = int(m.group("epoch"))
+            self.total_epochs = int(m.group("total"))
+        return None
+
+    def _tqdm_sample(self, m: re.Match) -> Optional[dict]:
+        postfix = {pm.group("key"): pm.group("value") for pm in _POSTFIX_RE.finditer(m.group("postfix") or "")}
+        loss = next((_float(postfix[k]) for k in _LOSS_KEYS if k in postfix), None)
+        lr = next((_float(v) for k, v in postfix.items() if k == "lr" or k.startswith("lr/")), None)
+        if lr is not None:
+            self._lr = lr
+        rate = _float(m.group("rate"))
+        if rate and m.group("unit") == "s/it":
+            rate = 1.0 / rate
+        self.total_steps = int(m.group("total")) or self.total_steps
+        return self._sample(
+            int(m.group("n")),
+            loss=loss,
+            it_s=rate,
+            eta_s=_clock_seconds(m.group("remaining")),
+        )
+
+    def _sample(self, step: int, *, loss=None, it_s=None, eta_s=None) -> Optional[dict]:
+        if self.last_step is not None and step <= self.last_step:
+            if step < self.last_step and step <= 1:
+                self.last_step = None  # a new progress bar (e.g. resumed or restarted loop)
+            else:
+                return None
+        self.last_step = step
+        return {"step": step, "loss": loss, "lr": self._lr, "it_s": it_s, "eta_s": eta_s}
+
+
+@dataclass
+class MetricsRun:
+    run_id: str
+    source: str
+    label: str
+    state: str = "running"  # running | done | stopped | error | interrupted
+    exit_code: Optional[int] = None
+    total_steps: Optional[int] = None
+    epoch: Optional[int] = None
+    total_epochs: Optional[int] = None
+    stride: int = 1
+    points: List[list] = field(default_factory=list)
+    latest: Optional[dict] = None
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def summary(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "source": self.source,
+            "label": self.label,
+            "state": self.state,
+            "exit_code": self.exit_code,
+            "total_steps": self.total_steps,
+            "epoch": self.epoch,
+            "total_epochs": self.total_epochs,
+            "latest": self.latest,
+            "points": len(self.points),
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+        }
+
+    def to_dict(self, since_step: Optional[int] = None) -> dict:
+        points = self.points
+        if since_step is not None:
+            points = [p for p in points if p[1] > since_step]
+        data = self.summary()
+        data["stride"] = self.stride
+        data["columns"] = list(COLUMNS)
+        data["series"] = {name: [p[i] for p in points] for i, name in enumerate(COLUMNS)}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MetricsRun":
+        series = data.get("series") or {}
+        columns = [series.get(name) or [] for name in COLUMNS]
+        count = min(len(col) for col in columns) if columns else 0
+        return cls(
+            run_id=str(data.get("run_id") or ""),
+            source=str(data.get("source") or ""),
+            label=str(data.get("label") or ""),
+            state=str(data.get("state") or "done"),
+            exit_code=data.get("exit_code"),
+            total_steps=data.get("total_steps"),
+            epoch=data.get("epoch"),
+            total_epochs=data.get("total_epochs"),
+            stride=int(data.get("stride") or 1),
+            points=[[col[i] for col in columns] for i in range(count)],
+            latest=data.get("latest"),
+            started_at=float(data.get("started_at") or 0.0),
+            updated_at=float(data.get("updated_at") or 0.0),
+        )
+
+
+# Runs being recorded in this process, shared by every store (the Portal and
+# the Dpipe router each hold one over the same directory).
+_active_lock = threading.Lock()
+_active: Dict[str, "MetricsRecorder"] = {}
+
+
+class MetricsStore:
+    """Per-run metric series persisted as `<run_id>.json` under ``root``."""
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_points: int = DEFAULT_MAX_POINTS,
+        persist_interval: float = DEFAULT_PERSIST_INTERVAL_SECONDS,
+    ):
+        self.root = Path(root)
+        self.max_points = max(16, max_points)
+        self.persist_interval = persist_interval
+
+    def start_run(self, source: str, label: str = "") -> "MetricsRecorder":
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "-", f"{source}-{label}" if label else source).strip("-.")[:100]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        run_id = f"{stamp}-{slug or 'run'}"
+        with _active_lock:
+            suffix = 1
+            while run_id in _active or self._path(run_id).exists():
+                suffix += 1
+                run_id = f"{stamp}-{slug or 'run'}-{suffix}"
+            recorder = MetricsRecorder(self, MetricsRun(run_id=run_id, source=source, label=label))
+            _active[run_id] = recorder
+        return recorder
+
+    def _path(self, run_id: str) -> Path:
+        if not RUN_ID_RE.match(run_id or ""):
+            raise ValueError("invalid run id")
+        return self.root / f"{run_id}.json"
+
+    def save(self, run: MetricsRun) -> None:
+        path = self._path(run.run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(run.to_dict(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def get(self, run_id: str, since_step: Optional[int] = None) -> Optional[dict]:
+        with _active_lock:
+            recorder = _active.get(run_id)
+        if recorder is not None:
+            return recorder.snapshot(since_step)
+        run = self._load(run_id)
+        return run.to_dict(since_step) if run is not None else None
+
+    def _load(self, run_id: str) -> Optional[MetricsRun]:
+        try:
+            path = self._path(run_id)
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (ValueError, OSError):
+            return None
+        if not isinstance(data, dict):
+            return None
+        run = MetricsRun.from_dict(data)
+        if run.state == "running":
+            run.state = "interrupted"  # saved mid-run by a process that is gone
+        return run
+
+    def list_runs(self, limit: int = 50, source: Optional[str] = None) -> List[dict]:
+        """Newest first. Run ids start with their start time, so only the newest files are read."""
+        with _active_lock:
+            active = {run_id: rec for run_id, rec in _active.items() if rec.store.root == self.root}
+        runs = [rec.summary() for rec in active.values()]
+        runs = [s for s in runs if source is None or s["source"] == source]
+        try:
+            names = sorted((p.stem for p in self.root.glob("*.json") if RUN_ID_RE.match(p.stem)), reverse=True)
+        except OSError:
+            names = []
+        loaded = 0
+        for run_id in names:
+            if loaded >= limit:
+                break
+            if run_id in active:
+                continue
+            run = self._load(run_id)
+            if run is None or (source is not None and run.source != source):
+                continue
+            runs.append(run.summary())
+            loaded += 1
+        runs.sort(key=lambda s: s["run_id"], reverse=True)
+        return runs[:limit]
+
+
+class MetricsRecorder:
+    """Feeds one run's output lines through a parser into a bounded, persisted series."""
+
+    def __init__(self, store: MetricsStore, run: MetricsRun):
+        self.store = store
+        self.run = run
+        self._parser = MetricsParser()
+        self._lock = threading.Lock()
+        self._last_recorded_step: Optional[int] = None
+        self._saved_at = 0.0
+
+    @property
+    def run_id(self) -> str:
+        return self.run.run_id
+
+    def feed(self, line: str) -> None:
+        samples = self._parser.feed(line)
+        if not samples:
+            return
+        now = time.time()
+        with self._lock:
+            run = self.run
+            run.total_steps = self._parser.total_steps or run.total_steps
+            run.epoch = self._parser.epoch
+            run.total_epochs = self._parser.total_epochs
+            for sample in samples:
+                run.latest = dict(sample, t=round(now, 3))
+                if self._last_recorded_step is not None and sample["step"] < self._last_recorded_step:
+                    self._last_recorded_step = None  # progress restarted
+                if self._last_recorded_step is not None and sample["step"] - self._last_recorded_step < run.stride:
+                    continue
+                run.points.append([round(now, 3), sample["step"], sample["loss"], sample["lr"], sample["it_s"], sample["eta_s"]])
+                self._last_recorded_step = sample["step"]
+                if len(run.points) > self.store.max_points:
+                    # Halve resolution: keep every other point and sample twice as sparsely from here on.
+                    run.points = run.points[::2]
+                    run.stride *= 2
+            run.updated_at = now
+            due = now - self._saved_at >= self.store.persist_interval
+        if due:
+            self._persist()
+
+    def finish(self, exit_code: Optional[int]) -> None:
+        with self._lock:
+            self.run.exit_code = exit_code
+            if exit_code == 0:
+                self.run.state = "done"
+            elif exit_code is not None and exit_code < 0:
+                self.run.state = "stopped"  # killed by a signal, e.g. the stop button
+            else:
+                self.run.state = "error"
+            self.run.updated_at = time.time()
+        try:
+            self._persist()
+        finally:
+            with _active_lock:
+                if _active.get(self.run_id) is self:
+                    _active.pop(self.run_id, None)
+
+    def _persist(self) -> None:
+        with self._lock:
+            self._saved_at = time.time()
+            if not self.run.points:
+                return  # nothing worth keeping (e.g. the run failed before training started)
+            snapshot = MetricsRun.from_dict(self.run.to_dict())
+        try:
+            self.store.save(snapshot)
+        except OSError:
+            pass
+
+    def summary(self) -> dict:
+        with self._lock:
+            return self.run.summary()
+
+    def snapshot(self, since_step: Optional[int] = None) -> dict:
+        with self._lock:
+            return self.run.to_dict(since_step)
@@ -0,0 +1,299 @@
+"""Registry of on-disk latent / text-encoder caches built by training runs.
+
+Trainers cache VAE latents and text-encoder outputs next to the dataset, but
+whether an existing cache still matches the next run is only discovered by
+the trainer itself, after model loading. The registry records, per cache
+directory, a fingerprint of what the cache was built from:
+
+- ``dataset``: every image/caption file (relative path, size, mtime)
+- ``settings``: bucket layout, dtype and anything else that changes the cached tensors
+- ``models``: the model files/directories used to encode (size, mtime of each file)
+
+``check`` compares a planned run against the record so the start endpoint
+can say "reuse" or "stale (dataset changed)" up front. Records live in one
+small JSON file written atomically.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+_SCHEMA_VERSION = 1
+_MODEL_DIR_MAX_FILES = 10_000
+_DATASET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".mp4", ".webm", ".mov", ".txt", ".caption")
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(items: Iterable) -> str:
+    h = hashlib.sha256()
+    for item in items:
+        h.update(json.dumps(item, sort_keys=True, separators=(",", ":")).encode())
+        h.update(b"\n")
+    return h.hexdigest()[:32]
+
+
+def _tree_stats(root: Path, *, skip: Optional[Path] = None, extensions: Optional[tuple] = None, limit: Optional[int] = None):
+    base = str(root)
+    skip_path = str(skip) if skip is not None else None
+    stack = [base]
+    seen = 0
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != skip_path:
+                        stack.append(entry.path)
+                    continue
+                if extensions is not None and not entry.name.lower().endswith(extensions):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            yield os.path.relpath(entry.path, base), stat.st_size, stat.st_mtime_ns
+            seen += 1
+            if limit is not None and seen >= limit:
+                return
+
+
+def dataset_fingerprint(dataset_dir: Path, *, cache_dir: Optional[Path] = None) -> str:
+    return _digest(sorted(_tree_stats(Path(dataset_dir), skip=cache_dir, extensions=_DATASET_EXTENSIONS)))
+
+
+def model_fingerprint(paths: Iterable[str]) -> str:
+    items = []
+    for raw in paths:
+        if not raw:
+            continue
+        path = Path(raw)
+        try:
+            if path.is_dir():
+                items.append([str(path), sorted(_tree_stats(path, limit=_MODEL_DIR_MAX_FILES))])
+            else:
+                stat = path.stat()
+                items.append([str(path), stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            items.append([str(path), None])
+    return _digest(items)
+
+
+def fingerprint_parts(dataset_dir: Path, cache_dir: Path, *, settings: dict, model_paths: Iterable[str]) -> dict:
+    return {
+        "dataset": dataset_fingerprint(dataset_dir, cache_dir=cache_dir),
+        "settings": _digest([settings]),
+        "models": model_fingerprint(model_paths),
+    }
+
+
+def dir_size(path: Path) -> int:
+    return sum(size for _, size, _ in _tree_stats(Path(path)))
+
+
+def _has_files(path: Path) -> bool:
+    return next(_tree_stats(Path(path), limit=1), None) is not None
+
+
+def _orphan_reason(cache_dir: Path, entry: dict) -> Optional[str]:
+    """Why the files in ``cache_dir`` can no longer be reused, or None.
+
+    Settings are per run, so only the dataset and model parts of the
+    fingerprint are re-checked here. A failed build is left alone: the next
+    run decides whether to resume or regenerate it.
+    """
+    dataset = Path(entry.get("dataset") or "")
+    if not dataset.is_dir():
+        return "dataset is gone"
+    models = entry.get("models")
+    if models is None:
+        return None  # recorded before model paths were kept
+    if any(not Path(p).exists() for p in models):
+        return "model files are gone"
+    parts = entry.get("parts") or {}
+    skip = entry.get("dataset_skip")
+    if parts.get("dataset") != dataset_fingerprint(dataset, cache_dir=Path(skip) if skip else cache_dir):
+        return "dataset changed since the cache was built"
+    if parts.get("models") != model_fingerprint(models):
+        return "models changed since the cache was built"
+    return None
+
+
+class CacheRegistry:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, dict]] = None
+
+    def _load(self) -> dict[str, dict]:
+        # Caller holds the lock.
+        if self._entries is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._entries = dict(data.get("entries") or {}) if data.get("version") == _SCHEMA_VERSION else {}
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable training cache registry %s: %s", self.path, e)
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        # Caller holds the lock.
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps({"version": _SCHEMA_VERSION, "entries": self._entries}, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Failed to write training cache registry %s: %s", self.path, e)
+
+    def check(self, cache_dir: Path, parts: dict) -> dict:
+        """How a run with fingerprint ``parts`` relates to what is in ``cache_dir``.
+
+        ``status`` is one of ``missing`` (nothing cached yet), ``reuse`` (the
+        record matches), ``stale`` (built from different inputs, see
+        ``reasons``), ``unverified`` (the build that wrote it did not finish,
+        so the trainer's own checks decide) or ``untracked`` (files exist but
+        were not written by a Portal-started run).
+        """
+        cache_dir = Path(cache_dir)
+        with self._lock:
+            entry = dict(self._load().get(str(cache_dir)) or {})
+        result = {"cache_dir": str(cache_dir), "status": "missing", "reasons": []}
+        if not _has_files(cache_dir):
+            return result
+        if not entry:
+            result["status"] = "untracked"
+            return result
+        previous = entry.get("parts") or {}
+        reasons = [f"{name} changed" for name in ("dataset", "settings", "models") if previous.get(name) != parts.get(name)]
+        if reasons:
+            result.update(status="stale", reasons=reasons)
+        elif entry.get("state") != "ready":
+            result["status"] = "unverified"
+        else:
+            result["status"] = "reuse"
+        result["built_at"] = entry.get("updated_at")
+        return result
+
+    def begin(
+        self,
+        cache_dir: Path,
+        *,
+        trainer: str,
+        dataset_dir: Path,
+        parts: dict,
+        model_paths: Iterable[str] = (),
+        dataset_skip: Optional[Path] = None,
+        rebuild: bool = False,
+        run: Optional[str] = None,
+    ) -> None:
+        """Record that a run is about to use (or build) ``cache_dir``.
+
+        ``model_paths`` and ``dataset_skip`` are the inputs ``parts`` was
+        computed from, kept so ``inventory`` can re-check the cache later.
+        A run that reuses a ready cache leaves it ready even if the run later
+        fails; anything else is ``building`` until ``finish``.
+        """
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            previous = entries.get(str(cache_dir)) or {}
+            reused = not rebuild and previous.get("parts") == parts and previous.get("state") == "ready"
+            entries[str(cache_dir)] = {
+                "trainer": trainer,
+                "dataset": str(dataset_dir),
+                "parts": parts,
+                "models": [str(p) for p in model_paths if p],
+                "dataset_skip": str(dataset_skip) if dataset_skip is not None else None,
+                "state": "ready" if reused else "building",
+                "run": run,
+                "created_at": previous.get("created_at", now) if reused else now,
+                "updated_at": now,
+            }
+            self._save()
+
+    def finish(self, cache_dir: Path, *, ok: bool) -> None:
+        with self._lock:
+            entry = self._load().get(str(cache_dir))
+            if entry is None:
+                return
+            if ok:
+                entry["state"] = "ready"
+            elif entry.get("state") == "building":
+                entry["state"] = "incomplete"
+            entry["updated_at"] = time.time()
+            self._save()
+
+    def inventory(self, discover_roots: Iterable[tuple[Path, str]] = ()) -> list[dict]:
+        """Recorded caches plus untracked ``<dataset>/<subdir>`` directories, with sizes.
+
+        ``orphaned`` marks caches no run can reuse as they are, with
+        ``orphan_reason`` saying why; cleanup removes those.
+        """
+        with self._lock:
+            entries = {k: dict(v) for k, v in self._load().items()}
+        items = []
+        for cache_dir, entry in entries.items():
+            path = Path(cache_dir)
+            exists = path.is_dir()
+            reason = _orphan_reason(path, entry) if exists else "cache directory is gone"
+            items.append(
+                {
+                    "cache_dir": cache_dir,
+                    "trainer": entry.get("trainer"),
+                    "dataset": entry.get("dataset"),
+                    "state": entry.get("state"),
+                    "tracked": True,
+                    "orphaned": reason is not None,
+                    "orphan_reason": reason,
+                    "size_bytes": dir_size(path) if exists else 0,
+                    "updated_at": entry.get("updated_at"),
+                }
+            )
+        for root, subdir in discover_roots:
+            try:
+                datasets = sorted(p for p in Path(root).iterdir() if p.is_dir())
+            except OSError:
+                continue
+            for dataset in datasets:
+                path = dataset / subdir
+                if str(path) in entries or not path.is_dir():
+                    continue
+                items.append(
+                    {
+                        "cache_dir": str(path),
+                        "trainer": None,
+                        "dataset": str(dataset),
+                        "state": None,
+                        "tracked": False,
+                        "orphaned": False,
+                        "orphan_reason": None,
+                        "size_bytes": dir_size(path),
+                        "updated_at": None,
+                    }
+                )
+        return items
+
+    def remove(self, cache_dir: Path) -> int:
+        """Delete a cache directory and its record; returns the bytes freed."""
+        path = Path(cache_dir)
+        freed = dir_size(path) if path.is_dir() else 0
+        if path.is_dir():
+            shutil.rmtree(path)
+        with self._lock:
+            if self._load().pop(str(path), None) is not None:
+                self._save()
+        return freed
@@ -0,0 +1,262 @@
+"""Subprocess-free version probes for pip packages and git checkouts.
+
+Installed versions are read straight from ``*.dist-info/METADATA`` and ``.git``
+ref files and cached on the mtimes that change when they do. "Latest" lookups
+(network, slow) go through :class:`LatestCache`, which answers from cache and
+refreshes in a background pool.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Hashable, Optional
+
+DEFAULT_LATEST_TTL_SECONDS = 3600.0
+DEFAULT_LATEST_RETRY_SECONDS = 300.0
+_SHA_RE = re.compile(r"^[0-9a-f]{40}(?:[0-9a-f]{24})?$")
+
+_lock = threading.Lock()
+_site_dirs: dict[str, list[Path]] = {}
+_dist_versions: dict[tuple[str, str], tuple[int, Optional[str]]] = {}
+_git_heads: dict[str, tuple[tuple, tuple[Optional[str], Optional[str]]]] = {}
+
+
+def normalize_dist_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def site_packages_for(python_bin: str) -> list[Path]:
+    """site-packages dirs of the venv that owns ``python_bin`` (``<venv>/bin/python``)."""
+    with _lock:
+        cached = _site_dirs.get(python_bin)
+    if cached is not None:
+        return cached
+    venv = Path(python_bin).parent.parent
+    dirs = sorted(
+        p for pattern in ("lib/python*/site-packages", "lib64/python*/site-packages") for p in venv.glob(pattern) if p.is_dir()
+    )
+    unique = list({p.resolve(): p for p in reversed(dirs)}.values())[::-1]  # lib64 is often a symlink to lib
+    if unique:
+        with _lock:
+            _site_dirs[python_bin] = unique
+    return unique
+
+
+def _read_metadata_version(path: Path) -> Optional[str]:
+    try:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith("Version:"):
+                    return line.split(":", 1)[1].strip() or None
+                if not line.strip():
+                    break  # end of the header block
+    except OSError:
+        return None
+    return None
+
+
+def _scan_dist_version(site_dir: Path, normalized: str) -> Optional[str]:
+    try:
+        names = os.listdir(site_dir)
+    except OSError:
+        return None
+    for entry in names:
+        for suffix, meta in ((".dist-info", "METADATA"), (".egg-info", "PKG-INFO")):
+            if not entry.endswith(suffix):
+                continue
+            stem = entry[: -len(suffix)]
+            dist = stem.split("-", 1)[0]
+            if normalize_dist_name(dist) != normalized:
+                continue
+            version = _read_metadata_version(site_dir / entry / meta)
+            if version is None and "-" in stem:
+                version = stem.split("-", 1)[1].split("-py", 1)[0] or None
+            if version:
+                return version
+    return None
+
+
+def dist_version(site_dirs: list[Path], package: str) -> Optional[str]:
+    """Installed version of ``package``; each site dir is rescanned only when its mtime
+    changes (pip creates/removes a ``*.dist-info`` dir on every install)."""
+    normalized = normalize_dist_name(package)
+    for site_dir in site_dirs:
+        try:
+            mtime = site_dir.stat().st_mtime_ns
+        except OSError:
+            continue
+        key = (str(site_dir), normalized)
+        with _lock:
+            cached = _dist_versions.get(key)
+        if cached and cached[0] == mtime:
+            version = cached[1]
+        else:
+            version = _scan_dist_version(site_dir, normalized)
+            with _lock:
+                _dist_versions[key] = (mtime, version)
+        if version:
+            return version
+    return None
+
+
+def _git_dir(repo: Path) -> Optional[Path]:
+    dot_git = repo / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():  # worktree / submodule: "gitdir: <path>"
+        try:
+            text = dot_git.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if text.startswith("gitdir:"):
+            path = Path(text.split(":", 1)[1].strip())
+            return path if path.is_absolute() else (repo / path).resolve()
+    return None
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_ref(git_dir: Path, common_dir: Path, ref: str) -> Optional[str]:
+    for base in (git_dir, common_dir):
+        try:
+            value = (base / ref).read_text(encoding="utf-8").strip()
+        except OSError:
+            continue
+        if _SHA_RE.match(value):
+            return value
+    try:
+        with (common_dir / "packed-refs").open(encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("#", "^")):
+                    continue
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref and _SHA_RE.match(parts[0]):
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+
+def _symbolic_ref(path: Path) -> Optional[str]:
+    try:
+        text = path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return text[len("ref:") :].strip() if text.startswith("ref:") else None
+
+
+def git_head(repo: Path) -> tuple[Optional[str], Optional[str]]:
+    """(branch, sha) of a checkout without running git. ``branch`` falls back to the
+    remote default branch for detached checkouts, mirroring the old ``rev-parse`` logic.
+    Cached on the mtimes of HEAD, the branch ref and packed-refs."""
+    git_dir = _git_dir(repo)
+    if git_dir is None:
+        return None, None
+    common_dir = git_dir
+    commondir_file = git_dir / "commondir"
+    if commondir_file.is_file():
+        try:
+            common_dir = (git_dir / commondir_file.read_text(encoding="utf-8").strip()).resolve()
+        except OSError:
+            pass
+    head = git_dir / "HEAD"
+    ref = _symbolic_ref(head)
+    key = (
+        _mtime(head),
+        _mtime(git_dir / ref) if ref else None,
+        _mtime(common_dir / ref) if ref else None,
+        _mtime(common_dir / "packed-refs"),
+        _mtime(common_dir / "refs" / "remotes" / "origin" / "HEAD"),
+    )
+    with _lock:
+        cached = _git_heads.get(str(repo))
+    if cached and cached[0] == key:
+        return cached[1]
+
+    if ref:
+        sha = _read_ref(git_dir, common_dir, ref)
+        branch = ref[len("refs/heads/") :] if ref.startswith("refs/heads/") else None
+    else:
+        try:
+            value = head.read_text(encoding="utf-8").strip()
+        except OSError:
+            value = ""
+        sha = value if _SHA_RE.match(value) else None
+        branch = None
+    if branch is None:
+        remote_head = _symbolic_ref(common_dir / "refs" / "remotes" / "origin" / "HEAD")
+        if remote_head and remote_head.startswith("refs/remotes/origin/"):
+            branch = remote_head[len("refs/remotes/origin/") :]
+    result = (branch, sha)
+    with _lock:
+        _git_heads[str(repo)] = (key, result)
+    return result
+
+
+class LatestCache:
+    """Serves "latest version" lookups from cache; stale or missing keys are refreshed in
+    a shared thread pool so several services are checked in parallel and callers never
+    wait on the network unless they ask to."""
+
+    def __init__(
+        self,
+        fetch: Callable[[Hashable], Optional[str]],
+        *,
+        ttl: float = DEFAULT_LATEST_TTL_SECONDS,
+        retry: float = DEFAULT_LATEST_RETRY_SECONDS,
+        max_workers: int = 4,
+    ) -> None:
+        self._fetch = fetch
+        self._ttl = ttl
+        self._retry = min(retry, ttl)
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, dict] = {}
+        self._pending: dict[Hashable, threading.Event] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="latest-version")
+
+    def get(self, key: Hashable, *, wait: Optional[float] = None, refresh: bool = False) -> dict:
+        """``{"latest", "checked_at", "error", "pending"}``. With ``wait`` (seconds),
+        block up to that long for an in-flight or newly started lookup."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            done = self._pending.get(key)
+            if done is None:
+                stale = entry is None or refresh
+                if entry is not None and not stale:
+                    age = now - entry["checked_at"]
+                    stale = age > (self._retry if entry["error"] else self._ttl)
+                if stale:
+                    done = self._pending[key] = threading.Event()
+                    self._pool.submit(self._run, key, done)
+        if done is not None and wait:
+            done.wait(wait)
+        with self._lock:
+            entry = dict(self._entries.get(key) or {"latest": None, "checked_at": None, "error": None})
+            entry["pending"] = key in self._pending
+        return entry
+
+    def _run(self, key: Hashable, done: threading.Event) -> None:
+        latest: Optional[str] = None
+        error: Optional[str] = None
+        try:
+            latest = self._fetch(key)
+        except Exception as e:  # surfaced through the entry
+            error = str(e) or type(e).__name__
+        with self._lock:
+            previous = self._entries.get(key)
+            if error and previous and previous.get("latest"):
+                latest = previous["latest"]  # keep the last good answer
+            self._entries[key] = {"latest": latest, "checked_at": time.time(), "error": error}
+            self._pending.pop(key, None)
+        done.set()
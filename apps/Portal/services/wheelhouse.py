@@ -0,0 +1,117 @@
+"""Persistent wheel cache for pip-based service updates.
+
+An update is split in two: ``pip wheel`` resolves, downloads and builds everything
+into the service's wheelhouse while the old version keeps serving, then an
+``--no-index`` install from that directory swaps the code in seconds. Wheels for
+the installed version and the one before it are kept, so going back is an offline
+reinstall too; everything else is pruned after a successful update.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import unquote, urlparse
+
+
+def normalize_wheel_name(name: str) -> str:
+    """Distribution name as it appears in wheel filenames (PEP 427/503)."""
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def wheel_dir(root: Path, service: str) -> Path:
+    return root / service
+
+
+def package_ref(package: str, version: Optional[str]) -> str:
+    return f"{package}=={version}" if version else package
+
+
+def prefetch_command(python_bin: str, wheels: Path, package: str, version: Optional[str]) -> list[str]:
+    """Build/download wheels for ``package`` and its whole dependency tree into ``wheels``.
+    Wheels already in the directory are reused instead of downloaded again."""
+    return [
+        python_bin,
+        "-m",
+        "pip",
+        "wheel",
+        "--wheel-dir",
+        str(wheels),
+        "--find-links",
+        str(wheels),
+        package_ref(package, version),
+    ]
+
+
+def offline_install_command(python_bin: str, wheels: Path, package: str, version: Optional[str]) -> list[str]:
+    return [
+        python_bin,
+        "-m",
+        "pip",
+        "install",
+        "--no-index",
+        "--find-links",
+        str(wheels),
+        "--upgrade",
+        package_ref(package, version),
+    ]
+
+
+def has_wheel(wheels: Path, package: str, version: str) -> bool:
+    """True if the top-level wheel for ``package==version`` is cached. Its dependencies
+    were fetched by the same ``pip wheel`` run, so this is the marker for the set."""
+    prefix = f"{normalize_wheel_name(package)}-{version}-"
+    try:
+        return any(p.name.lower().startswith(prefix.lower()) and p.suffix == ".whl" for p in wheels.iterdir())
+    except OSError:
+        return False
+
+
+def resolve_command(python_bin: str, wheels: Path, package: str, version: str, report: Path) -> list[str]:
+    """Offline dry-run resolve of ``package==version`` against ``wheels``. pip writes the
+    wheels it would install (the whole tree, installed or not) to ``report``."""
+    return [
+        python_bin,
+        "-m",
+        "pip",
+        "install",
+        "--dry-run",
+        "--quiet",
+        "--ignore-installed",
+        "--no-index",
+        "--find-links",
+        str(wheels),
+        "--report",
+        str(report),
+        package_ref(package, version),
+    ]
+
+
+def wheels_in_report(report: Path) -> set[str]:
+    """File names of the wheels listed in a ``pip install --report`` file."""
+    data = json.loads(report.read_text(encoding="utf-8"))
+    names = set()
+    for item in data.get("install") or []:
+        url = (item.get("download_info") or {}).get("url") or ""
+        if url.startswith("file:"):
+            names.add(Path(unquote(urlparse(url).path)).name)
+    return names
+
+
+def prune(wheels: Path, keep: Iterable[str]) -> tuple[int, int]:
+    """Delete cached wheels not named in ``keep``; returns (files removed, bytes freed)."""
+    keep = set(keep)
+    removed = freed = 0
+    for path in wheels.glob("*.whl"):
+        if path.name in keep:
+            continue
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
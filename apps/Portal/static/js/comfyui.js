@@ -4,6 +4,7 @@ let comfyReconnectTimer = null;
 let comfyActive = false;
 let previewEnabled = true;
 let imageCount = 0;
+let previewFrameUrl = null;
 let lastGeneratedImage = null;
 let comfyPort = "5555";
 let comfyStatusFailures = 0;
@@ -261,6 +262,7 @@ function connectWebSocket() {
 
   try {
     comfyWebSocket = new WebSocket(wsUrl);
+    comfyWebSocket.binaryType = "arraybuffer";
 
     comfyWebSocket.onopen = function () {
       updateConnectionStatus("connected", "Connected to ComfyUI");
@@ -268,6 +270,10 @@ function connectWebSocket() {
 
     comfyWebSocket.onmessage = function (event) {
       if (!previewEnabled) return;
+      if (event.data instanceof ArrayBuffer) {
+        displayPreviewFrame(event.data);
+        return;
+      }
 
       try {
         const data = JSON.parse(event.data);
@@ -346,6 +352,27 @@ function displayImage(imageData) {
   };
 }
 
+// Comfy binary frames: uint32 event type (1 = PREVIEW_IMAGE), uint32 format
+// (1 = JPEG, 2 = PNG), then the encoded image. Sampler previews replace the
+// current image without counting as generated images.
+function displayPreviewFrame(buffer) {
+  const container = document.getElementById("preview-container");
+  const infoEl = document.getElementById("preview-info");
+  if (!container || buffer.byteLength <= 8) return;
+  const view = new DataView(buffer);
+  if (view.getUint32(0) !== 1) return;
+  const mime = view.getUint32(4) === 2 ? "image/png" : "image/jpeg";
+
+  if (previewFrameUrl) URL.revokeObjectURL(previewFrameUrl);
+  previewFrameUrl = URL.createObjectURL(new Blob([buffer.slice(8)], { type: mime }));
+
+  const img = document.createElement("img");
+  img.className = "preview-image";
+  img.src = previewFrameUrl;
+  container.replaceChildren(img);
+  if (infoEl) infoEl.classList.remove("is-hidden");
+}
+
 function getComfyUIImageUrl(filename, subfolder, port) {
   const base = getComfyUIUrl(port).replace(/\/$/, "");
   let url = `${base}/view?filename=${encodeURIComponent(filename)}`;
@@ -130,6 +130,19 @@ window.createDatasetPrompt = async function () {
   }
 };
 
+async function waitForDatasetExtract(name, status) {
+  for (;;) {
+    const job = await fetchJson(`/api/datasets/${encodeURIComponent(name)}/extract/status`);
+    if (job.state === "error") throw job.error || "Extraction failed";
+    if (job.state !== "uploading" && job.state !== "running") return;
+    if (status) {
+      const total = job.entries_total != null ? `/${job.entries_total}` : "";
+      status.textContent = `Extracting... ${job.entries_done}${total} files`;
+    }
+    await new Promise(resolve => setTimeout(resolve, 500));
+  }
+}
+
 async function uploadDatasetFile(file) {
   const status = document.getElementById("ds-upload-status");
   const bar = document.getElementById("ds-upload-bar");
@@ -139,12 +152,12 @@ async function uploadDatasetFile(file) {
     return;
   }
   if (status) status.textContent = "Uploading...";
-  const fd = new FormData();
-  fd.append("file", file);
   try {
-    await new Promise((resolve, reject) => {
+    const body = await new Promise((resolve, reject) => {
       const xhr = new XMLHttpRequest();
-      xhr.open("POST", "/api/datasets/upload");
+      // Raw body lets the server extract members while the upload is still arriving.
+      xhr.open("PUT", `/api/datasets/upload/stream?filename=${encodeURIComponent(file.name || "dataset.zip")}`);
+      xhr.setRequestHeader("Content-Type", "application/zip");
       xhr.upload.onprogress = (e) => {
         if (e.lengthComputable && bar) {
           const pct = Math.round((e.loaded / e.total) * 100);
@@ -156,8 +169,10 @@ async function uploadDatasetFile(file) {
         else reject(xhr.responseText || xhr.statusText);
       };
       xhr.onerror = () => reject("Upload failed");
-      xhr.send(fd);
+      xhr.send(file);
     });
+    const job = JSON.parse(body || "{}").extract_job;
+    if (job) await waitForDatasetExtract(job.name, status);
     if (status) status.textContent = "Uploaded.";
     closeUploadModal();
     await loadDatasets();
@@ -1,4 +1,9 @@
 let dpLogTimer = null;
+let dpLogLines = [];
+let dpLogSeq = null;
+let dpLogEpoch = null;
+let dpLogPid = null;
+const DP_LOG_MAX_LINES = 2000;
 const DP_STORAGE_KEY = "dpipeSettings";
 const DP_SENSITIVE_FIELDS = new Set([
   "dp-wandb-key",
@@ -225,9 +230,19 @@ function startLogPoll() {
     const pre = document.getElementById("dp-logs");
     if (!pre) return;
     try {
-      const data = await fetchJson("/dpipe/train/logs?limit=500");
+      const cursor = dpLogSeq === null ? "" : `&since=${dpLogSeq}&epoch=${encodeURIComponent(dpLogEpoch || "")}`;
+      const data = await fetchJson(`/dpipe/train/logs?limit=500${cursor}`);
       const lines = normalizeDpipeLines(data);
-      pre.textContent = lines.join("\n");
+      // With a cursor only new lines come back; a snapshot (first poll, new run or reset) replaces the buffer.
+      if (dpLogSeq === null || data.reset || data.pid !== dpLogPid) {
+        dpLogLines = lines;
+      } else {
+        dpLogLines = dpLogLines.concat(lines).slice(-DP_LOG_MAX_LINES);
+      }
+      dpLogPid = data.pid;
+      dpLogSeq = typeof data.seq === "number" ? data.seq : null;
+      dpLogEpoch = data.epoch || null;
+      pre.textContent = dpLogLines.join("\n");
     } catch (e) {
       // ignore when no logs yet
     }
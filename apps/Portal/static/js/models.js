@@ -34,6 +34,10 @@ function clearProgress(card) {
   text.textContent = "";
 }
 
+function pullQueueLabel(st) {
+  return st && st.queue_position ? `Queued (#${st.queue_position})…` : "Queued…";
+}
+
 async function syncPullStatusesOnce() {
   try {
     const res = await fetchJson("/api/models/pulls");
@@ -44,13 +48,21 @@ async function syncPullStatusesOnce() {
       if (n) cardsByName.set(n, c);
     });
     jobs.forEach(j => {
-      if (!j || j.state !== "running") return;
+      if (!j || (j.state !== "running" && j.state !== "queued")) return;
       const card = cardsByName.get(j.name);
       if (!card) return;
+      const btn = card.querySelector('button[data-action="install"]');
+      if (j.state === "queued") {
+        setProgress(card, null, pullQueueLabel(j));
+        if (btn) {
+          btn.disabled = true;
+          btn.textContent = "Queued";
+        }
+        return;
+      }
       const pct = (typeof j.progress_pct === "number") ? j.progress_pct : null;
       const label = j.last_line || (pct != null ? `${pct}%` : "Downloading…");
       setProgress(card, pct, label);
-      const btn = card.querySelector('button[data-action="install"]');
       if (btn) {
         btn.disabled = true;
         btn.textContent = pct != null ? `Downloading ${pct}%` : "Downloading…";
@@ -289,6 +301,12 @@ window.pullModel = async function (name, btn) {
 
     while (true) {
       const st = await fetchJson(`/api/models/${encodeURIComponent(name)}/pull/status`);
+      if (st && st.state === "queued") {
+        if (card) setProgress(card, null, pullQueueLabel(st));
+        btn.textContent = "Queued";
+        await new Promise(r => setTimeout(r, 1000));
+        continue;
+      }
       if (st && st.state === "running") {
         const pct = (typeof st.progress_pct === "number") ? st.progress_pct : null;
         const label = st.last_line || (pct != null ? `${pct}%` : "Downloading…");
@@ -101,13 +101,15 @@ function renderServiceUpdateStatus(name, status) {
   statusEl.classList.remove("is-hidden", "ok", "error", "running");
   if (status.state === "running") {
     const line = (status.last_line || "").trim();
-    statusEl.textContent = line ? `Updating: ${line}` : "Updating...";
+    const stage = status.phase === "prefetch" ? "Downloading" : "Updating";
+    statusEl.textContent = line ? `${stage}: ${line}` : `${stage}...`;
     statusEl.classList.add("running");
     buttonEl.disabled = true;
     return;
   }
   if (status.state === "done") {
-    statusEl.textContent = status.installed_after ? `Updated: ${status.installed_after}` : "Update finished";
+    const downtime = typeof status.downtime_seconds === "number" ? ` (down ${status.downtime_seconds}s)` : "";
+    statusEl.textContent = (status.installed_after ? `Updated: ${status.installed_after}` : "Update finished") + downtime;
     statusEl.classList.add("ok");
     buttonEl.disabled = false;
     return;
@@ -158,6 +160,18 @@ async function startServiceUpdatePolling(name) {
   }, 2000);
 }
 
+async function refreshPendingServiceVersions(services, attempt) {
+  // "latest" lookups run in the background on the server; re-read once they settle.
+  if (attempt >= 10) return;
+  await new Promise(r => setTimeout(r, 3000));
+  const versions = await fetchJson("/api/services/versions");
+  versions.forEach(info => {
+    serviceVersions[info.name] = info;
+    if (services.some(svc => svc.name === info.name)) renderServiceVersion(info.name, info);
+  });
+  if (versions.some(info => info.latest_pending)) await refreshPendingServiceVersions(services, attempt + 1);
+}
+
 async function loadServiceVersions(services) {
   try {
     const versions = await fetchJson("/api/services/versions");
@@ -167,6 +181,9 @@ async function loadServiceVersions(services) {
       serviceVersions[info.name] = info;
     });
     services.forEach(svc => renderServiceVersion(svc.name, byName[svc.name] || null));
+    if (versions.some(info => info.latest_pending)) {
+      refreshPendingServiceVersions(services, 0).catch(() => {});
+    }
 
     const supported = services.filter(svc => !!(byName[svc.name] && byName[svc.name].update_supported));
     const statuses = await Promise.all(supported.map(svc => fetchServiceUpdateStatus(svc.name)));
@@ -314,18 +331,72 @@ window.toggleServiceAutostart = async function (name, toggle) {
   }
 };
 
+const SERVICE_LOG_MAX_LINES = 2000;
+let serviceLogSource = null;
+
+function stopServiceLogStream() {
+  if (serviceLogSource) {
+    serviceLogSource.close();
+    serviceLogSource = null;
+  }
+}
+
 window.viewServiceLog = async function (name) {
-  try {
-    const res = await fetchJson(`/api/services/${encodeURIComponent(name)}/log?lines=200`);
-    const modal = document.getElementById("svc-log-modal");
-    const title = document.getElementById("svc-log-title");
-    const content = document.getElementById("svc-log-content");
-    if (title) title.textContent = `Service Log: ${name} (${res.path})`;
-    if (content) content.textContent = res.log || "";
-    if (modal) modal.classList.add("show");
-  } catch (e) {
-    alert(`Failed to load log: ${e.message || e}`);
+  const modal = document.getElementById("svc-log-modal");
+  const title = document.getElementById("svc-log-title");
+  const content = document.getElementById("svc-log-content");
+  stopServiceLogStream();
+  if (typeof EventSource === "undefined") {
+    try {
+      const res = await fetchJson(`/api/services/${encodeURIComponent(name)}/log?lines=200`);
+      if (title) title.textContent = `Service Log: ${name} (${res.path})`;
+      if (content) content.textContent = res.log || "";
+      if (modal) modal.classList.add("show");
+    } catch (e) {
+      alert(`Failed to load log: ${e.message || e}`);
+    }
+    return;
   }
+
+  let logLines = [];
+  const render = (appendOnly) => {
+    if (!content) return;
+    const atBottom = content.scrollTop + content.clientHeight >= content.scrollHeight - 4;
+    content.textContent = logLines.join("\n");
+    if (atBottom || !appendOnly) content.scrollTop = content.scrollHeight;
+  };
+  if (title) title.textContent = `Service Log: ${name}`;
+  if (content) content.textContent = "";
+  if (modal) modal.classList.add("show");
+
+  const source = new EventSource(`/api/services/${encodeURIComponent(name)}/log/stream?lines=200`);
+  serviceLogSource = source;
+  let opened = false;
+  source.addEventListener("lines", (evt) => {
+    const data = JSON.parse(evt.data);
+    if (data.path && title) title.textContent = `Service Log: ${name} (${data.path})`;
+    logLines = logLines.concat(data.lines || []);
+    if (logLines.length > SERVICE_LOG_MAX_LINES) logLines = logLines.slice(-SERVICE_LOG_MAX_LINES);
+    render(opened);
+    opened = true;
+  });
+  source.addEventListener("reset", () => {
+    logLines.push("--- log rotated or truncated ---");
+    render(true);
+  });
+  source.addEventListener("error", (evt) => {
+    if (evt.data) {
+      try {
+        logLines.push(JSON.parse(evt.data).detail || "Log stream error");
+      } catch (_) {}
+      render(true);
+    }
+    if (!opened) {
+      stopServiceLogStream();
+      if (modal) modal.classList.remove("show");
+      alert("Failed to load log");
+    }
+  });
 };
 
 window.openServiceTensorBoard = async function (name) {
@@ -374,6 +445,7 @@ window.closeServiceLog = function (evt) {
     const isCloseBtn = t.classList && t.classList.contains("modal-close");
     if (!isBackdrop && !isCloseBtn) return;
   }
+  stopServiceLogStream();
   const modal = document.getElementById("svc-log-modal");
   if (modal) modal.classList.remove("show");
 };
@@ -1,4 +1,8 @@
 let tpLogTimer = null;
+let tpLogLines = [];
+let tpLogSeq = null;
+let tpLogEpoch = null;
+const TP_LOG_MAX_LINES = 2000;
 
 window.initTrainpilot = function () {
   bindTpControls();
@@ -203,6 +207,12 @@ async function ensureTrainpilotModelsPresent(tomlPath) {
     await fetchJson(`/api/models/${encodeURIComponent(modelName)}/pull/start`, { method: "POST" });
     while (true) {
       const st = await fetchJson(`/api/models/${encodeURIComponent(modelName)}/pull/status`);
+      if (st && st.state === "queued") {
+        const pos = st.queue_position ? ` (#${st.queue_position})` : "";
+        setModelDownloadUI(null, `${prefix} Queued ${modelName}${pos}…`);
+        await new Promise(r => setTimeout(r, 1000));
+        continue;
+      }
       if (st && st.state === "running") {
         const pct = (typeof st.progress_pct === "number") ? st.progress_pct : null;
         const label = st.last_line ? `${prefix} ${st.last_line}` : `${prefix} Downloading ${modelName}…`;
@@ -360,14 +370,24 @@ function startTpLogPoll() {
     const status = document.getElementById("tp-status");
     if (!pre) return;
     try {
-      const response = await fetch("/api/trainpilot/logs?limit=500");
+      const cursor = tpLogSeq === null ? "" : `&since=${tpLogSeq}&epoch=${encodeURIComponent(tpLogEpoch || "")}`;
+      const response = await fetch(`/api/trainpilot/logs?limit=500${cursor}`);
       if (!response.ok) {
         console.error("TrainPilot logs endpoint returned:", response.status, response.statusText);
         pre.textContent = `Error loading logs: ${response.status} ${response.statusText}`;
         return;
       }
       const data = await response.json();
-      const lines = data.lines || [];
+      // With a cursor only new lines come back; a snapshot (first poll or reset) replaces the buffer.
+      if (tpLogSeq === null || data.reset) {
+        tpLogLines = data.lines || [];
+      } else {
+        tpLogLines = tpLogLines.concat(data.lines || []);
+        if (tpLogLines.length > TP_LOG_MAX_LINES) tpLogLines = tpLogLines.slice(-TP_LOG_MAX_LINES);
+      }
+      if (typeof data.seq === "number") tpLogSeq = data.seq;
+      tpLogEpoch = data.epoch || null;
+      const lines = tpLogLines;
       const running = data.running === true;
       const finished = lines.some(line => line.includes('=== Training finished'));
       const progress = findLatestProgress(lines);
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""Latency / throughput benchmark for the Portal's hot read endpoints.
+
+Builds a synthetic workspace (N datasets x M images, a models manifest,
+MediaPilot outputs and fake ``nvidia-smi`` / ``supervisorctl`` / ``du`` on
+PATH), then drives the Portal app with concurrent GET requests:
+
+- ``inprocess``: one worker process per endpoint imports the app and calls it
+  through ``httpx.ASGITransport``; peak RSS is that process's ``ru_maxrss``.
+- ``http``: one ``uvicorn`` server per endpoint; peak RSS is the server's
+  ``VmHWM``.
+
+Results are written as JSON (``--output``) and can be checked against an
+earlier run (``--compare``); the exit code is 1 when an endpoint regressed.
+"""
+import argparse
+import asyncio
+import binascii
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PORTAL_DIR = REPO_ROOT / "apps" / "Portal"
+MEDIAPILOT_DIR = REPO_ROOT / "apps" / "MediaPilot"
+RESULT_VERSION = 1
+MODES = ("inprocess", "http")
+ENDPOINTS = {
+    "telemetry": "/api/telemetry",
+    "models": "/api/models",
+    "datasets": "/api/datasets",
+    "tagpilot_load": "/api/tagpilot/load?name=bench_000",
+    "services": "/api/services",
+    "mediapilot_images": "/mediapilot/images?limit=50",
+}
+# Mirrors SERVICE_LOGS in apps/Portal/app.py; the supervisorctl shim reports these.
+SERVICE_NAMES = ("jupyter", "code-server", "comfy", "kohya", "diffpipe", "invoke", "ai-toolkit", "controlpilot", "copilot")
+WORKLOAD_KEYS = ("datasets", "images", "models", "image_size", "requests", "concurrency", "warmup")
+SERVER_READY_TIMEOUT = 60
+SERVER_READY_PATH = "/api/settings/auth/status"
+MIN_RSS_DELTA_BYTES = 16 * 1024 * 1024
+
+
+def make_png(width: int, height: int) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        crc = binascii.crc32(kind + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+    rows = []
+    for y in range(height):
+        pixels = bytearray()
+        for x in range(width):
+            pixels.extend(((40 + x * 4) % 256, (80 + y * 4) % 256, 160))
+        rows.append(b"\x00" + bytes(pixels))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"".join(rows)))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _write_shim(bin_dir: Path, name: str, body: str) -> None:
+    path = bin_dir / name
+    path.write_text("#!/bin/sh\n" + body, encoding="utf-8")
+    path.chmod(0o755)
+
+
+def build_workspace(root: Path, *, datasets: int, images: int, models: int, image_size: int) -> dict[str, str]:
+    """Populate ``root`` and return the environment overrides that point the Portal at it."""
+    workspace = root / "workspace"
+    bin_dir = root / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    png = make_png(image_size, image_size)
+
+    for d in range(datasets):
+        dataset_dir = workspace / "datasets" / f"1_bench_{d:03}"
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(images):
+            (dataset_dir / f"img_{i:04}.png").write_bytes(png)
+            (dataset_dir / f"img_{i:04}.txt").write_text(f"bench, sample {i}, dataset {d}", encoding="utf-8")
+
+    outputs = workspace / "outputs" / "comfy"
+    outputs.mkdir(parents=True, exist_ok=True)
+    for i in range(images):
+        path = outputs / f"ComfyUI_{i:05}_.png"
+        path.write_bytes(png)
+        os.utime(path, (1_700_000_000 + i, 1_700_000_000 + i))
+
+    manifest = workspace / "config" / "models.manifest"
+    manifest.parent.mkdir(parents=True, exist_ok=True)
+    subdirs = ("checkpoints", "loras", "vae", "text_encoders")
+    lines = ["# name|kind|source|subdir|include|size"]
+    for m in range(models):
+        subdir = subdirs[m % len(subdirs)]
+        filename = f"bench-model-{m:04}.safetensors"
+        lines.append(f"bench-model-{m:04}|hf_file|bench/repo-{m:04}:{filename}|{subdir}||2GB")
+        if m % 2 == 0:
+            # Installed models are sparse files so sizes look real without using disk.
+            target = workspace / "models" / subdir / filename
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with target.open("wb") as f:
+                f.truncate(2 * 1024**3)
+    manifest.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    if MEDIAPILOT_DIR.is_dir():
+        # The Portal mounts MediaPilot from <workspace>/apps/MediaPilot and may write a .env there.
+        shutil.copytree(
+            MEDIAPILOT_DIR,
+            workspace / "apps" / "MediaPilot",
+            ignore=shutil.ignore_patterns("__pycache__", "data", ".env"),
+            dirs_exist_ok=True,
+        )
+
+    gpu_lines = "\n".join(f"{g}, NVIDIA Bench GPU {g}, {20 + g}, {10 + g}, 10240, 24576" for g in range(2))
+    _write_shim(bin_dir, "nvidia-smi", f"cat <<'EOF'\n{gpu_lines}\nEOF\n")
+    status_lines = "\n".join(
+        f"{name:<33}RUNNING   pid {100 + i}, uptime 1:02:03" if i % 3 else f"{name:<33}STOPPED   Not started"
+        for i, name in enumerate(SERVICE_NAMES)
+    )
+    _write_shim(
+        bin_dir,
+        "supervisorctl",
+        f'if [ "$1" = "status" ]; then\ncat <<\'EOF\'\n{status_lines}\nEOF\nfi\nexit 0\n',
+    )
+    _write_shim(bin_dir, "du", 'eval "last=\\${$#}"\nprintf "123456789\\t%s\\n" "$last"\n')
+
+    return {
+        "WORKSPACE_ROOT": str(workspace),
+        "MODELS_MANIFEST": str(manifest),
+        "DEFAULT_MODELS_MANIFEST": str(manifest),
+        "SUPERVISOR_SOCKET_PATH": str(root / "supervisor.sock"),
+        "MEDIAPILOT_ACCESS_PASSWORD": "",
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+    }
+
+
+def percentile(sorted_values: list[float], pct: float) -> Optional[float]:
+    """Linear interpolation between the closest ranks (same as services.job_history)."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = int(pos), min(int(pos) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(latencies: list[float], wall_seconds: float, errors: int) -> dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        "throughput_rps": round(len(ordered) / wall_seconds, 2) if wall_seconds > 0 else None,
+    }
+
+
+async def drive(client, path: str, *, requests: int, concurrency: int, warmup: int) -> dict[str, Any]:
+    """Warm up, then issue ``requests`` GETs from ``concurrency`` concurrent callers."""
+    for _ in range(max(1, warmup)):
+        res = await client.get(path)
+        if res.status_code == 404 and path.startswith("/mediapilot/"):
+            return {"skipped": "MediaPilot is not mounted (its dependencies are probably missing)"}
+        if res.status_code >= 400:
+            return {"failed": f"HTTP {res.status_code}: {res.text[:200]}"}
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def caller() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            res = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if res.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(max(1, concurrency))))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def _peak_rss_self() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _peak_rss_pid(pid: int) -> Optional[int]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def run_worker(args: argparse.Namespace) -> int:
+    """Child process for ``inprocess`` mode: import the app, load one endpoint, write the result."""
+    import httpx
+
+    sys.path.insert(0, str(REPO_ROOT))
+    from apps.Portal import app as portal_app
+
+    import_rss = _peak_rss_self()
+
+    async def main() -> dict[str, Any]:
+        transport = httpx.ASGITransport(app=portal_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(
+                client, ENDPOINTS[args.endpoint], requests=args.requests, concurrency=args.concurrency, warmup=args.warmup
+            )
+
+    result = asyncio.run(main())
+    if "requests" in result:
+        result.update(peak_rss_bytes=_peak_rss_self(), import_rss_bytes=import_rss)
+    Path(args.result_file).write_text(json.dumps(result), encoding="utf-8")
+    return 0
+
+
+def _run_inprocess(endpoint: str, args: argparse.Namespace, env: dict[str, str], scratch: Path) -> dict[str, Any]:
+    result_file = scratch / f"inprocess-{endpoint}.json"
+    log_file = scratch / f"inprocess-{endpoint}.log"
+    cmd = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "_worker",
+        "--endpoint",
+        endpoint,
+        "--requests",
+        str(args.requests),
+        "--concurrency",
+        str(args.concurrency),
+        "--warmup",
+        str(args.warmup),
+        "--result-file",
+        str(result_file),
+    ]
+    with log_file.open("wb") as log:
+        proc = subprocess.run(cmd, env=env, cwd=str(scratch), stdout=log, stderr=subprocess.STDOUT)
+    if proc.returncode != 0 or not result_file.exists():
+        return {"failed": f"worker exited with {proc.returncode}: {_tail(log_file)}"}
+    return json.loads(result_file.read_text(encoding="utf-8"))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _tail(path: Path, lines: int = 5) -> str:
+    try:
+        return " | ".join(path.read_text(encoding="utf-8", errors="replace").strip().splitlines()[-lines:])
+    except OSError:
+        return ""
+
+
+def _run_http(endpoint: str, args: argparse.Namespace, env: dict[str, str], scratch: Path) -> dict[str, Any]:
+    import httpx
+
+    port = _free_port()
+    log_file = scratch / f"http-{endpoint}.log"
+    cmd = [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", str(PORTAL_DIR), "--host", "127.0.0.1", "--port", str(port)]
+    with log_file.open("wb") as log:
+        server = subprocess.Popen(cmd, env=env, cwd=str(scratch), stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + SERVER_READY_TIMEOUT
+        while True:
+            if server.poll() is not None:
+                return {"failed": f"uvicorn exited with {server.returncode}: {_tail(log_file)}"}
+            try:
+                if httpx.get(base_url + SERVER_READY_PATH, timeout=1.0).status_code < 500:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                return {"failed": f"uvicorn did not become ready within {SERVER_READY_TIMEOUT}s"}
+            time.sleep(0.1)
+
+        async def main() -> dict[str, Any]:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+                return await drive(
+                    client, ENDPOINTS[endpoint], requests=args.requests, concurrency=args.concurrency, warmup=args.warmup
+                )
+
+        result = asyncio.run(main())
+        if "requests" in result:
+            result["peak_rss_bytes"] = _peak_rss_pid(server.pid)
+        return result
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def _mode_unavailable(mode: str) -> Optional[str]:
+    import importlib.util
+
+    if importlib.util.find_spec("httpx") is None:
+        return "httpx is not installed"
+    if mode == "http" and importlib.util.find_spec("uvicorn") is None:
+        return "uvicorn is not installed"
+    return None
+
+
+def run_benchmarks(args: argparse.Namespace, env_overrides: dict[str, str], scratch: Path) -> dict[str, Any]:
+    env = {**os.environ, **env_overrides}
+    report: dict[str, Any] = {
+        "version": RESULT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "workload": {key: getattr(args, key) for key in WORKLOAD_KEYS},
+        "results": {},
+        "skipped": {},
+        "failed": {},
+    }
+    runners = {"inprocess": _run_inprocess, "http": _run_http}
+    for mode in args.modes:
+        reason = _mode_unavailable(mode)
+        if reason:
+            report["skipped"][mode] = reason
+            print(f"[{mode}] skipped: {reason}", file=sys.stderr)
+            continue
+        for endpoint in args.endpoints:
+            result = runners[mode](endpoint, args, env, scratch)
+            key = f"{mode}/{endpoint}"
+            if "skipped" in result:
+                report["skipped"][key] = result["skipped"]
+                print(f"[{key}] skipped: {result['skipped']}", file=sys.stderr)
+            elif "failed" in result:
+                report["failed"][key] = result["failed"]
+                print(f"[{key}] failed: {result['failed']}", file=sys.stderr)
+            else:
+                report["results"].setdefault(mode, {})[endpoint] = result
+                print(format_result(key, result), file=sys.stderr)
+    return report
+
+
+def format_result(key: str, result: dict[str, Any]) -> str:
+    rss = result.get("peak_rss_bytes")
+    rss_text = f"{rss / 1024**2:.0f}MiB" if rss else "n/a"
+    return (
+        f"[{key}] p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+        f"{result['throughput_rps']}req/s errors={result['errors']} peak_rss={rss_text}"
+    )
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    *,
+    tolerance: float,
+    min_delta_ms: float,
+    rss_tolerance: float,
+) -> list[str]:
+    """Regressions of ``current`` against ``baseline``, one human-readable line each."""
+    problems: list[str] = []
+    for mode, endpoints in (baseline.get("results") or {}).items():
+        for endpoint, base in endpoints.items():
+            key = f"{mode}/{endpoint}"
+            cur = (current.get("results") or {}).get(mode, {}).get(endpoint)
+            if cur is None:
+                reason = current.get("failed", {}).get(key) or current.get("skipped", {}).get(key) or current.get("skipped", {}).get(mode)
+                problems.append(f"{key}: not measured ({reason or 'not selected'})")
+                continue
+            if cur["errors"] and not base["errors"]:
+                problems.append(f"{key}: {cur['errors']} failed request(s)")
+            for stat in ("p50_ms", "p95_ms", "p99_ms"):
+                before, after = base.get(stat), cur.get(stat)
+                if before is None or after is None:
+                    continue
+                if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                    problems.append(f"{key}: {stat} {before} -> {after}")
+            before, after = base.get("throughput_rps"), cur.get("throughput_rps")
+            if before and after and after < before / (1 + tolerance):
+                problems.append(f"{key}: throughput_rps {before} -> {after}")
+            before, after = base.get("peak_rss_bytes"), cur.get("peak_rss_bytes")
+            if before and after and after > before * (1 + rss_tolerance) and after - before > MIN_RSS_DELTA_BYTES:
+                problems.append(f"{key}: peak_rss_bytes {before} -> {after}")
+    return problems
+
+
+def _csv(value: str, allowed) -> list[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown value(s): {', '.join(unknown)} (choose from {', '.join(allowed)})")
+    return items
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["_worker"]:
+        parser = argparse.ArgumentParser(prog="portal-bench.py _worker")
+        parser.add_argument("--endpoint", required=True, choices=sorted(ENDPOINTS))
+        parser.add_argument("--requests", type=int, required=True)
+        parser.add_argument("--concurrency", type=int, required=True)
+        parser.add_argument("--warmup", type=int, required=True)
+        parser.add_argument("--result-file", required=True)
+        args = parser.parse_args(argv[1:])
+        args.worker = True
+        return args
+
+    parser = argparse.ArgumentParser(description="Benchmark Portal API hot endpoints against a synthetic workspace.")
+    parser.add_argument("--datasets", type=int, default=20, help="Synthetic datasets (default: 20)")
+    parser.add_argument("--images", type=int, default=50, help="Images per dataset and in MediaPilot outputs (default: 50)")
+    parser.add_argument("--models", type=int, default=200, help="Manifest entries, half of them installed (default: 200)")
+    parser.add_argument("--image-size", type=int, default=64, help="Synthetic image edge in pixels (default: 64)")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers (default: 8)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each run (default: 5)")
+    parser.add_argument("--modes", type=lambda v: _csv(v, MODES), default=list(MODES), help="inprocess,http")
+    parser.add_argument(
+        "--endpoints",
+        type=lambda v: _csv(v, tuple(ENDPOINTS)),
+        default=list(ENDPOINTS),
+        help=",".join(ENDPOINTS),
+    )
+    parser.add_argument("--workspace", help="Build the synthetic workspace here and keep it (default: a temp dir)")
+    parser.add_argument("--output", help="Write the results JSON here (use it as a baseline later)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed latency/throughput change (default: 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore latency changes below this (default: 2.0)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25, help="Allowed peak RSS growth (default: 0.25)")
+    args = parser.parse_args(argv)
+    args.worker = False
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        return run_worker(args)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("version") != RESULT_VERSION:
+            print(f"Baseline {args.compare} has an unsupported format", file=sys.stderr)
+            return 2
+        workload = {key: getattr(args, key) for key in WORKLOAD_KEYS}
+        if baseline.get("workload") != workload:
+            print(f"Baseline workload {baseline.get('workload')} does not match this run {workload}", file=sys.stderr)
+            return 2
+
+    with tempfile.TemporaryDirectory(prefix="portal-bench-") as tmp:
+        root = Path(args.workspace) if args.workspace else Path(tmp)
+        env = build_workspace(
+            root, datasets=args.datasets, images=args.images, models=args.models, image_size=args.image_size
+        )
+        report = run_benchmarks(args, env, Path(tmp))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if report["failed"]:
+        return 1
+    if baseline is not None:
+        problems = compare(
+            baseline,
+            report,
+            tolerance=args.tolerance,
+            min_delta_ms=args.min_delta_ms,
+            rss_tolerance=args.rss_tolerance,
+        )
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
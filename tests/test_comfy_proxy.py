@@ -0,0 +1,212 @@
+import asyncio
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+try:
+    from starlette.requests import Request
+
+    from apps.Portal.services import comfy as comfy_service
+except ModuleNotFoundError as exc:
+    if exc.name in ("fastapi", "starlette", "websockets"):
+        comfy_service = None
+    else:
+        raise
+
+
+class _Upstream:
+    """Stand-in for ComfyUI: records requests and the client port of each connection."""
+
+    def __init__(self):
+        self.blob = os.urandom(200_000)
+        self.release = threading.Event()
+        self.requests = []
+        self.ports = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _record(self, body=b""):
+                upstream.requests.append((self.command, self.path, dict(self.headers), body))
+                upstream.ports.append(self.client_address[1])
+
+            def do_HEAD(self):
+                self._record()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(upstream.blob)))
+                self.end_headers()
+
+            def do_GET(self):
+                self._record()
+                if self.path.startswith("/view"):
+                    rng = self.headers.get("Range")
+                    body = upstream.blob
+                    if rng:
+                        start, end = (int(x) for x in rng.split("=", 1)[1].split("-"))
+                        body = body[start : end + 1]
+                        self.send_response(206)
+                        self.send_header("Content-Range", f"bytes {start}-{end}/{len(upstream.blob)}")
+                    else:
+                        self.send_response(200)
+                    self.send_header("Content-Type", "image/png")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Connection", "keep-alive, X-Hop")
+                    self.send_header("X-Hop", "secret")
+                    self.send_header("Set-Cookie", "a=1")
+                    self.send_header("Set-Cookie", "b=2")
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.path.startswith("/slow"):
+                    self.send_response(200)
+                    self.send_header("Content-Length", "8")
+                    self.end_headers()
+                    self.wfile.write(b"head")
+                    self.wfile.flush()
+                    upstream.release.wait(10)
+                    self.wfile.write(b"tail")
+                else:
+                    body = gzip.compress(b'{"models": []}')
+                    self.send_response(200)
+                    self.send_header("Content-Encoding", "gzip")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._record(body)
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.release.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _request(method, path, query="", headers=(), body=b""):
+    chunks = [body[i : i + 4096] for i in range(0, len(body), 4096)] or [b""]
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": f"/proxy/comfy/{path}",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"portal")] + [(k.lower().encode(), v.encode()) for k, v in headers],
+    }
+    return Request(scope, receive)
+
+
+@unittest.skipIf(comfy_service is None, "FastAPI is not installed in this test environment")
+class ComfyProxyTests(unittest.TestCase):
+    def setUp(self):
+        self.upstream = _Upstream()
+        self.addCleanup(self.upstream.close)
+        patcher = patch.dict(os.environ, {"COMFY_PORT": str(self.upstream.port)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.router = comfy_service.create_router(Path(self.tmp.name))
+        route = next(r for r in self.router.routes if getattr(r, "path", "") == "/proxy/comfy/{path:path}")
+        self.proxy = route.endpoint
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.addCleanup(self._shutdown)
+
+    def _shutdown(self):
+        for handler in self.router.on_shutdown:
+            result = handler()
+            if asyncio.iscoroutine(result):
+                self.loop.run_until_complete(result)
+
+    def _call(self, *args, **kwargs):
+        async def run():
+            response = await self.proxy(_request(*args, **kwargs), args[1])
+            body = b""
+            if hasattr(response, "body_iterator"):
+                async for chunk in response.body_iterator:
+                    body += chunk
+            else:
+                body = response.body
+            return response, body
+
+        return self.loop.run_until_complete(run())
+
+    def _headers(self, response):
+        return [(k.decode(), v.decode()) for k, v in response.raw_headers]
+
+    def test_streams_body_and_filters_hop_by_hop_headers(self):
+        response, body = self._call("GET", "view", query="filename=a.png")
+
+        self.assertEqual((response.status_code, body), (200, self.upstream.blob))
+        headers = self._headers(response)
+        names = [k.lower() for k, _ in headers]
+        self.assertNotIn("connection", names)
+        self.assertNotIn("x-hop", names)
+        self.assertIn(("content-length", str(len(self.upstream.blob))), [(k.lower(), v) for k, v in headers])
+        self.assertEqual([v for k, v in headers if k.lower() == "set-cookie"], ["a=1", "b=2"])
+        self.assertEqual(self.upstream.requests[0][1], "/view?filename=a.png")
+        self.assertNotEqual(self.upstream.requests[0][2].get("Host"), "portal")
+
+    def test_range_requests_pass_through(self):
+        response, body = self._call("GET", "view", headers=[("Range", "bytes=10-19")])
+        self.assertEqual((response.status_code, body), (206, self.upstream.blob[10:20]))
+        self.assertIn(("content-range", f"bytes 10-19/{len(self.upstream.blob)}"), [(k.lower(), v) for k, v in self._headers(response)])
+
+    def test_encoded_bodies_are_not_decoded(self):
+        response, body = self._call("GET", "object_info", headers=[("Accept-Encoding", "gzip")])
+        self.assertEqual(gzip.decompress(body), b'{"models": []}')
+        self.assertIn(("content-encoding", "gzip"), [(k.lower(), v) for k, v in self._headers(response)])
+
+    def test_post_body_is_forwarded_and_connections_are_reused(self):
+        payload = b'{"prompt": {}}' * 1000
+        response, body = self._call("POST", "prompt", headers=[("Content-Length", str(len(payload)))], body=payload)
+        self.assertEqual((response.status_code, body), (200, b"ok"))
+        self.assertEqual(self.upstream.requests[-1][3], payload)
+
+        self._call("HEAD", "view")
+        self._call("GET", "view")
+        self.assertEqual(len(set(self.upstream.ports)), 1)
+
+    def test_first_chunk_is_sent_before_upstream_finishes(self):
+        async def run():
+            response = await self.proxy(_request("GET", "slow"), "slow")
+            first = await response.body_iterator.__anext__()
+            self.upstream.release.set()
+            rest = b"".join([chunk async for chunk in response.body_iterator])
+            return first, rest
+
+        first, rest = self.loop.run_until_complete(asyncio.wait_for(run(), 10))
+        self.assertEqual((first, rest), (b"head", b"tail"))
+
+    def test_unreachable_upstream_is_a_bad_gateway(self):
+        self.upstream.close()
+        with self.assertLogs(comfy_service.logger, "ERROR"):
+            response, body = self._call("GET", "view")
+        self.assertEqual(response.status_code, 502)
+
+
+if __name__ == "__main__":
+    unittest.main()
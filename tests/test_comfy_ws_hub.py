@@ -0,0 +1,158 @@
+import asyncio
+import unittest
+
+try:
+    from websockets.asyncio.server import serve
+
+    from apps.Portal.services import comfy as comfy_service
+except ModuleNotFoundError as exc:
+    if exc.name in ("fastapi", "starlette", "websockets"):
+        comfy_service = None
+    else:
+        raise
+
+
+class _Upstream:
+    """Stand-in for ComfyUI's websocket: counts connections and can broadcast or drop them."""
+
+    def __init__(self):
+        self.connections = set()
+        self.opened = 0
+        self.received = []
+        self.server = None
+
+    async def handler(self, ws):
+        self.opened += 1
+        self.connections.add(ws)
+        try:
+            async for message in ws:
+                self.received.append(message)
+        finally:
+            self.connections.discard(ws)
+
+    async def start(self):
+        self.server = await serve(self.handler, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def broadcast(self, message):
+        for ws in list(self.connections):
+            await ws.send(message)
+
+    async def drop_all(self):
+        for ws in list(self.connections):
+            await ws.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+@unittest.skipIf(comfy_service is None, "FastAPI is not installed in this test environment")
+class ComfyHubTests(unittest.TestCase):
+    def _run(self, scenario, **hub_kwargs):
+        async def main():
+            upstream = _Upstream()
+            await upstream.start()
+            hub = comfy_service.ComfyHub(lambda: f"ws://127.0.0.1:{upstream.port}/ws", **hub_kwargs)
+            try:
+                await asyncio.wait_for(scenario(upstream, hub), 10)
+            finally:
+                await hub.close()
+                await upstream.stop()
+
+        asyncio.run(main())
+
+    def test_subscribers_share_one_upstream_and_get_text_and_binary(self):
+        async def scenario(upstream, hub):
+            subs = [hub.subscribe() for _ in range(5)]
+            await _until(lambda: upstream.connections and hub.stats()["connected"])
+            frame = b"\x00\x00\x00\x01\x00\x00\x00\x02" + b"png"
+            await upstream.broadcast('{"type": "status"}')
+            await upstream.broadcast(frame)
+            for sub in subs:
+                self.assertEqual(await sub.get(), '{"type": "status"}')
+                self.assertEqual(await sub.get(), frame)
+            self.assertEqual(upstream.opened, 1)
+            self.assertEqual(hub.stats()["subscribers"], 5)
+
+            self.assertTrue(await hub.send('{"type": "ping"}'))
+            await _until(lambda: upstream.received)
+            self.assertEqual(upstream.received, ['{"type": "ping"}'])
+
+        self._run(scenario)
+
+    def test_slow_subscriber_drops_oldest_frames(self):
+        async def scenario(upstream, hub):
+            slow = hub.subscribe()
+            await _until(lambda: hub.stats()["connected"])
+            for i in range(10):
+                await upstream.broadcast(str(i))
+            await _until(lambda: len(slow.frames) == 4 and slow.frames[-1] == "9")
+            self.assertEqual([await slow.get() for _ in range(4)], ["6", "7", "8", "9"])
+            self.assertEqual(hub.stats()["dropped_frames"], 6)
+
+        self._run(scenario, queue_size=4)
+
+    def test_slow_subscriber_queue_is_bounded_by_bytes(self):
+        async def scenario(upstream, hub):
+            slow = hub.subscribe()
+            await _until(lambda: hub.stats()["connected"])
+            for i in range(5):
+                await upstream.broadcast(bytes([i]) * 400)
+            await _until(lambda: slow.frames and slow.frames[-1][0] == 4)
+            self.assertEqual((len(slow.frames), slow.bytes), (2, 800))
+            self.assertEqual([(await slow.get())[0] for _ in range(2)], [3, 4])
+            self.assertEqual(slow.bytes, 0)
+
+            await upstream.broadcast(b"x" * 2000)  # larger than the budget on its own
+            self.assertEqual(len(await slow.get()), 2000)
+
+        self._run(scenario, queue_bytes=1000)
+
+    def test_reconnects_after_upstream_drops(self):
+        async def scenario(upstream, hub):
+            sub = hub.subscribe()
+            await _until(lambda: hub.stats()["connected"])
+            await upstream.drop_all()
+            await _until(lambda: upstream.opened == 2 and hub.stats()["connected"])
+            await upstream.broadcast("after")
+            self.assertEqual(await sub.get(), "after")
+            self.assertEqual(hub.stats()["connects"], 2)
+
+        self._run(scenario, backoff_initial=0.05)
+
+    def test_outage_is_reported_once_and_upstream_closes_when_idle(self):
+        async def scenario(upstream, hub):
+            await upstream.stop()
+            sub = hub.subscribe()
+            with self.assertLogs(comfy_service.logger, "WARNING"):
+                self.assertEqual(await sub.get(), comfy_service._HUB_UNAVAILABLE)
+            await asyncio.sleep(0.1)
+            self.assertFalse(sub.frames)
+            self.assertFalse(await hub.send("x"))
+
+            # A tab opened during the outage learns about it too.
+            late = hub.subscribe()
+            self.assertEqual(await late.get(), comfy_service._HUB_UNAVAILABLE)
+            hub.unsubscribe(late)
+
+            await upstream.start()
+            await _until(lambda: hub.stats()["connected"], timeout=5)
+            hub.unsubscribe(sub)
+            self.assertIsNone(await sub.get())
+            await _until(lambda: not upstream.connections)
+            self.assertFalse(hub.stats()["connected"])
+
+        self._run(scenario, backoff_initial=0.02, backoff_max=0.05, idle_close=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
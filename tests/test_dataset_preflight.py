@@ -0,0 +1,191 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import dataset_preflight as preflight_service
+
+try:
+    from fastapi import HTTPException
+
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _png(width: int, height: int) -> bytes:
+    # Header, IHDR and IEND are all the analyzer reads; pixel data is never decoded.
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", b"") + _chunk(b"IEND", b"")
+
+
+def _dataset(root: Path, images: dict, captions: dict) -> Path:
+    root.mkdir(parents=True, exist_ok=True)
+    for name, data in images.items():
+        (root / name).write_bytes(data)
+    for name, text in captions.items():
+        (root / name).write_text(text)
+    return root
+
+
+class BucketSpecTests(unittest.TestCase):
+    def test_diffusion_pipe_buckets(self):
+        spec = preflight_service.BucketSpec.diffusion_pipe([512, [768, 512]], min_ar=0.5, max_ar=2.0, num_ar_buckets=5)
+        labels = [label for label, _ in spec.groups]
+        self.assertEqual(labels, ["512", "768x512"])
+        sizes = spec.groups[0][1]
+        self.assertEqual(len(sizes), 5)
+        self.assertIn((512, 512), sizes)
+        self.assertEqual((sizes[0], sizes[-1]), ((368, 720), (720, 368)))
+        self.assertTrue(all(w % 16 == 0 and h % 16 == 0 for w, h in sizes))
+        self.assertAlmostEqual(spec.min_ar, 0.5)
+
+        square_only = preflight_service.BucketSpec.diffusion_pipe([512], enable_ar_bucket=False)
+        self.assertEqual(square_only.groups, (("512", ((512, 512),)),))
+        self.assertIsNone(square_only.min_ar)
+
+    def test_kohya_buckets_from_config(self):
+        config = {
+            "resolution": "1024,1024",
+            "enable_bucket": True,
+            "min_bucket_reso": 768,
+            "max_bucket_reso": 1600,
+            "bucket_reso_steps": 64,
+            "caption_extension": ".txt",
+            "max_token_length": 225,
+        }
+        spec, caption_ext, max_tokens = preflight_service.kohya_spec_from_config(config)
+        sizes = spec.groups[0][1]
+        self.assertEqual((caption_ext, max_tokens), (".txt", 225))
+        self.assertIn((1024, 1024), sizes)
+        self.assertTrue(all(768 <= side <= 1600 and side % 64 == 0 for size in sizes for side in size))
+        self.assertTrue(all(w * h <= 1024 * 1024 for w, h in sizes))
+
+        spec, caption_ext, max_tokens = preflight_service.kohya_spec_from_config({"general": {"resolution": 512}})
+        self.assertEqual((spec.groups, caption_ext, max_tokens), ((("512x512", ((512, 512),)),), ".caption", 75))
+
+
+class PreflightAnalyzerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spec = preflight_service.BucketSpec.diffusion_pipe([512], min_ar=0.5, max_ar=2.0, num_ar_buckets=3)
+
+    def _analyzer(self, **kwargs):
+        analyzer = preflight_service.PreflightAnalyzer(**kwargs)
+        self.addCleanup(analyzer.close)
+        return analyzer
+
+    def test_report_and_cache(self):
+        root = _dataset(
+            Path(self.tmp.name) / "ds",
+            {
+                "square.png": _png(1024, 1024),
+                "wide.png": _png(1200, 600),
+                "small.png": _png(256, 256),
+                "panorama.png": _png(4000, 1000),
+                "truncated.png": _png(512, 512)[:-12],
+                "text.jpg": b"not an image",
+            },
+            {"square.txt": "a photo of sks dog", "wide.txt": "word " * 100, "small.txt": ""},
+        )
+        analyzer = self._analyzer(workers=1)
+        report = analyzer.analyze(root, self.spec, max_tokens=75)
+
+        self.assertFalse(report["ok"])
+        self.assertEqual(report["errors"], ["1 corrupt or unreadable image(s)"])
+        self.assertEqual([c["path"] for c in report["corrupt"]], ["text.jpg"])
+        self.assertEqual([s["path"] for s in report["suspect"]], ["truncated.png"])
+        self.assertIn("1 image(s) may be truncated (no end-of-image marker)", report["warnings"])
+        self.assertEqual((report["images"], report["valid_images"]), (6, 5))
+        self.assertEqual((report["missing_captions"], report["empty_captions"]), (3, 1))
+        self.assertEqual(report["tokens"]["over_limit_examples"], ["wide.png"])
+        self.assertEqual(report["aspect_ratio"]["out_of_range"], 1)
+        group = report["buckets"][0]
+        self.assertEqual([b["count"] for b in group["buckets"]], [0, 3, 2])
+        self.assertEqual(group["upscaled"], 1)
+        self.assertEqual(report["probed"], 6)
+
+        again = analyzer.analyze(root, self.spec, max_tokens=75)
+        self.assertEqual((again["probed"], again["cached"]), (0, 6))
+        (root / "small.txt").write_text("now captioned")
+        os.utime(root / "small.txt", (1, 1))
+        self.assertEqual(analyzer.analyze(root, self.spec)["probed"], 1)
+
+    def test_trailing_data_after_end_marker_is_not_an_error(self):
+        jpeg = b"\xff\xd8\xff\xc0\x00\x11\x08\x00\x40\x00\x40\x03" + b"\x00" * 9 + b"\xff\xd9"
+        root = _dataset(Path(self.tmp.name) / "motion", {"a.jpg": jpeg + b"\x00" * 200, "b.png": _png(512, 512) + b"\x00" * 200}, {})
+        report = self._analyzer(workers=1).analyze(root, self.spec)
+        self.assertTrue(report["ok"])
+        self.assertEqual((report["valid_images"], report["corrupt_count"], report["suspect_count"]), (2, 0, 2))
+
+    def test_empty_dataset_fails(self):
+        root = _dataset(Path(self.tmp.name) / "empty", {}, {"orphan.txt": "caption"})
+        report = self._analyzer(workers=1).analyze(root, self.spec)
+        self.assertEqual(report["errors"], ["No images found in dataset"])
+
+    def test_process_pool_matches_inline(self):
+        images = {f"img{i:03}.png": _png(512 + 16 * (i % 7), 512) for i in range(150)}
+        root = _dataset(Path(self.tmp.name) / "big", images, {})
+        pool_analyzer = self._analyzer(workers=2)
+        pooled = pool_analyzer.analyze(root, self.spec)
+        self.assertIsNotNone(pool_analyzer._pool)
+        inline = self._analyzer(workers=1).analyze(root, self.spec)
+        for key in ("images", "valid_images", "buckets", "aspect_ratio", "resolution"):
+            self.assertEqual(pooled[key], inline[key], key)
+        self.assertTrue(pooled["ok"])
+
+
+class PreflightEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        workspace = Path(self.tmp.name)
+        _dataset(workspace / "datasets" / "1_dogs", {"a.png": _png(512, 512)}, {"a.txt": "dog"})
+        _dataset(workspace / "datasets" / "1_broken", {"a.png": b"junk"}, {})
+        toml = workspace / "lora.toml"
+        toml.write_text('resolution = "512,512"\nenable_bucket = true\nmin_bucket_reso = 256\nmax_bucket_reso = 1024\ncaption_extension = ".txt"\n')
+        self.toml = toml
+        analyzer = preflight_service.PreflightAnalyzer(workers=1)
+        for patcher in (
+            patch.object(portal_app, "_DATASET_ROOT", workspace / "datasets"),
+            patch.object(portal_app, "WORKSPACE_ROOT", workspace),
+            patch.object(portal_app, "_dataset_preflight", analyzer),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_preflight_endpoint_with_diffusion_pipe_and_toml_settings(self):
+        report = portal_app.dataset_preflight("dogs", portal_app.DatasetPreflightRequest(resolutions=[512]))
+        self.assertTrue(report["ok"])
+        self.assertEqual(report["buckets"][0]["resolution"], "512")
+
+        report = portal_app.dataset_preflight("1_dogs", portal_app.DatasetPreflightRequest(toml_path=str(self.toml)))
+        self.assertEqual((report["ok"], report["missing_captions"]), (True, 0))
+        self.assertEqual(report["buckets"][0]["resolution"], "512x512")
+
+    def test_trainpilot_preflight_fails_fast(self):
+        with self.assertRaises(HTTPException) as ctx:
+            portal_app._trainpilot_preflight("broken", self.toml)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertIn("corrupt", ctx.exception.detail)
+        with self.assertRaises(HTTPException) as ctx:
+            portal_app._trainpilot_preflight("missing", self.toml)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertTrue(portal_app._trainpilot_preflight("dogs", self.toml)["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from apps.Portal.services import image_index as image_index_service
+from apps.Portal.services import imagemeta
+
+try:
+    from PIL import Image
+except ModuleNotFoundError:
+    Image = None
+
+try:
+    from apps.Portal.services import comfy as comfy_service
+except ModuleNotFoundError as exc:
+    if exc.name in ("fastapi", "starlette", "websockets", "httpx"):
+        comfy_service = None
+    else:
+        raise
+
+
+def _png(width=3, height=2):
+    # Signature + IHDR is all the index reads.
+    return b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + width.to_bytes(4, "big") + height.to_bytes(4, "big") + b"\x08\x02\x00\x00\x00"
+
+
+def _write(path: Path, data: bytes, mtime: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def _until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.02)
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed in this test environment")
+class ImageMetaTests(unittest.TestCase):
+    def _encode(self, fmt, size, **kwargs):
+        buf = io.BytesIO()
+        Image.new("RGB", size, (10, 20, 30)).save(buf, fmt, **kwargs)
+        return buf.getvalue()
+
+    def test_reads_dimensions_from_headers(self):
+        cases = [
+            ("PNG", {}, "png"),
+            ("JPEG", {"exif": b"Exif\x00\x00" + b"\x00" * 4000}, "jpeg"),
+            ("JPEG", {"progressive": True}, "jpeg"),
+            ("WEBP", {"lossless": True}, "webp"),
+            ("WEBP", {"quality": 50}, "webp"),
+            ("GIF", {}, "gif"),
+            ("BMP", {}, "bmp"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, (fmt, kwargs, expected) in enumerate(cases):
+                path = Path(tmp) / f"img{i}"
+                path.write_bytes(self._encode(fmt, (123, 45), **kwargs))
+                self.assertEqual(imagemeta.read_header(path), (expected, 123, 45), fmt)
+
+    def test_unknown_and_truncated_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            text = Path(tmp) / "a.png"
+            text.write_text("not an image")
+            jpeg = Path(tmp) / "b.jpg"
+            jpeg.write_bytes(self._encode("JPEG", (8, 8))[:20])
+            self.assertIsNone(imagemeta.read_header(text))
+            self.assertIsNone(imagemeta.read_header(jpeg))
+            self.assertIsNone(imagemeta.image_size(Path(tmp) / "missing.png"))
+
+
+class LatestImageIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name) / "outputs"
+        _write(self.root / "a.png", _png(1, 1), 1000)
+        _write(self.root / "sub" / "b.png", _png(640, 480), 3000)
+        _write(self.root / "sub" / "c.jpg", b"", 2000)
+        _write(self.root / "notes.txt", b"", 4000)
+
+    def _index(self, **kwargs):
+        index = image_index_service.LatestImageIndex(self.root, keep=2, **kwargs)
+        self.addCleanup(index.close)
+        return index
+
+    def test_initial_scan(self):
+        snapshot = self._index().snapshot(limit=5)
+        self.assertEqual(snapshot["count"], 3)
+        self.assertEqual([i["path"] for i in snapshot["images"]], [os.path.join("sub", "b.png"), os.path.join("sub", "c.jpg")])
+        self.assertEqual(snapshot["images"][0]["dimensions"], (640, 480))
+        self.assertIsNone(snapshot["images"][1]["dimensions"])
+
+    def test_events_update_the_index_without_rescanning(self):
+        index = self._index()
+        index.snapshot()
+        if index._watcher is None:
+            self.skipTest("inotify is not available")
+        scanned_at = index._scanned_at
+
+        version = index.snapshot()["version"]
+        _write(self.root / "new" / "d.png", _png(9, 7), 5000)
+        self.assertTrue(index.wait(version, 5))
+        _until(lambda: index.snapshot()["images"][0]["path"] == os.path.join("new", "d.png"))
+        self.assertEqual(index.snapshot()["images"][0]["dimensions"], (9, 7))
+
+        (self.root / "new" / "d.png").unlink()
+        _until(lambda: index.snapshot()["count"] == 3)
+        self.assertEqual(index.snapshot()["images"][0]["path"], os.path.join("sub", "b.png"))
+        self.assertEqual(index._scanned_at, scanned_at)
+
+    def test_directory_created_after_start_is_watched(self):
+        index = self._index()
+        index.snapshot()
+        if index._watcher is None:
+            self.skipTest("inotify is not available")
+        (self.root / "later").mkdir()
+        _write(self.root / "later" / "x.png", _png(), 6000)
+        _until(lambda: index.snapshot()["count"] == 4)
+        _write(self.root / "later" / "y.png", _png(), 7000)
+        _until(lambda: index.snapshot()["images"][0]["path"] == os.path.join("later", "y.png"))
+
+        os.rename(self.root / "later", Path(self.tmp.name) / "moved")
+        _until(lambda: index.snapshot()["count"] == 3)
+
+    def test_polling_fallback_rescans_after_interval(self):
+        index = self._index(use_inotify=False, rescan_seconds=0.05)
+        self.assertEqual(index.snapshot()["count"], 3)
+        _write(self.root / "e.png", _png(), 8000)
+        time.sleep(0.1)
+        self.assertEqual(index.snapshot()["images"][0]["path"], "e.png")
+
+    def test_missing_root(self):
+        index = image_index_service.LatestImageIndex(Path(self.tmp.name) / "missing")
+        self.addCleanup(index.close)
+        self.assertEqual(index.snapshot()["count"], 0)
+
+
+@unittest.skipIf(comfy_service is None, "FastAPI is not installed in this test environment")
+class LatestImageEndpointTests(unittest.TestCase):
+    def test_endpoint_shape(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _write(Path(tmp) / "outputs" / "comfy" / "run1" / "img.png", _png(512, 768), 1_700_000_000)
+            router = comfy_service.create_router(Path(tmp))
+            endpoint = next(r.endpoint for r in router.routes if getattr(r, "path", "") == "/api/comfy/latest-image")
+            try:
+                payload = endpoint()
+            finally:
+                for handler in router.on_shutdown:
+                    result = handler()
+                    if asyncio.iscoroutine(result):
+                        asyncio.run(result)
+
+        self.assertEqual(payload["image_count"], 1)
+        self.assertEqual(payload["image"]["url"], "/proxy/comfy/view?filename=img.png&subfolder=run1")
+        self.assertEqual(payload["image"]["dimensions"], "512x768")
+        self.assertEqual(payload["image"]["size"], len(_png()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import job_history as job_history_service
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+class JobHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "logs" / "history.sqlite3"
+
+    def _history(self, **kwargs):
+        history = job_history_service.JobHistory(self.path, **kwargs)
+        self.addCleanup(history.close)
+        return history
+
+    def test_rows_survive_a_restart_and_running_ones_become_interrupted(self):
+        history = self._history()
+        done = history.record_start("model-pull", "flux", started_at=100.0, meta={"engine": "native"})
+        history.record_finish(done, state="done", ended_at=160.0, bytes_transferred=2048, output_tail=["a", "b"])
+        history.record_start("service-update", "comfy", started_at=200.0)
+        history.close()
+
+        reopened = self._history()
+        rows = reopened.query(with_output=True)
+        self.assertEqual([(r["name"], r["state"]) for r in rows], [("comfy", "interrupted"), ("flux", "done")])
+        self.assertEqual((rows[1]["duration_seconds"], rows[1]["bytes_transferred"]), (60.0, 2048))
+        self.assertEqual((rows[1]["output_tail"], rows[1]["meta"]), (["a", "b"], {"engine": "native"}))
+        self.assertEqual([r["name"] for r in reopened.query(kind="model-pull", since=50, until=150)], ["flux"])
+
+    def test_progress_is_throttled_and_kept_when_interrupted(self):
+        history = self._history(progress_interval=5)
+        job_id = history.record_start("service-update", "comfy", started_at=100.0)
+        self.assertTrue(history.record_progress(job_id, output_tail=["fetching"], bytes_transferred=10, now=1.0))
+        self.assertFalse(history.record_progress(job_id, output_tail=["fetching", "skipped"], now=3.0))
+        self.assertTrue(history.record_progress(job_id, output_tail=["fetching", "building"], now=6.0))
+        history.close()
+
+        row = self._history().query(with_output=True)[0]
+        self.assertEqual((row["state"], row["output_tail"]), ("interrupted", ["fetching", "building"]))
+        self.assertEqual(row["bytes_transferred"], 10)
+
+    def test_queries_use_the_indexes(self):
+        history = self._history()
+        history.query()
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM jobs WHERE kind = ? AND started_at >= ? ORDER BY started_at DESC",
+                ("model-pull", 0),
+            )
+        )
+        self.assertIn("jobs_kind_started", plan)
+
+    def test_retention_by_count_and_age(self):
+        history = self._history(max_rows=3, max_age_seconds=1000)
+        now = time.time()
+        for i in range(5):
+            job_id = history.record_start("model-pull", f"m{i}", started_at=now - 10 + i)
+            history.record_finish(job_id, state="done", ended_at=now)
+        self.assertEqual([r["name"] for r in history.query()], ["m4", "m3", "m2"])
+
+        old = history.record_start("model-pull", "ancient", started_at=now - 5000)
+        history.record_finish(old, state="done", ended_at=now - 4000)
+        self.assertNotIn("ancient", [r["name"] for r in history.query()])
+
+    def test_duration_percentiles_per_kind(self):
+        history = self._history()
+        for i, duration in enumerate([10, 20, 30, 40, 100]):
+            job_id = history.record_start("model-pull", "m", started_at=1000.0 + i)
+            history.record_finish(job_id, state="done", ended_at=1000.0 + i + duration)
+        failed = history.record_start("model-pull", "m", started_at=2000.0)
+        history.record_finish(failed, state="error", ended_at=9000.0)
+
+        stats = history.duration_stats()["model-pull"]
+
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["percentiles"]["p50"], 30)
+        self.assertAlmostEqual(stats["percentiles"]["p90"], 76.0)
+        self.assertEqual(stats["max_seconds"], 100)
+        self.assertEqual(history.duration_stats(state=None)["model-pull"]["count"], 6)
+
+    def test_unwritable_location_disables_history(self):
+        history = job_history_service.JobHistory(Path(self.tmp.name) / "missing" / "logs" / "h.sqlite3")
+        with self.assertLogs(job_history_service.logger, "WARNING"):
+            self.assertIsNone(history.record_start("model-pull", "m"))
+        self.assertEqual(history.query(), [])
+
+
+class JobHistoryEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        history = job_history_service.JobHistory(Path(self.tmp.name) / "history.sqlite3")
+        self.addCleanup(history.close)
+        for patcher in (
+            patch.object(portal_app, "_job_history", history),
+            patch.object(portal_app, "_model_pull_jobs", {}),
+            patch.object(portal_app, "_model_pull_queue", portal_app.deque()),
+            patch.object(portal_app, "_model_pull_active", 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_model_pulls_are_recorded(self):
+        job = portal_app.ModelPullJob(name="m", cmd=[sys.executable, "-c", "print('1.00M/2.00M [00:01<00:01, 1.00MB/s]')"])
+        portal_app._enqueue_model_pull(job)
+        deadline = time.time() + 10
+        while (job.state != "done" or portal_app._model_pull_active) and time.time() < deadline:
+            time.sleep(0.02)
+
+        rows = portal_app.job_history(kind="model-pull", output=True)["jobs"]
+        self.assertEqual(len(rows), 1)
+        # tqdm only reports the file in flight, so a script pull has no byte total.
+        self.assertEqual((rows[0]["state"], rows[0]["exit_code"], rows[0]["bytes_transferred"]), ("done", 0, None))
+        self.assertEqual(rows[0]["meta"], {"engine": "script"})
+        self.assertEqual(portal_app.job_history_durations()["kinds"]["model-pull"]["count"], 1)
+
+    def test_update_output_is_saved_while_running(self):
+        job = portal_app.ServiceUpdateJob(name="comfy")
+        job.history_id = portal_app._job_history.record_start("service-update", "comfy")
+        portal_app._update_service_update_job(job, "Collecting comfy")
+
+        row = portal_app.job_history(kind="service-update", output=True)["jobs"][0]
+        self.assertEqual((row["state"], row["output_tail"]), ("running", ["Collecting comfy"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from apps.Portal.services import jobs as jobs_service
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _script(code):
+    return [sys.executable, "-c", code]
+
+
+class LineSplitterTests(unittest.TestCase):
+    def test_crlf_split_across_reads_is_one_line_end(self):
+        splitter = jobs_service._LineSplitter(split_cr=True)
+        self.assertEqual(splitter.feed(b"10%\r20%\r"), ["10%"])
+        self.assertEqual(splitter.feed(b"\ndone \xc3"), ["20%"])
+        self.assertEqual(splitter.feed(b"\xa9", final=True), ["done é"])
+
+    def test_without_split_cr_redraws_stay_on_one_line(self):
+        splitter = jobs_service._LineSplitter(split_cr=False)
+        self.assertEqual(splitter.feed(b"a\rb\r\nc\n"), ["a\rb", "c"])
+
+
+class JobRunnerTests(unittest.TestCase):
+    def setUp(self):
+        self.runner = jobs_service.JobRunner()
+
+    def test_output_exit_code_and_resource_usage(self):
+        seen = []
+        exited = []
+        job = self.runner.spawn(
+            _script("import sys\nblob = bytearray(64 * 1024 * 1024)\nprint('one')\nsys.stdout.write('two\\r3\\n')\nsys.exit(3)"),
+            kind="test",
+            on_line=lambda _job, line: seen.append(line),
+            on_exit=exited.append,
+        )
+        self.assertTrue(job.wait(10))
+
+        self.assertEqual((job.state, job.returncode, job.error), ("error", 3, "exit code 3"))
+        self.assertEqual(seen, ["one", "two", "3"])
+        self.assertEqual(exited, [job])
+        lines, seq = job.log.tail()
+        self.assertEqual((lines, seq), (seen, job.log.last_seq))
+        self.assertGreater(job.max_rss_bytes, 64 * 1024 * 1024)
+        self.assertIsNotNone(job.cpu_user_seconds)
+        self.assertEqual(job.to_dict()["max_rss_bytes"], job.max_rss_bytes)
+
+    def test_on_line_sees_progress_redraws_while_the_log_keeps_whole_lines(self):
+        seen = []
+        job = self.runner.spawn(
+            _script(
+                "import sys, time\n"
+                "for i in range(1, 4):\n"
+                "    sys.stdout.write(f'\\rsteps: {i}/5'); sys.stdout.flush(); time.sleep(0.1)\n"
+                "time.sleep(60)"
+            ),
+            kind="test",
+            on_line=lambda _job, line: seen.append(line),
+            split_cr=False,
+            on_line_split_cr=True,
+        )
+        deadline = time.monotonic() + 10
+        while "steps: 2/5" not in seen and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIn("steps: 2/5", seen)
+        self.assertEqual(job.log.tail()[0], [])  # no newline yet, so nothing stored
+        self.runner.cancel(job.id, grace=1)
+        self.assertTrue(job.wait(10))
+        self.assertEqual(job.log.tail()[0], ["\rsteps: 1/5\rsteps: 2/5\rsteps: 3/5"])
+        self.assertEqual([line for line in seen if line], ["steps: 1/5", "steps: 2/5", "steps: 3/5"])
+
+    def test_cancel_stops_the_whole_process_group(self):
+        job = self.runner.spawn(
+            _script("import subprocess, sys, time\nsubprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\nprint('ready', flush=True)\ntime.sleep(60)"),
+            kind="test",
+            new_session=True,
+        )
+        deadline = time.time() + 10
+        while job.last_line != "ready" and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.runner.cancel(job.id, grace=1)
+
+        # The grandchild holds the pipe too; the job only finishes once the group is gone.
+        self.assertTrue(job.wait(10))
+        self.assertEqual(job.state, "cancelled")
+        self.assertLess(job.ended_at - job.started_at, 5)
+
+    def test_timeout_escalates_to_sigkill(self):
+        with patch.object(jobs_service, "DEFAULT_KILL_GRACE_SECONDS", 0.5):
+            job = self.runner.spawn(
+                _script("import signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\nprint('up', flush=True)\ntime.sleep(60)"),
+                kind="test",
+                timeout=0.5,
+            )
+            self.assertTrue(job.wait(15))
+        self.assertEqual((job.state, job.returncode), ("cancelled", -9))
+        self.assertTrue(job.error.startswith("timed out"))
+
+    def test_thread_count_does_not_grow_with_jobs(self):
+        self.runner.spawn(_script("pass"), kind="test").wait(10)
+        before = threading.active_count()
+        running = [self.runner.spawn(_script("import time; time.sleep(0.5)"), kind="test") for _ in range(8)]
+        self.assertEqual(threading.active_count(), before)
+        for job in running:
+            self.assertTrue(job.wait(10))
+        self.assertEqual([job.state for job in running], ["done"] * 8)
+
+    def test_finished_jobs_are_forgotten_after_ttl(self):
+        runner = jobs_service.JobRunner(finished_ttl=60, max_finished=1)
+        first = runner.spawn(_script("pass"), kind="test")
+        first.wait(10)
+        second = runner.spawn(_script("pass"), kind="other")
+        second.wait(10)
+
+        self.assertEqual(runner.list_jobs(), [second])  # over max_finished
+        runner.cleanup(now=second.ended_at + 61)
+        self.assertIsNone(runner.get(second.id))
+
+
+class JobsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        patcher = patch.object(portal_app, "_job_runner", jobs_service.JobRunner())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_status_since_cursor_and_cancel(self):
+        job = portal_app._job_runner.spawn(
+            _script("print('a', flush=True)\nimport time; time.sleep(60)"), kind="model-pull", name="m", new_session=True
+        )
+        deadline = time.time() + 10
+        while job.last_line != "a" and time.time() < deadline:
+            time.sleep(0.01)
+
+        listing = portal_app.list_jobs(kind="model-pull")
+        self.assertEqual((listing["running"], [j["id"] for j in listing["jobs"]]), (1, [job.id]))
+        snapshot = portal_app.job_status(job.id)
+        self.assertEqual((snapshot["lines"], snapshot["running"]), (["a"], True))
+        self.assertEqual(portal_app.job_status(job.id, since=snapshot["seq"])["lines"], [])
+
+        portal_app.cancel_job(job.id)
+        self.assertTrue(job.wait(10))
+        self.assertEqual(portal_app.job_status(job.id)["state"], "cancelled")
+        with self.assertRaises(portal_app.HTTPException):
+            portal_app.job_status("missing")
+
+    def test_service_update_commands_run_on_the_runner(self):
+        job = portal_app.ServiceUpdateJob(name="demo")
+        portal_app._run_service_update_cmd(job, _script("print('installed')"))
+        self.assertEqual(list(job.output_tail)[-1], "installed")
+        self.assertEqual(portal_app._job_runner.get(job.job_id).kind, "service-update")
+
+        with self.assertRaises(RuntimeError):
+            portal_app._run_service_update_cmd(job, _script("raise SystemExit(2)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
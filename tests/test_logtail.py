@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import select
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import logtail
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+class TailLinesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "svc.log"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_tail_reads_backwards_across_blocks(self):
+        self.path.write_text("".join(f"line {i}\r\n" for i in range(1000)), encoding="utf-8")
+
+        lines, end = logtail.tail_lines(self.path, 3, block_size=7)
+
+        self.assertEqual(lines, ["line 997", "line 998", "line 999"])
+        self.assertEqual(end, self.path.stat().st_size)
+
+    def test_tail_handles_short_files_and_missing_trailing_newline(self):
+        self.path.write_bytes(b"first\nsecond")
+        self.assertEqual(logtail.tail_lines(self.path, 10, block_size=4), (["first"], 6))
+        self.assertEqual(logtail.tail_lines(self.path, 10, partial=True, block_size=4)[0], ["first", "second"])
+
+        self.path.write_bytes(b"only")
+        self.assertEqual(logtail.tail_lines(self.path, 10, block_size=3), ([], 0))
+        self.assertEqual(logtail.tail_lines(self.path, 10, partial=True)[0], ["only"])
+
+        self.path.write_bytes(b"")
+        self.assertEqual(logtail.tail_lines(self.path, 10), ([], 0))
+
+    def test_follower_started_at_the_tail_finishes_an_unterminated_line(self):
+        self.path.write_bytes(b"loading\nsteps:  10%\rsteps:  20%")
+        lines, offset = logtail.tail_lines(self.path, 10, block_size=8)
+        follower = logtail.LogFollower(self.path, offset)
+        with open(self.path, "ab") as f:
+            f.write(b"\rsteps: 100%\ndone\n")
+
+        self.assertEqual(lines, ["loading"])
+        self.assertEqual(follower.poll(), (["steps:  10%\rsteps:  20%\rsteps: 100%", "done"], False))
+
+    def test_tail_grep_counts_only_matching_lines(self):
+        self.path.write_text("".join(f"{'ERROR' if i % 10 == 0 else 'info'} {i}\n" for i in range(100)), encoding="utf-8")
+
+        lines, _ = logtail.tail_lines(self.path, 2, match=lambda line: "ERROR" in line, block_size=16)
+
+        self.assertEqual(lines, ["ERROR 80", "ERROR 90"])
+
+    def test_tail_grep_stops_at_scan_budget(self):
+        self.path.write_text("ERROR old\n" + "info\n" * 100, encoding="utf-8")
+
+        lines, _ = logtail.tail_lines(self.path, 5, match=lambda line: "ERROR" in line, max_scan_bytes=64, block_size=16)
+
+        self.assertEqual(lines, [])
+
+
+class LogFollowerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "svc.log"
+        self.path.write_bytes(b"old\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, data: bytes):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_follow_buffers_partial_lines(self):
+        follower = logtail.LogFollower(self.path, self.path.stat().st_size)
+        self._append(b"new 1\nnew")
+        self.assertEqual(follower.poll(), (["new 1"], False))
+        self._append(b" 2\n")
+        self.assertEqual(follower.poll(), (["new 2"], False))
+        self.assertEqual(follower.poll(), ([], False))
+
+    def test_follow_detects_truncation_and_rotation(self):
+        follower = logtail.LogFollower(self.path, self.path.stat().st_size)
+        self.path.write_bytes(b"")
+        self.assertEqual(follower.poll(), ([], True))
+        self._append(b"after truncate\n")
+        self.assertEqual(follower.poll(), (["after truncate"], False))
+
+        os.replace(self.path, self.path.with_suffix(".log.1"))
+        self.path.write_bytes(b"rotated\n")
+        self.assertEqual(follower.poll(), (["rotated"], True))
+
+    def test_inotify_wakes_on_append(self):
+        watcher = logtail.InotifyWatcher.create(self.path)
+        if watcher is None:
+            self.skipTest("inotify is not available")
+        try:
+            self._append(b"x\n")
+            ready, _, _ = select.select([watcher.fileno()], [], [], 2.0)
+            self.assertTrue(ready)
+            self.assertTrue(watcher.drain())
+            self.assertFalse(watcher.drain())
+        finally:
+            watcher.close()
+
+
+class TailCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "train.log"
+        self.path.write_text("".join(f"step {i}\n" for i in range(50)), encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_reads_only_appended_bytes(self):
+        cache = logtail.TailCache(limit=3)
+        self.assertEqual(cache.lines(self.path), ["step 47", "step 48", "step 49"])
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("step 50\n")
+        with patch.object(logtail, "tail_lines", side_effect=AssertionError("re-read from EOF")):
+            self.assertEqual(cache.lines(self.path), ["step 48", "step 49", "step 50"])
+
+    def test_cache_rereads_after_truncation(self):
+        cache = logtail.TailCache(limit=3)
+        cache.lines(self.path)
+        self.path.write_text("fresh\n", encoding="utf-8")
+
+        self.assertEqual(cache.lines(self.path), ["fresh"])
+
+
+class SequencedLogTests(unittest.TestCase):
+    def test_since_returns_only_newer_lines(self):
+        log = logtail.SequencedLog(10)
+        first = log.append("a")
+        log.extend(["b", "c"])
+
+        entries, reset = log.since(first)
+
+        self.assertFalse(reset)
+        self.assertEqual([line for _, line in entries], ["b", "c"])
+        self.assertEqual(log.since(log.last_seq), ([], False))
+        # Paging by ``limit`` continues from the last returned line without gaps.
+        page, reset = log.since(first, 1)
+        self.assertEqual(([line for _, line in page], reset), (["b"], False))
+        self.assertEqual([line for _, line in log.since(page[-1][0], 1)[0]], ["c"])
+
+    def test_cursor_resets_after_eviction_clear_or_restart(self):
+        log = logtail.SequencedLog(2)
+        first = log.append("a")
+        log.extend(["b", "c"])
+        self.assertTrue(log.since(first - 1)[1])  # "a" was evicted
+        self.assertFalse(log.since(first)[1])
+
+        cursor = log.last_seq
+        log.clear()
+        self.assertTrue(log.since(cursor)[1])
+        lines, cleared = log.tail()
+        self.assertEqual(lines, [])
+        self.assertEqual(log.since(cleared), ([], False))
+
+        self.assertTrue(log.since(logtail.current_seq() + 100)[1])
+
+    def test_cursor_from_another_process_resets_even_when_in_range(self):
+        log = logtail.SequencedLog(5)
+        first = log.append("a")
+        log.append("b")
+        self.assertFalse(log.since(first, epoch=logtail.EPOCH)[1])
+        # A previous Portal's counter can sit below ours; only the epoch tells them apart.
+        self.assertEqual(log.since(first, epoch="0" * 8), ([], True))
+
+    def test_sequence_is_shared_across_logs(self):
+        a = logtail.SequencedLog(5)
+        b = logtail.SequencedLog(5)
+        a.append("a1")
+        cursor = b.append("b1")
+        a.append("a2")
+
+        self.assertEqual([line for _, line in a.since(cursor)[0]], ["a2"])
+        self.assertEqual(b.since(cursor), ([], False))
+        self.assertEqual(a.tail(through=cursor)[0], ["a1"])
+
+    def test_wait_wakes_on_append(self):
+        log = logtail.SequencedLog(5)
+        cursor = log.last_seq
+        self.assertFalse(log.wait(cursor, 0.01))
+        log.append("x")
+        self.assertTrue(log.wait(cursor, 0.01))
+
+
+class _FakeRequest:
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+class ServiceLogEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out_log = Path(self.tmp.name) / "comfy.out.log"
+        self.err_log = Path(self.tmp.name) / "comfy.err.log"
+        self.out_log.write_text("boot\nERROR bad thing\nready\n", encoding="utf-8")
+        self.err_log.write_bytes(b"")
+        patcher = patch.dict(portal_app.SERVICE_LOGS, {"comfy": (str(self.out_log), str(self.err_log))})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_service_log_tail_and_grep(self):
+        self.assertEqual(portal_app.service_log("comfy", lines=2)["log"], "ERROR bad thing\nready\n")
+        self.assertEqual(portal_app.service_log("comfy", grep="error")["log"], "ERROR bad thing\n")
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            portal_app.service_log("comfy", grep="(")
+        self.assertEqual(cm.exception.status_code, 400)
+
+    def test_service_log_stream_sends_tail_then_appended_lines(self):
+        async def collect():
+            events = []
+            with patch.object(portal_app, "SERVICE_LOG_POLL_SECONDS", 0.01):
+                stream = portal_app._follow_service_log(_FakeRequest(polls=3), self.out_log, 2, None)
+                events.append(await stream.__anext__())
+                with open(self.out_log, "a", encoding="utf-8") as f:
+                    f.write("appended\n")
+                async for chunk in stream:
+                    events.append(chunk)
+            return events
+
+        events = asyncio.run(collect())
+
+        payloads = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: lines")]
+        self.assertEqual(payloads[0]["lines"], ["ERROR bad thing", "ready"])
+        self.assertEqual([line for p in payloads[1:] for line in p["lines"]], ["appended"])
+
+
+class TrainingLogCursorTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        from apps.Portal import dpipe_api
+
+        self.dpipe_api = dpipe_api
+        patchers = [
+            patch.object(portal_app, "_tp_logs", logtail.SequencedLog(4000)),
+            patch.object(portal_app, "_tp_job", None),
+            patch.object(portal_app, "_tp_output_dir", None),
+            patch.object(dpipe_api, "_logs", {}),
+            patch.object(dpipe_api, "_procs", {}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_trainpilot_logs_since_returns_only_new_lines(self):
+        portal_app._tp_logs.append("=== TrainPilot process started (PID: 1) ===")
+        snapshot = portal_app.trainpilot_logs()
+        self.assertIn("=== TrainPilot process started (PID: 1) ===", snapshot["lines"])
+        self.assertFalse(snapshot["reset"])
+
+        portal_app._tp_logs.append("steps: 10%")
+        delta = portal_app.trainpilot_logs(since=snapshot["seq"])
+        self.assertEqual((delta["lines"], delta["reset"]), (["steps: 10%"], False))
+        self.assertEqual(portal_app.trainpilot_logs(since=delta["seq"])["lines"], [])
+
+        portal_app._tp_logs.extend(["a", "b", "c"])
+        first = portal_app.trainpilot_logs(limit=2, since=delta["seq"])
+        rest = portal_app.trainpilot_logs(limit=2, since=first["seq"])
+        self.assertEqual((first["lines"], rest["lines"]), (["a", "b"], ["c"]))
+
+        stale = portal_app.trainpilot_logs(since=delta["seq"], epoch="previous-boot")
+        self.assertTrue(stale["reset"])
+        self.assertEqual(portal_app.trainpilot_logs(since=delta["seq"], epoch=snapshot["epoch"])["reset"], False)
+
+        portal_app._tp_logs.clear()  # a new run
+        portal_app._tp_logs.append("fresh")
+        restarted = portal_app.trainpilot_logs(since=delta["seq"])
+        self.assertTrue(restarted["reset"])
+        self.assertIn("fresh", restarted["lines"])
+
+    def test_dpipe_logs_since_and_stream(self):
+        log = self.dpipe_api._log_for(42)
+        log.extend(["one", "two"])
+        snapshot = self.dpipe_api.training_logs()
+        self.assertEqual((snapshot["pid"], snapshot["lines"]), (42, ["one", "two"]))
+
+        log.append("three")
+        delta = self.dpipe_api.training_logs(since=snapshot["seq"], epoch=snapshot["epoch"])
+        self.assertEqual((delta["lines"], delta["reset"]), (["three"], False))
+        restarted = self.dpipe_api.training_logs(since=snapshot["seq"], epoch="previous-boot")
+        self.assertEqual((restarted["lines"], restarted["reset"]), (["one", "two", "three"], True))
+
+        async def collect():
+            response = self.dpipe_api.training_logs_stream(_FakeRequest(polls=2), since=snapshot["seq"])
+            return [chunk async for chunk in response.body_iterator]
+
+        with patch.object(self.dpipe_api, "_LOG_POLL_SECONDS", 0.01):
+            events = asyncio.run(collect())
+        first = json.loads(events[0].split("data: ", 1)[1])
+        self.assertEqual(first["lines"], ["three"])
+
+
+class TrainPilotLatestRunTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.outputs = Path(self.tmp.name).resolve()
+        for i, name in enumerate(("old", "new", "none")):
+            run = self.outputs / name
+            (run / "_logs").mkdir(parents=True)
+            if name != "none":
+                log = run / "_logs" / "train.log"
+                log.write_text(f"{name}\n", encoding="utf-8")
+                os.utime(log, (1000 + i, 1000 + i))
+        patchers = [
+            patch.object(portal_app, "_OUTPUT_ROOT", self.outputs),
+            patch.object(portal_app, "_tp_latest_runs", None),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_latest_runs_are_cached_until_outputs_change(self):
+        found, runs = portal_app._trainpilot_latest_run_dirs(self.outputs)
+        self.assertEqual((found, [d.name for d in runs]), (2, ["new", "old"]))
+
+        with patch.object(Path, "iterdir", side_effect=AssertionError("rescanned")):
+            self.assertEqual(portal_app._trainpilot_latest_run_dirs(self.outputs)[0], 2)
+
+        (self.outputs / "newest" / "_logs").mkdir(parents=True)
+        (self.outputs / "newest" / "_logs" / "train.log").write_text("x\n", encoding="utf-8")
+        found, runs = portal_app._trainpilot_latest_run_dirs(self.outputs)
+        self.assertEqual((found, runs[0].name), (3, "newest"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import models as models_service
+
+
+class _FixtureServer:
+    """Serves in-memory files with HEAD/Range support and a fake HF tree listing."""
+
+    def __init__(self):
+        self.files = {}
+        self.no_ranges = set()
+        self.fail_after = {}  # path -> bytes to send before dropping the next ranged GET
+        self.requests = []
+        self.trees = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _lookup(self):
+                path = self.path.split("?", 1)[0]
+                with server.lock:
+                    server.requests.append((self.command, path, self.headers.get("Range")))
+                return path, server.files.get(path)
+
+            def do_HEAD(self):
+                path, data = self._lookup()
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                if path not in server.no_ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+            def do_GET(self):
+                path, data = self._lookup()
+                if path.startswith("/api/models/"):
+                    repo = path[len("/api/models/") :].split("/tree/", 1)[0]
+                    body = json.dumps(server.trees.get(repo, [])).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if data is None:
+                    self.send_error(404)
+                    return
+                rng = self.headers.get("Range")
+                if rng and path not in server.no_ranges:
+                    start, end = (int(x) for x in rng.split("=", 1)[1].split("-"))
+                    body = data[start : end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                else:
+                    body = data
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                with server.lock:
+                    limit = server.fail_after.pop(path, None) if rng else None
+                if limit is not None:
+                    self.wfile.write(body[:limit])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def ranged_gets(self, path):
+        return [r for m, p, r in self.requests if m == "GET" and p == path and r]
+
+
+class DownloadEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.server = _FixtureServer()
+        self.addCleanup(self.server.close)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.models = Path(self.tmp.name) / "models"
+        patcher = patch.object(models_service, "_MIN_SEGMENT_BYTES", 1024)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.blob = os.urandom(10_000)
+
+    def _spec(self, line):
+        return models_service._parse_manifest_line(line)
+
+    def _download(self, spec, **kwargs):
+        return models_service.download_model(spec, self.models, endpoint=self.server.url, **kwargs)
+
+    def test_hf_file_uses_parallel_range_segments(self):
+        self.server.files["/org/model/resolve/main/sub/model.safetensors"] = self.blob
+        progress = models_service.TransferProgress()
+
+        paths = self._download(self._spec("m|hf_file|org/model:sub/model.safetensors|checkpoints||"), progress=progress)
+
+        dest = self.models / "checkpoints" / "sub" / "model.safetensors"
+        self.assertEqual(paths, [dest.resolve()])
+        self.assertEqual(dest.read_bytes(), self.blob)
+        self.assertEqual(len(self.server.ranged_gets("/org/model/resolve/main/sub/model.safetensors")), 4)
+        self.assertEqual(sorted(os.listdir(dest.parent)), ["model.safetensors"])
+        self.assertEqual((progress.bytes_done, progress.bytes_total), (10_000, 10_000))
+
+    def test_interrupted_segments_resume_from_part_state(self):
+        path = "/org/model/resolve/main/model.bin"
+        self.server.files[path] = self.blob
+        self.server.fail_after[path] = 500
+        spec = self._spec("m|hf_file|org/model:model.bin|checkpoints||")
+
+        with self.assertRaises(models_service.DownloadError):
+            self._download(spec, segments=4)
+        part = self.models / "checkpoints" / "model.bin.part"
+        self.assertTrue(part.exists())
+        state = json.loads((part.parent / "model.bin.part.json").read_text())
+        first_attempt = len(self.server.ranged_gets(path))
+
+        progress = models_service.TransferProgress()
+        self._download(spec, segments=4, progress=progress)
+
+        self.assertEqual((self.models / "checkpoints" / "model.bin").read_bytes(), self.blob)
+        retried = self.server.ranged_gets(path)[first_attempt:]
+        outstanding = [f"bytes={a}-{b - 1}" for a, b in state["ranges"] if a < b]
+        self.assertEqual(sorted(retried), sorted(outstanding))
+        self.assertFalse((part.parent / "model.bin.part.json").exists())
+
+    def test_bare_part_file_is_treated_as_downloaded_prefix(self):
+        path = "/org/model/resolve/main/model.bin"
+        self.server.files[path] = self.blob
+        target = self.models / "checkpoints"
+        target.mkdir(parents=True)
+        (target / "model.bin.part").write_bytes(self.blob[:4000])
+
+        self._download(self._spec("m|hf_file|org/model:model.bin|checkpoints||"), segments=2)
+
+        self.assertEqual((target / "model.bin").read_bytes(), self.blob)
+        self.assertEqual(self.server.ranged_gets(path), ["bytes=4000-6999", "bytes=7000-9999"])
+
+    def test_url_without_range_support_streams_once(self):
+        self.server.files["/files/RealESRGAN_x4plus.pth"] = self.blob
+        self.server.no_ranges.add("/files/RealESRGAN_x4plus.pth")
+        spec = self._spec(f"esr|url|{self.server.url}/files/RealESRGAN_x4plus.pth?download=1|upscale_models||")
+
+        self._download(spec)
+
+        self.assertEqual((self.models / "upscale_models" / "RealESRGAN_x4plus.pth").read_bytes(), self.blob)
+        self.assertEqual(self.server.ranged_gets("/files/RealESRGAN_x4plus.pth"), [])
+
+    def test_hf_repo_downloads_only_included_files(self):
+        self.server.trees["org/repo"] = [
+            {"type": "file", "path": "unet/model.safetensors", "size": 134, "lfs": {"size": 3000}},
+            {"type": "file", "path": "README.md", "size": 5},
+            {"type": "directory", "path": "unet"},
+        ]
+        self.server.files["/org/repo/resolve/main/unet/model.safetensors"] = self.blob[:3000]
+        self.server.files["/org/repo/resolve/main/README.md"] = b"hello"
+
+        self._download(self._spec("r|hf_repo|org/repo|diffusers/repo|*.safetensors|"))
+
+        self.assertEqual((self.models / "diffusers" / "repo" / "unet" / "model.safetensors").read_bytes(), self.blob[:3000])
+        self.assertFalse((self.models / "diffusers" / "repo" / "README.md").exists())
+
+    def test_manifest_size_mismatch_only_warns(self):
+        path = "/org/model/resolve/main/model.bin"
+        self.server.files[path] = self.blob
+        warnings = []
+
+        self._download(self._spec("m|hf_file|org/model:model.bin|checkpoints||1GB"), warn=warnings.append)
+
+        self.assertEqual((self.models / "checkpoints" / "model.bin").read_bytes(), self.blob)
+        self.assertEqual(warnings, ["m: remote size 10000 bytes does not match manifest size 1GB"])
+
+    def test_listing_cannot_escape_target_dir(self):
+        self.server.trees["org/evil"] = [{"type": "file", "path": "../../escape.bin", "size": 1}]
+        with self.assertRaises(models_service.DownloadError):
+            self._download(self._spec("e|hf_repo|org/evil|loras||"))
+
+
+class DownloadHelpersTests(unittest.TestCase):
+    def test_manifest_sizes_accept_decimal_or_binary_units(self):
+        self.assertTrue(models_service.size_matches_manifest(6_938_078_334, "6.94GB"))
+        self.assertTrue(models_service.size_matches_manifest(int(6.94 * 1024**3), "6.94GB"))
+        self.assertFalse(models_service.size_matches_manifest(6_938_078_334, "7.50GB"))
+        self.assertTrue(models_service.size_matches_manifest(123, ""))
+
+    def test_small_model_sizes_allow_for_manifest_rounding(self):
+        # Real files whose manifest entries are rounded to two decimals of a GB.
+        for actual, raw in (
+            (334_643_268, "0.34GB"),  # sdxl-vae
+            (335_304_388, "0.34GB"),  # flux ae
+            (67_040_989, "0.07GB"),  # RealESRGAN_x4plus
+            (17_938_799, "0.02GB"),
+            (253_815_318, "0.25GB"),  # wan 2.1 vae
+        ):
+            self.assertTrue(models_service.size_matches_manifest(actual, raw), raw)
+        self.assertFalse(models_service.size_matches_manifest(400_000_000, "0.34GB"))
+        self.assertFalse(models_service.size_matches_manifest(40_000_000, "0.07GB"))
+
+    def test_rate_is_measured_over_a_sliding_window(self):
+        now = [100.0]
+        progress = models_service.TransferProgress(clock=lambda: now[0])
+        progress.add_total(1000)
+        progress.add(200, transferred=False)  # already on disk, not counted as throughput
+        for _ in range(4):
+            progress.add(100)
+            now[0] += 1.0
+        snap = progress.snapshot()
+        self.assertEqual(snap["bytes_done"], 600)
+        self.assertAlmostEqual(snap["rate_bps"], 100.0)
+        self.assertAlmostEqual(snap["eta_seconds"], 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _script(code):
+    return [sys.executable, "-c", code]
+
+
+class ModelPullSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        patchers = [
+            patch.object(portal_app, "_model_pull_jobs", {}),
+            patch.object(portal_app, "_model_pull_queue", portal_app.deque()),
+            patch.object(portal_app, "_model_pull_active", 0),
+            patch.object(portal_app, "MODEL_PULL_CONCURRENCY", 1),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _job(self, name, cmd, expected_bytes=None):
+        job = portal_app.ModelPullJob(name=name, cmd=cmd, expected_bytes=expected_bytes)
+        with portal_app._model_pull_lock:
+            portal_app._model_pull_jobs[name] = job
+        return job
+
+    def _wait(self, *jobs):
+        deadline = time.time() + 10
+        while any(j.state in ("queued", "running") for j in jobs) and time.time() < deadline:
+            time.sleep(0.02)
+
+    def test_progress_is_split_on_carriage_returns(self):
+        job = self._job(
+            "a",
+            _script(
+                "import sys\n"
+                "for n in (1, 2, 3):\n"
+                "    sys.stdout.write(f'model.safetensors:  {n * 30}%|###  | {n}.00G/3.33G [00:01<00:02, 100MB/s]\\r')\n"
+                "sys.stdout.write('Download complete\\n')\n"
+            ),
+        )
+        portal_app._enqueue_model_pull(job)
+        self._wait(job)
+
+        self.assertEqual(job.state, "done")
+        self.assertEqual(len(job.output_tail), 4)
+        self.assertEqual((job.bytes_done, job.bytes_total, job.rate_bps), (3_000_000_000, 3_330_000_000, 100_000_000.0))
+
+    def test_pulls_beyond_concurrency_wait_in_fifo_order(self):
+        first = self._job("first", _script("import time; time.sleep(0.3)"))
+        second = self._job("second", _script("pass"), expected_bytes=1000)
+        third = self._job("third", _script("pass"), expected_bytes=2000)
+        for job in (first, second, third):
+            portal_app._enqueue_model_pull(job)
+
+        listing = portal_app.list_model_pulls()
+        self.assertEqual((listing["running"], listing["queue"]), (1, ["second", "third"]))
+        self.assertEqual([j["queue_position"] for j in listing["jobs"][:2]], [1, 2])
+        self.assertEqual(portal_app.pull_model_status("third")["queue_position"], 2)
+
+        self._wait(first, second, third)
+        self.assertEqual([j.state for j in (first, second, third)], ["done"] * 3)
+        self.assertLessEqual(first.updated_at, second.started_at)
+        self.assertLessEqual(second.started_at, third.started_at)
+
+
+class ModelPullProgressTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+
+    def test_curl_progress_meter_and_aggregate_eta(self):
+        job = portal_app.ModelPullJob(name="x", state="running")
+        portal_app._update_model_pull_job(
+            job, "  50 1024M   50  512M    0     0   128M      0  0:00:08  0:00:04  0:00:04  128M"
+        )
+        self.assertEqual((job.bytes_done, job.bytes_total, job.progress_pct), (512 * 1024**2, 1024**3, 50))
+        self.assertEqual(portal_app._model_pull_eta(job), 4.0)
+
+        queued = portal_app.ModelPullJob(name="y", expected_bytes=512 * 1024**2)
+        aggregate = portal_app._model_pull_aggregate([job], [queued])
+        self.assertEqual(aggregate["remaining_bytes"], 1024**3)
+        self.assertEqual(aggregate["eta_seconds"], 8.0)
+        self.assertTrue(aggregate["remaining_bytes_complete"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
+import os
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 from apps.Portal.services import models as models_service
 
@@ -143,5 +145,80 @@ class ModelsManifestTests(unittest.TestCase):
         self.assertGreater(by_name["pid-flux2-512-to-2048-mxfp8"].expected_size_bytes, 0)
 
 
+class ManifestIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.models = root / "models"
+        self.config = root / "config"
+        self.manifest = self.config / "models.manifest"
+        self.config.mkdir()
+        self.manifest.write_text(
+            "\n".join(
+                [
+                    "# comment",
+                    "sdxl-base|hf_file|org/sdxl:sd_xl_base.safetensors|checkpoints||6.9GB",
+                    "flux-dev|hf_file|org/flux:sub/flux1-dev.safetensors|checkpoints||",
+                    "wan-repo|hf_repo|org/wan|checkpoints|*.safetensors|",
+                    "esrgan|url|https://example.com/x/RealESRGAN_x4plus.pth?dl=1|upscale_models||",
+                ]
+            )
+            + "\n"
+        )
+        ckpt = self.models / "checkpoints"
+        ckpt.mkdir(parents=True)
+        (ckpt / "flux1-dev.safetensors").write_bytes(b"x" * 10)
+        (ckpt / "wan").mkdir()
+        (ckpt / "wan" / "wan-repo.safetensors").write_bytes(b"x" * 7)
+        (ckpt / "wan" / "notes.txt").write_bytes(b"")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _parse(self):
+        entries = models_service.parse_manifest(self.manifest, self.manifest, self.models, self.config)
+        return {entry.name: entry for entry in entries}
+
+    def test_installed_state_and_sizes(self):
+        by_name = self._parse()
+
+        self.assertFalse(by_name["sdxl-base"].installed)
+        self.assertEqual(by_name["sdxl-base"].size_bytes, int(6.9 * 1024**3))
+        self.assertTrue(by_name["flux-dev"].installed)
+        self.assertEqual(by_name["flux-dev"].size_bytes, 10)
+        self.assertEqual(by_name["wan-repo"].primary_path, str(self.models / "checkpoints" / "wan" / "wan-repo.safetensors"))
+        self.assertEqual(by_name["wan-repo"].size_bytes, 7)
+        self.assertFalse(by_name["esrgan"].installed)
+        self.assertTrue((self.models / "upscale_models").is_dir())
+
+    def test_shared_subdir_is_listed_once_per_call(self):
+        with patch.object(models_service.os, "scandir", wraps=os.scandir) as scandir:
+            self._parse()
+        scanned = [Path(call.args[0]).name for call in scandir.call_args_list]
+        self.assertEqual(sorted(scanned), ["checkpoints", "upscale_models", "wan"])
+
+    def test_manifest_is_reparsed_only_when_it_changes(self):
+        self._parse()
+        with patch.object(models_service, "_parse_manifest_line", wraps=models_service._parse_manifest_line) as parse:
+            self._parse()
+            self.assertEqual(parse.call_count, 0)
+            with self.manifest.open("a") as handle:
+                handle.write("extra|url|https://example.com/extra.bin|vae||\n")
+            self.assertIn("extra", self._parse())
+            self.assertGreater(parse.call_count, 0)
+
+    def test_paths_behind_symlinked_dirs_still_resolve(self):
+        real = Path(self.tmp.name) / "elsewhere"
+        real.mkdir()
+        (real / "flux1-dev.safetensors").write_bytes(b"y" * 3)
+        (self.models / "checkpoints" / "flux1-dev.safetensors").unlink()
+        (self.models / "checkpoints" / "sub").symlink_to(real, target_is_directory=True)
+
+        entry = self._parse()["flux-dev"]
+
+        self.assertTrue(entry.installed)
+        self.assertEqual(entry.size_bytes, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
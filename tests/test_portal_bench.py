@@ -0,0 +1,100 @@
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "scripts" / "portal-bench.py"
+SPEC = importlib.util.spec_from_file_location("portal_bench", MODULE_PATH)
+portal_bench = importlib.util.module_from_spec(SPEC)
+assert SPEC.loader is not None
+SPEC.loader.exec_module(portal_bench)
+
+HAS_PORTAL_DEPS = all(importlib.util.find_spec(name) for name in ("fastapi", "httpx"))
+
+
+def _result(**overrides):
+    result = {
+        "requests": 100,
+        "errors": 0,
+        "p50_ms": 10.0,
+        "p95_ms": 20.0,
+        "p99_ms": 30.0,
+        "max_ms": 40.0,
+        "throughput_rps": 500.0,
+        "peak_rss_bytes": 100 * 1024**2,
+    }
+    result.update(overrides)
+    return result
+
+
+class PortalBenchTests(unittest.TestCase):
+    def test_synthetic_workspace_and_shims(self):
+        with TemporaryDirectory() as tmp:
+            env = portal_bench.build_workspace(Path(tmp), datasets=2, images=3, models=4, image_size=8)
+            workspace = Path(env["WORKSPACE_ROOT"])
+            self.assertEqual(sorted(p.name for p in (workspace / "datasets").iterdir()), ["1_bench_000", "1_bench_001"])
+            self.assertEqual(len(list((workspace / "datasets" / "1_bench_000").glob("*.png"))), 3)
+            self.assertEqual(len(Path(env["MODELS_MANIFEST"]).read_text().splitlines()), 5)
+            self.assertEqual(len(list((workspace / "models").rglob("*.safetensors"))), 2)
+
+            run_env = {**os.environ, **env}
+
+            def shim(*args):
+                return subprocess.run(list(args), env=run_env, capture_output=True, text=True, check=True).stdout
+
+            self.assertEqual(shim("du", "-sb", str(workspace)), f"123456789\t{workspace}\n")
+            self.assertIn("NVIDIA Bench GPU 1", shim("nvidia-smi", "--format=csv,noheader,nounits"))
+            self.assertIn("RUNNING", shim("supervisorctl", "status"))
+
+    def test_summarize_and_compare(self):
+        summary = portal_bench.summarize([0.001 * i for i in range(1, 101)], 0.5, 2)
+        self.assertEqual((summary["p50_ms"], summary["p99_ms"], summary["throughput_rps"]), (50.5, 99.01, 200.0))
+
+        baseline = {"results": {"inprocess": {"models": _result(), "datasets": _result()}}}
+        current = {
+            "results": {"inprocess": {"models": _result(p95_ms=21.5, p99_ms=45.0, peak_rss_bytes=200 * 1024**2)}},
+            "failed": {"inprocess/datasets": "HTTP 500"},
+        }
+        problems = portal_bench.compare(baseline, current, tolerance=0.25, min_delta_ms=2.0, rss_tolerance=0.25)
+        self.assertEqual(
+            problems,
+            [
+                "inprocess/models: p99_ms 30.0 -> 45.0",
+                f"inprocess/models: peak_rss_bytes {100 * 1024**2} -> {200 * 1024**2}",
+                "inprocess/datasets: not measured (HTTP 500)",
+            ],
+        )
+        same = {"results": {"inprocess": {"models": _result(p50_ms=11.0), "datasets": _result(throughput_rps=450.0)}}}
+        self.assertEqual(portal_bench.compare(baseline, same, tolerance=0.25, min_delta_ms=2.0, rss_tolerance=0.25), [])
+
+    @unittest.skipUnless(HAS_PORTAL_DEPS, "FastAPI/httpx are not installed in this test environment")
+    def test_inprocess_run_writes_a_comparable_baseline(self):
+        with TemporaryDirectory() as tmp:
+            output = Path(tmp) / "bench.json"
+            argv = [
+                "--datasets", "2", "--images", "3", "--models", "4",
+                "--requests", "6", "--concurrency", "2", "--warmup", "1",
+                "--modes", "inprocess", "--endpoints", "datasets,tagpilot_load",
+                "--output", str(output),
+            ]
+            with redirect_stderr(io.StringIO()):
+                self.assertEqual(portal_bench.main(argv), 0)
+            report = json.loads(output.read_text())
+            for endpoint in ("datasets", "tagpilot_load"):
+                result = report["results"]["inprocess"][endpoint]
+                self.assertEqual((result["requests"], result["errors"]), (6, 0))
+                self.assertGreater(result["peak_rss_bytes"], 0)
+
+            with redirect_stderr(io.StringIO()):
+                mismatch = portal_bench.main(argv[:-2] + ["--requests", "7", "--compare", str(output)])
+            self.assertEqual(mismatch, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
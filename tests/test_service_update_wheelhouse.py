@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import venv
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import versions as versions_service
+from apps.Portal.services import wheelhouse as wheelhouse_service
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _build_wheel(index: Path, version: str) -> None:
+    name = f"demo_pkg-{version}"
+    with zipfile.ZipFile(index / f"{name}-py3-none-any.whl", "w") as zf:
+        files = {
+            "demo_pkg.py": f"VERSION = {version!r}\n",
+            f"{name}.dist-info/METADATA": f"Metadata-Version: 2.1\nName: demo-pkg\nVersion: {version}\n",
+            f"{name}.dist-info/WHEEL": "Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        }
+        record = "".join(f"{path},,\n" for path in files) + f"{name}.dist-info/RECORD,,\n"
+        for path, content in files.items():
+            zf.writestr(path, content)
+        zf.writestr(f"{name}.dist-info/RECORD", record)
+
+
+class WheelhouseCommandTests(unittest.TestCase):
+    def test_install_is_offline_and_markers_use_wheel_names(self):
+        wheels = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, wheels)
+        (wheels / "invokeai-5.6.0-py3-none-any.whl").write_bytes(b"")
+
+        cmd = wheelhouse_service.offline_install_command("/venv/bin/python", wheels, "invokeai", "5.6.0")
+
+        self.assertIn("--no-index", cmd)
+        self.assertEqual(cmd[-1], "invokeai==5.6.0")
+        self.assertTrue(wheelhouse_service.has_wheel(wheels, "InvokeAI", "5.6.0"))
+        self.assertFalse(wheelhouse_service.has_wheel(wheels, "invokeai", "5.6"))
+
+
+@unittest.skipIf(portal_app is None, "FastAPI is not installed in this test environment")
+class TwoPhaseServiceUpdateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = Path(cls.tmp.name)
+        cls.venv_dir = root / "venv"
+        venv.create(cls.venv_dir, with_pip=True)
+        cls.python = str(cls.venv_dir / "bin" / "python")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.work = Path(tempfile.mkdtemp(dir=self.tmp.name))
+        self.index = self.work / "index"
+        self.index.mkdir()
+        for version in ("1.0", "2.0"):
+            _build_wheel(self.index, version)
+        subprocess.run(
+            [self.python, "-m", "pip", "install", "-q", "--no-index", "--find-links", str(self.index), "demo-pkg==1.0"],
+            check=True,
+        )
+        self.calls = self.work / "supervisorctl.calls"
+        supervisorctl = self.work / "supervisorctl"
+        supervisorctl.write_text(f"#!/bin/sh\necho \"$@\" >> {self.calls}\n")
+        supervisorctl.chmod(0o755)
+        self.rollback_log = self.work / "rollback.jsonl"
+        self.wheelhouse = self.work / "wheelhouse"
+        spec = {"kind": "pip", "python_bin": self.python, "package": "demo-pkg"}
+        running = portal_app.ServiceEntry(name="demo", display="demo", state="RUNNING", state_raw="RUNNING", running=True)
+        for patcher in (
+            patch.object(portal_app, "SERVICE_UPDATE_SPECS", {"demo": spec}),
+            patch.object(portal_app, "SERVICES", ["demo"]),
+            patch.object(portal_app, "SERVICE_WHEELHOUSE_DIR", self.wheelhouse),
+            patch.object(portal_app, "SERVICE_UPDATES_CONFIG_PATH", self.work / "service-updates.toml"),
+            patch.object(portal_app, "SERVICE_UPDATES_ROLLBACK_LOG_PATH", self.rollback_log),
+            patch.object(portal_app, "SUPERVISORCTL", str(supervisorctl)),
+            patch.object(portal_app, "supervisor_status", lambda name: running),
+            patch.object(portal_app, "_pip_latest_versions", versions_service.LatestCache(lambda key: None)),
+            patch.dict(
+                os.environ,
+                {"PIP_NO_INDEX": "1", "PIP_FIND_LINKS": str(self.index), "PIP_DISABLE_PIP_VERSION_CHECK": "1"},
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, target, reason="update"):
+        job = portal_app.ServiceUpdateJob(name="demo", target_version=target, reason=reason)
+        portal_app._run_service_update_job(job)
+        self.assertEqual(job.state, "done", job.error or "\n".join(job.output_tail))
+        return job
+
+    def test_update_prefetches_then_installs_offline_and_rolls_back_without_index(self):
+        stale = self.wheelhouse / "demo"
+        stale.mkdir(parents=True)
+        _build_wheel(stale, "0.5")  # left over from an older update
+
+        job = self._run("2.0")
+
+        self.assertEqual((job.rollback_before, job.installed_after), ("1.0", "2.0"))
+        self.assertTrue(wheelhouse_service.has_wheel(self.wheelhouse / "demo", "demo-pkg", "2.0"))
+        self.assertTrue(wheelhouse_service.has_wheel(self.wheelhouse / "demo", "demo-pkg", "1.0"))
+        self.assertFalse(wheelhouse_service.has_wheel(self.wheelhouse / "demo", "demo-pkg", "0.5"))
+        self.assertEqual(sorted(p.name for p in stale.iterdir()), ["demo_pkg-1.0-py3-none-any.whl", "demo_pkg-2.0-py3-none-any.whl"])
+        self.assertEqual(self.calls.read_text().split("\n")[:2], ["stop demo", "start demo"])
+        install = next(line for line in job.output_tail if " pip install " in line)
+        self.assertIn("--no-index", install)
+        self.assertIsNotNone(job.downtime_seconds)
+
+        shutil.rmtree(self.index)  # rollback must not need the index
+        self.assertEqual(portal_app._last_service_rollback_target("demo"), "1.0")
+        rollback = self._run("1.0", reason="rollback")
+
+        self.assertEqual(rollback.installed_after, "1.0")
+        self.assertFalse(any(" pip wheel " in line for line in rollback.output_tail))
+        entries = [json.loads(line) for line in self.rollback_log.read_text().splitlines()]
+        self.assertEqual([e["reason"] for e in entries], ["update", "rollback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import versions as versions_service
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _install(site, dist, version):
+    info = site / f"{dist}-{version}.dist-info"
+    info.mkdir()
+    (info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {dist}\nVersion: {version}\n\nlong description\n")
+    return info
+
+
+class DistVersionTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.venv = Path(self.tmp.name) / "venv"
+        self.site = self.venv / "lib" / "python3.11" / "site-packages"
+        self.site.mkdir(parents=True)
+        (self.venv / "bin").mkdir()
+        self.python = str(self.venv / "bin" / "python")
+
+    def test_reads_metadata_with_normalized_names(self):
+        _install(self.site, "InvokeAI", "5.6.0")
+        _install(self.site, "typing_extensions", "4.12.2")
+        dirs = versions_service.site_packages_for(self.python)
+
+        self.assertEqual(dirs, [self.site])
+        self.assertEqual(versions_service.dist_version(dirs, "invokeai"), "5.6.0")
+        self.assertEqual(versions_service.dist_version(dirs, "typing-extensions"), "4.12.2")
+        self.assertIsNone(versions_service.dist_version(dirs, "missing"))
+
+    def test_site_dir_is_rescanned_only_when_it_changes(self):
+        old = _install(self.site, "invokeai", "5.5.0")
+        with patch.object(versions_service, "_scan_dist_version", wraps=versions_service._scan_dist_version) as scan:
+            self.assertEqual(versions_service.dist_version([self.site], "invokeai"), "5.5.0")
+            self.assertEqual(versions_service.dist_version([self.site], "invokeai"), "5.5.0")
+            self.assertEqual(scan.call_count, 1)
+
+            shutil.rmtree(old)
+            _install(self.site, "invokeai", "5.6.0")
+            os.utime(self.site, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+            self.assertEqual(versions_service.dist_version([self.site], "invokeai"), "5.6.0")
+            self.assertEqual(scan.call_count, 2)
+
+
+class GitHeadTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = Path(self.tmp.name) / "repo"
+        self.git = self.repo / ".git"
+        (self.git / "refs" / "heads").mkdir(parents=True)
+        (self.git / "refs" / "remotes" / "origin").mkdir(parents=True)
+
+    def test_branch_ref_loose_then_packed(self):
+        sha = "a" * 40
+        (self.git / "HEAD").write_text("ref: refs/heads/main\n")
+        (self.git / "packed-refs").write_text(f"# pack-refs with: peeled\n{sha} refs/heads/main\n")
+        self.assertEqual(versions_service.git_head(self.repo), ("main", sha))
+
+        newer = "b" * 40
+        (self.git / "refs" / "heads" / "main").write_text(newer + "\n")
+        self.assertEqual(versions_service.git_head(self.repo), ("main", newer))
+
+    def test_detached_head_uses_remote_default_branch(self):
+        sha = "c" * 40
+        (self.git / "HEAD").write_text(sha + "\n")
+        (self.git / "refs" / "remotes" / "origin" / "HEAD").write_text("ref: refs/remotes/origin/master\n")
+        self.assertEqual(versions_service.git_head(self.repo), ("master", sha))
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_matches_git_rev_parse(self):
+        repo = Path(self.tmp.name) / "real"
+        env = dict(os.environ, GIT_AUTHOR_NAME="t", GIT_AUTHOR_EMAIL="t@t", GIT_COMMITTER_NAME="t", GIT_COMMITTER_EMAIL="t@t")
+        subprocess.run(["git", "init", "-q", "-b", "dev", str(repo)], check=True, env=env)
+        subprocess.run(["git", "-C", str(repo), "commit", "-q", "--allow-empty", "-m", "x"], check=True, env=env)
+        subprocess.run(["git", "-C", str(repo), "pack-refs", "--all"], check=True, env=env)
+        expected = subprocess.run(["git", "-C", str(repo), "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+
+        self.assertEqual(versions_service.git_head(repo), ("dev", expected))
+
+
+class LatestCacheTests(unittest.TestCase):
+    def test_lookups_run_in_background_and_are_cached(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            release.wait(5)
+            return f"{key}-2.0"
+
+        cache = versions_service.LatestCache(fetch, ttl=3600)
+        first = cache.get("a")
+        self.assertEqual((first["latest"], first["pending"]), (None, True))
+        cache.get("b")
+        deadline = time.time() + 5
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(calls), ["a", "b"])  # both in flight at once
+
+        release.set()
+        self.assertEqual(cache.get("a", wait=5)["latest"], "a-2.0")
+        self.assertFalse(cache.get("a")["pending"])
+        self.assertEqual(calls.count("a"), 1)
+
+    def test_failed_refresh_keeps_last_good_value(self):
+        answers = ["1.0", RuntimeError("offline")]
+
+        def fetch(key):
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        cache = versions_service.LatestCache(fetch, ttl=0)
+        self.assertEqual(cache.get("pkg", wait=5)["latest"], "1.0")
+        entry = cache.get("pkg", wait=5)
+        self.assertEqual((entry["latest"], entry["error"]), ("1.0", "offline"))
+
+
+class ServiceVersionsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        venv = root / "venv"
+        site = venv / "lib" / "python3.11" / "site-packages"
+        site.mkdir(parents=True)
+        (venv / "bin").mkdir()
+        python = venv / "bin" / "python"
+        python.write_text("")
+        _install(site, "invokeai", "5.5.0")
+        repo = root / "repo"
+        (repo / ".git" / "refs" / "heads").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("ref: refs/heads/master\n")
+        (repo / ".git" / "refs" / "heads" / "master").write_text("d" * 40 + "\n")
+        specs = {
+            "invoke": {"kind": "pip", "python_bin": str(python), "package": "invokeai"},
+            "comfy": {"kind": "git", "repo_dir": str(repo)},
+        }
+        cache = versions_service.LatestCache(lambda key: "5.6.0")
+        for patcher in (
+            patch.object(portal_app, "SERVICE_UPDATE_SPECS", specs),
+            patch.object(portal_app, "SERVICES", ["invoke", "comfy"]),
+            patch.object(portal_app, "_pip_latest_versions", cache),
+            patch.object(portal_app, "_run_cmd_capture", side_effect=AssertionError("no subprocesses")),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_versions_are_probed_without_subprocesses(self):
+        portal_app._pip_latest_versions.get((portal_app.SERVICE_UPDATE_SPECS["invoke"]["python_bin"], "invokeai"), wait=5)
+
+        invoke, comfy = portal_app.list_service_versions()
+
+        self.assertEqual((invoke.installed, invoke.latest, invoke.update_available), ("5.5.0", "5.6.0", True))
+        self.assertEqual(comfy.installed, "master@ddddddd")
+
+    def test_pip_index_output_is_parsed(self):
+        with patch.object(portal_app, "_run_cmd_capture", return_value="invokeai (5.6.0)\nAvailable versions: 5.6.0, 5.5.0\n"):
+            self.assertEqual(portal_app._pip_latest_version(portal_app.SERVICE_UPDATE_SPECS["invoke"]["python_bin"], "invokeai"), "5.6.0")
+
+
+if __name__ == "__main__":
+    unittest.main()
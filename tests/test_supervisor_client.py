@@ -0,0 +1,116 @@
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+import xmlrpc.client
+from pathlib import Path
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+from apps.Portal.services import supervisor as supervisor_service
+
+
+class _UnixXMLRPCServer(socketserver.UnixStreamServer, SimpleXMLRPCServer):
+    def __init__(self, path):
+        SimpleXMLRPCServer.__init__(self, path, requestHandler=_UnixRequestHandler, logRequests=False)
+
+
+class _UnixRequestHandler(SimpleXMLRPCRequestHandler):
+    disable_nagle_algorithm = False  # TCP_NODELAY does not apply to unix sockets
+
+    def address_string(self):
+        return "unix"
+
+
+class FakeSupervisord:
+    def __init__(self):
+        self.calls = []
+        self.processes = {
+            "comfy": {"name": "comfy", "group": "comfy", "statename": "RUNNING", "pid": 42, "start": 100, "now": 160, "stop": 0, "exitstatus": 0, "description": "pid 42, uptime 0:01:00", "spawnerr": ""},
+            "kohya": {"name": "kohya", "group": "kohya", "statename": "EXITED", "pid": 0, "start": 100, "now": 160, "stop": 150, "exitstatus": 2, "description": "Oct 19 10:00 AM", "spawnerr": ""},
+        }
+
+    def getAllProcessInfo(self):
+        self.calls.append(("getAllProcessInfo",))
+        return list(self.processes.values())
+
+    def startProcess(self, name, wait=True):
+        self.calls.append(("startProcess", name))
+        if name not in self.processes:
+            raise xmlrpc.client.Fault(supervisor_service.FAULT_BAD_NAME, f"BAD_NAME: {name}")
+        if self.processes[name]["statename"] == "RUNNING":
+            raise xmlrpc.client.Fault(supervisor_service.FAULT_ALREADY_STARTED, f"ALREADY_STARTED: {name}")
+        self.processes[name].update(statename="RUNNING", pid=99)
+        return True
+
+    def stopProcess(self, name, wait=True):
+        self.calls.append(("stopProcess", name))
+        if self.processes[name]["statename"] != "RUNNING":
+            raise xmlrpc.client.Fault(supervisor_service.FAULT_NOT_RUNNING, f"NOT_RUNNING: {name}")
+        self.processes[name].update(statename="STOPPED", pid=0)
+        return True
+
+
+class SupervisorClientTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "supervisor.sock")
+        self.fake = FakeSupervisord()
+        self.server = _UnixXMLRPCServer(self.socket_path)
+        for method in ("getAllProcessInfo", "startProcess", "stopProcess"):
+            self.server.register_function(getattr(self.fake, method), f"supervisor.{method}")
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = supervisor_service.SupervisorClient(self.socket_path, snapshot_ttl=60)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_snapshot_reports_state_pid_uptime_and_exit_status(self):
+        snapshot = self.client.all_process_info()
+
+        self.assertEqual((snapshot["comfy"].state, snapshot["comfy"].pid, snapshot["comfy"].uptime), ("RUNNING", 42, 60))
+        self.assertEqual((snapshot["kohya"].state, snapshot["kohya"].pid, snapshot["kohya"].exit_status), ("EXITED", None, 2))
+
+    def test_snapshot_is_shared_until_a_control_call(self):
+        self.client.all_process_info()
+        self.client.process_info("comfy")
+        self.assertEqual(self.fake.calls, [("getAllProcessInfo",)])
+
+        self.client.start("kohya")
+        self.client.start("comfy")  # already running is not an error
+        self.assertEqual(self.client.process_info("kohya").state, "RUNNING")
+        self.assertEqual(self.fake.calls.count(("getAllProcessInfo",)), 2)
+
+    def test_restart_tolerates_stopped_program_and_reports_bad_names(self):
+        self.client.restart("kohya")
+        self.assertEqual(self.fake.calls[-2:], [("stopProcess", "kohya"), ("startProcess", "kohya")])
+
+        with self.assertRaises(supervisor_service.SupervisorError) as cm:
+            self.client.start("missing")
+        self.assertEqual(cm.exception.code, supervisor_service.FAULT_BAD_NAME)
+
+    def test_missing_socket_raises_unavailable(self):
+        client = supervisor_service.SupervisorClient(str(Path(self.tmp.name) / "absent.sock"))
+
+        with self.assertRaises(supervisor_service.SupervisorUnavailable):
+            client.all_process_info()
+
+    def test_parse_supervisorctl_status_fallback(self):
+        output = (
+            "comfy                            RUNNING   pid 42, uptime 1 day, 2:03:04\n"
+            "kohya                            STOPPED   Oct 19 10:00 AM\n"
+            "group:worker                     FATAL     Exited too quickly (process log may have details)\n"
+        )
+
+        entries = {e.name: e for e in supervisor_service.parse_supervisorctl_status(output)}
+
+        self.assertEqual((entries["comfy"].pid, entries["comfy"].uptime), (42, 86400 + 7384))
+        self.assertEqual(entries["kohya"].state, "STOPPED")
+        self.assertEqual((entries["worker"].group, entries["worker"].state), ("group", "FATAL"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,10 @@
+import asyncio
+import os
+import tempfile
+import time
 import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
 
 from apps.Portal.services import tagpilot_ai
 
@@ -134,5 +140,97 @@ class TagPilotAITests(unittest.TestCase):
         self.assertEqual(text, "tag one, tag two")
 
 
+class TagPilotGenerationCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "cache"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _generate(self, cache, *, force=False, prompt=""):
+        return asyncio.run(
+            tagpilot_ai.generate(
+                provider="openai",
+                mode="tags",
+                prompt=prompt,
+                image_bytes=b"\xff\xd8\xffimage",
+                mime_type="image/jpeg",
+                environ={"OPENAI_API_KEY": "sk-test"},
+                cache=cache,
+                force=force,
+            )
+        )
+
+    def test_generate_reuses_cached_result_until_forced(self):
+        cache = tagpilot_ai.GenerationCache(self.root)
+        fresh = {"text": "tag one", "provider": "openai", "model": "gpt-5.4-mini"}
+        with patch.object(tagpilot_ai, "_generate_openai", AsyncMock(return_value=fresh)) as call:
+            first = self._generate(cache)
+            second = self._generate(cache)
+            forced = self._generate(cache, force=True)
+            other_prompt = self._generate(cache, prompt="Different prompt")
+
+        self.assertEqual(first, {**fresh, "cached": False})
+        self.assertEqual(second, {**fresh, "cached": True})
+        self.assertFalse(forced["cached"])
+        self.assertFalse(other_prompt["cached"])
+        self.assertEqual(call.await_count, 3)
+        stats = tagpilot_ai.provider_status({}, cache=cache)["cache"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertEqual(stats["entries"], 2)
+
+    def test_fallback_results_are_cached_under_the_model_that_answered(self):
+        cache = tagpilot_ai.GenerationCache(self.root)
+        fallback = {"text": "from fallback", "provider": "openai", "model": "gpt-5.5"}
+        primary = {"text": "from primary", "provider": "openai", "model": "gpt-5.4-mini"}
+        with patch.object(tagpilot_ai, "_generate_openai", AsyncMock(return_value=fallback)):
+            self._generate(cache)
+        self.assertEqual(self._generate(cache), {**fallback, "cached": True})
+
+        # Once the primary answers, its result wins over the cached fallback one.
+        with patch.object(tagpilot_ai, "_generate_openai", AsyncMock(return_value=primary)):
+            self._generate(cache, force=True)
+        self.assertEqual(self._generate(cache), {**primary, "cached": True})
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_expired_entries_are_misses(self):
+        cache = tagpilot_ai.GenerationCache(self.root, ttl_seconds=60)
+        key = cache.key(image_bytes=b"img", provider="gemini", model="m", mode="tags", prompt="p")
+        cache.put(key, {"text": "old", "provider": "gemini", "model": "m"})
+        stale = time.time() - 120
+        os.utime(self.root / f"{key}.json", (stale, stale))
+
+        self.assertIsNone(cache.get(key))
+        self.assertFalse((self.root / f"{key}.json").exists())
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_size_limit_evicts_least_recently_used_entries(self):
+        cache = tagpilot_ai.GenerationCache(self.root, max_bytes=350)
+        keys = []
+        for idx in range(3):
+            key = cache.key(image_bytes=bytes([idx]), provider="grok", model="m", mode="tags", prompt="")
+            cache.put(key, {"text": "x" * 60, "provider": "grok", "model": "m"})
+            then = time.time() - 100 + idx
+            os.utime(self.root / f"{key}.json", (then, then))
+            keys.append(key)
+        self.assertIsNotNone(cache.get(keys[0]))
+
+        key = cache.key(image_bytes=b"new", provider="grok", model="m", mode="tags", prompt="")
+        cache.put(key, {"text": "x" * 60, "provider": "grok", "model": "m"})
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertLessEqual(cache.stats()["size_bytes"], 350)
+
+    def test_disabled_cache_never_stores(self):
+        cache = tagpilot_ai.GenerationCache(self.root, max_bytes=0)
+        key = cache.key(image_bytes=b"img", provider="openai", model="m", mode="tags", prompt="")
+        cache.put(key, {"text": "t", "provider": "openai", "model": "m"})
+
+        self.assertIsNone(cache.get(key))
+        self.assertFalse(self.root.exists())
+
+
 if __name__ == "__main__":
     unittest.main()
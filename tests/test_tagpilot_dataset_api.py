@@ -1,7 +1,14 @@
+import asyncio
 import base64
+import hashlib
 import io
+import os
+import queue
 import tempfile
+import time
 import unittest
+import zipfile
+from unittest import mock
 from pathlib import Path
 
 try:
@@ -30,6 +37,19 @@ class TagPilotDatasetApiTests(unittest.TestCase):
         portal_app._OUTPUT_ROOT = workspace / "outputs"
 
     def tearDown(self):
+        # Let background archive jobs settle before the workspace disappears.
+        deadline = time.time() + 5
+        while time.time() < deadline and (
+            portal_app._dataset_stats_refreshing
+            or any(
+                job.state in ("uploading", "running")
+                for job in [*portal_app._dataset_zip_jobs.values(), *portal_app._dataset_extract_jobs.values()]
+            )
+        ):
+            time.sleep(0.02)
+        portal_app._dataset_zip_jobs.clear()
+        portal_app._dataset_extract_jobs.clear()
+        portal_app._dataset_stats.clear()
         portal_app.WORKSPACE_ROOT = self.old_workspace_root
         portal_app._DATASET_ROOT = self.old_dataset_root
         portal_app._DATASET_ZIP_ROOT = self.old_dataset_zip_root
@@ -102,6 +122,63 @@ class TagPilotDatasetApiTests(unittest.TestCase):
         self.assertEqual((dataset_dir / "photo.txt").read_text(encoding="utf-8"), "saved, tag")
         self.assertFalse((portal_app._DATASET_ROOT / "1_1_sample").exists())
 
+    def test_write_dataset_zip_stores_images_and_deflates_captions(self):
+        dataset_dir = portal_app._DATASET_ROOT / "1_sample"
+        dataset_dir.mkdir(parents=True)
+        portal_app._DATASET_ZIP_ROOT.mkdir(parents=True)
+        (dataset_dir / "photo.jpg").write_bytes(b"\xff\xd8image")
+        (dataset_dir / "photo.txt").write_text("sample, tag", encoding="utf-8")
+        zip_path = portal_app._DATASET_ZIP_ROOT / "sample.zip"
+
+        stats = portal_app._write_dataset_zip(dataset_dir, zip_path)
+
+        self.assertEqual(stats, {"added": 2, "updated": 0, "removed": 0, "unchanged": 0})
+        with zipfile.ZipFile(zip_path) as zf:
+            infos = {info.filename: info for info in zf.infolist()}
+        self.assertEqual(infos["photo.jpg"].compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(infos["photo.txt"].compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_write_dataset_zip_only_touches_changed_members(self):
+        dataset_dir = portal_app._DATASET_ROOT / "1_sample"
+        dataset_dir.mkdir(parents=True)
+        portal_app._DATASET_ZIP_ROOT.mkdir(parents=True)
+        (dataset_dir / "a.jpg").write_bytes(b"a-image")
+        (dataset_dir / "a.txt").write_text("first", encoding="utf-8")
+        zip_path = portal_app._DATASET_ZIP_ROOT / "sample.zip"
+        portal_app._write_dataset_zip(dataset_dir, zip_path)
+
+        (dataset_dir / "b.jpg").write_bytes(b"b-image")
+        appended = portal_app._write_dataset_zip(dataset_dir, zip_path)
+        self.assertEqual(appended, {"added": 1, "updated": 0, "removed": 0, "unchanged": 2})
+
+        (dataset_dir / "a.txt").write_text("fixed", encoding="utf-8")
+        (dataset_dir / "b.jpg").unlink()
+        rewritten = portal_app._write_dataset_zip(dataset_dir, zip_path)
+        self.assertEqual(rewritten, {"added": 0, "updated": 1, "removed": 1, "unchanged": 1})
+
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertEqual(sorted(zf.namelist()), ["a.jpg", "a.txt"])
+            self.assertEqual(zf.read("a.txt"), b"fixed")
+            self.assertEqual(zf.read("a.jpg"), b"a-image")
+            self.assertIsNone(zf.testzip())
+
+    def test_tagpilot_save_item_builds_zip_in_background_job(self):
+        dataset_dir = portal_app._DATASET_ROOT / "1_sample"
+        dataset_dir.mkdir(parents=True)
+        upload = portal_app.UploadFile(file=io.BytesIO(b"image"), filename="photo.jpg")
+
+        payload = portal_app.tagpilot_save_item(name="sample", file=upload, tags="tag", reset=False, done=True)
+
+        self.assertEqual(payload["zip_job"]["name"], "1_sample")
+        deadline = time.time() + 5
+        status = portal_app.dataset_zip_status("sample")
+        while status["state"] == "running" and time.time() < deadline:
+            time.sleep(0.02)
+            status = portal_app.dataset_zip_status("sample")
+        self.assertEqual(status["state"], "done")
+        with zipfile.ZipFile(payload["zip"]) as zf:
+            self.assertEqual(sorted(zf.namelist()), ["photo.jpg", "photo.txt"])
+
     def test_dataset_file_iteration_skips_symlinks(self):
         dataset_dir = portal_app._DATASET_ROOT / "1_sample"
         dataset_dir.mkdir(parents=True)
@@ -130,6 +207,254 @@ class TagPilotDatasetApiTests(unittest.TestCase):
         finally:
             portal_app.DATASET_UPLOAD_MAX_BYTES = original_limit
 
+    def _wait_for_extract(self, name):
+        deadline = time.time() + 5
+        status = portal_app.dataset_extract_status(name)
+        while status["state"] in ("uploading", "running") and time.time() < deadline:
+            time.sleep(0.02)
+            status = portal_app.dataset_extract_status(name)
+        return status
+
+    @staticmethod
+    def _zip_bytes(files, *, streamed=False):
+        class _NonSeekable(io.RawIOBase):
+            def __init__(self):
+                self.buffer = bytearray()
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                self.buffer += data
+                return len(data)
+
+        raw = _NonSeekable() if streamed else io.BytesIO()
+        with zipfile.ZipFile(raw, "w") as zf:
+            for name, data in files.items():
+                compress = zipfile.ZIP_STORED if name.endswith(".jpg") and not streamed else zipfile.ZIP_DEFLATED
+                zf.writestr(name, data, compress_type=compress)
+        return bytes(raw.buffer) if streamed else raw.getvalue()
+
+    @staticmethod
+    def _stream_request(body, chunk_size=7, method="PUT", headers=None):
+        messages = [
+            {"type": "http.request", "body": body[i : i + chunk_size], "more_body": True}
+            for i in range(0, len(body), chunk_size)
+        ]
+        messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+        async def receive():
+            return messages.pop(0)
+
+        raw_headers = [(b"content-length", str(len(body)).encode())]
+        raw_headers += [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": "/api/datasets/upload/stream",
+            "headers": raw_headers,
+            "query_string": b"",
+        }
+        return portal_app.Request(scope, receive)
+
+    def test_upload_dataset_extracts_in_background_job(self):
+        files = {f"img/{i}.jpg": bytes([i]) * 100 for i in range(6)}
+        files["img/0.txt"] = b"caption " * 20
+        upload = portal_app.UploadFile(file=io.BytesIO(self._zip_bytes(files)), filename="upload.zip")
+
+        payload = portal_app.upload_dataset(upload)
+
+        self.assertEqual(payload["extract_job"]["name"], "1_upload")
+        status = self._wait_for_extract("upload")
+        self.assertEqual(status["state"], "done")
+        self.assertEqual(status["entries_total"], 7)
+        self.assertEqual(status["entries_done"], 7)
+        self.assertEqual(status["bytes_done"], sum(len(v) for v in files.values()))
+        dataset_dir = portal_app._DATASET_ROOT / "1_upload"
+        for name, data in files.items():
+            self.assertEqual((dataset_dir / name).read_bytes(), data)
+
+    def test_safe_extract_zip_validates_every_member_before_writing(self):
+        zip_path = Path(self.tmp.name) / "bomb.zip"
+        zip_path.write_bytes(self._zip_bytes({"a.txt": b"ok", "b.txt": b"0" * 100000}))
+        dest = Path(self.tmp.name) / "out"
+        dest.mkdir()
+
+        with self.assertRaisesRegex(ValueError, "compression ratio too high"):
+            portal_app._safe_extract_zip(zip_path, dest, max_ratio=10.0)
+
+        self.assertEqual(list(dest.iterdir()), [])
+
+    def test_upload_dataset_stream_extracts_while_uploading(self):
+        for streamed in (False, True):
+            with self.subTest(data_descriptors=streamed):
+                files = {"a.jpg": b"a-image" * 50, "sub/a.txt": b"tag, other tag", "empty.txt": b""}
+                body = self._zip_bytes(files, streamed=streamed)
+                name = f"live{int(streamed)}"
+
+                payload = asyncio.run(
+                    portal_app.upload_dataset_stream(self._stream_request(body), filename=f"{name}.zip")
+                )
+
+                self.assertEqual(payload["extract_job"]["mode"], "stream")
+                status = self._wait_for_extract(name)
+                self.assertEqual(status["state"], "done")
+                self.assertEqual(status["entries_total"], 3)
+                dataset_dir = portal_app._DATASET_ROOT / f"1_{name}"
+                for member, data in files.items():
+                    self.assertEqual((dataset_dir / member).read_bytes(), data)
+                self.assertEqual(Path(payload["zip"]).read_bytes(), body)
+
+    def _stream_extract(self, body, dest, **limits):
+        chunks = queue.Queue()
+        for i in range(0, len(body), 64 * 1024):
+            chunks.put(body[i : i + 64 * 1024])
+        chunks.put(None)
+        dest.mkdir()
+        return portal_app._stream_extract_zip(portal_app._ZipUploadStream(chunks, io.BytesIO()), dest, **limits)
+
+    def test_stream_extract_bounds_data_descriptor_entries_while_inflating(self):
+        bomb = self._zip_bytes({"bomb.txt": b"\0" * (64 * 1024 * 1024)}, streamed=True)
+        dest = Path(self.tmp.name) / "bomb"
+        with self.assertRaisesRegex(ValueError, "compression ratio too high"):
+            self._stream_extract(bomb, dest, max_ratio=100.0)
+        self.assertLess((dest / "bomb.txt").stat().st_size, 8 * 1024 * 1024)
+
+        body = self._zip_bytes({"a.bin": os.urandom(3000), "b.bin": os.urandom(3000)}, streamed=True)
+        dest = Path(self.tmp.name) / "total"
+        with self.assertRaises(ValueError):
+            self._stream_extract(body, dest, max_total_bytes=4000)
+        self.assertLessEqual((dest / "b.bin").stat().st_size, 1000)
+
+    def test_upload_dataset_stream_rejects_unsafe_member_and_clears_dataset(self):
+        raw = io.BytesIO()
+        with zipfile.ZipFile(raw, "w") as zf:
+            zf.writestr("ok.txt", b"fine")
+            zf.writestr("../escape.txt", b"nope")
+
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            asyncio.run(portal_app.upload_dataset_stream(self._stream_request(raw.getvalue()), filename="bad.zip"))
+
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertIn("unsafe parent path", cm.exception.detail)
+        self.assertEqual(list((portal_app._DATASET_ROOT / "1_bad").iterdir()), [])
+        self.assertFalse((Path(self.tmp.name) / "datasets" / "escape.txt").exists())
+
+    def _patch_upload(self, upload_id, offset, chunk, checksum=None):
+        headers = {"Upload-Offset": str(offset)}
+        if checksum is not None:
+            headers["Upload-Checksum"] = "sha256 " + base64.b64encode(checksum).decode()
+        request = self._stream_request(chunk, method="PATCH", headers=headers)
+        return asyncio.run(portal_app.append_dataset_upload(upload_id, request))
+
+    def test_resumable_upload_verifies_chunks_and_extracts(self):
+        body = self._zip_bytes({"a.jpg": b"a-image" * 40, "a.txt": b"caption"})
+        session = portal_app.create_dataset_upload(
+            portal_app.DatasetUploadCreateRequest(
+                filename="resumed.zip", size=len(body), sha256=hashlib.sha256(body).hexdigest()
+            )
+        )
+        upload_id = session["id"]
+        first, second = body[:100], body[100:]
+
+        self.assertEqual(self._patch_upload(upload_id, 0, first, hashlib.sha256(first).digest())["offset"], 100)
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            self._patch_upload(upload_id, 0, first)
+        self.assertEqual(cm.exception.status_code, 409)
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            self._patch_upload(upload_id, 100, second, hashlib.sha256(b"other").digest())
+        self.assertIn("checksum mismatch", cm.exception.detail)
+        self.assertEqual(portal_app.dataset_upload_status(upload_id)["offset"], 100)
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            portal_app.finalize_dataset_upload(upload_id)
+        self.assertEqual(cm.exception.status_code, 409)
+
+        # Drop the in-memory digest to mimic a Portal restart between chunks.
+        portal_app._dataset_upload_hashers.clear()
+        self.assertEqual(self._patch_upload(upload_id, 100, second)["offset"], len(body))
+        payload = portal_app.finalize_dataset_upload(upload_id)
+
+        self.assertEqual(Path(payload["zip"]).read_bytes(), body)
+        self.assertEqual(self._wait_for_extract("resumed")["state"], "done")
+        dataset_dir = portal_app._DATASET_ROOT / "1_resumed"
+        self.assertEqual((dataset_dir / "a.txt").read_bytes(), b"caption")
+        self.assertEqual(list((portal_app._DATASET_ZIP_ROOT / ".uploads").iterdir()), [])
+
+    def test_resumable_upload_rejects_whole_file_checksum_mismatch(self):
+        body = self._zip_bytes({"a.txt": b"caption"})
+        session = portal_app.create_dataset_upload(
+            portal_app.DatasetUploadCreateRequest(filename="bad.zip", size=len(body), sha256="0" * 64)
+        )
+        self._patch_upload(session["id"], 0, body)
+
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            portal_app.finalize_dataset_upload(session["id"])
+
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertFalse((portal_app._DATASET_ZIP_ROOT / "bad.zip").exists())
+        with self.assertRaises(portal_app.HTTPException):
+            portal_app.dataset_upload_status(session["id"])
+
+    def _list_datasets_after_refresh(self):
+        portal_app.list_datasets()
+        deadline = time.time() + 5
+        while portal_app._dataset_stats_refreshing and time.time() < deadline:
+            time.sleep(0.01)
+        return portal_app.list_datasets()
+
+    def test_list_datasets_revalidates_changed_trees_in_background(self):
+        dataset_dir = portal_app._DATASET_ROOT / "1_sample"
+        dataset_dir.mkdir(parents=True)
+        (dataset_dir / "a.jpg").write_bytes(b"a")
+
+        self.assertEqual(portal_app.list_datasets()[0].images, 1)
+        (dataset_dir / "b.jpg").write_bytes(b"b")
+        os.utime(dataset_dir, ns=(0, 0))
+        self.assertEqual(portal_app.list_datasets()[0].images, 1)
+
+        original_ttl = portal_app._DATASET_LIST_TTL_SECONDS
+        portal_app._DATASET_LIST_TTL_SECONDS = 0
+        try:
+            entries = self._list_datasets_after_refresh()
+        finally:
+            portal_app._DATASET_LIST_TTL_SECONDS = original_ttl
+
+        self.assertEqual(entries[0].images, 2)
+        self.assertEqual(entries[0].size_bytes, 2)
+
+    def test_list_datasets_skips_rescan_when_tree_is_unchanged(self):
+        dataset_dir = portal_app._DATASET_ROOT / "1_sample"
+        dataset_dir.mkdir(parents=True)
+        (dataset_dir / "a.jpg").write_bytes(b"a")
+        portal_app.list_datasets()
+
+        original_ttl = portal_app._DATASET_LIST_TTL_SECONDS
+        portal_app._DATASET_LIST_TTL_SECONDS = 0
+        try:
+            with mock.patch.object(portal_app, "_scan_dataset_stats", wraps=portal_app._scan_dataset_stats) as scan:
+                entries = self._list_datasets_after_refresh()
+        finally:
+            portal_app._DATASET_LIST_TTL_SECONDS = original_ttl
+
+        scan.assert_not_called()
+        self.assertEqual(entries[0].images, 1)
+
+    def test_dataset_write_endpoints_update_stats_directly(self):
+        portal_app.create_dataset({"name": "sample"})
+        self.assertEqual(portal_app.list_datasets()[0].images, 0)
+
+        with mock.patch.object(portal_app, "_scan_dataset_stats", wraps=portal_app._scan_dataset_stats) as scan:
+            upload = portal_app.UploadFile(file=io.BytesIO(b"image"), filename="photo.jpg")
+            portal_app.tagpilot_save_item(name="sample", file=upload, tags="tag", reset=False, done=False)
+            entry = portal_app.list_datasets()[0]
+        scan.assert_not_called()
+        self.assertEqual((entry.images, entry.size_bytes, entry.has_tags), (1, 8, True))
+
+        portal_app.rename_dataset("1_sample", {"name": "renamed"})
+        self.assertEqual([e.name for e in portal_app.list_datasets()], ["1_renamed"])
+        portal_app.delete_dataset("1_renamed")
+        self.assertEqual(portal_app.list_datasets(), [])
+
     def test_dataset_file_iteration_skips_symlinked_directories(self):
         dataset_dir = portal_app._DATASET_ROOT / "1_sample"
         dataset_dir.mkdir(parents=True)
@@ -0,0 +1,251 @@
+import os
+import struct
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import tensorboard as tensorboard_service
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, wire, payload):
+    key = _varint((number << 3) | wire)
+    if wire == 2:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def _event(step, tag, value, *, wall_time=1000.0, as_tensor=False):
+    if as_tensor:
+        tensor = _field(1, 0, _varint(1)) + _field(5, 2, struct.pack("<f", value))
+        metadata = _field(1, 2, _field(1, 2, b"scalars"))
+        summary_value = _field(1, 2, tag.encode()) + _field(8, 2, tensor) + _field(9, 2, metadata)
+    else:
+        summary_value = _field(1, 2, tag.encode()) + _field(2, 5, struct.pack("<f", value))
+    return (
+        _field(1, 1, struct.pack("<d", wall_time))
+        + _field(2, 0, _varint(step))
+        + _field(5, 2, _field(1, 2, summary_value))
+    )
+
+
+def _record(data):
+    header = struct.pack("<Q", len(data))
+    return (
+        header
+        + struct.pack("<I", tensorboard_service._masked_crc32c(header))
+        + data
+        + struct.pack("<I", tensorboard_service._masked_crc32c(data))
+    )
+
+
+class EventIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        self.run_dir = self.root / "run-a" / "logs"
+        self.run_dir.mkdir(parents=True)
+        self.event = self.run_dir / "events.out.tfevents.1.host"
+        self.event.write_bytes(b"x")
+        samples = self.root / "run-a" / "samples"
+        samples.mkdir()
+        for i in range(20):
+            (samples / f"{i}.png").write_bytes(b"")
+        self._age_tree()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _age_tree(self, seconds=60):
+        old = time.time() - seconds
+        for dirpath, _, _ in os.walk(self.root):
+            os.utime(dirpath, (old, old))
+        os.utime(self.event, (old, old))
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        index = tensorboard_service.EventIndex(self.root)
+        index.refresh()
+        self.assertEqual(index.events(), [(self.event, self.event.stat().st_mtime)])
+        self.assertEqual(index.dirs_listed, 4)
+
+        with open(self.event, "ab") as f:
+            f.write(b"more")
+        index.refresh()
+
+        self.assertEqual(index.dirs_listed, 0)
+        self.assertEqual(index.latest(), (self.event, self.event.stat().st_mtime))
+
+    def test_new_and_removed_event_files_are_picked_up(self):
+        index = tensorboard_service.EventIndex(self.root)
+        index.refresh()
+
+        run_b = self.root / "run-b"
+        run_b.mkdir()
+        newer = run_b / "events.out.tfevents.2.host"
+        newer.write_bytes(b"x")
+        index.refresh()
+        self.assertEqual(index.latest()[0], newer)
+
+        newer.unlink()
+        index.refresh()
+        self.assertEqual([p for p, _ in index.events()], [self.event])
+
+    def test_depth_limit_and_hidden_dirs(self):
+        hidden = self.root / ".cache"
+        hidden.mkdir()
+        (hidden / "events.out.tfevents.3.host").write_bytes(b"x")
+
+        shallow = tensorboard_service.EventIndex(self.root, max_depth=1)
+        shallow.refresh()
+        self.assertEqual(shallow.events(), [])
+
+        deep = tensorboard_service.EventIndex(self.root)
+        deep.refresh()
+        self.assertEqual([p for p, _ in deep.events()], [self.event])
+
+    def test_cache_serves_stale_result_and_refreshes_in_background(self):
+        cache = tensorboard_service.EventIndexCache(ttl=0)
+        index = cache.index(self.root)
+        self.assertEqual(index.latest()[0], self.event)
+
+        newer = self.root / "events.out.tfevents.9.host"
+        newer.write_bytes(b"x")
+        self.assertIs(cache.index(self.root), index)
+        deadline = time.time() + 5
+        while index.latest()[0] != newer and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(index.latest()[0], newer)
+
+
+class ScalarReaderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "events.out.tfevents.1.host"
+        version = _field(1, 1, struct.pack("<d", 999.0)) + _field(3, 2, b"brain.Event:2")
+        self.path.write_bytes(_record(version))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, data):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_masked_crc_matches_reference_value(self):
+        # CRC32C("123456789") == 0xE3069283, masked as TFRecord does.
+        crc = 0xE3069283
+        masked = (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+        self.assertEqual(tensorboard_service._masked_crc32c(b"123456789"), masked)
+
+    def test_reads_simple_and_tensor_scalars_incrementally(self):
+        reader = tensorboard_service.EventFileReader(self.path)
+        self._append(_record(_event(1, "loss", 0.5)) + _record(_event(2, "lr", 1e-4, as_tensor=True)))
+
+        first = reader.read_scalars()
+        self.assertEqual([(step, tag) for _, step, tag, _ in first], [(1, "loss"), (2, "lr")])
+        self.assertAlmostEqual(first[1][3], 1e-4)
+
+        record = _record(_event(3, "loss", 0.25))
+        self._append(record[:10])  # writer is mid-record
+        self.assertEqual(reader.read_scalars(), [])
+        self._append(record[10:])
+        self.assertEqual(reader.read_scalars(), [(1000.0, 3, "loss", 0.25)])
+
+    def test_corrupt_header_stops_reading(self):
+        self._append(b"\xff" * 16)
+        reader = tensorboard_service.EventFileReader(self.path)
+        self.assertEqual(reader.read_scalars(), [])
+        self.assertIn("corrupt", reader.error)
+
+    def test_series_are_downsampled_but_keep_latest_point(self):
+        self._append(b"".join(_record(_event(step, "loss", 1.0 / step)) for step in range(1, 101)))
+        cache = tensorboard_service.ScalarCache(max_points=10)
+
+        series, complete = cache.scalars([self.path])
+
+        loss = series["loss"]
+        self.assertTrue(complete)
+        self.assertLessEqual(len(loss["step"]), 11)
+        self.assertEqual(loss["count"], 100)
+        self.assertEqual(loss["step"][0], 1)
+        self.assertEqual(loss["step"][-1], 100)
+        self.assertEqual(loss["step"], sorted(loss["step"]))
+
+    def test_byte_budget_reports_incomplete(self):
+        self._append(b"".join(_record(_event(step, "loss", 0.1)) for step in range(1, 50)))
+        reader = tensorboard_service.EventFileReader(self.path)
+        reader.read_scalars(max_bytes=64)
+        self.assertTrue(reader.behind)
+        reader.read_scalars()
+        self.assertFalse(reader.behind)
+
+
+class TensorBoardScalarsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        for run, value in (("run-a", 0.5), ("run-b", 0.25)):
+            (self.root / run).mkdir()
+            (self.root / run / "events.out.tfevents.1.host").write_bytes(_record(_event(1, "loss", value)))
+        old = time.time() - 60
+        os.utime(self.root / "run-a" / "events.out.tfevents.1.host", (old, old))
+        patchers = [
+            patch.object(portal_app, "_tensorboard_sources", lambda: {"kohya": ([self.root], 8)}),
+            patch.object(portal_app, "_tensorboard_index", tensorboard_service.EventIndexCache()),
+            patch.object(portal_app, "_tensorboard_scalars", tensorboard_service.ScalarCache()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_runs_and_scalars_default_to_latest_run(self):
+        runs = portal_app.tensorboard_runs("kohya")
+        self.assertEqual([r["run"] for r in runs["runs"]], ["run-b", "run-a"])
+
+        latest = portal_app.tensorboard_scalars("kohya")
+        self.assertEqual((latest["run"], latest["tags"]["loss"]["value"]), ("run-b", [0.25]))
+        chosen = portal_app.tensorboard_scalars("kohya", run="run-a", tags="loss")
+        self.assertEqual(chosen["tags"]["loss"]["value"], [0.5])
+
+        self.assertEqual(chosen["errors"], {})
+
+        with (self.root / "run-a" / "events.out.tfevents.1.host").open("ab") as f:
+            f.write(b"\xff" * 16)
+        broken = portal_app.tensorboard_scalars("kohya", run="run-a")
+        self.assertIn("corrupt", broken["errors"]["events.out.tfevents.1.host"])
+        self.assertEqual(broken["tags"]["loss"]["value"], [0.5])
+        self.assertEqual(portal_app.tensorboard_scalars("kohya", run="run-b")["errors"], {})
+
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            portal_app.tensorboard_scalars("kohya", run="../etc")
+        self.assertEqual(cm.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from apps.Portal.services import train_metrics
+
+try:
+    from apps.Portal import app as portal_app
+except ModuleNotFoundError as exc:
+    if exc.name == "fastapi":
+        portal_app = None
+    else:
+        raise
+
+
+class MetricsParserTests(unittest.TestCase):
+    def test_kohya_tqdm_redraws_yield_one_sample_per_step(self):
+        parser = train_metrics.MetricsParser()
+        parser.feed("epoch 2/10")
+        line = (
+            "steps:  10%|█         | 100/1000 [02:00<18:00,  1.20s/it, avr_loss=0.125]\r"
+            "steps:  10%|█         | 100/1000 [02:00<18:00,  1.20s/it, avr_loss=0.125]\r"
+            "steps:  10%|█         | 101/1000 [02:01<17:59,  1.25it/s, avr_loss=0.124, lr/unet=0.0001]"
+        )
+
+        samples = parser.feed(line)
+
+        self.assertEqual([s["step"] for s in samples], [100, 101])
+        self.assertAlmostEqual(samples[0]["it_s"], 1 / 1.2)
+        self.assertEqual((samples[0]["loss"], samples[0]["eta_s"], samples[0]["lr"]), (0.125, 1080, None))
+        self.assertEqual((samples[1]["it_s"], samples[1]["lr"]), (1.25, 0.0001))
+        self.assertEqual((parser.total_steps, parser.epoch, parser.total_epochs), (1000, 2, 10))
+
+    def test_non_step_progress_bars_are_ignored(self):
+        parser = train_metrics.MetricsParser()
+        self.assertEqual(parser.feed("caching latents: 100%|██████████| 50/50 [00:05<00:00,  9.80it/s]"), [])
+
+    def test_deepspeed_step_and_lr_lines(self):
+        parser = train_metrics.MetricsParser()
+        parser.feed("[2024-05-01 10:00:00,000] [INFO] [logging.py:96:log_dist] [Rank 0] step=10, skipped=0, lr=[5e-05], mom=[(0.9, 0.99)]")
+
+        samples = parser.feed("steps: 10 loss: 0.2500 iter time (s): 2.000 samples/sec: 0.500")
+
+        self.assertEqual(samples, [{"step": 10, "loss": 0.25, "lr": 5e-05, "it_s": 0.5, "eta_s": None}])
+
+
+class MetricsStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = train_metrics.MetricsStore(Path(self.tmp.name), max_points=16, persist_interval=3600)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _feed_steps(self, recorder, count):
+        for step in range(1, count + 1):
+            recorder.feed(f"steps: {step} loss: {1 / step:.4f} iter time (s): 0.5")
+
+    def test_series_is_bounded_by_halving_resolution(self):
+        recorder = self.store.start_run("dpipe", "run")
+        self._feed_steps(recorder, 100)
+
+        data = self.store.get(recorder.run_id)
+
+        self.assertLessEqual(len(data["series"]["step"]), 16)
+        self.assertEqual(data["stride"], 8)
+        steps = data["series"]["step"]
+        self.assertEqual(steps, sorted(steps))
+        self.assertEqual(data["latest"]["step"], 100)
+        self.assertEqual(self.store.get(recorder.run_id, since_step=steps[-2])["series"]["step"], steps[-1:])
+
+    def test_finished_runs_are_persisted_and_listed_newest_first(self):
+        first = self.store.start_run("trainpilot", "alpha")
+        self._feed_steps(first, 3)
+        first.finish(0)
+        second = self.store.start_run("trainpilot", "alpha")
+        self._feed_steps(second, 2)
+
+        runs = self.store.list_runs()
+        self.assertEqual([r["run_id"] for r in runs], [second.run_id, first.run_id])
+        self.assertEqual([r["state"] for r in runs], ["running", "done"])
+
+        saved = json.loads((Path(self.tmp.name) / f"{first.run_id}.json").read_text(encoding="utf-8"))
+        self.assertEqual(saved["series"]["step"], [1, 2, 3])
+        reloaded = train_metrics.MetricsStore(Path(self.tmp.name)).get(first.run_id)
+        self.assertEqual(reloaded["series"]["loss"], [1.0, 0.5, 0.3333])
+        second.finish(-15)
+        self.assertEqual(self.store.get(second.run_id)["state"], "stopped")
+
+    def test_run_saved_mid_flight_loads_as_interrupted(self):
+        recorder = self.store.start_run("dpipe", "crashed")
+        self._feed_steps(recorder, 2)
+        recorder._persist()
+        train_metrics._active.pop(recorder.run_id)
+
+        self.assertEqual(self.store.get(recorder.run_id)["state"], "interrupted")
+        self.assertIsNone(self.store.get("20240101-000000-missing"))
+
+
+class TrainingMetricsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if portal_app is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+
+    def test_rejects_path_like_run_ids(self):
+        with self.assertRaises(portal_app.HTTPException) as cm:
+            portal_app.training_metrics_run("../../etc/passwd")
+        self.assertEqual(cm.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from apps.Portal.services import training_cache as training_cache_service
+
+try:
+    from apps.Portal import dpipe_api
+except ModuleNotFoundError as exc:
+    if exc.name in ("fastapi", "toml", "pydantic"):
+        dpipe_api = None
+    else:
+        raise
+
+
+class CacheRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        self.dataset = root / "datasets" / "1_dogs"
+        self.dataset.mkdir(parents=True)
+        (self.dataset / "a.png").write_bytes(b"png")
+        (self.dataset / "a.txt").write_text("dog")
+        self.cache_dir = self.dataset / "cache" / "hunyuan-video"
+        self.model = root / "vae.safetensors"
+        self.model.write_bytes(b"weights")
+        self.registry = training_cache_service.CacheRegistry(root / "config" / "caches.json")
+
+    def _parts(self, **settings):
+        return training_cache_service.fingerprint_parts(
+            self.dataset,
+            self.cache_dir.parent,
+            settings={"resolutions": [512], **settings},
+            model_paths=[str(self.model)],
+        )
+
+    def _build_cache(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / "latents.arrow").write_bytes(b"x" * 100)
+
+    def test_lifecycle_and_staleness(self):
+        parts = self._parts()
+        self.assertEqual(self.registry.check(self.cache_dir, parts)["status"], "missing")
+
+        self.registry.begin(self.cache_dir, trainer="diffusion-pipe", dataset_dir=self.dataset, parts=parts)
+        self._build_cache()
+        self.assertEqual(self.registry.check(self.cache_dir, parts)["status"], "unverified")
+        self.registry.finish(self.cache_dir, ok=True)
+
+        # The cache directory itself is not part of the dataset fingerprint.
+        reloaded = training_cache_service.CacheRegistry(self.registry.path)
+        self.assertEqual(reloaded.check(self.cache_dir, self._parts())["status"], "reuse")
+
+        self.assertEqual(reloaded.check(self.cache_dir, self._parts(resolutions=[768]))["reasons"], ["settings changed"])
+        os.utime(self.model, (1, 1))
+        (self.dataset / "b.png").write_bytes(b"png")
+        stale = reloaded.check(self.cache_dir, self._parts())
+        self.assertEqual((stale["status"], stale["reasons"]), ("stale", ["dataset changed", "models changed"]))
+
+    def test_failed_run_keeps_a_reused_cache_ready(self):
+        parts = self._parts()
+        self._build_cache()
+        self.registry.begin(self.cache_dir, trainer="diffusion-pipe", dataset_dir=self.dataset, parts=parts)
+        self.registry.finish(self.cache_dir, ok=True)
+
+        self.registry.begin(self.cache_dir, trainer="diffusion-pipe", dataset_dir=self.dataset, parts=parts)
+        self.registry.finish(self.cache_dir, ok=False)
+        self.assertEqual(self.registry.check(self.cache_dir, parts)["status"], "reuse")
+
+        self.registry.begin(self.cache_dir, trainer="diffusion-pipe", dataset_dir=self.dataset, parts=parts, rebuild=True)
+        self.registry.finish(self.cache_dir, ok=False)
+        self.assertEqual(self.registry.check(self.cache_dir, parts)["status"], "unverified")
+
+    def test_inventory_orphans_and_untracked(self):
+        self._build_cache()
+        self.assertEqual(self.registry.check(self.cache_dir, self._parts())["status"], "untracked")
+
+        cats = self.dataset.parent / "1_cats"
+        other = cats / "cache" / "hunyuan-video"
+        other.mkdir(parents=True)
+        (cats / "c.png").write_bytes(b"png")
+        (other / "x").write_bytes(b"y" * 10)
+        lora = self.model.with_name("text-encoder.safetensors")
+        lora.write_bytes(b"te")
+        models = [str(self.model), str(lora)]
+        parts = training_cache_service.fingerprint_parts(cats, other.parent, settings={}, model_paths=models)
+        self.registry.begin(other, trainer="diffusion-pipe", dataset_dir=cats, parts=parts, model_paths=models, dataset_skip=other.parent)
+        self.registry.finish(other, ok=True)
+
+        roots = [(self.dataset.parent, Path("cache") / "hunyuan-video")]
+        items = {i["cache_dir"]: i for i in self.registry.inventory(roots)}
+        self.assertEqual((items[str(other)]["orphaned"], items[str(other)]["size_bytes"]), (False, 10))
+        self.assertEqual((items[str(self.cache_dir)]["tracked"], items[str(self.cache_dir)]["size_bytes"]), (False, 100))
+
+        (cats / "d.png").write_bytes(b"png")
+        item = self.registry.inventory(roots)[0]
+        self.assertEqual((item["orphaned"], item["orphan_reason"]), (True, "dataset changed since the cache was built"))
+        (cats / "d.png").unlink()
+        lora.unlink()
+        self.assertEqual(self.registry.inventory(roots)[0]["orphan_reason"], "model files are gone")
+
+        self.assertEqual(self.registry.remove(other), 10)
+        self.assertFalse(other.exists())
+        self.assertEqual([i["cache_dir"] for i in self.registry.inventory()], [])
+
+
+class CacheEndpointTests(unittest.TestCase):
+    def setUp(self):
+        if dpipe_api is None:
+            self.skipTest("FastAPI is not installed in this test environment")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        self.datasets = root / "datasets"
+        registry = training_cache_service.CacheRegistry(root / "caches.json")
+        for patcher in (
+            patch.object(dpipe_api, "BASE_DATASET_DIR", self.datasets),
+            patch.object(dpipe_api, "_caches", registry),
+            patch.object(dpipe_api, "_procs", {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.model = root / "vae.safetensors"
+        self.model.write_bytes(b"weights")
+        self.live = self.datasets / "1_live" / "cache" / "hunyuan-video"
+        self.orphan = self.datasets / "1_old" / "cache" / "hunyuan-video"
+        for path in (self.live, self.orphan):
+            dataset = path.parent.parent
+            path.mkdir(parents=True)
+            (dataset / "a.png").write_bytes(b"png")
+            (path / "latents").write_bytes(b"z" * 64)
+            parts = training_cache_service.fingerprint_parts(dataset, path.parent, settings={}, model_paths=[str(self.model)])
+            registry.begin(
+                path,
+                trainer="diffusion-pipe",
+                dataset_dir=dataset,
+                parts=parts,
+                model_paths=[str(self.model)],
+                dataset_skip=path.parent,
+            )
+        # Re-captioned after its cache was built: the old latents are dead weight.
+        (self.orphan.parent.parent / "a.txt").write_text("a dog")
+
+    def test_list_and_cleanup_orphans(self):
+        listing = dpipe_api.list_caches()
+        self.assertEqual((listing["total_bytes"], listing["orphaned_bytes"]), (128, 64))
+
+        dry = dpipe_api.cleanup_caches(dpipe_api.CacheCleanupRequest(dry_run=True))
+        self.assertEqual((dry["freed_bytes"], self.orphan.exists()), (64, True))
+
+        done = dpipe_api.cleanup_caches(dpipe_api.CacheCleanupRequest())
+        self.assertEqual([r["cache_dir"] for r in done["removed"]], [str(self.orphan)])
+        self.assertFalse(self.orphan.exists())
+        self.assertTrue(self.live.exists())
+
+    def test_explicit_cleanup_skips_caches_in_use(self):
+        class _Job:
+            running = True
+            meta = {"cache_dir": str(self.live)}
+
+        dpipe_api._procs[1] = _Job()
+        result = dpipe_api.cleanup_caches(dpipe_api.CacheCleanupRequest(cache_dirs=[str(self.live)]))
+        self.assertEqual(result["skipped"][0]["reason"], "in use by a running training")
+        self.assertTrue(self.live.exists())
+        with self.assertRaises(dpipe_api.HTTPException):
+            dpipe_api.cleanup_caches(dpipe_api.CacheCleanupRequest(cache_dirs=["/etc"]))
+
+    def _start(self):
+        root = Path(self.tmp.name)
+        deepspeed = root / "deepspeed"
+        deepspeed.write_text("#!/bin/sh\nexit 1\n")
+        deepspeed.chmod(0o755)
+        diffpipe = root / "diffusion-pipe"
+        diffpipe.mkdir()
+        (diffpipe / "train.py").write_text("")
+        (root / "configs" / "run").mkdir(parents=True)
+        for name, value in (
+            ("WORKSPACE", root),
+            ("MODEL_DIR", root / "models"),
+            ("OUTPUT_DIR", root / "outputs"),
+            ("CONFIG_DIR", root / "configs"),
+            ("DIFFPIPE_APP_DIR", diffpipe),
+            ("DEEPSPEED_BIN", str(deepspeed)),
+            ("_LOCAL_PATH_ROOTS", (root.resolve(),)),
+            ("_logs", {}),
+            ("_metrics", dpipe_api.train_metrics.MetricsStore(root / "metrics")),
+        ):
+            patcher = patch.object(dpipe_api, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        model = str(self.model)
+        req = dpipe_api.TrainRequest(
+            dataset_path="1_live",
+            config_dir="run",
+            output_dir="run",
+            transformer_path=model,
+            vae_path=model,
+            llm_path=model,
+            clip_path=model,
+            skip_preflight=True,
+            regenerate_cache=True,
+        )
+        return dpipe_api.start_training(req)
+
+    def test_a_run_that_exits_at_once_still_finishes_its_cache_entry(self):
+        started = self._start()
+        job = dpipe_api.jobs.runner.get(started["job_id"])
+        self.assertTrue(job.wait(10))
+        def state():
+            # From disk: the entry is saved last, once on_exit (which runs after wait() returns) is done.
+            return training_cache_service.CacheRegistry(dpipe_api._caches.path)._load()[str(self.live)]["state"]
+
+        deadline = time.monotonic() + 10
+        while state() == "building" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(state(), "incomplete")
+
+    def test_spawn_failure_marks_the_cache_incomplete(self):
+        with patch.object(dpipe_api.jobs.runner, "spawn", side_effect=OSError("boom")):
+            with self.assertRaises(dpipe_api.HTTPException):
+                self._start()
+        self.assertEqual(dpipe_api._caches._load()[str(self.live)]["state"], "incomplete")
+
+
+if __name__ == "__main__":
+    unittest.main()